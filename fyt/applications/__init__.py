@@ -0,0 +1,12 @@
+from django.apps import AppConfig
+
+
+class ApplicationsConfig(AppConfig):
+    name = 'fyt.applications'
+
+    def ready(self):
+        # Register search signals
+        from . import search
+
+
+default_app_config = 'fyt.applications.ApplicationsConfig'
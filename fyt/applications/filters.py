@@ -7,6 +7,7 @@ from django.db.models import Q
 from django.forms import Select
 
 from fyt.applications.models import Volunteer
+from fyt.applications.search import search
 from fyt.training.models import Attendee, Training
 from fyt.trips.models import Section, TripType
 from fyt.utils.choices import AVAILABLE, PREFER
@@ -214,9 +215,16 @@ class ApplicationFilterSet(django_filters.FilterSet):
             KITCHEN_LEAD,
         ]
 
+    search = django_filters.CharFilter(method='search_applications', label='Search')
     name = django_filters.CharFilter(method='lookup_user_by_name', label='Name')
     netid = django_filters.CharFilter(method='lookup_user_by_netid', label='NetId')
 
+    def search_applications(self, qs, name, value):
+        if not value:
+            return qs
+
+        return search(qs, self.trips_year, value)
+
     def lookup_user_by_name(self, qs, name, value):
         if not value:
             return qs
@@ -231,6 +239,7 @@ class ApplicationFilterSet(django_filters.FilterSet):
 
     def __init__(self, trips_year, *args, **kwargs):
         super().__init__(*args, **kwargs)
+        self.trips_year = trips_year
 
         self.filters[COMPLETE] = ApplicationTypeFilter(trips_year)
         self.filters[AVAILABLE_SECTIONS] = AvailableSectionFilter(trips_year)
@@ -273,6 +282,7 @@ class FilterSetFormHelper(FormHelper):
             filter_row(FIRST_AID),
             training_layout,
             filter_row(CLASS_YEAR),
+            filter_row('search'),
             filter_row('name'),
             filter_row('netid'),
             filter_row(AVAILABLE_SECTIONS),
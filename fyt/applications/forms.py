@@ -4,6 +4,7 @@ from crispy_forms.helper import FormHelper
 from crispy_forms.layout import HTML, Div, Field, Fieldset, Layout, Row, Submit
 from django import forms
 from django.core.exceptions import ImproperlyConfigured, ValidationError
+from django.db import transaction
 from django.utils import timezone
 
 from fyt.applications.models import (
@@ -19,6 +20,7 @@ from fyt.applications.models import (
     Volunteer,
     validate_word_count,
 )
+from fyt.applications.search import schedule_update
 from fyt.core.forms import TripsYearModelForm
 from fyt.core.models import TripsYear
 from fyt.croos.models import Croo
@@ -115,6 +117,8 @@ class QuestionForm(TripsYearModelForm):
 
     def save(self, **kwargs):
         self.question_handler.save()
+        # Answers are saved in bulk, without signals
+        schedule_update(self.instance.pk)
 
 
 class AgreementForm(TripsYearModelForm):
@@ -199,10 +203,6 @@ class PreferenceHandler:
     # of through objects
     through_qs_name = None
 
-    # Name of the method on the instance which creates a new through object
-    # with the specified (target, data) arguments.
-    through_creator = None
-
     # The name of the extra data field on the through model
     data_field = None
 
@@ -233,8 +233,16 @@ class PreferenceHandler:
             .all()
         )
 
-    def create_through(self, instance, target, data):
-        return getattr(instance, self.through_creator)(target, data)
+    def build_through(self, instance, target, data):
+        """Return a new, unsaved, through object."""
+        manager = getattr(instance, self.through_qs_name)
+        return manager.model(
+            **{
+                manager.field.name: instance,
+                self.target_field: target,
+                self.data_field: data,
+            }
+        )
 
     def formfield_label(self, target):
         """The label for the formfield."""
@@ -288,27 +296,56 @@ class PreferenceHandler:
         Save the through objects.
 
         This must be called after the form's `save` method has been called.
+
+        Changes are worked out in memory and written with one `bulk_update`
+        and one `bulk_create`. Neither calls `save` or sends signals, and
+        the data has already been validated by the form fields.
         """
 
         def get_cleaned_data(target):
             return self.form.cleaned_data[self.formfield_name(target)]
 
+        instance = self.form.instance
         targets = set(self.targets)
+        changed = []
 
         # Update old answers
-        for pref in self.through_qs(self.form.instance):
+        for pref in self.through_qs(instance):
             target = self.get_target(pref)
             new_data = get_cleaned_data(target)
 
             if new_data != self.get_data(pref):
                 self.set_data(pref, new_data)
-                pref.save()
+                changed.append(pref)
 
             targets.remove(target)
 
         # Save new answers
-        for t in targets:
-            self.create_through(self.form.instance, t, get_cleaned_data(t))
+        new = [self.build_through(instance, t, get_cleaned_data(t)) for t in targets]
+
+        Model = getattr(instance, self.through_qs_name).model
+        with transaction.atomic():
+            if changed:
+                Model.objects.bulk_update(changed, [self.data_field])
+            if new:
+                Model.objects.bulk_create(new)
+
+
+    def create(self):
+        """
+        Save the through objects of an instance which has just been
+        created, and so has none yet, with a single `bulk_create`.
+        """
+        instance = self.form.instance
+        Model = getattr(instance, self.through_qs_name).model
+        Model.objects.bulk_create(
+            [
+                self.build_through(
+                    instance, t, self.form.cleaned_data[self.formfield_name(t)]
+                )
+                for t in self.targets
+            ]
+        )
 
 
 class QuestionHandler(PreferenceHandler):
@@ -317,7 +354,6 @@ class QuestionHandler(PreferenceHandler):
     """
 
     through_qs_name = 'answer_set'
-    through_creator = 'answer_question'
     data_field = 'answer'
     target_field = 'question'
     default = ''
@@ -353,7 +389,6 @@ class QuestionHandler(PreferenceHandler):
 
 class SectionPreferenceHandler(PreferenceHandler):
     through_qs_name = 'leadersectionchoice_set'
-    through_creator = 'set_section_preference'
     data_field = 'preference'
     target_field = 'section'
     choices = LEADER_SECTION_CHOICES
@@ -384,7 +419,6 @@ class SectionPreferenceHandler(PreferenceHandler):
 
 class TripTypePreferenceHandler(PreferenceHandler):
     through_qs_name = 'leadertriptypechoice_set'
-    through_creator = 'set_triptype_preference'
     data_field = 'preference'
     target_field = 'triptype'
     choices = LEADER_TRIPTYPE_CHOICES
@@ -662,7 +696,6 @@ class CommentHandler(PreferenceHandler):
     """
 
     through_qs_name = 'scorecomment_set'
-    through_creator = 'add_comment'
     data_field = 'comment'
     target_field = 'score_question'
     default = ''
@@ -725,6 +758,7 @@ def ScoreForm(application, grader, **kwargs):
         @property
         def helper(self):
             helper = FormHelper(self)
+            helper.form_id = 'score-form'
 
             helper.layout = Layout(
                 *self.comment_handler.formfield_names(),
@@ -746,8 +780,13 @@ def ScoreForm(application, grader, **kwargs):
             self.instance.grader = self.grader
             self.instance.application = self.application
             self.instance.trips_year = self.trips_year
-            score = super().save()
-            self.comment_handler.save()
+            created = self.instance.pk is None
+            with transaction.atomic():
+                score = super().save()
+                if created:
+                    self.comment_handler.create()
+                else:
+                    self.comment_handler.save()
             return score
 
     return _ScoreForm(application, grader, **kwargs)
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from fyt.applications.models import Volunteer
+from fyt.applications.search import update_documents
+from fyt.core.models import TripsYear
+
+
+class Command(BaseCommand):
+
+    help = 'Rebuild the full text search documents of volunteer applications'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--trips-year',
+            type=int,
+            help='Only rebuild this trips year; defaults to the current year',
+        )
+
+    def handle(self, *args, **options):
+        trips_year = options['trips_year'] or TripsYear.objects.current().pk
+
+        count = update_documents(Volunteer.objects.filter(trips_year=trips_year))
+        self.stdout.write('Rebuilt %s search documents in %s' % (count, trips_year))
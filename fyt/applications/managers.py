@@ -1,7 +1,8 @@
 from collections import OrderedDict
 
-from django.db import models
+from django.db import models, transaction
 from django.db.models import (
+    F,
     Q,
     Avg,
     Case,
@@ -177,6 +178,30 @@ class VolunteerQuerySet(models.QuerySet):
         # https://docs.djangoproject.com/en/2.2/releases/2.2/#model-meta-ordering-will-no-longer-affect-group-by-queries
         ).order_by(*self.model._meta.ordering)
 
+    def attach_avg_scores(self, volunteers):
+        """
+        Set the average scores of ``volunteers``, a list of Volunteers, as
+        ``with_avg_scores`` would, with a single query.
+        """
+        from .models import Score
+
+        scores = {
+            pk: (leader, croo)
+            for pk, leader, croo in Score.objects.filter(application__in=volunteers)
+            .values('application')
+            .annotate(
+                avg_leader_score=Avg('leader_score__value'),
+                avg_croo_score=Avg('croo_score__value'),
+            )
+            .order_by()
+            .values_list('application', 'avg_leader_score', 'avg_croo_score')
+        }
+        for volunteer in volunteers:
+            volunteer.avg_leader_score, volunteer.avg_croo_score = scores.get(
+                volunteer.pk, (None, None)
+            )
+        return volunteers
+
     def first_aid_complete(self):
         """
         All volunteers with complete first aid certifications.
@@ -227,8 +252,17 @@ class QuestionManager(models.Manager):
 
 class BaseGraderManager(models.Manager):
     def from_user(self, user):
-        """Return the Grader object proxying the given user."""
-        return self.get(pk=user.pk)
+        """
+        Return the Grader object proxying the given user.
+
+        Permissions already loaded for the user are reused by the grader,
+        so that checking ``is_croo_head`` does not query them again.
+        """
+        grader = self.get(pk=user.pk)
+        for cache in ['_perm_cache', '_user_perm_cache', '_group_perm_cache']:
+            if hasattr(user, cache):
+                setattr(grader, cache, getattr(user, cache))
+        return grader
 
 
 class GraderQuerySet(models.QuerySet):
@@ -315,6 +349,52 @@ class ScoreQuerySet(models.QuerySet):
         )
 
 
+class GraderStatsQuerySet(models.QuerySet):
+    def record(self, score, sign=1):
+        """
+        Add ``score`` to the running totals of its grader and of all
+        graders in its trips year. Pass ``sign=-1`` to remove it.
+        """
+        updates = {'score_count': F('score_count') + sign}
+        for kind in ['leader', 'croo']:
+            score_value = getattr(score, kind + '_score')
+            if score_value is not None:
+                value = score_value.value
+                updates.update(
+                    {
+                        kind + '_count': F(kind + '_count') + sign,
+                        kind + '_sum': F(kind + '_sum') + sign * value,
+                        kind
+                        + '_sum_of_squares': F(kind + '_sum_of_squares')
+                        + sign * value * value,
+                    }
+                )
+
+        with transaction.atomic():
+            for grader in [score.grader_id, None]:
+                self.get_or_create(trips_year_id=score.trips_year_id, grader_id=grader)
+            self.filter(
+                Q(grader=score.grader_id) | Q(grader__isnull=True),
+                trips_year=score.trips_year_id,
+            ).update(**updates)
+
+    def calibration(self, grader, trips_year):
+        """
+        Return the statistics of ``grader`` and of all graders in
+        ``trips_year``, with a single query.
+        """
+        stats = {
+            s.grader_id: s
+            for s in self.filter(
+                Q(grader=grader) | Q(grader__isnull=True), trips_year=trips_year
+            )
+        }
+        return (
+            stats.get(grader.pk) or self.model(grader=grader),
+            stats.get(None) or self.model(),
+        )
+
+
 class ScoreClaimQuerySet(models.QuerySet):
     def active(self):
         """
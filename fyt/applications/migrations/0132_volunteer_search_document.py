@@ -0,0 +1,39 @@
+# Generated by Django 3.1.2 on 2026-10-18 22:21
+
+from django.db import migrations, models
+
+
+# Matches the expression compiled by fyt.applications.search, so that
+# Postgres uses the index for full text searches.
+CREATE_INDEX = """
+CREATE INDEX applications_volunteer_search ON applications_volunteer
+USING gin (to_tsvector('english'::regconfig, COALESCE(search_document, '')))
+"""
+
+DROP_INDEX = 'DROP INDEX IF EXISTS applications_volunteer_search'
+
+
+def create_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(CREATE_INDEX)
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(DROP_INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('applications', '0131_auto_20200219_0319'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='volunteer',
+            name='search_document',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.RunPython(create_index, drop_index),
+    ]
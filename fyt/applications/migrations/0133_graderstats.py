@@ -0,0 +1,70 @@
+# Generated by Django 3.1.2 on 2026-10-18 22:26
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def add_grader_stats(apps, schema_editor):
+    Score = apps.get_model('applications', 'Score')
+    GraderStats = apps.get_model('applications', 'GraderStats')
+
+    stats = {}
+
+    def add(grader, trips_year, leader, croo):
+        key = (grader, trips_year)
+        if key not in stats:
+            stats[key] = GraderStats(grader_id=grader, trips_year_id=trips_year)
+        s = stats[key]
+        s.score_count += 1
+        for kind, value in [('leader', leader), ('croo', croo)]:
+            if value is not None:
+                setattr(s, kind + '_count', getattr(s, kind + '_count') + 1)
+                setattr(s, kind + '_sum', getattr(s, kind + '_sum') + value)
+                setattr(
+                    s,
+                    kind + '_sum_of_squares',
+                    getattr(s, kind + '_sum_of_squares') + value * value,
+                )
+
+    for grader, trips_year, leader, croo in Score.objects.values_list(
+        'grader', 'trips_year', 'leader_score__value', 'croo_score__value'
+    ):
+        add(grader, trips_year, leader, croo)
+        add(None, trips_year, leader, croo)
+
+    GraderStats.objects.bulk_create(stats.values())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_auto_20180719_1052'),
+        ('applications', '0132_volunteer_search_document'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GraderStats',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score_count', models.PositiveIntegerField(default=0)),
+                ('leader_count', models.PositiveIntegerField(default=0)),
+                ('leader_sum', models.DecimalField(decimal_places=1, default=0, max_digits=9)),
+                ('leader_sum_of_squares', models.DecimalField(decimal_places=2, default=0, max_digits=11)),
+                ('croo_count', models.PositiveIntegerField(default=0)),
+                ('croo_sum', models.DecimalField(decimal_places=1, default=0, max_digits=9)),
+                ('croo_sum_of_squares', models.DecimalField(decimal_places=2, default=0, max_digits=11)),
+                ('grader', models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='stats', to='applications.grader')),
+                ('trips_year', models.ForeignKey(editable=False, on_delete=django.db.models.deletion.PROTECT, to='core.tripsyear')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='graderstats',
+            constraint=models.UniqueConstraint(condition=models.Q(grader__isnull=True), fields=('trips_year',), name='unique_pool_graderstats'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='graderstats',
+            unique_together={('grader', 'trips_year')},
+        ),
+        migrations.RunPython(add_grader_stats, migrations.RunPython.noop),
+    ]
@@ -1,13 +1,13 @@
+import math
 import random
 from datetime import timedelta
 
 from django.conf import settings
 from django.core.exceptions import ValidationError
-from django.db import models
+from django.db import models, transaction
 from django.db.models import (
     F,
     Q,
-    Avg,
     Case,
     Count,
     Exists,
@@ -17,11 +17,15 @@ from django.db.models import (
     Value as V,
     When,
 )
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from django.utils import timezone
 from django.utils.functional import cached_property
+from model_utils import FieldTracker
 
 from .managers import (
     GraderManager,
+    GraderStatsQuerySet,
     QuestionManager,
     ScoreClaimQuerySet,
     ScoreQuerySet,
@@ -300,6 +304,7 @@ class Volunteer(MedicalMixin, DatabaseModel):
     NUM_SCORES = 3
 
     objects = VolunteerManager()
+    tracker = FieldTracker(fields=['trip_assignment'])
 
     PENDING = 'PENDING'
     CROO = 'CROO'
@@ -518,6 +523,10 @@ class Volunteer(MedicalMixin, DatabaseModel):
         "I can attend trainings during the summer term.", default=False
     )
 
+    # The searchable text of the application and its answers, kept up to
+    # date by ``fyt.applications.search``
+    search_document = models.TextField(blank=True, editable=False)
+
     def clean(self):
         """
         Only allow Croo/Trip assignments if status == LEADER,CROO
@@ -992,12 +1001,13 @@ class Score(DatabaseModel):
 
     def save(self, **kwargs):
         """
-        Set croo_head.
+        Set croo_head on new scores.
         """
         if self.pk is None:
             self.croo_head = self.grader.is_croo_head
-
-        return super().save(**kwargs)
+        # Keep the score and the grader's statistics in step
+        with transaction.atomic():
+            super().save(**kwargs)
 
     def add_comment(self, score_question, comment):
         """
@@ -1008,6 +1018,84 @@ class Score(DatabaseModel):
         )
 
 
+class GraderStats(DatabaseModel):
+    """
+    Running totals of the scores given by a grader in a trips year.
+
+    These are updated whenever a score is added or deleted, so that the
+    scoring page can show graders their average scores, and how they
+    compare to everyone else, without aggregating all their scores. The
+    row without a grader holds the totals of all graders.
+
+    The totals are kept by the ``post_save`` and ``post_delete`` receivers
+    below, which also see scores deleted in bulk or by cascade.
+    """
+
+    class Meta:
+        unique_together = ['grader', 'trips_year']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['trips_year'],
+                condition=Q(grader__isnull=True),
+                name='unique_pool_graderstats',
+            )
+        ]
+
+    grader = models.ForeignKey(
+        'Grader',
+        null=True,
+        editable=False,
+        related_name='stats',
+        on_delete=models.CASCADE,
+    )
+    score_count = models.PositiveIntegerField(default=0)
+    leader_count = models.PositiveIntegerField(default=0)
+    leader_sum = models.DecimalField(max_digits=9, decimal_places=1, default=0)
+    leader_sum_of_squares = models.DecimalField(
+        max_digits=11, decimal_places=2, default=0
+    )
+    croo_count = models.PositiveIntegerField(default=0)
+    croo_sum = models.DecimalField(max_digits=9, decimal_places=1, default=0)
+    croo_sum_of_squares = models.DecimalField(
+        max_digits=11, decimal_places=2, default=0
+    )
+
+    objects = GraderStatsQuerySet.as_manager()
+
+    def mean(self, kind):
+        """
+        The mean of the ``'leader'`` or ``'croo'`` scores, or None if there
+        are none.
+        """
+        count = getattr(self, kind + '_count')
+        if not count:
+            return None
+        return float(getattr(self, kind + '_sum')) / count
+
+    def stdev(self, kind):
+        """
+        The population standard deviation of the ``'leader'`` or ``'croo'``
+        scores, or None if there are none.
+        """
+        mean = self.mean(kind)
+        if mean is None:
+            return None
+        count = getattr(self, kind + '_count')
+        variance = float(getattr(self, kind + '_sum_of_squares')) / count - mean ** 2
+        return math.sqrt(max(variance, 0))
+
+
+@receiver(post_save, sender=Score)
+def add_score_to_stats(instance=None, created=False, raw=False, **kwargs):
+    if created and not raw:
+        GraderStats.objects.record(instance)
+
+
+@receiver(post_delete, sender=Score)
+def remove_score_from_stats(instance=None, **kwargs):
+    GraderStats.objects.record(instance, sign=-1)
+
+
 class ScoreValue(DatabaseModel):
     """
     The value assigned to leader and croo scores.
@@ -1206,18 +1294,17 @@ class Grader(DartmouthUser):
     def scores_for_year(self, trips_year):
         return self.scores.filter(trips_year=trips_year)
 
+    def stats(self, trips_year):
+        return GraderStats.objects.calibration(self, trips_year)[0]
+
     def score_count(self, trips_year):
-        return self.scores_for_year(trips_year).count()
+        return self.stats(trips_year).score_count
 
     def avg_leader_score(self, trips_year):
-        return self.scores_for_year(trips_year).aggregate(Avg('leader_score__value'))[
-            'leader_score__value__avg'
-        ]
+        return self.stats(trips_year).mean('leader')
 
     def avg_croo_score(self, trips_year):
-        return self.scores_for_year(trips_year).aggregate(Avg('croo_score__value'))[
-            'croo_score__value__avg'
-        ]
+        return self.stats(trips_year).mean('croo')
 
     def claim_next_to_score(self):
         """
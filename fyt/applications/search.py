@@ -0,0 +1,217 @@
+"""
+Full text search over volunteer applications.
+
+The searchable text of each application -- the applicant's name and
+NetId, the free text answers on the application and its leader and croo
+supplements, and the answers to the application questions -- is kept in
+``Volunteer.search_document``. The signal receivers below rebuild the
+document when the volunteer, a supplement or an answer is saved.
+
+On Postgres, ``search`` matches documents with ``to_tsvector`` and ranks
+them with ``ts_rank``; a GIN index on the same expression (see migration
+0132) makes the match an index lookup. Other databases, such as SQLite in
+development and tests, use an in-process inverted index of each trips
+year instead.
+"""
+
+import functools
+import math
+import re
+from collections import defaultdict
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connection, connections
+from django.db.models import Case, FloatField, Value, When
+from django.db.models.functions import Cast
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from fyt.applications.models import Answer, CrooSupplement, LeaderSupplement, Volunteer
+from fyt.core.managers import trips_data_cache
+from fyt.utils.cache import on_commit_once
+
+
+CONFIG = 'english'
+
+VOLUNTEER_FIELDS = [
+    'hometown',
+    'academic_interests',
+    'personal_activities',
+    'medical_certifications',
+    'medical_experience',
+    'peer_training',
+]
+LEADER_SUPPLEMENT_FIELDS = [
+    'section_availability',
+    'availability',
+    'relevant_experience',
+    'co_leader',
+    'paddling_experience',
+    'climbing_experience',
+    'biking_experience',
+    'bike_maintenance_experience',
+    'hiking_experience',
+]
+CROO_SUPPLEMENT_FIELDS = ['kitchen_lead_qualifications']
+
+DOCUMENT_FIELDS = (
+    ['applicant__name', 'applicant__netid']
+    + VOLUNTEER_FIELDS
+    + ['leader_supplement__' + f for f in LEADER_SUPPLEMENT_FIELDS]
+    + ['croo_supplement__' + f for f in CROO_SUPPLEMENT_FIELDS]
+)
+
+
+def build_documents(volunteers):
+    """
+    Return a dict of the search document of each of ``volunteers``, a
+    queryset, by pk.
+    """
+    texts = {
+        row['pk']: [row[field] for field in DOCUMENT_FIELDS]
+        for row in volunteers.values('pk', *DOCUMENT_FIELDS)
+    }
+    for pk, answer in Answer.objects.filter(
+        application__in=volunteers.values('pk')
+    ).values_list('application', 'answer'):
+        texts[pk].append(answer)
+
+    return {pk: '\n'.join(text for text in t if text) for pk, t in texts.items()}
+
+
+def update_documents(volunteers):
+    """
+    Rebuild the search documents of ``volunteers``, a queryset, with a
+    single bulk update.
+    """
+    documents = build_documents(volunteers)
+    Volunteer.objects.bulk_update(
+        [Volunteer(pk=pk, search_document=doc) for pk, doc in documents.items()],
+        ['search_document'],
+        batch_size=500,
+    )
+    for year in set(volunteers.values_list('trips_year', flat=True)):
+        trips_data_cache.invalidate(year, Volunteer)
+    return len(documents)
+
+
+def schedule_update(volunteer_pk):
+    """
+    Rebuild the document of a volunteer once the current transaction
+    commits. Saving an application and its supplements only rebuilds it
+    once.
+    """
+    on_commit_once(
+        ('search-document', volunteer_pk),
+        functools.partial(update_documents, Volunteer.objects.filter(pk=volunteer_pk)),
+    )
+
+
+@receiver(post_save, sender=Volunteer)
+def update_document_for_volunteer(instance, update_fields=None, **kwargs):
+    if update_fields is None or set(update_fields) & set(VOLUNTEER_FIELDS):
+        schedule_update(instance.pk)
+
+
+@receiver(post_save, sender=LeaderSupplement)
+@receiver(post_save, sender=CrooSupplement)
+@receiver(post_save, sender=Answer)
+def update_document_for_answers(instance, **kwargs):
+    schedule_update(instance.application_id)
+
+
+def tokenize(text):
+    return re.findall(r'\w+', text.lower())
+
+
+class InvertedIndex:
+    """
+    The postings of every term in the search documents of a trips year.
+    """
+
+    def __init__(self, documents):
+        self.size = len(documents)
+        self.postings = defaultdict(dict)  # term -> pk -> occurrences
+        for pk, document in documents.items():
+            for term in tokenize(document):
+                self.postings[term][pk] = self.postings[term].get(pk, 0) + 1
+
+    @classmethod
+    def build(cls, trips_year):
+        return cls(
+            dict(
+                Volunteer.objects.filter(trips_year=trips_year).values_list(
+                    'pk', 'search_document'
+                )
+            )
+        )
+
+    def search(self, query):
+        """
+        Return the rank of every document containing all the terms of
+        ``query``, by pk. Terms are weighted by their inverse document
+        frequency.
+        """
+        postings = [self.postings.get(term, {}) for term in set(tokenize(query))]
+        if not postings:
+            return {}
+
+        matches = set.intersection(*(set(p) for p in postings))
+        return {
+            pk: sum(p[pk] * math.log(1 + self.size / len(p)) for p in postings)
+            for pk in matches
+        }
+
+
+# Inverted indexes by trips year, with the trips_data_cache version of
+# Volunteer they were built at
+_indexes = {}
+
+
+def inverted_index(trips_year):
+    year = int(getattr(trips_year, 'pk', trips_year))
+    if connection.in_atomic_block:
+        return InvertedIndex.build(year)
+
+    group = trips_data_cache.group(Volunteer)
+    version = trips_data_cache.versions(year, [group])[0]
+    if year not in _indexes or _indexes[year][0] != version:
+        _indexes[year] = (version, InvertedIndex.build(year))
+    return _indexes[year][1]
+
+
+def search(queryset, trips_year, query):
+    """
+    Filter a queryset of the volunteers of ``trips_year`` to those whose
+    application matches ``query``, best matches first.
+
+    The rank of each match is annotated as ``search_rank``, as a double
+    so that it compares equal to itself when the keyset paginator seeks
+    past it. (``ts_rank`` returns a ``real``.)
+    """
+    ordering = ['-search_rank'] + Volunteer._meta.ordering
+
+    if connections[queryset.db].vendor == 'postgresql':
+        vector = SearchVector('search_document', config=CONFIG)
+        tsquery = SearchQuery(query, config=CONFIG)
+        return (
+            queryset.annotate(
+                search_vector=vector,
+                search_rank=Cast(SearchRank(vector, tsquery), FloatField()),
+            )
+            .filter(search_vector=tsquery)
+            .order_by(*ordering)
+        )
+
+    ranks = inverted_index(trips_year).search(query)
+    return (
+        queryset.filter(pk__in=list(ranks))
+        .annotate(
+            search_rank=Case(
+                *[When(pk=pk, then=Value(rank)) for pk, rank in ranks.items()],
+                default=Value(0.0),
+                output_field=FloatField(),
+            )
+        )
+        .order_by(*ordering)
+    )
@@ -37,6 +37,24 @@ class _ApplicationTable(tables.Table):
         url = reverse('core:volunteer:update_status', kwargs=kwargs)
         return make_link(url, record.get_status_display())
 
+    def order_avg_leader_score(self, queryset, is_descending):
+        return self._order_by_score(queryset, 'norm_avg_leader_score', is_descending)
+
+    def order_avg_croo_score(self, queryset, is_descending):
+        return self._order_by_score(queryset, 'norm_avg_croo_score', is_descending)
+
+    def _order_by_score(self, queryset, field, is_descending):
+        """
+        Average scores are only annotated when sorting by them. Otherwise
+        they are loaded for the displayed rows only.
+
+        The columns are ordered by descending score, so the ascending
+        alias sorts the highest scores first.
+        """
+        ordering = [field if is_descending else '-' + field]
+        ordering += queryset.model._meta.ordering
+        return queryset.with_avg_scores().order_by(*ordering), True
+
     def render_avg_leader_score(self, value):
         return "%.1f" % value
 
@@ -2,6 +2,8 @@ import unittest
 from datetime import timedelta
 
 from django.core.exceptions import ValidationError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils import timezone
 from model_mommy import mommy
@@ -9,6 +11,7 @@ from model_mommy import mommy
 from ..forms import SKIP, ScoreForm, ScoreQuestionFormset
 from ..models import (
     Grader,
+    GraderStats,
     Question,
     Score,
     ScoreClaim,
@@ -16,7 +19,7 @@ from ..models import (
     ScoreValue,
     Volunteer,
 )
-from ..views.scoring import SHOW_SCORE_AVG_INTERVAL
+from ..views.scoring import SHOW_SCORE_AVG_INTERVAL, ScoreApplication
 from . import ApplicationTestMixin
 
 from fyt.test import FytTestCase
@@ -140,6 +143,35 @@ class ScoreFormTestCase(ApplicationTestMixin, FytTestCase):
             ScoreValue.objects.filter(trips_year=self.trips_year),
         )
 
+    def test_save_score_with_comments(self):
+        self.make_score_values()
+        application = self.make_application()
+        questions = mommy.make(ScoreQuestion, trips_year=self.trips_year, _quantity=3)
+
+        def save():
+            data = {
+                'general': 'Great',
+                'leader_score': self.V3.pk,
+                'croo_score': self.V4.pk,
+            }
+            data.update({'score_question_%d' % q.pk: 'Good' for q in questions})
+            form = ScoreForm(application=application, grader=self.grader, data=data)
+            self.assertTrue(form.is_valid(), form.errors)
+            with CaptureQueriesContext(connection) as context:
+                return form.save(), context.captured_queries
+
+        score, queries = save()
+        comment_inserts = [
+            q for q in queries if 'INSERT INTO "applications_scorecomment"' in q['sql']
+        ]
+        self.assertEqual(len(comment_inserts), 1)
+
+        self.assertEqual(score.grader, self.grader)
+        self.assertEqual(
+            {(c.score_question, c.comment) for c in score.scorecomment_set.all()},
+            {(q, 'Good') for q in questions},
+        )
+
 
 class ScoreClaimModelTestCase(ApplicationTestMixin, FytTestCase):
     @unittest.mock.patch(
@@ -190,6 +222,14 @@ class GraderModelTestCase(ApplicationTestMixin, FytTestCase):
         self.assertFalse(self.grader.is_croo_head)
         self.assertTrue(self.croo_head.is_croo_head)
 
+    def test_from_user_reuses_loaded_permissions(self):
+        user = DartmouthUser.objects.get(pk=self.croo_head.pk)
+        self.assertTrue(user.has_perm('permissions.can_score_applications'))
+
+        grader = Grader.objects.from_user(user)
+        with self.assertNumQueries(0):
+            self.assertTrue(grader.is_croo_head)
+
     def test_average_score_methods(self):
         self.make_score_values()
         mommy.make(
@@ -217,6 +257,57 @@ class GraderModelTestCase(ApplicationTestMixin, FytTestCase):
         self.assertEqual(self.grader.avg_croo_score(self.trips_year), 3.5)
         self.assertEqual(self.grader.score_count(self.trips_year), 2)
 
+    def test_grader_stats(self):
+        self.make_score_values()
+        app1 = self.make_application()
+        app2 = self.make_application()
+        self.grader.add_score(app1, leader_score=self.V1, croo_score=self.V2)
+        score = self.grader.add_score(app2, leader_score=self.V3)
+        self.director.add_score(app1, leader_score=self.V5, croo_score=self.V4)
+        self.grader.add_score(
+            self.make_application(trips_year=self.old_trips_year),
+            leader_score=self.V5,
+        )
+
+        stats, pool = GraderStats.objects.calibration(self.grader, self.trips_year)
+        self.assertEqual(stats.score_count, 2)
+        self.assertEqual(stats.mean('leader'), 2)
+        self.assertEqual(stats.stdev('leader'), 1)
+        self.assertEqual(stats.mean('croo'), 2)
+        self.assertEqual(stats.stdev('croo'), 0)
+        self.assertEqual(pool.score_count, 3)
+        self.assertEqual(pool.mean('leader'), 3)
+        self.assertEqual(pool.mean('croo'), 3)
+        self.assertEqual(pool.stdev('croo'), 1)
+
+        score.delete()
+        stats, pool = GraderStats.objects.calibration(self.grader, self.trips_year)
+        self.assertEqual(stats.score_count, 1)
+        self.assertEqual(stats.mean('leader'), 1)
+        self.assertEqual(pool.score_count, 2)
+        self.assertEqual(pool.mean('leader'), 3)
+
+    def test_grader_stats_when_scores_are_deleted_in_bulk(self):
+        self.make_score_values()
+        app = self.make_application()
+        self.grader.add_score(app, leader_score=self.V1, croo_score=self.V2)
+        self.director.add_score(app, leader_score=self.V5)
+        self.grader.add_score(self.make_application(), leader_score=self.V3)
+
+        app.scores.all().delete()
+        stats, pool = GraderStats.objects.calibration(self.grader, self.trips_year)
+        self.assertEqual(stats.score_count, 1)
+        self.assertEqual(stats.mean('leader'), 3)
+        self.assertIsNone(stats.mean('croo'))
+        self.assertEqual(pool.score_count, 1)
+        self.assertEqual(pool.mean('leader'), 3)
+
+    def test_grader_stats_without_scores(self):
+        stats, pool = GraderStats.objects.calibration(self.grader, self.trips_year)
+        self.assertEqual(stats.score_count, 0)
+        self.assertIsNone(stats.mean('leader'))
+        self.assertIsNone(pool.stdev('croo'))
+
     def test_claim_score(self):
         app = self.make_application()
         self.grader.claim_score(app)
@@ -529,6 +620,21 @@ class ScoreViewsTestCase(ApplicationTestMixin, FytTestCase):
         resp = self.app.get(url, user=self.grader).follow()
         self.assertTemplateUsed(resp, self.no_applications)
 
+    def test_score_application_query_budget(self):
+        self.make_score_values()
+        mommy.make(ScoreQuestion, trips_year=self.trips_year, _quantity=3)
+        other_grader = mommy.make(Grader)
+
+        def populate(n):
+            for _ in range(n):
+                app = self.make_application(trips_year=self.trips_year)
+                other_grader.add_score(app, leader_score=self.V3, croo_score=self.V4)
+
+        url = reverse('applications:score:next')
+        self.assertQueryBudget(
+            lambda: self.app.get(url, user=self.grader).follow(), populate, 45
+        )
+
     def test_cant_GET_score_application_with_expired_claim(self):
         app = self.make_application(trips_year=self.trips_year)
         grader = _get_grader(self.grader)
@@ -620,6 +726,23 @@ class ScoreViewsTestCase(ApplicationTestMixin, FytTestCase):
         res = self.app.get(url, user=self.user, status=403)
         res = self.app.get(url, user=self.director)
 
+    def test_average_grade_queries(self):
+        self.make_score_values()
+        grader = _get_grader(self.grader)
+        for _ in range(SHOW_SCORE_AVG_INTERVAL):
+            grader.add_score(self.make_application(), leader_score=self.V3)
+
+        view = ScoreApplication()
+        view.grader = grader
+        view.trips_year = self.trips_year
+        view.messages = unittest.mock.Mock()
+        with self.assertNumQueries(1):
+            view.show_average_grade()
+
+        msg = view.messages.info.call_args[0][0]
+        self.assertIn('average awarded leader score is 3.0 ± 0.0', msg)
+        self.assertIn('croo score is None', msg)
+
     def test_delete_score_redirects_to_app(self):
         application = self.make_application(self.trips_year)
         score = mommy.make(Score, trips_year=self.trips_year, application=application)
@@ -631,6 +754,77 @@ class ScoreViewsTestCase(ApplicationTestMixin, FytTestCase):
         self.assertRedirects(resp, application.detail_url())
 
 
+class SubmitScoreViewTestCase(ApplicationTestMixin, FytTestCase):
+
+    csrf_checks = False
+
+    def setUp(self):
+        self.init_trips_year()
+        self.grader = _get_grader(self.make_grader())
+        self.open_scoring()
+        self.make_score_values()
+
+    def test_submit_score(self):
+        mommy.make(ScoreQuestion, trips_year=self.trips_year, pk=1)
+        first = self.make_application()
+        second = self.make_application()
+        self.grader.claim_score(first)
+
+        url = reverse('applications:score:submit', kwargs={'pk': first.pk})
+        resp = self.app.post(
+            url,
+            {
+                'leader_score': self.V3.pk,
+                'croo_score': self.V4.pk,
+                'score_question_1': 'A comment',
+                'general': 'A comment about the whole',
+            },
+            user=self.grader,
+        )
+        self.assertEqual(
+            resp.json,
+            {
+                'next': second.pk,
+                'url': reverse('applications:score:add', kwargs={'pk': second.pk}),
+            },
+        )
+        score = first.scores.get()
+        self.assertEqual(score.leader_score, self.V3)
+        self.assertEqual(score.scorecomment_set.get().comment, 'A comment')
+        self.assertEqual(self.grader.current_claim().application, second)
+
+        url = reverse('applications:score:submit', kwargs={'pk': second.pk})
+        resp = self.app.post(url, {SKIP: 'Skip'}, user=self.grader)
+        self.assertEqual(
+            resp.json,
+            {'next': None, 'url': reverse('applications:score:no_applications_left')},
+        )
+        self.assertTrue(second.skips.filter(grader=self.grader).exists())
+
+    def test_submit_invalid_score(self):
+        application = self.make_application()
+        self.grader.claim_score(application)
+
+        url = reverse('applications:score:submit', kwargs={'pk': application.pk})
+        resp = self.app.post(url, {'general': 'Hmm'}, user=self.grader, status=400)
+        self.assertIn('leader_score', resp.json['errors'])
+        self.assertFalse(application.scores.exists())
+
+    def test_submit_score_with_expired_claim(self):
+        application = self.make_application()
+        _expire_claim(self.grader.claim_score(application))
+
+        url = reverse('applications:score:submit', kwargs={'pk': application.pk})
+        resp = self.app.post(
+            url,
+            {'leader_score': self.V3.pk, 'croo_score': self.V4.pk, 'general': 'Ok'},
+            user=self.grader,
+            status=409,
+        )
+        self.assertEqual(resp.json['url'], reverse('applications:score:next'))
+        self.assertFalse(application.scores.exists())
+
+
 class ScoreValueModelTestCase(ApplicationTestMixin, FytTestCase):
     def setUp(self):
         self.init_trips_year()
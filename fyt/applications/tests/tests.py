@@ -1,4 +1,5 @@
 from datetime import date, timedelta
+from unittest import mock
 
 from django.core.exceptions import ValidationError
 from django.urls import reverse
@@ -19,10 +20,13 @@ from ..models import (
     LeaderSupplement,
     PortalContent,
     Question,
+    Score,
     ScoreValue,
     Volunteer,
     validate_class_year,
 )
+from ..search import InvertedIndex, search, update_documents
+from ..views.application import ApplicationIndex
 
 from fyt.croos.models import Croo
 from fyt.test import FytTestCase
@@ -736,6 +740,27 @@ class LeaderSupplementFormTestCase(FytTestCase):
         self.assertEqual(prefs[0].section, self.section)
         self.assertEqual(prefs[0].preference, 'AVAILABLE')
 
+    def test_preferences_are_saved_in_bulk(self):
+        sections = mommy.make(Section, 4, trips_year=self.trips_year)
+        self.leader_app.set_section_preference(self.section, 'PREFER')
+        self.leader_app.set_section_preference(sections[0], 'PREFER')
+        self.leader_app.set_section_preference(sections[1], 'AVAILABLE')
+
+        data = {'section_{}'.format(s.pk): 'AVAILABLE' for s in sections}
+        data['section_1'] = 'PREFER'
+        form = LeaderSupplementForm(instance=self.leader_app, data=self.data(data))
+        self.assertTrue(form.is_valid())
+
+        # Select, savepoint, update, insert, release
+        with self.assertNumQueries(5):
+            form.section_handler.save()
+
+        prefs = self.leader_app.leadersectionchoice_set.all()
+        self.assertEqual(
+            {(p.section, p.preference) for p in prefs},
+            {(self.section, 'PREFER')} | {(s, 'AVAILABLE') for s in sections},
+        )
+
     def test_formfield_names(self):
         mommy.make(Section, trips_year=self.trips_year, pk=3, name='C')
         form = LeaderSupplementForm(trips_year=self.trips_year)
@@ -803,10 +828,80 @@ class DbVolunteerViewsTestCase(ApplicationTestMixin, FytTestCase):
             self.make_application()
 
         user = self.make_director()
-        with self.assertNumQueries(20):
+        with self.assertNumQueries(21):
             url = reverse('core:volunteer:index', kwargs={'trips_year': self.trips_year})
             self.app.get(url, user=user)
 
+    def index(self, **params):
+        url = reverse('core:volunteer:index', kwargs={'trips_year': self.trips_year})
+        return self.app.get(url, params, user=self.make_director())
+
+    def page_through(self, res):
+        pages = [res.context['page'].object_list]
+        while res.context['page'].has_next:
+            res = res.click(description='Next page')
+            self.assertContains(res, 'First page')
+            pages.append(res.context['page'].object_list)
+        return pages
+
+    def test_volunteer_index_pages(self):
+        mommy.make(Timetable)
+        applications = sorted(
+            [self.make_application() for _ in range(5)],
+            key=lambda a: (a.applicant.name, a.pk),
+        )
+
+        with mock.patch.object(ApplicationIndex, 'per_page', 2):
+            res = self.index()
+            self.assertContains(res, '<span class="badge"> 5 </span>', html=True)
+            self.assertNotContains(res, 'First page')
+            pages = self.page_through(res)
+
+        self.assertEqual(
+            pages, [applications[:2], applications[2:4], applications[4:]]
+        )
+
+    def test_volunteer_index_pages_sorted_by_score(self):
+        mommy.make(Timetable)
+        self.make_score_values()
+        applications = [self.make_application() for _ in range(4)]
+        for application, value in zip(applications, [self.V2, self.V5, None, self.V2]):
+            if value is not None:
+                mommy.make(
+                    Score,
+                    trips_year=self.trips_year,
+                    application=application,
+                    leader_score=value,
+                )
+
+        with mock.patch.object(ApplicationIndex, 'per_page', 2):
+            pages = self.page_through(self.index(sort='avg_leader_score'))
+
+        ordered = [applications[1]] + sorted(
+            [applications[0], applications[3]], key=lambda a: (a.applicant.name, a.pk)
+        )
+        self.assertEqual(sum(pages, []), ordered + [applications[2]])
+        self.assertEqual(pages[0][0].avg_leader_score, 5)
+
+    def test_volunteer_index_loads_scores_for_page(self):
+        mommy.make(Timetable)
+        self.make_score_values()
+        application = self.make_application()
+        mommy.make(
+            Score,
+            trips_year=self.trips_year,
+            application=application,
+            leader_score=self.V4,
+            croo_score=self.V2,
+        )
+        self.make_application()
+
+        res = self.index(netid=application.applicant.netid)
+        self.assertEqual(res.context['page'].object_list, [application])
+        self.assertContains(res, '<span class="badge"> 1 </span>', html=True)
+        self.assertContains(res, '<td>4.0</td>', html=True)
+        self.assertContains(res, '<td>2.0</td>', html=True)
+
     def test_old_applications_are_hidden(self):
         mommy.make(Timetable)
         mommy.make(ApplicationInformation, trips_year=self.old_trips_year)
@@ -856,6 +951,107 @@ class DbVolunteerViewsTestCase(ApplicationTestMixin, FytTestCase):
         self.assertIsNone(application.trip_assignment)
 
 
+class SearchTestCase(ApplicationTestMixin, FytTestCase):
+    def setUp(self):
+        self.init_trips_year()
+        self.init_old_trips_year()
+        patcher = mock.patch(
+            'fyt.utils.cache.transaction.on_commit', lambda func: func()
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_document_is_updated_when_supplement_is_saved(self):
+        application = self.make_application(hometown='Hanover')
+        application.leader_supplement.hiking_experience = 'Climbed Katahdin twice'
+        application.leader_supplement.save()
+
+        application.refresh_from_db()
+        self.assertIn('Hanover', application.search_document)
+        self.assertIn('Climbed Katahdin twice', application.search_document)
+        self.assertIn(application.applicant.netid, application.search_document)
+
+    def test_document_is_updated_when_questions_are_answered(self):
+        application = self.make_application()
+        question = mommy.make(Question, trips_year=self.trips_year, type='ALL')
+        form = QuestionForm(
+            instance=application, data={'question_%d' % question.pk: 'Blueberries'}
+        )
+        self.assertTrue(form.is_valid())
+        form.save()
+
+        application.refresh_from_db()
+        self.assertIn('Blueberries', application.search_document)
+
+    def test_inverted_index_ranks_matches(self):
+        index = InvertedIndex(
+            {
+                1: 'kayaking and canoeing',
+                2: 'kayaking, kayaking, kayaking',
+                3: 'canoeing',
+                4: 'hiking',
+            }
+        )
+        self.assertEqual(index.search('hiking'), {4: mock.ANY})
+        self.assertEqual(index.search('Kayaking Canoeing').keys(), {1})
+        self.assertEqual(index.search('climbing'), {})
+        self.assertEqual(index.search(''), {})
+
+        ranks = index.search('kayaking')
+        self.assertGreater(ranks[2], ranks[1])
+
+    def test_search_filters_and_orders_volunteers(self):
+        once = self.make_application(personal_activities='kayaking')
+        twice = self.make_application(personal_activities='kayaking kayaking')
+        neither = self.make_application(personal_activities='hiking')
+        old = self.make_application(
+            trips_year=self.old_trips_year, personal_activities='kayaking'
+        )
+        update_documents(Volunteer.objects.all())
+
+        qs = search(
+            Volunteer.objects.filter(trips_year=self.trips_year),
+            self.trips_year,
+            'kayaking',
+        )
+        self.assertEqual(list(qs), [twice, once])
+
+    def test_index_search_filter(self):
+        mommy.make(Timetable)
+        match = self.make_application(academic_interests='Geology')
+        other = self.make_application(academic_interests='History')
+
+        url = reverse('core:volunteer:index', kwargs={'trips_year': self.trips_year})
+        res = self.app.get(url, {'search': 'geology'}, user=self.make_director())
+        self.assertContains(res, str(match))
+        self.assertNotContains(res, str(other))
+
+    def test_index_search_pages(self):
+        mommy.make(Timetable)
+        for activities in ['kayaking', 'kayaking kayaking', 'kayaking', 'hiking']:
+            self.make_application(personal_activities=activities)
+        self.make_application(personal_activities='kayaking kayaking kayaking')
+        matches = list(
+            search(
+                Volunteer.objects.filter(trips_year=self.trips_year),
+                self.trips_year,
+                'kayaking',
+            )
+        )
+
+        url = reverse('core:volunteer:index', kwargs={'trips_year': self.trips_year})
+        with mock.patch.object(ApplicationIndex, 'per_page', 2):
+            res = self.app.get(url, {'search': 'kayaking'}, user=self.make_director())
+            pages = [res.context['page'].object_list]
+            while res.context['page'].has_next:
+                res = res.click(description='Next page')
+                pages.append(res.context['page'].object_list)
+
+        self.assertEqual(len(pages), 2)
+        self.assertEqual(sum(pages, []), matches)
+        self.assertEqual(len(matches), 4)
+
+
 class PortalContentModelTestCase(ApplicationTestMixin, FytTestCase):
     def test_get_status_description(self):
         trips_year = self.init_trips_year()
@@ -26,6 +26,7 @@ from fyt.applications.views.scoring import (
     NoApplicationsLeftToScore,
     ScoreApplication,
     Scoring,
+    SubmitScore,
 )
 from fyt.core.urlhelpers import DB_REGEX
 
@@ -35,6 +36,7 @@ score_urlpatterns = [
     url(r'^none/$', NoApplicationsLeftToScore.as_view(), name='no_applications_left'),
     url(r'^next/$', ClaimNextApplication.as_view(), name='next'),
     url(r'^(?P<pk>[0-9]+)/$', ScoreApplication.as_view(), name='add'),
+    url(r'^(?P<pk>[0-9]+)/submit/$', SubmitScore.as_view(), name='submit'),
 ]
 
 urlpatterns = [
@@ -16,6 +16,7 @@ from django.shortcuts import get_object_or_404, render
 from django.urls import reverse, reverse_lazy
 from django.utils.decorators import method_decorator
 from django.utils.functional import cached_property
+from django.utils.http import urlencode
 from django.views import View
 from vanilla import DetailView, FormView, ListView, TemplateView, UpdateView
 
@@ -37,6 +38,7 @@ from fyt.applications.models import (
     Volunteer,
 )
 from fyt.applications.tables import ApplicationTable
+from fyt.core.managers import trips_data_cache
 from fyt.core.models import TripsYear
 from fyt.core.views import CrispyFormMixin, TripsYearMixin
 from fyt.croos.models import Croo
@@ -49,6 +51,7 @@ from fyt.timetable.models import Timetable
 from fyt.training.forms import FirstAidCertificationFormset
 from fyt.trips.models import TripType
 from fyt.utils.forms import crispify
+from fyt.utils.pagination import KeysetPaginator
 from fyt.utils.views import ExtraContextMixin, MultiFormMixin
 
 
@@ -451,36 +454,75 @@ class ApplicationIndex(
     ExtraContextMixin,
     ListView,
 ):
+    """
+    The applications of a trips year, a page at a time.
+
+    Pages are fetched by seeking past the sort keys of the previous page,
+    and average scores are only loaded for the rows on the page, so
+    pages render in constant time however many applications there are.
+    """
+
     model = Volunteer
     template_name = 'applications/application_index.html'
 
+    per_page = 100
+
+    # Query parameters which do not change the filtered applications
+    UNFILTERED_PARAMS = ['sort', 'after', 'submit']
+
     def get_queryset(self):
         return (
             Volunteer.objects.filter(trips_year=self.trips_year)
             .select_related(None)  # Clear leader_supplement, croo_supplement selects
             .select_related('applicant')
-            .with_avg_scores()
             .only(
                 'applicant__netid',
                 'applicant__name',
                 'trips_year_id',
                 'status',
                 'gender',
+                'trip_assignment_id',  # Loaded by the assignment tracker
                 'leader_willing',
                 'croo_willing',
                 'submitted',
             )
         )
 
+    def application_count(self, filter):
+        """
+        The number of filtered applications, cached for each combination
+        of filters until the applications or trainings change.
+        """
+        params = sorted(
+            (key, values)
+            for key, values in self.request.GET.lists()
+            if key not in self.UNFILTERED_PARAMS and any(values)
+        )
+        return trips_data_cache.get_or_set(
+            self.trips_year,
+            'application-index-count?' + urlencode(params, doseq=True),
+            [Volunteer, 'training'],
+            filter.qs.count,
+        )
+
     def extra_context(self):
         # TODO: use/make a generic FilterView mixin?
         filter = ApplicationFilterSet(
             self.trips_year, self.request.GET, queryset=self.object_list
         )
         table = ApplicationTable(filter.qs, self.request)
+
+        # The table has applied the requested sort to its queryset
+        paginator = KeysetPaginator(table.data.data, self.per_page)
+        page = paginator.page(self.request.GET.get('after'))
+        if page.object_list and not hasattr(page.object_list[0], 'avg_leader_score'):
+            Volunteer.objects.attach_avg_scores(page.object_list)
+        table.data.data = page.object_list
+
         return {
             'table': table,
-            'application_count': len(filter.qs),
+            'page': page,
+            'application_count': self.application_count(filter),
             'applications_filter': filter,
         }
 
@@ -3,14 +3,21 @@ import logging
 from braces.views import FormMessagesMixin, SetHeadlineMixin
 from django import forms
 from django.db import models
-from django.http import HttpResponseRedirect
+from django.http import HttpResponseRedirect, JsonResponse
 from django.shortcuts import get_object_or_404, render
 from django.urls import reverse, reverse_lazy
 from django.utils.functional import cached_property
 from vanilla import CreateView, FormView, RedirectView, TemplateView
 
 from fyt.applications.forms import SKIP, ScoreForm, ScoreQuestionFormset
-from fyt.applications.models import Grader, Score, ScoreClaim, ScoreQuestion, Volunteer
+from fyt.applications.models import (
+    Grader,
+    GraderStats,
+    Score,
+    ScoreClaim,
+    ScoreQuestion,
+    Volunteer,
+)
 from fyt.core.models import TripsYear
 from fyt.core.views import DatabaseDeleteView
 from fyt.permissions.views import GraderPermissionRequired, SettingsPermissionRequired
@@ -141,21 +148,25 @@ class ScoreApplication(
 
     def show_average_grade(self):
         """
-        Show the grader their average grade every SHOW_GRADE_AVG_INTERVAL in
-        a message.
+        Show the grader their average grade, and the average of all
+        graders, every SHOW_GRADE_AVG_INTERVAL in a message.
         """
-        score_count = self.grader.score_count(self.trips_year)
+        stats, pool = GraderStats.objects.calibration(self.grader, self.trips_year)
+        score_count = stats.score_count
 
         if score_count % SHOW_SCORE_AVG_INTERVAL == 0 and score_count != 0:
             msg = (
-                "FYI, your average awarded leader score is {}. "
-                "Your average awarded croo score is {}. "
+                "FYI, your average awarded leader score is {}; all graders "
+                "average {}. "
+                "Your average awarded croo score is {}; all graders average {}. "
                 "You'll see your average score every {} grades."
             )
             self.messages.info(
                 msg.format(
-                    self.grader.avg_leader_score(self.trips_year),
-                    self.grader.avg_croo_score(self.trips_year),
+                    _describe(stats, 'leader'),
+                    _describe(pool, 'leader'),
+                    _describe(stats, 'croo'),
+                    _describe(pool, 'croo'),
                     SHOW_SCORE_AVG_INTERVAL,
                 )
             )
@@ -185,9 +196,73 @@ class ScoreApplication(
             'application': self.application,
             'time_left': self.claim.time_left(),
             'timeout_url': reverse('applications:score:scoring'),
+            'submit_url': reverse(
+                'applications:score:submit', kwargs={'pk': self.application.pk}
+            ),
         }
 
 
+class SubmitScore(ScoreApplication):
+    """
+    Score or skip an application and claim the next one to score in a
+    single request, responding with JSON.
+
+    On success the response holds the URL of the next application, or of
+    the page telling the grader that there are none left. Invalid scores
+    get a 400 response with the form errors, and scores submitted after
+    the claim expired get a 409 response.
+    """
+
+    http_method_names = ['post']
+
+    def post(self, request, *args, **kwargs):
+        if SKIP in request.POST:
+            self.grader.skip(self.application)
+            self.messages.success('Skipped {}'.format(self.application_name))
+            return self.claim_next()
+
+        if not self.claim:
+            error = 'Your claim on this application has expired'
+            return JsonResponse(
+                {'error': error, 'url': self.get_success_url()}, status=409
+            )
+
+        form = self.get_form(data=request.POST)
+        if not form.is_valid():
+            return JsonResponse({'errors': form.errors}, status=400)
+
+        form.save()
+        self.messages.success(self.get_form_valid_message())
+        return self.claim_next()
+
+    def claim_next(self):
+        application = self.grader.claim_next_to_score()
+        if application is None:
+            return JsonResponse(
+                {
+                    'next': None,
+                    'url': reverse('applications:score:no_applications_left'),
+                }
+            )
+
+        return JsonResponse(
+            {
+                'next': application.pk,
+                'url': reverse('applications:score:add', kwargs={'pk': application.pk}),
+            }
+        )
+
+
+def _describe(stats, kind):
+    """
+    The mean and standard deviation of some ``GraderStats``.
+    """
+    mean = stats.mean(kind)
+    if mean is None:
+        return None
+    return '{} ± {}'.format(round(mean, 2), round(stats.stdev(kind), 2))
+
+
 class DeleteScore(DatabaseDeleteView):
     model = Score
 
@@ -1,7 +1,11 @@
 import logging
+import time
+from collections import defaultdict
 
-from django.db.transaction import atomic
+from django.db import transaction
+from django.db.models.signals import post_save
 
+from .managers import trips_data_cache
 from .models import TripsYear
 
 from fyt.applications.models import (
@@ -16,21 +20,60 @@ from fyt.croos.models import Croo
 from fyt.gear.models import Gear
 from fyt.incoming.models import IncomingStudent, Registration, Settings
 from fyt.raids.models import RaidInfo
+from fyt.tasks.models import Task
 from fyt.timetable.models import Timetable
 from fyt.training.models import Training
 from fyt.transport.models import Route, Stop, TransportConfig, Vehicle
 from fyt.trips.models import (
     Campsite,
     Document,
+    Trip,
     TripTemplate,
     TripTemplateDescription,
     TripType,
 )
+from fyt.trips.artifacts import delete_artifacts
+from fyt.trips.packets import packet_cache
 
 
 logger = logging.getLogger(__name__)
 
 
+def forward_order(models):
+    """
+    Sort ``models`` so that every model comes after the models its foreign
+    keys point to.
+
+    Models keep their relative order in ``models`` whenever the foreign
+    keys allow it. Raises ``ValueError`` if the foreign keys form a cycle.
+    """
+    deps = {
+        Model: {
+            field.related_model
+            for field in Model._meta.concrete_fields
+            if field.is_relation
+            and field.related_model in models
+            and field.related_model is not Model
+        }
+        for Model in models
+    }
+
+    ordered = []
+    remaining = list(models)
+    while remaining:
+        ready = [Model for Model in remaining if deps[Model].issubset(ordered)]
+        if not ready:
+            raise ValueError(
+                'Foreign keys between {} form a cycle'.format(
+                    ', '.join(Model.__name__ for Model in remaining)
+                )
+            )
+        ordered.append(ready[0])
+        remaining.remove(ready[0])
+
+    return ordered
+
+
 class Forward:
     """
     Manages the state of the database migration to the next ``trips_year``.
@@ -69,14 +112,133 @@ class Forward:
         """
         Werrrk. Migrate all models listed in ``MODELS_FORWARD``
         """
-        for Model in self.MODELS_FORWARD:
-            for obj in Model.objects.filter(trips_year=self.curr_year):
-                self.copy_object_forward(obj)
-
+        self.copy_models_forward()
         self.delete_trippee_medical_info()
         self.delete_application_medical_info()
+        self.delete_task_files()
         self.reset_timetable()
 
+    def copy_models_forward(self):
+        """
+        Bulk copy all objects of ``MODELS_FORWARD`` to the next ``trips_year``.
+
+        Models are copied in foreign key order with one ``bulk_create`` per
+        model, and foreign keys are re-pointed at the new objects through
+        ``self.pk_map``, a mapping of ``{Model: {old_pk: new_pk}}``.
+        ``bulk_create`` does not send ``post_save``; the signal is sent for
+        every new object once all models have been copied.
+
+        Returns a list of ``(Model, count, seconds)`` tuples.
+        """
+        models = forward_order(self.MODELS_FORWARD)
+        rows = self.collect_rows(models)
+
+        self.pk_map = {}
+        self.report = []
+        created = []
+
+        for Model in models:
+            start = time.perf_counter()
+            new_objs = self.bulk_copy_forward(Model, rows[Model])
+            seconds = time.perf_counter() - start
+
+            created.append((Model, new_objs))
+            self.report.append((Model, len(new_objs), seconds))
+            logger.info(
+                'Copied %s %s in %.2fs', len(new_objs), Model.__name__, seconds
+            )
+
+        start = time.perf_counter()
+        for Model, new_objs in created:
+            for obj in new_objs:
+                post_save.send(
+                    sender=Model,
+                    instance=obj,
+                    created=True,
+                    update_fields=None,
+                    raw=False,
+                    using=obj._state.db,
+                )
+        logger.info('Sent post_save signals in %.2fs', time.perf_counter() - start)
+
+        return self.report
+
+    def collect_rows(self, models):
+        """
+        Load the field values of every object to copy, keyed by model.
+
+        This is all of this year's objects, plus any objects from other years
+        which they point to. ``models`` must be in ``forward_order``.
+        """
+        rows = {}
+        needed = defaultdict(set)
+
+        for Model in reversed(models):
+            pk_name = Model._meta.pk.attname
+            model_rows = list(
+                Model.objects.filter(trips_year=self.curr_year).order_by('pk').values()
+            )
+
+            missing = needed[Model] - {values[pk_name] for values in model_rows}
+            if missing:
+                model_rows += list(
+                    Model.objects.filter(pk__in=missing).order_by('pk').values()
+                )
+
+            for field in Model._meta.concrete_fields:
+                if field.is_relation and field.related_model in models:
+                    needed[field.related_model].update(
+                        values[field.attname]
+                        for values in model_rows
+                        if values[field.attname] is not None
+                    )
+
+            rows[Model] = model_rows
+
+        return rows
+
+    def bulk_copy_forward(self, Model, rows):
+        """
+        Create a copy of each of ``rows`` in the next ``trips_year``.
+
+        Models which ``Model`` points to must already have been copied.
+        Returns the new objects.
+        """
+        pk_name = Model._meta.pk.attname
+        remapped = [
+            field
+            for field in Model._meta.concrete_fields
+            if field.is_relation and field.related_model in self.pk_map
+        ]
+
+        old_pks = []
+        new_objs = []
+        for values in rows:
+            values = dict(values, trips_year_id=self.next_year.pk)
+            old_pks.append(values.pop(pk_name))
+
+            for field in remapped:
+                old_pk = values[field.attname]
+                if old_pk is not None:
+                    values[field.attname] = self.pk_map[field.related_model][old_pk]
+
+            new_objs.append(Model(**values))
+
+        new_objs = Model.objects.bulk_create(new_objs)
+
+        # Some backends (e.g. SQLite) do not return primary keys from bulk
+        # inserts. The next year only contains the objects we just created,
+        # so they can be fetched back in insertion order.
+        if new_objs and new_objs[0].pk is None:
+            new_objs = list(
+                Model.objects.filter(trips_year=self.next_year).order_by('pk')
+            )
+
+        self.pk_map[Model] = {
+            old_pk: obj.pk for old_pk, obj in zip(old_pks, new_objs)
+        }
+        return new_objs
+
     def copy_object_forward(self, obj, from_one_to_one=None):
         """
         Recursively copy ``obj`` to the next ``trips_year``
@@ -128,11 +290,21 @@ class Forward:
     def delete_trippee_medical_info(self):
         """
         Delete all medical info saved on
-        ``IncomingStudents`` and ``Registrations``.
+        ``IncomingStudents`` and ``Registrations``, and the packets which
+        show it.
         """
-        IncomingStudent.objects.filter(trips_year=self.curr_year).update(med_info='')
+        packet_cache.delete_fragments(Trip.objects.filter(trips_year=self.curr_year))
+        packet_cache.invalidate_year(self.curr_year)
+        delete_artifacts(self.curr_year)
+        trips_data_cache.update(
+            IncomingStudent.objects.filter(trips_year=self.curr_year),
+            self.curr_year,
+            med_info='',
+        )
 
-        Registration.objects.filter(trips_year=self.curr_year).update(
+        trips_data_cache.update(
+            Registration.objects.filter(trips_year=self.curr_year),
+            self.curr_year,
             food_allergies='',
             dietary_restrictions='',
             medical_conditions='',
@@ -142,9 +314,15 @@ class Forward:
 
     def delete_application_medical_info(self):
         """
-        Delete all medical info saved on ``Volunteers``
+        Delete all medical info saved on ``Volunteers``, and the packets
+        which show it.
         """
-        Application.objects.filter(trips_year=self.curr_year).update(
+        packet_cache.delete_fragments(Trip.objects.filter(trips_year=self.curr_year))
+        packet_cache.invalidate_year(self.curr_year)
+        delete_artifacts(self.curr_year)
+        trips_data_cache.update(
+            Application.objects.filter(trips_year=self.curr_year),
+            self.curr_year,
             food_allergies='',
             dietary_restrictions='',
             medical_conditions='',
@@ -152,6 +330,13 @@ class Forward:
             needs='',
         )
 
+    def delete_task_files(self):
+        """
+        Delete the reports exported by background tasks, and the
+        spreadsheets uploaded for them.
+        """
+        Task.objects.delete_files()
+
     def reset_timetable(self):
         """
         Reset the timetable.
@@ -159,14 +344,33 @@ class Forward:
         Timetable.objects.timetable().reset()
 
 
-@atomic
-def forward():
+class DryRun(Exception):
+    """
+    Raised to roll back a dry run of ``forward``.
+    """
+
+
+def forward(dry_run=False):
     """
     Copy over all persisting objects, delete sensitive info, etc.
 
-    This action is not reversible.
+    This action is not reversible. With ``dry_run``, everything is rolled
+    back after the migration runs.
+
+    Returns a list of ``(Model, count, seconds)`` tuples for the copied
+    models.
     """
-    curr_year = TripsYear.objects.current()
-    next_year = curr_year.make_next_year()
-    # bye bye!
-    Forward(curr_year, next_year).do()
+    try:
+        with transaction.atomic():
+            curr_year = TripsYear.objects.current()
+            next_year = curr_year.make_next_year()
+            # bye bye!
+            migration = Forward(curr_year, next_year)
+            migration.do()
+
+            if dry_run:
+                raise DryRun
+    except DryRun:
+        logger.info('Dry run: rolled back migration to %s', next_year)
+
+    return migration.report
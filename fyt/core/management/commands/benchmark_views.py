@@ -0,0 +1,227 @@
+import json
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Max
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from fyt.applications.models import ScoreClaim
+from fyt.core.models import TripsYear
+from fyt.core.synthetic import dataset_counts
+from fyt.timetable.models import Timetable
+from fyt.trips.models import Section, Trip
+from fyt.users.models import DartmouthUser
+
+
+BENCHMARK_NETID = 'benchmark'
+
+
+def hot_views(trips_year):
+    """
+    Return ``(name, url)`` pairs for the views to benchmark.
+    """
+    trip = Trip.objects.filter(trips_year=trips_year).order_by('pk').first()
+    section = (
+        Section.objects.filter(trips_year=trips_year, trips__isnull=False)
+        .order_by('pk')
+        .first()
+    )
+    if trip is None or section is None:
+        raise CommandError('Trips year %s has no trips' % trips_year)
+
+    kwargs = {'trips_year': trips_year.pk}
+    return [
+        ('InternalBusMatrix', reverse('core:internalbus:index', kwargs=kwargs)),
+        (
+            'AssignTrippee',
+            reverse('core:assign_trippee', kwargs=dict(kwargs, trip_pk=trip.pk)),
+        ),
+        (
+            'AutoAssignTrippees',
+            reverse('core:auto_assign_trippees', kwargs=kwargs),
+        ),
+        (
+            'AssignLeader',
+            reverse('core:assign_leader', kwargs=dict(kwargs, trip_pk=trip.pk)),
+        ),
+        (
+            'AutoAssignLeaders',
+            reverse('core:auto_assign_leaders', kwargs=kwargs),
+        ),
+        ('VolunteerCSV', reverse('core:reports:all_apps', kwargs=kwargs)),
+        ('Charges', reverse('core:reports:charges', kwargs=kwargs)),
+        ('ClaimNextApplication', reverse('applications:score:next')),
+        (
+            'PacketsForSection',
+            reverse('core:packets:section', kwargs=dict(kwargs, section_pk=section.pk)),
+        ),
+    ]
+
+
+class Command(BaseCommand):
+
+    help = (
+        'Time and count the queries of the busiest views, and write a JSON '
+        'report which can be compared between commits. Run this against a '
+        'trips year made by generate_trips_year.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--trips-year',
+            type=int,
+            help='Trips year to benchmark; defaults to the current year',
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=5, help='Number of timed requests'
+        )
+        parser.add_argument('--output', help='Write the JSON report to this file')
+        parser.add_argument(
+            '--compare', help='Compare with the JSON report in this file'
+        )
+
+    def handle(self, *args, **options):
+        if options['trips_year']:
+            trips_year = TripsYear.objects.get(year=options['trips_year'])
+        else:
+            trips_year = TripsYear.objects.current()
+
+        user, created = DartmouthUser.objects.get_or_create(
+            netid=BENCHMARK_NETID,
+            defaults={'name': 'Benchmark', 'email': 'benchmark@example.com'},
+        )
+        was_superuser = user.is_superuser
+        user.is_superuser = True
+        user.save()
+
+        self.client = Client()
+        try:
+            self.client.force_login(user)
+            report = self.run_benchmarks(trips_year, options['repeat'])
+        finally:
+            # Delete the session, and the user or its superuser status
+            self.client.logout()
+            if created:
+                user.delete()
+            else:
+                user.is_superuser = was_superuser
+                user.save()
+
+        if options['compare']:
+            with open(options['compare']) as f:
+                self.compare(json.load(f), report)
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2, sort_keys=True)
+            self.stdout.write("Wrote report to %s" % options['output'])
+
+    def run_benchmarks(self, trips_year, repeat):
+        report = {
+            'trips_year': trips_year.pk,
+            'created': timezone.now().isoformat(),
+            'repeat': repeat,
+            'dataset': dataset_counts(trips_year),
+            'views': {},
+        }
+
+        for name, url in hot_views(trips_year):
+            result = self.benchmark(trips_year, url, repeat)
+            report['views'][name] = result
+            msg = "%-22s %s %5s queries  best %8.2f ms  median %8.2f ms"
+            self.stdout.write(
+                msg
+                % (
+                    name,
+                    result['status'],
+                    result['queries'],
+                    result['best_ms'],
+                    result['median_ms'],
+                )
+            )
+        return report
+
+    def benchmark(self, trips_year, url, repeat):
+        """
+        Request ``url`` ``repeat`` times, after one warm up request.
+
+        The requests run in autocommit, as in production, so that the
+        caches which are skipped inside transactions are measured. The
+        benchmarked year is made current and scoring is enabled for the
+        duration of the requests, and the score claims made by
+        ClaimNextApplication are deleted afterwards.
+        """
+        current = list(TripsYear.objects.filter(is_current=True))
+        timetable, _ = Timetable.objects.get_or_create()
+        scoring_available = timetable.scoring_available
+        last_claim = ScoreClaim.objects.aggregate(pk=Max('pk'))['pk'] or 0
+
+        timings = []
+        try:
+            self.set_current(trips_year)
+            timetable.scoring_available = True
+            timetable.save()
+
+            self.request(url)
+            for _ in range(repeat):
+                with CaptureQueriesContext(connection) as queries:
+                    start = time.perf_counter()
+                    response = self.request(url)
+                    timings.append((time.perf_counter() - start) * 1000)
+        finally:
+            ScoreClaim.objects.filter(pk__gt=last_claim).delete()
+            timetable.scoring_available = scoring_available
+            timetable.save()
+            for year in current:
+                self.set_current(year)
+
+        return {
+            'url': url,
+            'status': response.status_code,
+            'queries': len(queries),
+            'best_ms': round(min(timings), 2),
+            'median_ms': round(statistics.median(timings), 2),
+        }
+
+    def set_current(self, trips_year):
+        """
+        Make ``trips_year`` the current year. Years are saved one at a time
+        so that the trips year cache is invalidated.
+        """
+        for year in TripsYear.objects.filter(is_current=True):
+            year.is_current = False
+            year.save()
+        trips_year.is_current = True
+        trips_year.save()
+
+    def request(self, url):
+        response = self.client.get(url, secure=True)
+        # Render streaming responses such as CSV reports
+        if response.streaming:
+            b''.join(response.streaming_content)
+        return response
+
+    def compare(self, old, new):
+        self.stdout.write("Compared with the report from %s:" % old['created'])
+        for name, result in new['views'].items():
+            if name not in old['views']:
+                continue
+            prev = old['views'][name]
+            msg = "%-22s queries %5s -> %5s  median %8.2f -> %8.2f ms (%+.0f%%)"
+            change = (result['median_ms'] / prev['median_ms'] - 1) * 100
+            self.stdout.write(
+                msg
+                % (
+                    name,
+                    prev['queries'],
+                    result['queries'],
+                    prev['median_ms'],
+                    result['median_ms'],
+                    change,
+                )
+            )
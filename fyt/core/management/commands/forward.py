@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from fyt.core.forward import forward
+from fyt.core.models import TripsYear
+
+
+class Command(BaseCommand):
+
+    help = 'Migrate the database to the next trips year'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Run the migration, report what was copied, then roll back',
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        curr_year = TripsYear.objects.current()
+
+        report = forward(dry_run=dry_run)
+
+        for Model, count, seconds in report:
+            self.stdout.write(
+                '%-25s %6s objects  %7.2fs' % (Model.__name__, count, seconds)
+            )
+
+        total = sum(count for _, count, _ in report)
+        seconds = sum(seconds for _, _, seconds in report)
+        if dry_run:
+            msg = "Dry run: would copy %s objects from %s to %s (%.2fs)"
+        else:
+            msg = "Copied %s objects from %s to %s (%.2fs)"
+        self.stdout.write(msg % (total, curr_year, curr_year.year + 1, seconds))
@@ -0,0 +1,63 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max
+
+from fyt.core.models import TripsYear
+from fyt.core.synthetic import (
+    TRIPPEES,
+    TRIPS,
+    VOLUNTEERS,
+    SyntheticTripsYear,
+    dataset_counts,
+)
+
+
+class Command(BaseCommand):
+
+    help = (
+        'Generate a synthetic trips year at production scale, for '
+        'benchmarking. Never run this against the production database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--year',
+            type=int,
+            help='Year to generate; defaults to the year after the latest year',
+        )
+        parser.add_argument(
+            '--scale',
+            type=float,
+            default=1.0,
+            help='Multiply the number of trippees, volunteers and trips',
+        )
+        parser.add_argument('--trippees', type=int, default=TRIPPEES)
+        parser.add_argument('--volunteers', type=int, default=VOLUNTEERS)
+        parser.add_argument('--trips', type=int, default=TRIPS)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--current',
+            action='store_true',
+            help='Make the generated year the current trips year',
+        )
+
+    def handle(self, *args, **options):
+        year = options['year']
+        if year is None:
+            latest = TripsYear.objects.aggregate(Max('year'))['year__max']
+            year = (latest or 2000) + 1
+
+        if TripsYear.objects.filter(year=year).exists():
+            raise CommandError('Trips year %s already exists' % year)
+
+        scale = options['scale']
+        trips_year = SyntheticTripsYear(
+            year,
+            trippees=int(options['trippees'] * scale),
+            volunteers=int(options['volunteers'] * scale),
+            trips=max(1, int(options['trips'] * scale)),
+            seed=options['seed'],
+        ).generate(is_current=options['current'])
+
+        for name, count in dataset_counts(trips_year).items():
+            self.stdout.write('%-20s %6s' % (name, count))
+        self.stdout.write("Generated trips year %s" % trips_year)
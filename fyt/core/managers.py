@@ -1,8 +1,17 @@
 from django.db import models
 
+from fyt.utils.cache import SingletonCache, TripsYearCache
+
 
 # TODO: test cases
 
+# TripsYears change about once a year, but are looked up on every request
+trips_year_cache = SingletonCache('trips-year')
+
+# Matrices, report aggregates and other computations over a trips year.
+# Invalidated by the signal receivers in fyt.core.models.
+trips_data_cache = TripsYearCache()
+
 
 class TripsYearManager(models.Manager):
     """ Object manager for TripsYear """
@@ -14,4 +23,12 @@ class TripsYearManager(models.Manager):
         current refers to the year of trips, eg. Trips 2014, 
         not *necessarily* the actual date.
         """
-        return self.get(is_current=True)
+        return trips_year_cache.get(
+            'current', lambda: self.get(is_current=True)
+        )
+
+    def cached(self, year):
+        """
+        Get the TripsYear for ``year`` through the process-wide cache.
+        """
+        return trips_year_cache.get(int(year), lambda: self.get(year=year))
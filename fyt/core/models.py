@@ -1,7 +1,9 @@
 from django.db import models
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
 from django.urls import reverse
 
-from fyt.core.managers import TripsYearManager
+from fyt.core.managers import TripsYearManager, trips_data_cache, trips_year_cache
 
 
 class TripsYear(models.Model):
@@ -36,6 +38,12 @@ class TripsYear(models.Model):
         return str(self.year)
 
 
+@receiver(post_save, sender=TripsYear)
+@receiver(post_delete, sender=TripsYear)
+def invalidate_trips_year_cache(**kwargs):
+    trips_year_cache.invalidate()
+
+
 class DatabaseModel(models.Model):
     """
     Abstract base class which manages the ``trips_year``
@@ -87,3 +95,23 @@ class DatabaseModel(models.Model):
 
     def obj_kwargs(self):
         return {'trips_year': self.trips_year_id, 'pk': self.pk}
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def invalidate_trips_data_cache(sender, instance, **kwargs):
+    """
+    Invalidate cached computations which read any model in the group of a
+    changed DatabaseModel.
+
+    Bulk ``QuerySet.update`` calls do not send signals; use
+    ``trips_data_cache.update`` for those.
+    """
+    if isinstance(instance, DatabaseModel):
+        trips_data_cache.invalidate(instance.trips_year_id, sender)
+
+
+@receiver(m2m_changed)
+def invalidate_trips_data_cache_for_m2m(instance, model, action, **kwargs):
+    if action.startswith('post_') and isinstance(instance, DatabaseModel):
+        trips_data_cache.invalidate(instance.trips_year_id, type(instance), model)
@@ -0,0 +1,494 @@
+"""
+Generate a synthetic trips year at production scale.
+
+This is used to benchmark views against realistic amounts of data, see
+the ``generate_trips_year`` and ``benchmark_views`` management commands.
+Objects are built with model_mommy and saved with ``bulk_create`` so that
+a full year can be generated in seconds. Signals are not sent for the
+bulk-created objects, so anything they would normally create (training
+attendees, trip counts) is created explicitly.
+"""
+
+import random
+import string
+from datetime import date, time, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.utils import timezone
+from model_mommy import mommy
+
+from fyt.applications.models import (
+    Answer,
+    CrooSupplement,
+    LeaderSectionChoice,
+    LeaderSupplement,
+    LeaderTripTypeChoice,
+    Question,
+    Score,
+    ScoreValue,
+    Volunteer,
+)
+from fyt.core.managers import trips_data_cache
+from fyt.core.models import TripsYear
+from fyt.gear.models import Gear, GearRequest
+from fyt.incoming.models import (
+    IncomingStudent,
+    Registration,
+    RegistrationSectionChoice,
+    RegistrationTripTypeChoice,
+    Settings,
+)
+from fyt.training.models import Attendee
+from fyt.transport.models import (
+    ExternalBus,
+    InternalBus,
+    Route,
+    Stop,
+    StopOrder,
+    TransportConfig,
+    Vehicle,
+)
+from fyt.trips.models import Campsite, Section, Trip, TripTemplate, TripType
+from fyt.users.models import DartmouthUser
+from fyt.utils.choices import AVAILABLE, FIRST_CHOICE, NOT_AVAILABLE, PREFER
+
+
+# Roughly the size of a recent trips year
+TRIPPEES = 1500
+VOLUNTEERS = 600
+TRIPS = 120
+
+SECTIONS = 10
+TRIPTYPES = 8
+CAMPSITES = 20
+INTERNAL_ROUTES = 6
+EXTERNAL_ROUTES = 4
+INTERNAL_STOPS = 30
+EXTERNAL_STOPS = 15
+QUESTIONS = 6
+GRADERS = 30
+GEAR = 12
+
+# The number of sections each trip template is run in
+SECTIONS_PER_TEMPLATE = 4
+
+# Proportion of trippees who are assigned to a trip, who request a bus,
+# and who request gear.
+ASSIGNED = 0.85
+BUS_REQUESTS = 0.2
+GEAR_REQUESTS = 0.1
+
+
+class SyntheticTripsYear:
+    """
+    Build a trips year with ``trippees`` incoming students, ``volunteers``
+    leader and croo applications, and ``trips`` trips.
+
+    The same ``seed`` always generates the same data.
+    """
+
+    def __init__(
+        self, year, trippees=TRIPPEES, volunteers=VOLUNTEERS, trips=TRIPS, seed=0
+    ):
+        self.year = year
+        self.num_trippees = trippees
+        self.num_volunteers = volunteers
+        self.num_trips = trips
+        self.random = random.Random(seed)
+        self.seed = seed
+
+    def generate(self, is_current=False):
+        """
+        Create the trips year and all its objects.
+
+        Returns the new TripsYear.
+        """
+        # model_mommy uses the global random generator
+        random.seed(self.seed)
+
+        with transaction.atomic():
+            self.trips_year = TripsYear.objects.create(
+                year=self.year, is_current=False
+            )
+            if is_current:
+                TripsYear.objects.filter(is_current=True).update(is_current=False)
+                self.trips_year.is_current = True
+                self.trips_year.save()
+
+            self.make_structure()
+            self.make_transport()
+            self.make_trips()
+            self.make_trippees()
+            self.make_volunteers()
+            self.make_scores()
+            self.make_gear_requests()
+
+        return self.trips_year
+
+    def make(self, Model, **kwargs):
+        return mommy.make(Model, trips_year=self.trips_year, **kwargs)
+
+    def prepare(self, Model, **kwargs):
+        return mommy.prepare(Model, trips_year=self.trips_year, **kwargs)
+
+    def bulk_create(self, Model, objs):
+        """
+        Bulk create ``objs`` and return them, with primary keys, in the same
+        order.
+
+        Not all databases return primary keys from ``bulk_create``, so the new
+        objects are fetched again. This relies on the trips year being new.
+        """
+        Model.objects.bulk_create(objs, batch_size=500)
+        if hasattr(Model, 'trips_year'):
+            trips_data_cache.invalidate(self.trips_year, Model)
+            qs = Model.objects.filter(trips_year=self.trips_year)
+            return list(qs.order_by('pk'))
+        return objs
+
+    def make_users(self, prefix, n):
+        netids = ['{}{}{:05d}'.format(prefix, self.year, i) for i in range(n)]
+        DartmouthUser.objects.bulk_create(
+            [
+                DartmouthUser(
+                    netid=netid,
+                    name='Synthetic {}'.format(netid),
+                    email='{}@example.com'.format(netid),
+                )
+                for netid in netids
+            ],
+            batch_size=500,
+        )
+        return list(DartmouthUser.objects.filter(netid__in=netids).order_by('netid'))
+
+    def make_structure(self):
+        start = date(self.year, 8, 20)
+        self.sections = [
+            self.make(
+                Section,
+                name=string.ascii_uppercase[i],
+                leaders_arrive=start + timedelta(days=i),
+                is_local=(i == 0),
+            )
+            for i in range(SECTIONS)
+        ]
+        self.triptypes = self.make(TripType, hidden=False, _quantity=TRIPTYPES)
+        self.campsites = self.make(Campsite, _quantity=CAMPSITES)
+        self.make(Settings, trips_cost=300, doc_membership_cost=50)
+
+    def lat_lng(self):
+        return '{:.5f},{:.5f}'.format(
+            self.random.uniform(43.5, 44.3), self.random.uniform(-72.3, -71.5)
+        )
+
+    def make_transport(self):
+        hanover = self.make(Stop, route=None, lat_lng='43.7031377,-72.2898190')
+        lodge = self.make(Stop, route=None, lat_lng='43.977253,-71.8154831')
+        self.make(TransportConfig, hanover=hanover, lodge=lodge)
+
+        vehicles = self.make(Vehicle, capacity=50, _quantity=4)
+        self.internal_routes = [
+            self.make(
+                Route, category=Route.INTERNAL, vehicle=self.random.choice(vehicles)
+            )
+            for _ in range(INTERNAL_ROUTES)
+        ]
+        self.external_routes = [
+            self.make(
+                Route, category=Route.EXTERNAL, vehicle=self.random.choice(vehicles)
+            )
+            for _ in range(EXTERNAL_ROUTES)
+        ]
+        self.internal_stops = [
+            self.make(
+                Stop,
+                route=self.random.choice(self.internal_routes),
+                lat_lng=self.lat_lng(),
+            )
+            for _ in range(INTERNAL_STOPS)
+        ]
+        self.external_stops = [
+            self.make(
+                Stop,
+                route=self.random.choice(self.external_routes),
+                lat_lng=self.lat_lng(),
+                cost_round_trip=Decimal('100'),
+                cost_one_way=Decimal('60'),
+            )
+            for _ in range(EXTERNAL_STOPS)
+        ]
+
+    def make_trips(self):
+        num_templates = -(-self.num_trips // SECTIONS_PER_TEMPLATE)
+        templates = [
+            self.make(
+                TripTemplate,
+                name=100 + i,
+                triptype=self.random.choice(self.triptypes),
+                max_trippees=self.random.randint(8, 12),
+                dropoff_stop=self.random.choice(self.internal_stops),
+                pickup_stop=self.random.choice(self.internal_stops),
+                return_route=self.random.choice(self.internal_routes),
+                campsite1=self.random.choice(self.campsites),
+                campsite2=self.random.choice(self.campsites),
+            )
+            for i in range(num_templates)
+        ]
+
+        # Spread the runs of each template across the sections
+        stride = max(1, SECTIONS // SECTIONS_PER_TEMPLATE)
+        self.trips = [
+            self.make(
+                Trip,
+                template=templates[i % num_templates],
+                section=self.sections[
+                    (i % num_templates + i // num_templates * stride) % SECTIONS
+                ],
+            )
+            for i in range(self.num_trips)
+        ]
+
+        # InternalBus signals create the stop orderings for existing trips
+        dates = sorted({d for s in self.sections for d in s.trip_dates})
+        for route in self.internal_routes:
+            for d in dates:
+                self.make(InternalBus, route=route, date=d)
+
+        # Pretend that bus times have been computed, so that views do not
+        # request directions from Google Maps.
+        trips_data_cache.update(
+            StopOrder.objects.filter(trips_year=self.trips_year),
+            self.trips_year,
+            computed_time=time(9, 0),
+        )
+        trips_data_cache.update(
+            InternalBus.objects.filter(trips_year=self.trips_year),
+            self.trips_year,
+            dirty=False,
+        )
+
+        for route in self.external_routes:
+            for section in self.sections:
+                self.make(ExternalBus, route=route, section=section)
+
+    def preferences(self, choices, first_choice=False):
+        """
+        Return a random preference for each of ``choices``.
+        """
+        prefs = [
+            self.random.choice([PREFER, AVAILABLE, AVAILABLE, NOT_AVAILABLE])
+            for _ in choices
+        ]
+        if first_choice:
+            prefs[self.random.randrange(len(prefs))] = FIRST_CHOICE
+        return zip(choices, prefs)
+
+    def make_trippees(self):
+        users = self.make_users('t', self.num_trippees)
+
+        registrations = []
+        for user in users:
+            bus_stop = None
+            if self.random.random() < BUS_REQUESTS:
+                bus_stop = self.random.choice(self.external_stops)
+            registrations.append(
+                self.prepare(
+                    Registration,
+                    user=user,
+                    name=user.name,
+                    bus_stop_round_trip=bus_stop,
+                    doc_membership=self.random.random() < 0.5,
+                    green_fund_donation=self.random.choice([0, 0, 0, 10]),
+                )
+            )
+        registrations = self.bulk_create(Registration, registrations)
+
+        self.bulk_create(
+            RegistrationSectionChoice,
+            [
+                RegistrationSectionChoice(
+                    registration=reg, section=section, preference=pref
+                )
+                for reg in registrations
+                for section, pref in self.preferences(self.sections)
+            ],
+        )
+        self.bulk_create(
+            RegistrationTripTypeChoice,
+            [
+                RegistrationTripTypeChoice(
+                    registration=reg, triptype=triptype, preference=pref
+                )
+                for reg in registrations
+                for triptype, pref in self.preferences(
+                    self.triptypes, first_choice=True
+                )
+            ],
+        )
+
+        # Fill trips in order until the assigned proportion is reached
+        spots = [
+            trip for trip in self.trips for _ in range(trip.template.max_trippees)
+        ]
+        self.random.shuffle(spots)
+        spots = spots[: int(len(registrations) * ASSIGNED)]
+        spots += [None] * (len(registrations) - len(spots))
+
+        stops = {stop.pk: stop for stop in self.external_stops}
+        trippees = []
+        for user, reg, trip in zip(users, registrations, spots):
+            bus_stop = stops.get(reg.bus_stop_round_trip_id) if trip else None
+            trippees.append(
+                self.prepare(
+                    IncomingStudent,
+                    netid=user.netid,
+                    name=reg.name,
+                    registration=reg,
+                    trip_assignment=trip,
+                    bus_assignment_round_trip=bus_stop,
+                    financial_aid=self.random.choice([0, 0, 0, 50, 100]),
+                )
+            )
+        self.trippees = self.bulk_create(IncomingStudent, trippees)
+
+    def make_volunteers(self):
+        users = self.make_users('v', self.num_volunteers)
+        self.questions = [
+            self.make(Question, index=i, type=Question.ALL) for i in range(QUESTIONS)
+        ]
+
+        # Two leaders per trip, the remainder split between the statuses
+        leader_spots = [trip for trip in self.trips for _ in range(2)]
+        statuses = [
+            Volunteer.PENDING,
+            Volunteer.CROO,
+            Volunteer.LEADER_WAITLIST,
+            Volunteer.REJECTED,
+        ]
+
+        volunteers = []
+        for i, user in enumerate(users):
+            if i < len(leader_spots):
+                status, trip = Volunteer.LEADER, leader_spots[i]
+            else:
+                status, trip = self.random.choice(statuses), None
+            volunteers.append(
+                self.prepare(
+                    Volunteer,
+                    applicant=user,
+                    status=status,
+                    trip_assignment=trip,
+                    leader_willing=True,
+                    croo_willing=self.random.random() < 0.4,
+                    submitted=timezone.now(),
+                )
+            )
+        self.volunteers = self.bulk_create(Volunteer, volunteers)
+
+        self.bulk_create(
+            Attendee,
+            [Attendee(trips_year=self.trips_year, volunteer=v) for v in self.volunteers],
+        )
+        self.bulk_create(
+            Answer,
+            [
+                Answer(application=v, question=q, answer='Synthetic answer')
+                for v in self.volunteers
+                for q in self.questions
+            ],
+        )
+        self.bulk_create(
+            CrooSupplement,
+            [self.prepare(CrooSupplement, application=v) for v in self.volunteers],
+        )
+        supplements = self.bulk_create(
+            LeaderSupplement,
+            [self.prepare(LeaderSupplement, application=v) for v in self.volunteers],
+        )
+        self.bulk_create(
+            LeaderSectionChoice,
+            [
+                LeaderSectionChoice(application=s, section=section, preference=pref)
+                for s in supplements
+                for section, pref in self.preferences(self.sections)
+            ],
+        )
+        self.bulk_create(
+            LeaderTripTypeChoice,
+            [
+                LeaderTripTypeChoice(application=s, triptype=triptype, preference=pref)
+                for s in supplements
+                for triptype, pref in self.preferences(self.triptypes)
+            ],
+        )
+
+        Trip.objects.update_counts(self.trips)
+
+    def make_scores(self):
+        values = [self.make(ScoreValue, value=v) for v in range(1, 6)]
+        graders = self.make_users('g', GRADERS)
+
+        scores = []
+        for volunteer in self.volunteers:
+            for grader in self.random.sample(graders, self.random.randint(0, 3)):
+                scores.append(
+                    Score(
+                        trips_year=self.trips_year,
+                        grader_id=grader.pk,
+                        application=volunteer,
+                        leader_score=self.random.choice(values),
+                        croo_score=(
+                            self.random.choice(values)
+                            if volunteer.croo_willing
+                            else None
+                        ),
+                        general='Synthetic score',
+                    )
+                )
+        self.bulk_create(Score, scores)
+
+    def make_gear_requests(self):
+        gear = self.make(Gear, _quantity=GEAR)
+
+        requests = [
+            GearRequest(trips_year=self.trips_year, incoming_student=trippee)
+            for trippee in self.trippees
+            if self.random.random() < GEAR_REQUESTS
+        ] + [
+            GearRequest(trips_year=self.trips_year, volunteer=volunteer)
+            for volunteer in self.volunteers
+            if self.random.random() < GEAR_REQUESTS
+        ]
+        requests = self.bulk_create(GearRequest, requests)
+
+        GearRequest.gear.through.objects.bulk_create(
+            [
+                GearRequest.gear.through(gearrequest=request, gear=item)
+                for request in requests
+                for item in self.random.sample(gear, 3)
+            ],
+            batch_size=500,
+        )
+
+
+def dataset_counts(trips_year):
+    """
+    The number of objects of each kind in ``trips_year``.
+    """
+    return {
+        Model.__name__: Model.objects.filter(trips_year=trips_year).count()
+        for Model in [
+            Section,
+            Trip,
+            Stop,
+            Route,
+            InternalBus,
+            ExternalBus,
+            IncomingStudent,
+            Registration,
+            Volunteer,
+            Score,
+            GearRequest,
+        ]
+    }
@@ -0,0 +1,25 @@
+from fyt.core import forward
+from fyt.core.models import TripsYear
+from fyt.tasks.queue import noop, task
+
+
+@task()
+def forward_trips_year(trips_year, progress=noop):
+    """
+    Migrate the database to the next trips year
+    """
+    current = TripsYear.objects.current()
+    if current.pk != trips_year:
+        # Submitted twice
+        msg = "Trips {} has already been migrated to Trips {}".format(
+            trips_year, current
+        )
+        return {'messages': [('error', msg)]}
+
+    progress(0, None, 'Copying Trips {} to Trips {}'.format(current, current.year + 1))
+    # The migration runs in one transaction, so progress saved during it
+    # would not be seen; the worker's heartbeat keeps the task alive.
+    forward.forward()
+
+    msg = "Succesfully migrated the database to Trips {}".format(current.year + 1)
+    return {'messages': [('success', msg)]}
@@ -1,6 +1,8 @@
 from functools import wraps
 
 from django import template
+from django.middleware.csrf import get_token
+from django.utils.html import format_html
 from django.utils.safestring import mark_safe
 
 from fyt.core.models import TripsYear
@@ -148,6 +150,24 @@ def download_button(url, name=None):
     )
 
 
+@register.simple_tag(takes_context=True)
+def background_download_button(context, url, name=None):
+    """
+    Button to export a large report in the background.
+    """
+    name = name or "Download"
+    return format_html(
+        '<form action="{}" method="post" style="display: inline">'
+        '<input type="hidden" name="csrfmiddlewaretoken" value="{}">'
+        '<button type="submit" class="btn btn-default" '
+        'title="Export in the background, for large reports"> '
+        '<i class="fa fa-clock-o"></i> {} </button></form>',
+        url,
+        get_token(context['request']),
+        name,
+    )
+
+
 @register.filter
 def upload_button(url, name=None):
     name = name or "Upload"
@@ -1,17 +1,27 @@
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
 import webtest
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.management import call_command
 from django.db import models
+from django.db.models.signals import post_save
 from model_mommy import mommy
 
-from ..forward import Forward, forward
+from ..forward import Forward, forward, forward_order
 from ..models import TripsYear
 
 from fyt.applications.models import Volunteer as Application
 from fyt.croos.models import Croo
 from fyt.incoming.models import IncomingStudent, Registration
+from fyt.tasks.models import Task
 from fyt.test import FytTestCase
 from fyt.timetable.models import Timetable
 from fyt.transport.models import Route, Stop, Vehicle
-from fyt.trips.models import TripTemplate
+from fyt.trips.models import Document, TripTemplate, TripTemplateDescription
 
 
 def all_field_names(obj):
@@ -153,6 +163,26 @@ class MigrateForwardTestCase(FytTestCase):
         self.assertEqual(app.needs, '')
         self.assertIsNone(app.epipen)
 
+    def test_task_files_are_deleted(self):
+        storage = FileSystemStorage(location=tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, storage.location)
+        name = storage.save('reports/report.csv', ContentFile(b'medical'))
+        task = mommy.make(Task, result={'file': name})
+        upload = storage.save('task-uploads/upload.json', ContentFile(b'[]'))
+        queued = mommy.make(Task, kwargs={'upload': upload})
+
+        with mock.patch('fyt.tasks.models.default_storage', storage), mock.patch(
+            'fyt.tasks.models.transaction.on_commit', lambda func: func()
+        ):
+            forward()
+
+        task.refresh_from_db()
+        self.assertEqual(task.result, {})
+        self.assertFalse(storage.exists(name))
+        queued.refresh_from_db()
+        self.assertEqual(queued.kwargs, {})
+        self.assertFalse(storage.exists(upload))
+
     def test_croo_is_migrated(self):
         croo = mommy.make(Croo, trips_year=self.trips_year)
         forward()
@@ -193,3 +223,65 @@ class MigrateForwardTestCase(FytTestCase):
 
         self.assertEqual(new_template.description.intro, 'hello')
         self.assertNotEqual(template.description.pk, new_template.description.pk)
+
+    def test_forward_order_puts_related_models_first(self):
+        models = [Document, TripTemplate, Route, TripTemplateDescription, Stop, Vehicle]
+        order = forward_order(models)
+        self.assertEqual(set(order), set(models))
+
+        def before(model1, model2):
+            return order.index(model1) < order.index(model2)
+
+        self.assertTrue(before(Vehicle, Route))
+        self.assertTrue(before(Route, Stop))
+        self.assertTrue(before(Stop, TripTemplate))
+        self.assertTrue(before(TripTemplateDescription, TripTemplate))
+        self.assertTrue(before(TripTemplate, Document))
+
+    def test_foreign_keys_point_to_new_objects(self):
+        route = mommy.make(Route, trips_year=self.trips_year)
+        stops = mommy.make(Stop, trips_year=self.trips_year, route=route, _quantity=2)
+        forward()
+
+        new_route = Route.objects.get(trips_year=self.trips_year.year + 1)
+        self.assertEqual(new_route.name, route.name)
+        self.assertEqual(new_route.vehicle.trips_year_id, self.trips_year.year + 1)
+        self.assertQsEqual(
+            Stop.objects.filter(trips_year=self.trips_year.year + 1),
+            [stop.name for stop in stops],
+            transform=lambda s: s.name,
+        )
+        for stop in Stop.objects.filter(trips_year=self.trips_year.year + 1):
+            self.assertEqual(stop.route, new_route)
+
+    def test_post_save_is_sent_for_new_objects(self):
+        mommy.make(Vehicle, trips_year=self.trips_year, _quantity=2)
+        received = []
+
+        def receiver(instance, created, **kwargs):
+            received.append((instance.trips_year_id, created))
+
+        post_save.connect(receiver, sender=Vehicle)
+        try:
+            forward()
+        finally:
+            post_save.disconnect(receiver, sender=Vehicle)
+
+        next_year = self.trips_year.year + 1
+        self.assertEqual(received, [(next_year, True), (next_year, True)])
+
+    def test_dry_run_rolls_back(self):
+        mommy.make(Vehicle, trips_year=self.trips_year, _quantity=2)
+        report = forward(dry_run=True)
+
+        self.assertIn((Vehicle, 2), [(Model, count) for Model, count, _ in report])
+        self.assertEqual(TripsYear.objects.current(), self.trips_year)
+        self.assertFalse(TripsYear.objects.filter(year=self.trips_year.year + 1))
+        self.assertEqual(Vehicle.objects.count(), 2)
+
+    def test_forward_command_dry_run(self):
+        mommy.make(Vehicle, trips_year=self.trips_year)
+        out = StringIO()
+        call_command('forward', dry_run=True, stdout=out)
+        self.assertIn('Dry run: would copy 1 objects', out.getvalue())
+        self.assertEqual(TripsYear.objects.current(), self.trips_year)
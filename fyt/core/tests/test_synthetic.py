@@ -0,0 +1,122 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.sessions.models import Session
+from django.core.management import call_command
+from model_mommy import mommy
+
+from ..models import TripsYear
+from ..synthetic import SyntheticTripsYear, dataset_counts
+
+from fyt.applications.models import ScoreClaim, Volunteer
+from fyt.incoming.models import IncomingStudent
+from fyt.test import FytTestCase
+from fyt.timetable.models import Timetable
+from fyt.trips.models import Trip
+from fyt.users.models import DartmouthUser
+
+
+class SyntheticTripsYearTestCase(FytTestCase):
+    def generate(self, **kwargs):
+        return SyntheticTripsYear(
+            2031, trippees=40, volunteers=20, trips=4, **kwargs
+        ).generate()
+
+    def test_generate(self):
+        trips_year = self.generate()
+        counts = dataset_counts(trips_year)
+        self.assertEqual(counts['IncomingStudent'], 40)
+        self.assertEqual(counts['Registration'], 40)
+        self.assertEqual(counts['Volunteer'], 20)
+        self.assertEqual(counts['Trip'], 4)
+        self.assertFalse(trips_year.is_current)
+
+    def test_trip_counts_are_consistent(self):
+        trips_year = self.generate()
+        for trip in Trip.objects.with_live_counts(trips_year):
+            self.assertEqual(trip.num_trippees, trip.live_num_trippees)
+            self.assertEqual(trip.num_leaders, trip.live_num_leaders)
+            self.assertEqual(trip.num_leaders, 2)
+
+    def test_same_seed_generates_same_data(self):
+        self.generate(seed=3)
+        assignments = list(
+            IncomingStudent.objects.order_by('netid').values_list(
+                'trip_assignment__template__name', flat=True
+            )
+        )
+        statuses = list(
+            Volunteer.objects.order_by('pk').values_list('status', flat=True)
+        )
+
+        call_command('flush', interactive=False, verbosity=0)
+        self.generate(seed=3)
+        self.assertEqual(
+            assignments,
+            list(
+                IncomingStudent.objects.order_by('netid').values_list(
+                    'trip_assignment__template__name', flat=True
+                )
+            ),
+        )
+        self.assertEqual(
+            statuses,
+            list(Volunteer.objects.order_by('pk').values_list('status', flat=True)),
+        )
+
+    def test_generate_command(self):
+        self.init_trips_year()
+        out = StringIO()
+        call_command('generate_trips_year', scale=0.02, stdout=out)
+        self.assertIn('Generated trips year 2015', out.getvalue())
+        self.assertEqual(TripsYear.objects.current(), self.trips_year)
+
+    def test_benchmark_command(self):
+        self.init_trips_year()
+        self.generate()
+        out = StringIO()
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'report.json')
+            call_command(
+                'benchmark_views', trips_year=2031, repeat=1, output=path, stdout=out
+            )
+            call_command(
+                'benchmark_views', trips_year=2031, repeat=1, compare=path, stdout=out
+            )
+            with open(path) as f:
+                report = json.load(f)
+
+        self.assertEqual(report['dataset']['Trip'], 4)
+        self.assertEqual(
+            set(report['views']),
+            {
+                'InternalBusMatrix',
+                'AssignTrippee',
+                'AutoAssignTrippees',
+                'AssignLeader',
+                'AutoAssignLeaders',
+                'VolunteerCSV',
+                'Charges',
+                'ClaimNextApplication',
+                'PacketsForSection',
+            },
+        )
+        for result in report['views'].values():
+            self.assertIn(result['status'], [200, 302], result)
+        self.assertEqual(TripsYear.objects.current(), self.trips_year)
+        self.assertFalse(Timetable.objects.timetable().scoring_available)
+        self.assertFalse(ScoreClaim.objects.exists())
+        self.assertFalse(DartmouthUser.objects.filter(netid='benchmark').exists())
+        self.assertFalse(Session.objects.exists())
+
+    def test_benchmark_command_restores_existing_user(self):
+        self.init_trips_year()
+        self.generate()
+        user = mommy.make(DartmouthUser, netid='benchmark', is_superuser=False)
+        call_command('benchmark_views', trips_year=2031, repeat=1, stdout=StringIO())
+
+        user.refresh_from_db()
+        self.assertFalse(user.is_superuser)
+        self.assertFalse(Session.objects.exists())
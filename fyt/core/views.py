@@ -4,7 +4,6 @@ from braces.views import FormInvalidMessageMixin, SetHeadlineMixin
 from crispy_forms.bootstrap import FormActions
 from crispy_forms.helper import FormHelper
 from crispy_forms.layout import HTML, Submit
-from django import forms
 from django.contrib import messages
 from django.core.exceptions import NON_FIELD_ERRORS, ImproperlyConfigured
 from django.db import IntegrityError, models, transaction
@@ -23,15 +22,17 @@ from vanilla import (
     UpdateView,
 )
 
-from . import forward
 from .forms import tripsyear_modelform_factory
 from .models import TripsYear
+from .tasks import forward_trips_year
 
 from fyt.permissions.views import (
     DatabaseEditPermissionRequired,
     DatabaseReadPermissionRequired,
     SettingsPermissionRequired,
 )
+from fyt.tasks.forms import BackgroundForm
+from fyt.tasks.views import BackgroundTaskMixin
 from fyt.utils.views import CrispyFormMixin, ExtraContextMixin, SetExplanationMixin
 
 
@@ -76,7 +77,7 @@ class TripsYearMixin:
         """
         Return the trips_year specified by the url kwargs.
         """
-        return TripsYear.objects.get(year=self.kwargs['trips_year'])
+        return TripsYear.objects.cached(self.kwargs['trips_year'])
 
     @cached_property
     def current_trips_year(self):
@@ -347,7 +348,11 @@ class RedirectToCurrentDatabase(DatabaseReadPermissionRequired, RedirectView):
 
 
 class MigrateForward(
-    SettingsPermissionRequired, ExtraContextMixin, TripsYearMixin, FormView
+    SettingsPermissionRequired,
+    ExtraContextMixin,
+    TripsYearMixin,
+    BackgroundTaskMixin,
+    FormView,
 ):
     """
     Migrate the database to the next ``trips_year`
@@ -355,6 +360,7 @@ class MigrateForward(
 
     template_name = 'core/migrate.html'
     success_url = reverse_lazy('core:current')
+    task = forward_trips_year
 
     @property
     def trips_year(self):
@@ -365,7 +371,7 @@ class MigrateForward(
         return self.trips_year.year + 1
 
     def get_form(self, **kwargs):
-        form = forms.Form(**kwargs)
+        form = BackgroundForm(**kwargs)
         form.helper = FormHelper()
         form.helper.add_input(Submit('submit', 'Migrate', css_class='btn-danger'))
 
@@ -374,11 +380,5 @@ class MigrateForward(
     def extra_context(self):
         return {'next_year': self.next_year}
 
-    def form_valid(self, form):
-        forward.forward()
-        messages.success(
-            self.request,
-            "Succesfully migrated the database to Trips {}".format(self.next_year),
-        )
-
-        return super().form_valid(form)
+    def get_task_kwargs(self, form):
+        return {'trips_year': self.trips_year.pk}
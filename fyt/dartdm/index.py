@@ -0,0 +1,148 @@
+"""
+Local indexes for Dartmouth Directory lookups.
+
+Typeahead sends a lookup for every keystroke, so ``PrefixCache`` keeps
+recent results in memory. If a lookup returned every match (the directory
+did not truncate it) the results for any longer query can be found by
+filtering them, without asking the directory again.
+
+``DirectoryIndex`` serves lookups from a locally loaded snapshot of the
+directory, for offline development or instant lookups.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+# Record keys
+NETID = 'netid'
+NAME = 'name'
+
+
+def normalize(query):
+    return ' '.join(query.lower().split())
+
+
+def matches(query, record):
+    """
+    Does the directory ``record`` match the normalized ``query``?
+
+    This is looser than the directory's own matching, so that filtering
+    complete results never drops a record the directory would return.
+    """
+    haystack = '{} {}'.format(record[NAME], record[NETID]).lower()
+    return all(token in haystack for token in query.split())
+
+
+class PrefixCache:
+    """
+    An LRU cache of lookup results, with a time to live.
+    """
+
+    def __init__(self, maxsize=1024, ttl=10 * 60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # query -> (results, complete, stored_at)
+
+    def _get(self, query, now):
+        try:
+            results, complete, stored_at = self.entries[query]
+        except KeyError:
+            return None
+        if now - stored_at > self.ttl:
+            del self.entries[query]
+            return None
+        self.entries.move_to_end(query)
+        return results, complete
+
+    def get(self, query):
+        """
+        Return the cached results for ``query``, or None if they are not
+        cached and cannot be derived from a shorter query.
+        """
+        query = normalize(query)
+        now = time.monotonic()
+
+        with self.lock:
+            entry = self._get(query, now)
+            if entry is not None:
+                return list(entry[0])
+
+            for end in range(len(query) - 1, 1, -1):
+                entry = self._get(query[:end], now)
+                if entry is not None and entry[1]:
+                    return [r for r in entry[0] if matches(query, r)]
+
+        return None
+
+    def set(self, query, results, complete):
+        """
+        Cache ``results`` for ``query``. ``complete`` says whether they
+        are all the matches in the directory.
+        """
+        query = normalize(query)
+        with self.lock:
+            self.entries[query] = (list(results), complete, time.monotonic())
+            self.entries.move_to_end(query)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+class DirectoryIndex:
+    """
+    A trie over the words of each name and the NetId in a directory
+    snapshot.
+    """
+
+    def __init__(self, records):
+        self.records = list(records)
+        self.root = {}
+
+        for i, record in enumerate(self.records):
+            words = normalize(record[NAME]).split() + [record[NETID].lower()]
+            for word in set(words):
+                node = self.root
+                for char in word:
+                    node = node.setdefault(char, {})
+                node.setdefault(None, []).append(i)
+
+    def _starting_with(self, prefix):
+        """
+        Indexes of all records with a word starting with ``prefix``.
+        """
+        node = self.root
+        for char in prefix:
+            try:
+                node = node[char]
+            except KeyError:
+                return set()
+
+        found = set()
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            for char, child in node.items():
+                if char is None:
+                    found.update(child)
+                else:
+                    stack.append(child)
+        return found
+
+    def search(self, query):
+        """
+        All records with a word starting with each word of ``query``, in
+        snapshot order.
+        """
+        found = None
+        for token in normalize(query).split():
+            ids = self._starting_with(token)
+            found = ids if found is None else found & ids
+            if not found:
+                return []
+        return [self.records[i] for i in sorted(found or [])]
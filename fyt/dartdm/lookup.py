@@ -1,7 +1,12 @@
+import json
 import logging
 from json import JSONDecodeError
 
 import requests
+from django.conf import settings
+
+from fyt.dartdm.index import NAME, NETID, DirectoryIndex, PrefixCache
+from fyt.utils import http
 
 
 log = logging.getLogger(__name__)
@@ -24,15 +29,50 @@ log = logging.getLogger(__name__)
 DARTDM_URL = 'https://api-lookup.dartmouth.edu/v1/lookup'
 DNDPROFILES_URL = 'http://dndprofiles.dartmouth.edu/profile'
 
-# Key constants
-NETID = 'netid'
-NAME = 'name'
+# Seconds to wait for the directory before giving up
+DARTDM_TIMEOUT = (3.05, 5)
+
+# The directory answers some invalid queries with a 503 and an error
+# message, so a 503 does not mean that it is down.
+dartdm = http.session(
+    DARTDM_URL, timeout=DARTDM_TIMEOUT, unavailable_statuses=(502, 504)
+)
+dndprofiles = http.session(DNDPROFILES_URL)
+
+# Recent lookups, shared by all requests in this process
+prefix_cache = PrefixCache()
+
+_directory_index = None
 
 
 class DartDmLookupException(Exception):
     pass
 
 
+def directory_index():
+    """
+    Return the index of the directory snapshot in ``DARTDM_SNAPSHOT``, or
+    None if there is no snapshot.
+
+    The snapshot is a JSON list of directory records, as returned by the
+    lookup API, and is loaded the first time it is needed.
+    """
+    global _directory_index
+
+    path = getattr(settings, 'DARTDM_SNAPSHOT', None)
+    if not path:
+        return None
+
+    if _directory_index is None:
+        with open(path) as f:
+            _directory_index = DirectoryIndex(_record(data) for data in json.load(f))
+    return _directory_index
+
+
+def _record(data):
+    return {NETID: data['uid'], NAME: data['displayName']}
+
+
 def lookup_dartdm(query_string):
     """
     Search in the Dartmouth Directory Manager for a user.
@@ -43,21 +83,41 @@ def lookup_dartdm(query_string):
     if len(query_string) < 2:
         return []
 
-    r = requests.get(DARTDM_URL, params={'q': query_string})
+    index = directory_index()
+    if index is not None:
+        return index.search(query_string)
+
+    results = prefix_cache.get(query_string)
+    if results is not None:
+        return results
+
+    try:
+        r = dartdm.get(DARTDM_URL, params={'q': query_string})
+        r_json = r.json()
+    except (requests.RequestException, ValueError) as e:
+        # Including CircuitOpenError, which fails fast while the directory
+        # is down
+        log.warning('DartDm lookup failed: %r', e)
+        return []
 
-    if 'error' in r.json():
-        log.info(r.json())
+    # Errors can be transient, so they are not cached
+    if 'error' in r_json:
+        log.info(r_json)
         return []
 
-    return [
-        {NETID: data['uid'], NAME: data['displayName']} for data in r.json()['users']
-    ]
+    results = [_record(data) for data in r_json['users']]
+    prefix_cache.set(query_string, results, not r_json.get('truncated', True))
+    return results
 
 
 class EmailLookupException(Exception):
     pass
 
 
+class EmailNotFound(EmailLookupException):
+    pass
+
+
 def lookup_email(netid):
     """
     Lookup the email address of a user, given their NetId.
@@ -65,7 +125,7 @@ def lookup_email(netid):
     params = {'lookup': netid, 'fields': ['email', 'netid']}
 
     try:
-        r = requests.get(DNDPROFILES_URL, params=params)
+        r = dndprofiles.get(DNDPROFILES_URL, params=params)
     except requests.RequestException as e:
         log.error(e)
         raise EmailLookupException from e
@@ -80,7 +140,7 @@ def lookup_email(netid):
     if not r_json:
         msg = 'Email lookup failed: NetId %s not found' % netid
         log.error(msg)
-        raise EmailLookupException(msg)
+        raise EmailNotFound(msg)
 
     assert r_json['netid'] == netid
 
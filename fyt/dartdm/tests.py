@@ -1,16 +1,31 @@
+import json
 import logging
 import os
+import tempfile
 import unittest
+from unittest import mock
 
 import requests
 from django.core.exceptions import ValidationError
+from django.test.utils import override_settings
 
+from fyt.dartdm import lookup
 from fyt.dartdm.forms import DartmouthDirectoryLookupField
-from fyt.dartdm.lookup import EmailLookupException, lookup_dartdm, lookup_email
+from fyt.dartdm.index import DirectoryIndex, PrefixCache
+from fyt.dartdm.lookup import (
+    EmailLookupException,
+    lookup_dartdm,
+    lookup_email,
+    prefix_cache,
+)
 from fyt.test import FytTestCase, vcr
+from fyt.utils import http
 
 
 class DartdmLookupFieldTestCase(FytTestCase):
+    def setUp(self):
+        prefix_cache.clear()
+
     @vcr.use_cassette
     def test_compress(self):
         field = DartmouthDirectoryLookupField()
@@ -36,6 +51,7 @@ class DartdmLookupFieldTestCase(FytTestCase):
 class DartdmLookupTestCase(unittest.TestCase):
     def setUp(self):
         logging.disable(logging.CRITICAL)
+        prefix_cache.clear()
 
     def tearDown(self):
         logging.disable(logging.NOTSET)
@@ -48,6 +64,116 @@ class DartdmLookupTestCase(unittest.TestCase):
         self.assertEqual([], lookup_dartdm('a,'))
 
 
+ROBERT = {'uid': 'a002bxd', 'displayName': 'Robert L. Marchman IV'}
+BOB = {'uid': 'd34898x', 'displayName': 'Robert L. Marchman'}
+
+
+class CachedDartdmLookupTestCase(unittest.TestCase):
+    def setUp(self):
+        prefix_cache.clear()
+        fake = http.fake_transport()
+        self.transport = fake.__enter__()
+        self.addCleanup(fake.__exit__, None, None, None)
+
+    def respond(self, users, truncated=False):
+        self.transport.add(
+            lookup.DARTDM_URL, json={'truncated': truncated, 'users': users}
+        )
+
+    def test_repeated_query_is_cached(self):
+        self.respond([ROBERT, BOB])
+        expected = [
+            {'netid': 'a002bxd', 'name': 'Robert L. Marchman IV'},
+            {'netid': 'd34898x', 'name': 'Robert L. Marchman'},
+        ]
+        self.assertEqual(lookup_dartdm('Robert'), expected)
+        self.assertEqual(lookup_dartdm(' robert '), expected)
+        self.assertEqual(len(self.transport.requests), 1)
+
+    def test_longer_query_is_filtered_from_complete_results(self):
+        self.respond([ROBERT, BOB])
+        lookup_dartdm('Robert L')
+        self.assertEqual(
+            lookup_dartdm('Robert L. Marchman I'),
+            [{'netid': 'a002bxd', 'name': 'Robert L. Marchman IV'}],
+        )
+        self.assertEqual(len(self.transport.requests), 1)
+
+    def test_truncated_results_are_not_filtered(self):
+        self.respond([ROBERT, BOB], truncated=True)
+        lookup_dartdm('Ro')
+        lookup_dartdm('Rob')
+        self.assertEqual(len(self.transport.requests), 2)
+
+    def test_unavailable_directory(self):
+        self.transport.add(lookup.DARTDM_URL, exception=requests.Timeout())
+        with self.assertLogs('fyt.dartdm.lookup', 'WARNING'):
+            self.assertEqual(lookup_dartdm('Robert'), [])
+
+        with mock.patch.object(lookup.dartdm.breaker, 'allow', return_value=False):
+            with self.assertLogs('fyt.dartdm.lookup', 'WARNING') as logs:
+                self.assertEqual(lookup_dartdm('Robert'), [])
+        self.assertIn('CircuitOpenError', logs.output[0])
+
+    def test_errors_are_not_cached(self):
+        self.transport.add(lookup.DARTDM_URL, json={'error': 'Try again'})
+        self.assertEqual(lookup_dartdm('Robert'), [])
+
+        self.respond([ROBERT])
+        self.assertEqual(
+            lookup_dartdm('Robert'),
+            [{'netid': 'a002bxd', 'name': 'Robert L. Marchman IV'}],
+        )
+
+
+class PrefixCacheTestCase(unittest.TestCase):
+    def test_least_recently_used_is_evicted(self):
+        cache = PrefixCache(maxsize=2)
+        cache.set('aa', [], True)
+        cache.set('bb', [], True)
+        cache.get('aa')
+        cache.set('cc', [], True)
+        self.assertEqual(cache.get('aa'), [])
+        self.assertIsNone(cache.get('bb'))
+
+    def test_entries_expire(self):
+        cache = PrefixCache(ttl=0)
+        cache.set('aa', [], True)
+        self.assertIsNone(cache.get('aa'))
+
+
+class DirectoryIndexTestCase(unittest.TestCase):
+    def setUp(self):
+        self.records = [
+            {'netid': 'a002bxd', 'name': 'Robert L. Marchman IV'},
+            {'netid': 'd34898x', 'name': 'Robert L. Marchman'},
+            {'netid': 'f00001a', 'name': 'Lucia Roberts'},
+        ]
+        self.index = DirectoryIndex(self.records)
+
+    def test_search_by_word_prefixes(self):
+        self.assertEqual(self.index.search('rob marc'), self.records[:2])
+        self.assertEqual(self.index.search('Rob'), self.records)
+        self.assertEqual(self.index.search('marchman iv'), self.records[:1])
+        self.assertEqual(self.index.search('robert xyz'), [])
+
+    def test_search_by_netid(self):
+        self.assertEqual(self.index.search('d348'), self.records[1:2])
+
+    def test_lookup_from_snapshot(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.json') as f:
+            json.dump([ROBERT, BOB], f)
+            f.flush()
+            with override_settings(DARTDM_SNAPSHOT=f.name), mock.patch.object(
+                lookup, '_directory_index', None
+            ), http.fake_transport() as transport:
+                self.assertEqual(
+                    lookup_dartdm('marchman iv'),
+                    [{'netid': 'a002bxd', 'name': 'Robert L. Marchman IV'}],
+                )
+        self.assertEqual(transport.requests, [])
+
+
 class EmailLookupTestCase(unittest.TestCase):
     def setUp(self):
         logging.disable(logging.CRITICAL)
@@ -55,7 +181,8 @@ class EmailLookupTestCase(unittest.TestCase):
     def tearDown(self):
         logging.disable(logging.NOTSET)
 
-    @unittest.mock.patch('requests.get', side_effect=requests.ConnectionError)
-    def test_connection_error(self, patched_get):
-        with self.assertRaises(EmailLookupException):
-            lookup_email('d348dgx')
+    def test_connection_error(self):
+        with http.fake_transport() as transport:
+            transport.add(lookup.DNDPROFILES_URL, exception=requests.ConnectionError())
+            with self.assertRaises(EmailLookupException):
+                lookup_email('d348dgx')
@@ -0,0 +1,249 @@
+"""
+An index of the trips which each registration is eligible for.
+
+``EligibilityIndex`` keeps, for each section and trip type preference, a
+bitset of the registrations which gave it, with one bit per registration.
+The registrations available for a trip are then the set bits of::
+
+    (section PREFER | section AVAILABLE)
+    & (trip type FIRST_CHOICE | trip type PREFER | trip type AVAILABLE)
+
+with non-swimmers masked out of trips which require a swim test, and the
+preference of each candidate is the mask its bit is set in. This replaces
+a join through both preference tables, and the loading of every
+preference for a section and trip type, on each ``AssignTrippee`` page.
+
+The index is built in one pass over the preference tables and kept in
+Django's cache. Saving a registration or one of its preferences patches
+the cached index once the transaction commits, instead of rebuilding it.
+"""
+
+import functools
+import uuid
+from collections import defaultdict
+
+from django.core.cache import cache
+from django.db import connection, transaction
+
+from fyt.core.managers import trips_data_cache
+from fyt.incoming.models import (
+    AVAILABLE,
+    FIRST_CHOICE,
+    PREFER,
+    Registration,
+    RegistrationSectionChoice,
+    RegistrationTripTypeChoice,
+)
+
+
+SECTION_PREFERENCES = [PREFER, AVAILABLE]
+TRIPTYPE_PREFERENCES = [FIRST_CHOICE, PREFER, AVAILABLE]
+
+# Seconds to hold the lock taken while patching the cached index
+LOCK_TIMEOUT = 10
+
+
+def _bits(mask):
+    """
+    The positions of the set bits in ``mask``, lowest first.
+    """
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def _union(masks):
+    return functools.reduce(lambda a, b: a | b, masks.values(), 0)
+
+
+def _level(masks, bit):
+    for preference, mask in masks.items():
+        if mask >> bit & 1:
+            return preference
+    return None
+
+
+class EligibilityIndex:
+    """
+    Bitsets of registrations by section preference, trip type preference
+    and swimming ability.
+    """
+
+    def __init__(self):
+        self.positions = {}  # registration pk -> bit
+        self.registrations = []  # bit -> registration pk
+        self.sections = defaultdict(dict)  # section -> preference -> mask
+        self.triptypes = defaultdict(dict)  # triptype -> preference -> mask
+        self.non_swimmers = 0
+
+    @classmethod
+    def build(cls, trips_year):
+        """
+        Build the index of ``trips_year`` with one query of each table.
+        """
+        index = cls()
+        for pk, swimming_ability in (
+            Registration.objects.filter(trips_year=trips_year)
+            .order_by('pk')
+            .values_list('pk', 'swimming_ability')
+        ):
+            index.add_registration(pk, swimming_ability)
+
+        for pk, section, preference in RegistrationSectionChoice.objects.filter(
+            registration__trips_year=trips_year, preference__in=SECTION_PREFERENCES
+        ).values_list('registration', 'section', 'preference'):
+            index.set(index.sections[section], preference, index.positions[pk])
+
+        for pk, triptype, preference in RegistrationTripTypeChoice.objects.filter(
+            registration__trips_year=trips_year, preference__in=TRIPTYPE_PREFERENCES
+        ).values_list('registration', 'triptype', 'preference'):
+            index.set(index.triptypes[triptype], preference, index.positions[pk])
+
+        return index
+
+    def add_registration(self, pk, swimming_ability):
+        if pk not in self.positions:
+            self.positions[pk] = len(self.registrations)
+            self.registrations.append(pk)
+        if swimming_ability == Registration.NON_SWIMMER:
+            self.non_swimmers |= 1 << self.positions[pk]
+
+    @staticmethod
+    def set(masks, preference, bit):
+        masks[preference] = masks.get(preference, 0) | 1 << bit
+
+    def remove(self, pk):
+        """
+        Clear the bits of registration ``pk``.
+
+        Its position is not reused, so the bits of other registrations do
+        not move.
+        """
+        bit = self.positions.get(pk)
+        if bit is None:
+            return
+        keep = ~(1 << bit)
+        for masks in list(self.sections.values()) + list(self.triptypes.values()):
+            for preference in masks:
+                masks[preference] &= keep
+        self.non_swimmers &= keep
+
+    def refresh(self, pk):
+        """
+        Reload the swimming ability and preferences of registration ``pk``
+        from the database, removing it if it has been deleted.
+        """
+        self.remove(pk)
+        swimming_ability = (
+            Registration.objects.filter(pk=pk)
+            .values_list('swimming_ability', flat=True)
+            .first()
+        )
+        if swimming_ability is None:
+            return
+
+        self.add_registration(pk, swimming_ability)
+        bit = self.positions[pk]
+        for section, preference in RegistrationSectionChoice.objects.filter(
+            registration=pk, preference__in=SECTION_PREFERENCES
+        ).values_list('section', 'preference'):
+            self.set(self.sections[section], preference, bit)
+        for triptype, preference in RegistrationTripTypeChoice.objects.filter(
+            registration=pk, preference__in=TRIPTYPE_PREFERENCES
+        ).values_list('triptype', 'preference'):
+            self.set(self.triptypes[triptype], preference, bit)
+
+    def candidates(self, trip):
+        """
+        Return a dict mapping the pk of every registration which is
+        available for ``trip`` to its ``(section, trip type)`` preferences.
+        """
+        template = trip.template
+        section_masks = self.sections.get(trip.section_id, {})
+        triptype_masks = self.triptypes.get(template.triptype_id, {})
+
+        mask = _union(section_masks) & _union(triptype_masks)
+        if template.swimtest_required:
+            mask &= ~self.non_swimmers
+
+        return {
+            self.registrations[bit]: (
+                _level(section_masks, bit),
+                _level(triptype_masks, bit),
+            )
+            for bit in _bits(mask)
+        }
+
+
+def _year(trips_year):
+    return int(getattr(trips_year, 'pk', trips_year))
+
+
+def _keys(year):
+    prefix = 'incoming-eligibility:{}'.format(year)
+    return prefix, prefix + ':stamp', prefix + ':lock'
+
+
+def eligibility_index(trips_year):
+    """
+    The ``EligibilityIndex`` of ``trips_year``, from the cache if possible.
+
+    An index built while a registration is being patched is not cached,
+    since it may have been read before the change was committed.
+    """
+    if connection.in_atomic_block:
+        return EligibilityIndex.build(trips_year)
+
+    year = _year(trips_year)
+    key, stamp_key, _ = _keys(year)
+    index = cache.get(key)
+    if index is None:
+        stamp = cache.get(stamp_key)
+        index = EligibilityIndex.build(year)
+        if cache.get(stamp_key) == stamp:
+            cache.set(key, index, trips_data_cache.timeout_for(year))
+    return index
+
+
+def update_registration(registration_pk, trips_year=None):
+    """
+    Patch the cached index with the current state of a registration.
+
+    If another process is patching the index at the same time it is
+    dropped instead, to be rebuilt by the next reader.
+    """
+    if trips_year is None:
+        trips_year = (
+            Registration.objects.filter(pk=registration_pk)
+            .values_list('trips_year', flat=True)
+            .first()
+        )
+        if trips_year is None:
+            return
+
+    year = _year(trips_year)
+    key, stamp_key, lock_key = _keys(year)
+    if not cache.add(lock_key, True, LOCK_TIMEOUT):
+        cache.set(stamp_key, uuid.uuid4().hex, None)
+        cache.delete(key)
+        return
+
+    try:
+        cache.set(stamp_key, uuid.uuid4().hex, None)
+        index = cache.get(key)
+        if index is not None:
+            index.refresh(registration_pk)
+            cache.set(key, index, trips_data_cache.timeout_for(year))
+    finally:
+        cache.delete(lock_key)
+
+
+def schedule_update(registration_pk, trips_year=None):
+    """
+    Patch the cached index once the current transaction commits. For use
+    in signal receivers.
+    """
+    transaction.on_commit(
+        functools.partial(update_registration, registration_pk, trips_year)
+    )
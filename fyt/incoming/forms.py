@@ -21,8 +21,10 @@ from .models import (
 
 from fyt.applications.forms import PreferenceHandler
 from fyt.core.forms import TripsYearModelForm
+from fyt.core.managers import trips_data_cache
 from fyt.core.models import TripsYear
-from fyt.incoming.models import Settings
+from fyt.incoming.models import SETTINGS_GROUP, Settings
+from fyt.tasks.forms import BackgroundField
 from fyt.transport.models import Stop
 from fyt.trips.fields import TripChoiceField
 from fyt.trips.models import Section, Trip, TripType
@@ -50,7 +52,6 @@ class OneWayStopChoiceField(forms.ModelChoiceField):
 
 class SectionPreferenceHandler(PreferenceHandler):
     through_qs_name = 'registrationsectionchoice_set'
-    through_creator = 'set_section_preference'
     data_field = 'preference'
     target_field = 'section'
     choices = REGISTRATION_SECTION_CHOICES
@@ -62,7 +63,6 @@ class SectionPreferenceHandler(PreferenceHandler):
 
 class TripTypePreferenceHandler(PreferenceHandler):
     through_qs_name = 'registrationtriptypechoice_set'
-    through_creator = 'set_triptype_preference'
     data_field = 'preference'
     target_field = 'triptype'
     choices = REGISTRATION_TRIPTYPE_CHOICES
@@ -72,6 +72,56 @@ class TripTypePreferenceHandler(PreferenceHandler):
         return triptype.name
 
 
+class RegistrationSchema:
+    """
+    The parts of the registration form which only depend on the trips
+    year: the sections, trip types and stops to choose from, help texts
+    and the crispy layout.
+
+    Building these takes a dozen queries. When registration opens
+    hundreds of students load the form within minutes, so the schema is
+    cached by ``registration_schema``.
+    """
+
+    def __init__(self, trips_year):
+        self.sections = list(Section.objects.filter(trips_year=trips_year))
+        self.triptypes = list(TripType.objects.visible(trips_year))
+        self.external_stops = list(Stop.objects.external(trips_year))
+
+        def sections_where(flag, value=True):
+            return [s for s in self.sections if getattr(s, flag) == value]
+
+        # Show which sections are available for these choices
+        self.help_texts = {
+            field: join_with_and(sections_where(field))
+            for field in [
+                'is_exchange',
+                'is_international',
+                'is_transfer',
+                'is_native',
+                'is_fysep',
+            ]
+        }
+
+        settings = Settings.objects.get(trips_year=trips_year)
+        self.contact_url = settings.contact_url
+        self.layout = RegistrationFormLayout(
+            SectionPreferenceHandler(None, self.sections).formfield_names(),
+            TripTypePreferenceHandler(None, self.triptypes).formfield_names(),
+            local_sections=sections_where('is_local'),
+            not_local_sections=sections_where('is_local', False),
+            international_sections=sections_where('is_international'),
+            trips_cost=settings.trips_cost,
+            doc_membership_cost=settings.doc_membership_cost,
+            contact_url=settings.contact_url,
+        )
+
+
+@trips_data_cache.memoize('trips', 'transport', SETTINGS_GROUP)
+def registration_schema(trips_year):
+    return RegistrationSchema(trips_year)
+
+
 class RegistrationForm(TripsYearModelForm):
     """
     Form for Trippee registration
@@ -83,13 +133,12 @@ class RegistrationForm(TripsYearModelForm):
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
+        self.schema = registration_schema(self.trips_year)
 
-        sections = Section.objects.filter(trips_year=self.trips_year)
-        self.section_handler = SectionPreferenceHandler(self, sections)
+        self.section_handler = SectionPreferenceHandler(self, self.schema.sections)
         self.fields.update(self.section_handler.get_formfields())
 
-        triptypes = TripType.objects.visible(self.trips_year)
-        self.triptype_handler = TripTypePreferenceHandler(self, triptypes)
+        self.triptype_handler = TripTypePreferenceHandler(self, self.schema.triptypes)
         self.fields.update(self.triptype_handler.get_formfields())
 
         external_stops = Stop.objects.external(self.trips_year)
@@ -106,43 +155,25 @@ class RegistrationForm(TripsYearModelForm):
             queryset=external_stops,
             required=False,
         )
-
-        # Show which sections are available for these choices
-        self.fields['is_exchange'].help_text = join_with_and(
-            Section.objects.exchange(self.trips_year)
-        )
-        self.fields['is_international'].help_text = join_with_and(
-            Section.objects.international(self.trips_year)
-        )
-        self.fields['is_transfer'].help_text = join_with_and(
-            Section.objects.transfer(self.trips_year)
-        )
-        self.fields['is_native'].help_text = join_with_and(
-            Section.objects.native(self.trips_year)
-        )
-        self.fields['is_fysep'].help_text = join_with_and(
-            Section.objects.fysep(self.trips_year)
-        )
+        # Render the cached stops; the queryset is only used to validate
+        for name in [
+            'bus_stop_round_trip',
+            'bus_stop_to_hanover',
+            'bus_stop_from_hanover',
+        ]:
+            field = self.fields[name]
+            field.choices = [('', field.empty_label)] + [
+                (stop.pk, field.label_from_instance(stop))
+                for stop in self.schema.external_stops
+            ]
+
+        for name, help_text in self.schema.help_texts.items():
+            self.fields[name].help_text = help_text
 
     @property
     def helper(self):
         helper = FormHelper(self)
-
-        settings = Settings.objects.get(trips_year=self.trips_year)
-        kwargs = {
-            'local_sections': Section.objects.local(self.trips_year),
-            'not_local_sections': Section.objects.not_local(self.trips_year),
-            'international_sections': Section.objects.international(self.trips_year),
-            'trips_cost': settings.trips_cost,
-            'doc_membership_cost': settings.doc_membership_cost,
-            'contact_url': settings.contact_url,
-        }
-        helper.layout = RegistrationFormLayout(
-            self.section_handler.formfield_names(),
-            self.triptype_handler.formfield_names(),
-            **kwargs
-        )
-
+        helper.layout = self.schema.layout
         return helper
 
     def save(self, user=None):
@@ -271,6 +302,7 @@ class PyExcelFileForm(forms.Form):
     spreadsheet = forms.FileField(
         help_text="Uploaded file may be in Excel or CSV format"
     )
+    background = BackgroundField()
 
     def __init__(self, trips_year, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -1,4 +1,8 @@
+import functools
+
 from crispy_forms.layout import HTML, Div, Field, Fieldset, Layout, Row, Submit
+from crispy_forms.utils import TEMPLATE_PACK
+from django.template import Template
 
 from fyt.utils.fmt import join_with_and, section_range
 
@@ -8,6 +12,20 @@ crispy_form layouts
 """
 
 
+@functools.lru_cache(maxsize=128)
+def compile_template(html):
+    return Template(html)
+
+
+class CachedHTML(HTML):
+    """
+    ``HTML`` which compiles its template once, rather than on every render.
+    """
+
+    def render(self, form, form_style, context, template_pack=TEMPLATE_PACK, **kwargs):
+        return compile_template(str(self.html)).render(context)
+
+
 class RegistrationFormLayout(Layout):
     def __init__(self, section_fields, triptype_fields, **kwargs):
 
@@ -23,7 +41,7 @@ class RegistrationFormLayout(Layout):
         super().__init__(
             Fieldset(
                 'Mission',
-                HTML(
+                CachedHTML(
                     '<p>Trips, as the program is called, welcomes first-year students to '
                     'life at Dartmouth through the beauty of the New Hampshire outdoors. '
                     'It is a unique, five-day, outdoor experience designed to provide '
@@ -50,7 +68,7 @@ class RegistrationFormLayout(Layout):
             ),
             Fieldset(
                 'Orientations and Pre-Season Training',
-                HTML(
+                CachedHTML(
                     "<p> The College has several different pre-orientation options, including athletics pre-season for fall sports. ALL students are able to participate in DOC Trips, even if they are involved in other pre-orientation programs. We work with other programs and offices as we schedule the Trips program, so the information below is helpful in assigning you to an appropriately scheduled trip. </p>"
                     "<p> If your group is limited to certain sections, be sure to mark all other sections as 'Not Available' (see below). Please note that marking any of these groups will NOT affect your eligibility to participate in DOC Trips.</p>"
                 ),
@@ -63,7 +81,7 @@ class RegistrationFormLayout(Layout):
             ),
             Fieldset(
                 'Section',
-                HTML(
+                CachedHTML(
                     "<p>Because we can’t have a thousand students all arrive on the same day, we stagger our program over ten Sections.</p>"
                     "<p> "
                     + local_sections
@@ -85,14 +103,14 @@ class RegistrationFormLayout(Layout):
                     "us to change it!</p>"
                 ),
                 Layout(*section_fields),
-                HTML(
+                CachedHTML(
                     "<p> If you have a particular, immovable scheduling conflict and need to come on a specific section, please elaborate below. Let us know which section(s) you can attend and which ones you cannot. </p>"
                 ),
                 Field('schedule_conflicts', rows=3),
             ),
             Fieldset(
                 'Trip Type',
-                HTML(
+                CachedHTML(
                     "<p> Every trip spends two and a half of the five days exploring a specific location around New Hampshire while doing any number of outdoor activities - everything from hiking to yoga to kayaking to organic farming. No matter which trip you are assigned to, we promise you'll find the experience to be an exciting and comfortable one. </p>"
                     "<p> We offer a variety of different types of trips on each section. The trip type is determined by the activity featured on the trip. {% include 'incoming/_triptype_modal.html' %} </p>"
                     "<p> You must list a Hiking or Cabin Camping trip as one of your possible choices - those are the most common trip types we offer. We do our very best to assign you to a trip you have listed as either your first choice or a preferred option. If you are not assigned your first choice, we encourage you to check out the beginner classes & trips offered by the Dartmouth Outing Club throughout the school year. The likelihood of getting your first choice increases if you: </p>"
@@ -107,20 +125,20 @@ class RegistrationFormLayout(Layout):
             ),
             Fieldset(
                 'T-Shirts',
-                HTML(
+                CachedHTML(
                     "<p> You'll be getting a DOC Trips t-shirt! These shirts are 100% organic cotton &mdash; wahoo! What size would you like? </p>"
                 ),
                 'tshirt_size',
             ),
             Fieldset(
                 'Accommodations',
-                HTML(
+                CachedHTML(
                     "<p> We recognize that some students may need additional accommodations related (but not limited) to disabilities, religious practices, dietary restrictions, allergies, and other needs. We are committed to doing everything possible to help all students participate in the Trips program to the extent they feel comfortable. (e.g. electricity can be provided if you require a medical device). Please let us know of your needs on your registration form; all information is kept confidential. You may also contact the Student Accessibility Services Office by phone at (603) 646.9900. </p>"
                 ),
             ),
             Fieldset(
                 'Medical Information',
-                HTML(
+                CachedHTML(
                     "<p> This will absolutely NOT affect your ability to go on a Trip. While many students manage their own health needs, we would prefer that you let us know of any needs or conditions including (but not limited to) allergies, dietary restrictions, and chronic illnesses. We are able to accommodate any accessibility need (e.g. we can provide electricity if you require a medical device, etc.). We encourage you to provide as much detail as possible on your registration form. All information will be kept confidential. Please contact us if you would like to discuss any accommodations. You may also contact the Student Accessibility Services Office by phone at (603) 646.9900. </p>"
                     "<p> If you do have any medical problem(s) which may become aggravated in the outdoors, it is your responsibility to consult with your doctor (before your trip begins) for instructions or medication. We're happy to provide additional details about your trip's itinerary if needed. </p>"
                     "<p> We encourage you to elaborate on any conditions on the registration form, however the online form is <strong>not</strong> a secure form so we cannot guarantee the confidentiality of medical information. If you would prefer to explain any conditions to us over the phone, please feel free to call us at (603) 646-3996. </p>"
@@ -133,7 +151,7 @@ class RegistrationFormLayout(Layout):
             ),
             Fieldset(
                 'General Physical Condition',
-                HTML(
+                CachedHTML(
                     "<p> We will match you to a trip that best suits your interests and abilities. For this reason, please be specific and detailed in describing your physical condition & outdoors experience on the registration form. We want to challenge you as little or as much as you feel comfortable with. The more information you provide, the better! </p>"
                     "<p> Tell us about your outdoor experience and how much you enjoy physical activity. There are NO right answers - we have trips for everyone, regardless of your prior experience or physical condition. The more we know about what your prior experiences have been and what you hope to do on your trip, the better we can assign you a trip that is both comfortable and fun!</p>"
                 ),
@@ -143,11 +161,11 @@ class RegistrationFormLayout(Layout):
             ),
             Fieldset(
                 'Swimming Experience',
-                HTML(
+                CachedHTML(
                     "<p> Completing a 50 yard swim is a Dartmouth graduation requirement, and is also required for participation in some of our trips, so every incoming student will have the opportunity to take a swim test the day they arrive. If possible, we highly recommend that you take your swim test during Trips so you can get it out of the way. </p>"
                 ),
                 'swimming_ability',
-                HTML(
+                CachedHTML(
                     "<p> If you cannot swim or would rather not take the swim test, please indicate that by answering the above question with 'non-swimmer'. Don't worry, there are plenty of chances to complete the 50-yard swim graduation requirement throughout your time at Dartmouth. This way we can assign you to a trip that does not require you to have passed a swim test. <i>And don't worry! Over half the trips don't involve swimming!</i> <p>"
                 ),
             ),
@@ -159,7 +177,7 @@ class RegistrationFormLayout(Layout):
             ),
             Fieldset(
                 'Canoeing & Kayaking Experience',
-                HTML(
+                CachedHTML(
                     "<p> Complete this section only if you indicated above that you preferred or were available for a <strong>Canoeing</strong> trip or a <strong>Kayaking</strong> trip. Please note that NO experience is needed for these types of trips; we just want to get a sense of your comfort level with these activites. </p>"
                 ),
                 'has_boating_experience',
@@ -168,28 +186,28 @@ class RegistrationFormLayout(Layout):
             ),
             Fieldset(
                 'Fishing Experience',
-                HTML(
+                CachedHTML(
                     "<p> Complete this section only if you indicated above that you preferred or were available for a <strong>Fishing</strong> trip. Fishing experience is NOT required to participate in this trip. </p>"
                 ),
                 Field('fishing_experience', rows=3),
             ),
             Fieldset(
                 'Horseback Riding Experience',
-                HTML(
+                CachedHTML(
                     "<p> Complete this section only if you indicated above that you preferred or were available for a <strong>Horseback Riding</strong> trip. </p>"
                 ),
                 Field('horseback_riding_experience', rows=3),
             ),
             Fieldset(
                 'Mountain Biking Experience',
-                HTML(
+                CachedHTML(
                     "<p> Complete this section only if you indicated above that you preferred or were available for a trip that involved <strong>Biking</strong>. Prior mountain biking experience is NOT required to participate in this trip.</p>"
                 ),
                 Field('mountain_biking_experience', rows=3),
             ),
             Fieldset(
                 'Sailing Experience',
-                HTML(
+                CachedHTML(
                     "<p> Complete this section only if you indicated above that you preferred or were available for a Sailing trip. Sailing experience is NOT required to participate in this trip. </p>"
                 ),
                 Field('sailing_experience', rows=3),
@@ -197,7 +215,7 @@ class RegistrationFormLayout(Layout):
             Fieldset('Anything else?', Field('anything_else', rows=3)),
             Fieldset(
                 'Gear',
-                HTML(
+                CachedHTML(
                     "<p>We will use this information to fit gear for you on "
                     "trips that require it (e.g. paddles and life jackets for "
                     "canoeing and kayaking trips, harnesses for climbing "
@@ -210,7 +228,7 @@ class RegistrationFormLayout(Layout):
             ),
             Fieldset(
                 'Bus Option',
-                HTML(
+                CachedHTML(
                     "<p> Students in "
                     + local_sections
                     + " will not be able to move into their rooms after their trips. It is for them that we coordinate bus transportation. We charter buses from various areas of the Northeast to bring students to Hanover for their trips and return them home afterwards. Because of the need to reserve spaces on later sections for those who live farther away, it is essential that all applicants from the Northeast come on Sections "
@@ -223,18 +241,18 @@ class RegistrationFormLayout(Layout):
                     "<p> Bus fares vary by location (see bus options below for exact price). Financial assistance is available for bus fares. If the cost of transportation/Trips may prevent you from participating, please contact us & we can help! See below for more information. </p>"
                 ),
                 'bus_stop_round_trip',
-                HTML("<p> Or, if you would like to take a bus only one-way:</p>"),
+                CachedHTML("<p> Or, if you would like to take a bus only one-way:</p>"),
                 Row(
                     Div('bus_stop_to_hanover', css_class="col-sm-6"),
                     Div('bus_stop_from_hanover', css_class="col-sm-6"),
                 ),
-                HTML(
+                CachedHTML(
                     '<p> If our bus option does not work for you, there are other public transportation services such as the train (<a href="http://www.amtrak.com/home">Amtrak</a>) or bus (<a href="https://www.greyhound.com/">Greyhound</a>, <a href="http://www.dartmouthcoach.com/">Dartmouth Coach</a>). We consider these options the most environmentally friendly ways to get here, so check them out!</p>'
                 ),
             ),
             Fieldset(
                 'Financial Assistance',
-                HTML(
+                CachedHTML(
                     "<p> We are <i>very</i> committed to making Trips available to anyone, regardless of financial need. We offer <strong>generous financial assistance</strong>, which you can request below. Financial assistance is also available for bussing if you are taking a DOC Trips bus from one of our Northeast stops to Hanover. The cost for DOC Trips is $"
                     + trips_cost
                     + ". The cost is the same regardless of which trip you are assigned. </p>"
@@ -252,7 +270,7 @@ class RegistrationFormLayout(Layout):
             ),
             Fieldset(
                 'Waiver of Liability',
-                HTML(
+                CachedHTML(
                     '<p> Please read, review, and indicate your acknowledgment of the following information. If you have any questions or concerns, please feel free to <a href="'
                     + contact_url
                     + '"> contact us.</a> </p>'
@@ -264,7 +282,7 @@ class RegistrationFormLayout(Layout):
             ),
             Fieldset(
                 'OPTIONAL: Dartmouth Outing Club Membership',
-                HTML(
+                CachedHTML(
                     "<p> The DOC is one of Dartmouth's largest student organizations - and the home of First-Year Trips - and offers many opportunities to get outside and enjoy the beautiful areas surrounding campus. Student members are eligible for membership & positions in the various clubs (e.g. Cabin & Trail, Mountaineering Club, Ski Patrol, etc.), qualify for reduced prices for season passes & cabin rentals, and receive a copy of the 'Dartmouth Outing Guide' book. A student career membership is $"
                     + doc_membership_cost
                     + ". Please indicate if you would like to purchase a student career (the duration of your time as a Dartmouth undergraduate) membership. You will receive information later this summer about your membership. <i>Note: this charge, along with the rest of the cost for your Trip, will be placed directly on your first College tuition bill. </i></p>"
@@ -273,7 +291,7 @@ class RegistrationFormLayout(Layout):
             ),
             Fieldset(
                 'OPTIONAL: Green Fund Donation',
-                HTML(
+                CachedHTML(
                     "<p> As the largest outdoors orientation program in the country, DOC Trips is committed to being a responsible steward of both natural resources and the environment. Your donation to the Green Fund will go directly toward sustainability initiatives within the program such as locally-sourced food, providing organic cotton t-shirts to all participants, using bio-diesel fuel for Trips transportation, and serving an entirely vegetarian/organic menu during the program. <i>Note: this donation, along with the rest of the cost for your Trip, will be placed directly on your first College tuition bill.</i> </p>"
                 ),
                 'green_fund_donation',
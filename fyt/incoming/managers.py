@@ -21,34 +21,17 @@ class IncomingStudentManager(models.Manager):
         registration that they are available for, prefer, or have
         chosen trip as their first choice.
 
-        Unregistered students are not included.
+        Unregistered students are not included. Candidates are looked up
+        in the ``fyt.incoming.eligibility`` index.
         """
-        from fyt.incoming.models import Registration, FIRST_CHOICE, PREFER, AVAILABLE
+        from fyt.incoming.eligibility import eligibility_index
 
-        qs = self
-        if trip.template.swimtest_required:
-            qs = qs.exclude(registration__swimming_ability=Registration.NON_SWIMMER)
-
-        section = trip.section
-        triptype = trip.template.triptype
-
-        return (
-            qs.filter(trips_year=trip.trips_year)
-            .filter(
-                registration__registrationsectionchoice__section=section,
-                registration__registrationsectionchoice__preference__in=(
-                    [PREFER, AVAILABLE]
-                ),
-            )
-            .filter(
-                registration__registrationtriptypechoice__triptype=triptype,
-                registration__registrationtriptypechoice__preference__in=(
-                    [FIRST_CHOICE, PREFER, AVAILABLE]
-                ),
-            )
+        registrations = eligibility_index(trip.trips_year_id).candidates(trip)
+        return self.filter(
+            trips_year=trip.trips_year_id, registration__in=list(registrations)
         )
 
-    def create_from_sheet(self, sheet, trips_year):
+    def create_from_sheet(self, sheet, trips_year, progress=None):
         """
         Import incoming students from a pyexcel sheet.
 
@@ -58,15 +41,20 @@ class IncomingStudentManager(models.Manager):
         Param trips_year is a string
         Returns a tuple (created_students, existing_students).
 
+        ``progress(done, total)`` is called for each row, if given.
+
         TODO: parse/input incoming_status. How should this work?
         """
         sheet.name_columns_by_row(0)
-        rows = sheet.to_records()
+        rows = list(sheet.to_records())
 
         added = []
         ignored = []
 
-        for row in rows:
+        for i, row in enumerate(rows):
+            if progress:
+                progress(i, len(rows))
+
             if row['Id']:
                 incoming, created = self.get_or_create(
                     trips_year=trips_year,
@@ -98,13 +86,15 @@ class IncomingStudentManager(models.Manager):
 
         return (added, ignored)
 
-    def update_hinman_boxes(self, sheet, trips_year):
+    def update_hinman_boxes(self, sheet, trips_year, progress=None):
         """
         Import hinman boxes from a pyexcel sheet.
 
         Given a spreadsheet file with a ``netid`` and ``hinman box`` column,
         update each IncomingStudent specified by netid with the
         given hinman box number.
+
+        ``progress(done, total)`` is called for each row, if given.
         """
         NETID = 'netid'
         HINMAN_BOX = 'hinman box'
@@ -113,7 +103,11 @@ class IncomingStudentManager(models.Manager):
 
         updated = []
         not_found = []
-        for row in sheet.to_records():
+        rows = list(sheet.to_records())
+        for i, row in enumerate(rows):
+            if progress:
+                progress(i, len(rows))
+
             try:
                 inc = self.get(netid=row[NETID], trips_year=trips_year)
             except self.model.DoesNotExist:
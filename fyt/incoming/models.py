@@ -5,11 +5,13 @@ from django.conf import settings
 from django.core.exceptions import ObjectDoesNotExist, ValidationError
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
+from model_utils import FieldTracker
 
 from .managers import IncomingStudentManager, RegistrationManager
 
+from fyt.core.managers import trips_data_cache
 from fyt.core.models import DatabaseModel
 from fyt.trips.models import Section, Trip, TripType
 from fyt.users.models import NetIdField
@@ -59,6 +61,7 @@ class IncomingStudent(DatabaseModel):
     """
 
     objects = IncomingStudentManager()
+    tracker = FieldTracker(fields=['trip_assignment'])
 
     class Meta:
         unique_together = ['netid', 'trips_year']
@@ -808,3 +811,36 @@ class Settings(DatabaseModel):
 
     class Meta:
         unique_together = ['trips_year']
+
+
+# Version group of ``Settings`` in ``trips_data_cache``. The ``incoming``
+# group changes with every saved registration, which is too often for
+# values which only depend on the settings.
+SETTINGS_GROUP = 'incoming-settings'
+
+
+@receiver(post_save, sender=Settings)
+@receiver(post_delete, sender=Settings)
+def invalidate_settings_group(instance, **kwargs):
+    trips_data_cache.invalidate(instance.trips_year_id, SETTINGS_GROUP)
+
+
+@receiver(post_save, sender=Registration)
+@receiver(post_delete, sender=Registration)
+def update_eligibility_index(instance, **kwargs):
+    from fyt.incoming.eligibility import schedule_update
+
+    schedule_update(instance.pk, instance.trips_year_id)
+
+
+@receiver(post_save, sender=RegistrationSectionChoice)
+@receiver(post_save, sender=RegistrationTripTypeChoice)
+def update_eligibility_index_for_preference(instance, **kwargs):
+    """
+    Preferences are deleted with their registration, which updates the
+    index itself; ``PreferenceHandler`` saves them in bulk, without
+    signals, inside the registration's transaction.
+    """
+    from fyt.incoming.eligibility import schedule_update
+
+    schedule_update(instance.registration_id)
@@ -0,0 +1,79 @@
+import logging
+
+import pyexcel
+
+from fyt.core.models import TripsYear
+from fyt.incoming.models import IncomingStudent, Registration
+from fyt.tasks.models import load_upload
+from fyt.tasks.queue import noop, task
+
+
+logger = logging.getLogger(__name__)
+
+
+@task(max_attempts=3)
+def import_incoming_students(trips_year, upload, progress=noop):
+    """
+    Import incoming students
+
+    ``upload`` holds the rows of the uploaded spreadsheet, including the
+    header row.
+    """
+    trips_year = TripsYear.objects.get(pk=trips_year)
+    messages = []
+
+    try:
+        (ctd, skipped) = IncomingStudent.objects.create_from_sheet(
+            pyexcel.Sheet(load_upload(upload)), trips_year, progress=progress
+        )
+    except KeyError as exc:
+        msg = "A column is missing (or mis-named) in the uploaded file: %s"
+        return {'messages': [('error', msg % exc)]}
+
+    if ctd:
+        msg = 'Created incoming students with NetIds %s'
+        logger.info(msg % ctd)
+        messages.append(('info', msg % ctd))
+
+    if skipped:
+        msg = 'Ignored existing incoming students with NetIds %s'
+        logger.info(msg % skipped)
+        messages.append(('warning', msg % skipped))
+
+    return {'messages': messages}
+
+
+@task(max_attempts=3)
+def update_hinman_boxes(trips_year, upload, progress=noop):
+    """
+    Update Hinman boxes
+    """
+    trips_year = TripsYear.objects.get(pk=trips_year)
+    updated, not_found = IncomingStudent.objects.update_hinman_boxes(
+        pyexcel.Sheet(load_upload(upload)), trips_year, progress=progress
+    )
+    return {
+        'messages': [
+            ('error', "Not found: %s" % ", ".join(not_found)),
+            ('info', "Updated Hinman Boxes for: %s" % ", ".join(map(str, updated))),
+        ]
+    }
+
+
+@task(max_attempts=3)
+def match_registrations(trips_year, progress=noop):
+    """
+    Match registrations to incoming students
+    """
+    regs = Registration.objects.filter(
+        trips_year=trips_year, trippee__isnull=True
+    ).select_related('user', 'trips_year')
+    total = len(regs)
+
+    matches = []
+    for i, reg in enumerate(regs):
+        progress(i, total)
+        matches.append(reg.match())
+
+    matched = [str(incoming) for incoming in filter(None, matches)]
+    return {'messages': [('info', 'Matched %s' % matched)]}
@@ -1,13 +1,20 @@
 import os
+import shutil
+import tempfile
 from datetime import date, timedelta
+from unittest import mock
 
 import pyexcel
+from django.core.cache import cache
 from django.core.exceptions import ObjectDoesNotExist, ValidationError
+from django.core.files.storage import FileSystemStorage
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.db import IntegrityError
 from django.urls import reverse
 from model_mommy import mommy
+from webtest import Upload
 
+from fyt.incoming.eligibility import EligibilityIndex, eligibility_index
 from fyt.incoming.forms import PyExcelFileForm, RegistrationForm
 from fyt.incoming.models import (
     AVAILABLE,
@@ -21,6 +28,8 @@ from fyt.incoming.models import (
     Settings,
     sort_by_lastname,
 )
+from fyt.tasks.models import Task, load_upload
+from fyt.tasks.queue import run_next
 from fyt.test import FytTestCase
 from fyt.timetable.models import Timetable
 from fyt.transport.models import Route, Stop
@@ -642,6 +651,14 @@ class ImportIncomingStudentHinmanBoxes(FytTestCase):
 
     def setUp(self):
         self.init_trips_year()
+        self.storage = FileSystemStorage(location=tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.storage.location)
+        for target in [
+            mock.patch('fyt.tasks.models.default_storage', self.storage),
+            mock.patch('fyt.tasks.models.transaction.on_commit', lambda func: func()),
+        ]:
+            target.start()
+            self.addCleanup(target.stop)
 
     def test_import_from_csv(self):
         incoming = mommy.make(
@@ -657,6 +674,47 @@ class ImportIncomingStudentHinmanBoxes(FytTestCase):
         self.assertEqual(imported, [incoming])
         self.assertEqual(not_found, ['d25623b'])
 
+    def upload(self, background):
+        url = reverse(
+            'core:incomingstudent:upload_hb', kwargs={'trips_year': self.trips_year}
+        )
+        resp = self.app.get(url, user=self.make_director())
+        resp.form['spreadsheet'] = Upload(self.FILE_CSV)
+        resp.form['background'] = background
+        return resp.form.submit()
+
+    def test_upload(self):
+        incoming = mommy.make(
+            IncomingStudent, trips_year=self.trips_year, netid='d34898x', hinman_box=''
+        )
+        resp = self.upload(background=False).follow()
+        self.assertContains(resp, 'Not found: d25623b')
+
+        incoming.refresh_from_db()
+        self.assertEqual(incoming.hinman_box, 'Hinman Box 2884')
+        self.assertEqual(self.storage.listdir('task-uploads'), ([], []))
+
+    def test_upload_in_background(self):
+        incoming = mommy.make(
+            IncomingStudent, trips_year=self.trips_year, netid='d34898x', hinman_box=''
+        )
+        resp = self.upload(background=True)
+        task = Task.objects.get()
+        self.assertEqual(resp.location, task.get_absolute_url())
+        self.assertEqual(list(task.kwargs), ['trips_year', 'upload'])
+        name = task.kwargs['upload']
+        self.assertEqual(load_upload(name)[1], ['d34898x', 'Hinman Box 2884'])
+
+        run_next()
+        incoming.refresh_from_db()
+        self.assertEqual(incoming.hinman_box, 'Hinman Box 2884')
+        self.assertContains(resp.follow(), 'Not found: d25623b')
+
+        # The upload is deleted once the task is done
+        task.refresh_from_db()
+        self.assertNotIn('upload', task.kwargs)
+        self.assertFalse(self.storage.exists(name))
+
 
 class IncomingStudentsManagerTestCase(FytTestCase):
     def setUp(self):
@@ -719,6 +777,7 @@ class IncomingStudentsManagerTestCase(FytTestCase):
         available = mommy.make(
             IncomingStudent,
             trips_year=self.trips_year,
+            registration__trips_year=self.trips_year,
             registration__swimming_ability=Registration.BEGINNER,
         )
         available.registration.set_section_preference(trip.section, PREFER)
@@ -729,6 +788,7 @@ class IncomingStudentsManagerTestCase(FytTestCase):
         unavailable = mommy.make(
             IncomingStudent,
             trips_year=self.trips_year,
+            registration__trips_year=self.trips_year,
             registration__swimming_ability=Registration.NON_SWIMMER,
         )
         unavailable.registration.set_section_preference(trip.section, PREFER)
@@ -964,6 +1024,76 @@ class RegistrationFormTestCase(FytTestCase):
         self.assertEqual(secs[0].preference, 'PREFER')
 
 
+class RegistrationSchemaTestCase(FytTestCase):
+    def setUp(self):
+        self.init_trips_year()
+        self.settings = mommy.make(Settings, trips_year=self.trips_year)
+        self.section = mommy.make(
+            Section,
+            trips_year=self.trips_year,
+            name='A',
+            is_exchange=True,
+            leaders_arrive=date(2015, 1, 1),
+        )
+
+        # Tests run in a transaction, which would bypass the cache
+        cache.clear()
+        for patch in [
+            mock.patch('fyt.utils.cache.connection', mock.Mock(in_atomic_block=False)),
+            mock.patch('fyt.utils.cache.transaction.on_commit', lambda func: func()),
+        ]:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_form_is_built_without_queries(self):
+        RegistrationForm(trips_year=self.trips_year)
+
+        with self.assertNumQueries(0):
+            form = RegistrationForm(trips_year=self.trips_year)
+            form.helper
+
+        self.assertIn('section_{}'.format(self.section.pk), form.fields)
+        self.assertEqual(form.fields['is_exchange'].help_text, 'Section A')
+
+    def test_changing_a_section_invalidates_schema(self):
+        RegistrationForm(trips_year=self.trips_year)
+        self.section.is_exchange = False
+        self.section.save()
+
+        form = RegistrationForm(trips_year=self.trips_year)
+        self.assertEqual(form.fields['is_exchange'].help_text, '')
+
+    def test_changing_settings_invalidates_schema(self):
+        RegistrationForm(trips_year=self.trips_year)
+        self.settings.contact_url = 'https://example.com/contact'
+        self.settings.save()
+
+        form = RegistrationForm(trips_year=self.trips_year)
+        self.assertEqual(form.schema.contact_url, 'https://example.com/contact')
+
+    def test_bus_stop_choices(self):
+        stop = mommy.make(
+            Stop,
+            trips_year=self.trips_year,
+            name='Boston',
+            route__category=Route.EXTERNAL,
+            cost_round_trip=10,
+            cost_one_way=6,
+        )
+        form = RegistrationForm(trips_year=self.trips_year)
+        self.assertEqual(
+            list(form.fields['bus_stop_round_trip'].choices),
+            [('', '---------'), (stop.pk, 'Boston - $10.00')],
+        )
+
+        form = RegistrationForm(
+            trips_year=self.trips_year,
+            data={'bus_stop_to_hanover': stop.pk},
+        )
+        form.is_valid()
+        self.assertEqual(form.cleaned_data['bus_stop_to_hanover'], stop)
+
+
 class IncomingStudentViewsTestCase(FytTestCase):
     def setUp(self):
         self.init_trips_year()
@@ -1019,3 +1149,85 @@ class RegistrationManagerTestCase(FytTestCase):
         mommy.make(IncomingStudent, trips_year=self.trips_year, registration=matched)
         unmatched = mommy.make(Registration, trips_year=self.trips_year)
         self.assertQsEqual(Registration.objects.unmatched(self.trips_year), [unmatched])
+
+
+class EligibilityIndexTestCase(FytTestCase):
+    def setUp(self):
+        self.init_trips_year()
+        self.trip = mommy.make(
+            Trip, trips_year=self.trips_year, template__swimtest_required=True
+        )
+
+        # Tests run in a transaction, which would bypass the cache
+        cache.clear()
+        for patch in [
+            mock.patch(
+                'fyt.incoming.eligibility.connection', mock.Mock(in_atomic_block=False)
+            ),
+            mock.patch(
+                'fyt.incoming.eligibility.transaction.on_commit', lambda func: func()
+            ),
+        ]:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def make_registration(
+        self, section_pref, triptype_pref, swimming_ability=Registration.BEGINNER
+    ):
+        registration = mommy.make(
+            Registration,
+            trips_year=self.trips_year,
+            swimming_ability=swimming_ability,
+        )
+        registration.set_section_preference(self.trip.section, section_pref)
+        registration.set_triptype_preference(
+            self.trip.template.triptype, triptype_pref
+        )
+        return registration
+
+    def test_candidates(self):
+        first = self.make_registration(PREFER, FIRST_CHOICE)
+        second = self.make_registration(AVAILABLE, AVAILABLE)
+        self.make_registration(NOT_AVAILABLE, FIRST_CHOICE)
+        self.make_registration(PREFER, NOT_AVAILABLE)
+        self.make_registration(
+            PREFER, PREFER, swimming_ability=Registration.NON_SWIMMER
+        )
+
+        self.assertEqual(
+            EligibilityIndex.build(self.trips_year).candidates(self.trip),
+            {first.pk: (PREFER, FIRST_CHOICE), second.pk: (AVAILABLE, AVAILABLE)},
+        )
+
+    def test_saved_registrations_patch_the_cached_index(self):
+        registration = self.make_registration(PREFER, PREFER)
+        eligibility_index(self.trips_year)
+
+        with mock.patch.object(EligibilityIndex, 'build') as build:
+            other = self.make_registration(AVAILABLE, FIRST_CHOICE)
+            registration.swimming_ability = Registration.NON_SWIMMER
+            registration.save()
+
+            candidates = eligibility_index(self.trips_year).candidates(self.trip)
+            self.assertFalse(build.called)
+
+        self.assertEqual(candidates, {other.pk: (AVAILABLE, FIRST_CHOICE)})
+
+    def test_deleted_registrations_are_removed(self):
+        registration = self.make_registration(PREFER, PREFER)
+        eligibility_index(self.trips_year)
+        registration.delete()
+
+        self.assertEqual(eligibility_index(self.trips_year).candidates(self.trip), {})
+
+    def test_concurrent_updates_drop_the_index(self):
+        registration = self.make_registration(PREFER, PREFER)
+        eligibility_index(self.trips_year)
+
+        key = 'incoming-eligibility:{}'.format(self.trips_year.pk)
+        cache.add(key + ':lock', True)
+        registration.swimming_ability = Registration.NON_SWIMMER
+        registration.save()
+
+        self.assertIsNone(cache.get(key))
+        self.assertEqual(eligibility_index(self.trips_year).candidates(self.trip), {})
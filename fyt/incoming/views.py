@@ -3,8 +3,6 @@ import logging
 
 import django_tables2 as tables
 from braces.views import FormMessagesMixin
-from django import forms
-from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.core.exceptions import MultipleObjectsReturned
@@ -18,7 +16,13 @@ from django.utils.functional import cached_property
 from vanilla import CreateView, FormView, TemplateView, UpdateView
 
 from .filters import RegistrationFilterSet
-from .forms import AssignmentForm, PyExcelFileForm, RegistrationForm, TrippeeInfoForm
+from .forms import (
+    AssignmentForm,
+    PyExcelFileForm,
+    RegistrationForm,
+    TrippeeInfoForm,
+    registration_schema,
+)
 from .models import IncomingStudent, Registration, Settings
 from .tables import IncomingStudentTable, RegistrationTable
 
@@ -31,9 +35,16 @@ from fyt.core.views import (
     DatabaseUpdateView,
     TripsYearMixin,
 )
+from fyt.incoming.tasks import (
+    import_incoming_students,
+    match_registrations,
+    update_hinman_boxes,
+)
 from fyt.permissions.views import DatabaseEditPermissionRequired
+from fyt.tasks.forms import BackgroundForm
+from fyt.tasks.models import save_upload
+from fyt.tasks.views import BackgroundTaskMixin
 from fyt.timetable.models import Timetable
-from fyt.trips.models import TripType
 from fyt.users.models import DartmouthUser
 from fyt.utils.forms import crispify
 from fyt.utils.views import ExtraContextMixin
@@ -94,13 +105,12 @@ class BaseRegistrationView(
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['triptypes'] = TripType.objects.visible(self.trips_year)
+        schema = registration_schema(self.trips_year)
+        context['triptypes'] = schema.triptypes
         context[
             'registration_deadline'
         ] = Timetable.objects.timetable().trippee_registrations_close
-        context['contact_url'] = Settings.objects.get(
-            trips_year=self.trips_year
-        ).contact_url
+        context['contact_url'] = schema.contact_url
         return context
 
 
@@ -478,7 +488,7 @@ class IncomingStudentUpdate(DatabaseUpdateView):
 
 
 class UploadIncomingStudentData(
-    DatabaseEditPermissionRequired, TripsYearMixin, FormView
+    DatabaseEditPermissionRequired, TripsYearMixin, BackgroundTaskMixin, FormView
 ):
     """
     Accept an upload of CSV file of incoming students.
@@ -492,34 +502,21 @@ class UploadIncomingStudentData(
 
     form_class = PyExcelFileForm
     template_name = 'incoming/upload_incoming_students.html'
+    task = import_incoming_students
 
-    def form_valid(self, form):
-        try:
-            (ctd, skipped) = IncomingStudent.objects.create_from_sheet(
-                form.load_sheet(), self.trips_year
-            )
-
-            if ctd:
-                msg = 'Created incoming students with NetIds %s'
-                logger.info(msg % ctd)
-                messages.info(self.request, msg % ctd)
-
-            if skipped:
-                msg = 'Ignored existing incoming students with NetIds %s'
-                logger.info(msg % skipped)
-                messages.warning(self.request, msg % skipped)
-
-        except KeyError as exc:
-            msg = "A column is missing (or mis-named) in the uploaded file: %s"
-            messages.error(self.request, msg % exc)
-
-        return super().form_valid(form)
+    def get_task_kwargs(self, form):
+        return {
+            'trips_year': self.trips_year.pk,
+            'upload': save_upload(form.load_sheet().to_array()),
+        }
 
     def get_success_url(self):
         return self.request.path
 
 
-class UploadHinmanBoxes(DatabaseEditPermissionRequired, TripsYearMixin, FormView):
+class UploadHinmanBoxes(
+    DatabaseEditPermissionRequired, TripsYearMixin, BackgroundTaskMixin, FormView
+):
     """
     Upload a CSV file of netids and hinman box numbers.
     Update the cooresponding IncomingStudent's HB #s.
@@ -527,21 +524,21 @@ class UploadHinmanBoxes(DatabaseEditPermissionRequired, TripsYearMixin, FormView
 
     form_class = PyExcelFileForm
     template_name = 'incoming/upload_hinman_boxes.html'
+    task = update_hinman_boxes
 
-    def form_valid(self, form):
-        updated, not_found = IncomingStudent.objects.update_hinman_boxes(
-            form.load_sheet(), self.trips_year
-        )
-
-        msg = "Not found: %s" % ", ".join(not_found)
-        messages.error(self.request, msg)
+    def get_task_kwargs(self, form):
+        return {
+            'trips_year': self.trips_year.pk,
+            'upload': save_upload(form.load_sheet().to_array()),
+        }
 
-        msg = "Updated Hinman Boxes for: %s" % ", ".join(map(str, updated))
-        messages.info(self.request, msg)
-        return HttpResponseRedirect(self.request.path)
+    def get_success_url(self):
+        return self.request.path
 
 
-class MatchRegistrations(DatabaseEditPermissionRequired, TripsYearMixin, FormView):
+class MatchRegistrations(
+    DatabaseEditPermissionRequired, TripsYearMixin, BackgroundTaskMixin, FormView
+):
     """
     Match all registrations for this ``trips_year``.
 
@@ -551,22 +548,14 @@ class MatchRegistrations(DatabaseEditPermissionRequired, TripsYearMixin, FormVie
     .. todo:: expose this with a link
     """
 
-    template_name = 'db/form.html'
+    template_name = 'form.html'
+    task = match_registrations
 
     def get_form(self, **kwargs):
-        return crispify(forms.Form(**kwargs), 'Match')
+        return crispify(BackgroundForm(**kwargs), 'Match')
 
-    def form_valid(self, form):
-        """
-        Try and match all unmatched registrations.
-        """
-        regs = Registration.objects.filter(trips_year=self.trips_year)
-        matches = []
-        for reg in regs:
-            if not hasattr(reg, 'trippee'):
-                matches.append(reg.match())
-        messages.info(self.request, 'Matched %s' % list(filter(None, matches)))
-        return HttpResponseRedirect(self.get_success_url())
+    def get_task_kwargs(self, form):
+        return {'trips_year': self.trips_year.pk}
 
     def get_success_url(self):
         return reverse('core:registration:match', kwargs=self.kwargs)
@@ -1,8 +1,12 @@
 import logging
+import time
 
 from django.conf import settings
+from django.db import connection
 from django.shortcuts import redirect
 
+from fyt.utils.metrics import QueryRecorder, registry
+
 
 log = logging.getLogger(__name__)
 
@@ -45,3 +49,41 @@ def UserLoggerMiddleware(get_response):
         return get_response(request)
 
     return middleware
+
+
+def RequestMetricsMiddleware(get_response):
+    """
+    Record the wall time and SQL queries of each request, by view.
+
+    The metrics are served by the ``metrics`` view. Requests slower than
+    ``SLOW_REQUEST_THRESHOLD`` seconds are logged with their worst queries.
+    """
+
+    def middleware(request):
+        recorder = QueryRecorder()
+        start = time.perf_counter()
+
+        with connection.execute_wrapper(recorder):
+            response = get_response(request)
+
+        seconds = time.perf_counter() - start
+
+        match = request.resolver_match
+        view = match.view_name if match else 'unresolved'
+        registry.observe(view, seconds, recorder)
+
+        if seconds > settings.SLOW_REQUEST_THRESHOLD:
+            log.warning(
+                "slow request view={} path={} time={:.3f}s queries={} "
+                "sql_time={:.3f}s".format(
+                    view, request.path, seconds, recorder.count, recorder.seconds
+                )
+            )
+            for sql, query_seconds in recorder.slowest(3):
+                log.warning("slow query {:.3f}s: {}".format(query_seconds, sql))
+            for shape, count in recorder.duplicates(3):
+                log.warning("duplicated query x{}: {}".format(count, shape))
+
+        return response
+
+    return middleware
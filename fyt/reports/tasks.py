@@ -0,0 +1,40 @@
+import io
+import uuid
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils.module_loading import import_string
+
+from fyt.tasks.queue import noop, task
+
+
+@task(max_attempts=3)
+def export_csv(view, view_kwargs, progress=noop):
+    """
+    Export a report
+
+    ``view`` is the import path of a ``GenericReportView``, which is
+    called with the url kwargs ``view_kwargs``. The report is saved with
+    the default file storage, under a random directory so that its name
+    cannot be guessed.
+    """
+    from fyt.reports.views import GenericReportView
+
+    view_class = import_string(view)
+    if not issubclass(view_class, GenericReportView):
+        raise ValueError('{} is not a report'.format(view))
+    if not view_class.allow_background:
+        raise ValueError('{} cannot be exported in the background'.format(view))
+
+    report = view_class(kwargs=view_kwargs)
+    f = io.StringIO()
+    rows = report.write_csv(f, progress=progress)
+
+    name = default_storage.save(
+        'reports/{}/{}'.format(uuid.uuid4().hex, report.get_filename()),
+        ContentFile(f.getvalue().encode()),
+    )
+    return {
+        'messages': [('success', 'Exported {} rows'.format(rows))],
+        'file': name,
+    }
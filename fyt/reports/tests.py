@@ -1,8 +1,11 @@
 import csv
+import shutil
 import tempfile
 from contextlib import contextmanager
 from datetime import date
+from unittest import mock
 
+from django.core.files.storage import FileSystemStorage
 from django.urls import reverse
 from model_mommy import mommy
 
@@ -11,7 +14,10 @@ from fyt.applications.tests import ApplicationTestMixin
 from fyt.croos.models import Croo
 from fyt.gear.models import Gear, GearRequest
 from fyt.incoming.models import IncomingStudent, Registration, Settings
+from fyt.reports.tasks import export_csv
 from fyt.reports.views import croo_tshirts, leader_tshirts, trippee_tshirts, fmt_float
+from fyt.tasks.models import Task
+from fyt.tasks.queue import run_next
 from fyt.test import FytTestCase
 from fyt.transport.models import ExternalBus, Route
 from fyt.trips.models import Section, Trip, TripType
@@ -139,7 +145,7 @@ class ReportViewsTestCase(FytTestCase, ApplicationTestMixin):
                     'croo score 3': '3.0',
                 }
             ],
-            num_queries=22,
+            num_queries=20,
         )
 
     def test_trip_leader_csv(self):
@@ -215,6 +221,63 @@ class ReportViewsTestCase(FytTestCase, ApplicationTestMixin):
             [{'name': trippee.name, 'netid': trippee.netid.upper()}],
         )
 
+    def test_trippees_csv_in_background(self):
+        trippee = mommy.make(
+            IncomingStudent,
+            trips_year=self.trips_year,
+            trip_assignment=mommy.make(Trip),
+        )
+        director = self.make_director()
+        url = reverse('core:reports:trippees', kwargs={'trips_year': self.trips_year})
+        index = reverse(
+            'core:incomingstudent:index', kwargs={'trips_year': self.trips_year}
+        )
+        resp = self.app.get(index, user=director)
+        form = next(f for f in resp.forms.values() if f.action == url)
+        resp = form.submit(user=director)
+        task = Task.objects.get()
+        self.assertEqual(resp.location, task.get_absolute_url())
+
+        storage = FileSystemStorage(location=tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, storage.location)
+        with mock.patch('fyt.reports.tasks.default_storage', storage):
+            run_next()
+
+        task.refresh_from_db()
+        self.assertEqual(task.status, Task.SUCCEEDED)
+        name = task.result['file']
+        self.assertTrue(name.endswith('/Trippees-{}.csv'.format(self.trips_year)))
+
+        with mock.patch('fyt.tasks.models.default_storage', storage):
+            resp = self.app.get(
+                reverse('tasks:download', kwargs={'pk': task.pk}), user=director
+            )
+        rows = list(csv.DictReader(resp.body.decode().splitlines()))
+        self.assertEqual(rows[0]['netid'], trippee.netid.upper())
+
+    def test_get_does_not_export_in_background(self):
+        url = reverse('core:reports:trippees', kwargs={'trips_year': self.trips_year})
+        self.app.get(url + '?background=1', user=self.make_director())
+        self.assertFalse(Task.objects.exists())
+
+    def test_medical_info_is_not_exported_in_background(self):
+        director = self.make_director()
+        index = reverse(
+            'core:incomingstudent:index', kwargs={'trips_year': self.trips_year}
+        )
+        resp = self.app.get(index, user=director)
+        token = resp.forms[0]['csrfmiddlewaretoken'].value
+        url = reverse('core:reports:medical', kwargs={'trips_year': self.trips_year})
+        resp = self.app.post(url, {'csrfmiddlewaretoken': token}, user=director)
+        self.assertEqual(resp.content_type, 'text/csv')
+        self.assertFalse(Task.objects.exists())
+
+        with self.assertRaises(ValueError):
+            export_csv(
+                view='fyt.reports.views.MedicalInfo',
+                view_kwargs={'trips_year': self.trips_year.pk},
+            )
+
     def test_registrations_csv(self):
         r = mommy.make(
             Registration, trips_year=self.trips_year, name='Bob', gender='male'
@@ -795,6 +858,59 @@ class ReportViewsTestCase(FytTestCase, ApplicationTestMixin):
         )
 
 
+class QueryBudgetTestCase(FytTestCase, ApplicationTestMixin):
+    def setUp(self):
+        self.init_trips_year()
+        self.director = self.make_director()
+        self.make_score_values()
+        mommy.make(
+            Settings, trips_year=self.trips_year, doc_membership_cost=91, trips_cost=250
+        )
+        self.section = mommy.make(Section, trips_year=self.trips_year)
+        self.triptype = mommy.make(TripType, trips_year=self.trips_year)
+        self.question = mommy.make(Question, trips_year=self.trips_year)
+
+    def get(self, urlpattern):
+        url = reverse(urlpattern, kwargs={'trips_year': self.trips_year})
+        return lambda: self.app.get(url, user=self.director)
+
+    def make_trippees(self, n):
+        for _ in range(n):
+            mommy.make(
+                IncomingStudent,
+                trips_year=self.trips_year,
+                trip_assignment__trips_year=self.trips_year,
+                bus_assignment_round_trip__cost_round_trip=100,
+                registration__trips_year=self.trips_year,
+                registration__doc_membership=True,
+                registration__green_fund_donation=20,
+            )
+
+    def test_volunteer_csv(self):
+        def populate(n):
+            for _ in range(n):
+                app = self.make_application()
+                app.leader_supplement.set_section_preference(self.section, PREFER)
+                app.leader_supplement.set_triptype_preference(
+                    self.triptype, AVAILABLE
+                )
+                app.answer_question(self.question, 'An answer')
+                mommy.make(Grader).add_score(app, self.V4, self.V2)
+                mommy.make(Grader).add_score(app, self.V5, self.V1)
+
+        self.assertQueryBudget(self.get('core:reports:all_apps'), populate, 25)
+
+    def test_charges(self):
+        self.assertQueryBudget(
+            self.get('core:reports:charges'), self.make_trippees, 20
+        )
+
+    def test_trippees_csv(self):
+        self.assertQueryBudget(
+            self.get('core:reports:trippees'), self.make_trippees, 15
+        )
+
+
 class TShirtCountTestCase(FytTestCase):
     def setUp(self):
         self.init_trips_year()
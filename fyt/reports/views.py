@@ -5,11 +5,15 @@ from collections import OrderedDict
 from braces.views import AllVerbsMixin
 from django.core.exceptions import ImproperlyConfigured
 from django.db.models import Q, Count, Max, Prefetch
-from django.http import HttpResponse
+from django.http import HttpResponse, HttpResponseRedirect
 from django.utils.functional import cached_property
 from vanilla import View
 
-from fyt.applications.models import Volunteer as Application
+from fyt.applications.models import (
+    LeaderSectionChoice,
+    LeaderTripTypeChoice,
+    Volunteer as Application,
+)
 from fyt.core.views import DatabaseTemplateView, TripsYearMixin
 from fyt.gear.models import GearRequest
 from fyt.incoming.models import (
@@ -20,9 +24,10 @@ from fyt.incoming.models import (
     Settings,
 )
 from fyt.permissions.views import DatabaseReadPermissionRequired
+from fyt.reports.tasks import export_csv
 from fyt.transport.models import ExternalBus
 from fyt.trips.models import Section, Trip, TripType
-from fyt.utils.choices import TSHIRT_SIZES
+from fyt.utils.choices import AVAILABLE, PREFER, TSHIRT_SIZES
 
 
 def yes_no(value):
@@ -51,6 +56,9 @@ class GenericReportView(
 
     file_prefix = None
     header = None
+    #: Whether the report can be exported by a background task, which
+    #: saves it to a file. Leave this off for sensitive reports.
+    allow_background = False
 
     def get_filename(self):
         return "{}-{}.csv".format(self.file_prefix, self.trips_year)
@@ -66,21 +74,45 @@ class GenericReportView(
     def get_row(self, obj):
         raise ImproperlyConfigured('implement get_row()')
 
+    def write_csv(self, f, progress=None):
+        """
+        Write the report to the file-like object ``f``.
+
+        Returns the number of rows written. ``progress(done, total)`` is
+        called for each row, if given.
+        """
+        qs = self.get_queryset()
+        writer = csv.writer(f)
+        writer.writerow(self.get_header())
+
+        rows = 0
+        for obj in qs:
+            if progress:
+                progress(rows, len(qs))
+            writer.writerow(self.get_row(obj))
+            rows += 1
+        return rows
+
     def all(self, request, *args, **kwargs):
+        if request.method == 'POST' and self.allow_background:
+            task = export_csv.enqueue(
+                user=request.user,
+                view='{}.{}'.format(self.__module__, self.__class__.__name__),
+                view_kwargs=self.kwargs,
+            )
+            return HttpResponseRedirect(task.get_absolute_url())
+
         response = HttpResponse(content_type='text/csv')
         response['Content-Disposition'] = 'attachment; filename="{}"'.format(
             self.get_filename()
         )
-        qs = self.get_queryset()
-        writer = csv.writer(response)
-        writer.writerow(self.get_header())
-        for obj in qs:
-            writer.writerow(self.get_row(obj))
+        self.write_csv(response)
         return response
 
 
 class VolunteerCSV(GenericReportView):
     file_prefix = 'TL-and-Croo-applicants'
+    allow_background = True
     header = [
         'name',
         'netid',
@@ -125,13 +157,39 @@ class VolunteerCSV(GenericReportView):
             Application.objects.leader_or_croo_applications(self.trips_year)
             .with_avg_scores()
             .prefetch_related(
-                'scores', 'answer_set', 'scores__leader_score', 'scores__croo_score'
+                'scores',
+                'answer_set',
+                'scores__leader_score',
+                'scores__croo_score',
+                Prefetch(
+                    'leader_supplement__leadersectionchoice_set',
+                    queryset=LeaderSectionChoice.objects.select_related(
+                        'section'
+                    ).order_by('section'),
+                ),
+                Prefetch(
+                    'leader_supplement__leadertriptypechoice_set',
+                    queryset=LeaderTripTypeChoice.objects.select_related(
+                        'triptype'
+                    ).order_by('triptype'),
+                ),
             )
         )
 
     def get_row(self, application):
         user = application.applicant
 
+        # Use the prefetched choices instead of
+        # LeaderSupplement.sections_by_preference, which queries each time
+        section_choices = application.leader_supplement.leadersectionchoice_set.all()
+        triptype_choices = application.leader_supplement.leadertriptypechoice_set.all()
+
+        def sections(preference):
+            return [c.section for c in section_choices if c.preference == preference]
+
+        def triptypes(preference):
+            return [c.triptype for c in triptype_choices if c.preference == preference]
+
         return (
             [
                 user.name,
@@ -153,10 +211,10 @@ class VolunteerCSV(GenericReportView):
                 application.personal_activities,
                 application.leader_supplement.hiking_experience,
                 application.leader_supplement.co_leader,
-                print_section_availability(application.leader_supplement.new_preferred_sections()),
-                print_section_availability(application.leader_supplement.new_available_sections()),
-                print_triptype_availability(application.leader_supplement.new_preferred_triptypes()),
-                print_triptype_availability(application.leader_supplement.new_available_triptypes())
+                print_section_availability(sections(PREFER)),
+                print_section_availability(sections(AVAILABLE)),
+                print_triptype_availability(triptypes(PREFER)),
+                print_triptype_availability(triptypes(AVAILABLE)),
             ]
             + [score.leader_score for score in application.scores.all()]
             + [score.croo_score for score in application.scores.all()]
@@ -278,6 +336,7 @@ class TrippeesCSV(GenericReportView):
     """
 
     file_prefix = 'Trippees'
+    allow_background = True
 
     def get_queryset(self):
         return IncomingStudent.objects.with_trip(self.trips_year)
@@ -294,6 +353,7 @@ class Registrations(GenericReportView):
     """
 
     file_prefix = 'Registrations'
+    allow_background = True
 
     def get_queryset(self):
         return (
@@ -426,7 +486,13 @@ class Charges(GenericReportView):
                 | Q(registration__green_fund_donation__gt=0)
             ),
             trips_year=self.trips_year,
-        ).prefetch_related('registration')
+        ).select_related(
+            'registration',
+            'trip_assignment',
+            'bus_assignment_round_trip',
+            'bus_assignment_to_hanover',
+            'bus_assignment_from_hanover',
+        )
 
     header = [
         'name',
@@ -48,6 +48,19 @@ FILE_STORAGE_PREFIX = 'uploads'
 HEROKU_HOST = 'doc-trips.herokuapp.com'
 CANONICAL_HOST = 'www.doctrips.org'
 
+# RequestMetricsMiddleware logs requests which take longer than this
+# many seconds, along with their slowest and most repeated queries.
+SLOW_REQUEST_THRESHOLD = float(env.get('SLOW_REQUEST_THRESHOLD', 2))
+
+# Serve Dartmouth Directory lookups from this JSON snapshot of the
+# directory, instead of from the lookup API.
+DARTDM_SNAPSHOT = env.get('DARTDM_SNAPSHOT', None)
+
+# build_packets also renders packets to PDF with this command, if it is set.
+# The command reads HTML from stdin and writes PDF to stdout, for instance
+# `wkhtmltopdf --quiet - -`.
+PACKET_PDF_COMMAND = env.get('PACKET_PDF_COMMAND', None)
+
 # Sentry monitoring
 RAVEN_CONFIG = {'dsn': env.get('SENTRY_DSN')}
 
@@ -78,6 +91,7 @@ INSTALLED_APPS = [
     'fyt.raids',
     'fyt.reports',
     'fyt.safety',
+    'fyt.tasks',
     'fyt.timetable',
     'fyt.training',
     'fyt.transport',
@@ -95,6 +109,7 @@ MIDDLEWARE = (
         'django.middleware.security.SecurityMiddleware',
         'fyt.middleware.CanonicalHostMiddleware',
         'whitenoise.middleware.WhiteNoiseMiddleware',
+        'fyt.middleware.RequestMetricsMiddleware',
     ]
     + (['debug_toolbar.middleware.DebugToolbarMiddleware'] if DEBUG else [])
     + [
@@ -133,6 +148,42 @@ DATABASES = {
     'default': dj_database_url.parse(env.get('DATABASE_URL'), conn_max_age=500)
 }
 
+# The cache is shared by all gunicorn workers in production, so that
+# writes in one worker invalidate cached data in the others. It is
+# memcached, from the MemCachier add-on, since the version stamps of the
+# caches in fyt.utils.cache are read on almost every request.
+if PRODUCTION:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.memcached.PyLibMCCache',
+            'LOCATION': env.get('MEMCACHIER_SERVERS'),
+            'OPTIONS': {
+                'binary': True,
+                'username': env.get('MEMCACHIER_USERNAME'),
+                'password': env.get('MEMCACHIER_PASSWORD'),
+                'behaviors': {
+                    'no_block': True,
+                    'tcp_nodelay': True,
+                    'tcp_keepalive': True,
+                    # Milliseconds
+                    'connect_timeout': 2000,
+                    'send_timeout': 750 * 1000,
+                    'receive_timeout': 750 * 1000,
+                    '_poll_timeout': 2000,
+                    # Spread keys over the servers and skip dead ones
+                    'ketama': True,
+                    'remove_failed': 1,
+                    'retry_timeout': 2,
+                    'dead_timeout': 30,
+                },
+            },
+        }
+    }
+else:
+    CACHES = {
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+    }
+
 # Forms
 CRISPY_TEMPLATE_PACK = 'bootstrap3'
 CRISPY_FAIL_SILENTLY = PRODUCTION
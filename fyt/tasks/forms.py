@@ -0,0 +1,26 @@
+from django import forms
+
+
+class BackgroundField(forms.BooleanField):
+    """
+    Checkbox which runs a form's task in the background. See
+    ``fyt.tasks.views.BackgroundTaskMixin``.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('required', False)
+        kwargs.setdefault('label', 'Run in the background')
+        kwargs.setdefault(
+            'help_text',
+            'Use this for large jobs, which would otherwise time out. You '
+            'can follow the progress of the job on the next page.',
+        )
+        super().__init__(**kwargs)
+
+
+class BackgroundForm(forms.Form):
+    """
+    Form for a task with no other input.
+    """
+
+    background = BackgroundField()
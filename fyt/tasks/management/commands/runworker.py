@@ -0,0 +1,91 @@
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from fyt.tasks import queue
+from fyt.tasks.models import Task
+
+
+# Seconds between checks for periodic tasks to enqueue
+SCHEDULE_INTERVAL = 30
+
+
+class Command(BaseCommand):
+
+    help = 'Run tasks from the background task queue'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=1,
+            help='Run this many tasks at once, each in its own thread',
+        )
+        parser.add_argument(
+            '--poll',
+            type=float,
+            default=2,
+            help='Seconds to wait before checking an empty queue again',
+        )
+        parser.add_argument(
+            '--stale-after',
+            type=int,
+            default=10 * 60,
+            help='Requeue running tasks whose worker has not sent a heartbeat '
+            'for this many seconds',
+        )
+        parser.add_argument(
+            '--burst',
+            action='store_true',
+            help='Exit once the queue is empty, without running periodic tasks',
+        )
+
+    def handle(self, *args, **options):
+        queue.autodiscover()
+        self.stopping = threading.Event()
+        self.schedule_lock = threading.Lock()
+        self.next_schedule = 0
+
+        if options['concurrency'] == 1:
+            self.work(options)
+            return
+
+        threads = [
+            threading.Thread(target=self.work, args=[options], daemon=True)
+            for _ in range(options['concurrency'])
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            for thread in threads:
+                while thread.is_alive():
+                    thread.join(1)
+        except KeyboardInterrupt:
+            self.stdout.write('Finishing running tasks...')
+            self.stopping.set()
+            for thread in threads:
+                thread.join()
+
+    def work(self, options):
+        try:
+            while not self.stopping.is_set():
+                Task.objects.requeue_stale(options['stale_after'])
+                if not options['burst']:
+                    self.schedule_periodic()
+                task = queue.run_next()
+                if task is not None:
+                    self.stdout.write('{} {}'.format(task.get_status_display(), task))
+                elif options['burst']:
+                    break
+                else:
+                    time.sleep(options['poll'])
+        finally:
+            connection.close()
+
+    def schedule_periodic(self):
+        with self.schedule_lock:
+            if time.monotonic() >= self.next_schedule:
+                queue.schedule_periodic()
+                self.next_schedule = time.monotonic() + SCHEDULE_INTERVAL
@@ -0,0 +1,228 @@
+import json
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models, transaction
+from django.db.models import Q
+from django.urls import reverse
+from django.utils import timezone
+
+
+class TaskManager(models.Manager):
+    def enqueue(self, name, title, kwargs, user=None, max_attempts=1, run_at=None):
+        return self.create(
+            name=name,
+            title=title,
+            kwargs=kwargs,
+            created_by=user,
+            max_attempts=max_attempts,
+            run_at=run_at or timezone.now(),
+        )
+
+    def claim(self):
+        """
+        Take the next queued task off the queue and mark it running.
+
+        Returns None if the queue is empty.
+
+        Tasks which another worker is claiming are skipped, rather than
+        waited for, with ``SELECT ... FOR UPDATE SKIP LOCKED``.
+        """
+        now = timezone.now()
+        with transaction.atomic():
+            task = (
+                self.select_for_update(skip_locked=True)
+                .filter(status=Task.QUEUED, run_at__lte=now)
+                .order_by('run_at', 'pk')
+                .first()
+            )
+            if task is None:
+                return None
+
+            task.status = Task.RUNNING
+            task.attempts += 1
+            task.started = task.heartbeat = now
+            # Guard against databases without row locks, such as SQLite
+            claimed = self.filter(pk=task.pk, status=Task.QUEUED).update(
+                status=task.status,
+                attempts=task.attempts,
+                started=task.started,
+                heartbeat=task.heartbeat,
+            )
+        return task if claimed else self.claim()
+
+    def requeue_stale(self, timeout):
+        """
+        Put back tasks whose worker has not reported for ``timeout``
+        seconds, because it died or was restarted.
+        """
+        stale = self.filter(
+            status=Task.RUNNING,
+            heartbeat__lt=timezone.now() - timedelta(seconds=timeout),
+        )
+        stale.filter(attempts__lt=models.F('max_attempts')).update(
+            status=Task.QUEUED
+        )
+        return stale.update(
+            status=Task.FAILED, error='The worker stopped', finished=timezone.now()
+        )
+
+    def delete_files(self, finished_before=None):
+        """
+        Delete the files saved by and uploaded for tasks which finished
+        before ``finished_before``, or by all tasks. The files are deleted
+        once the current transaction commits.
+        """
+        tasks = self.filter(Q(result__has_key='file') | Q(kwargs__has_key='upload'))
+        if finished_before is not None:
+            tasks = tasks.filter(finished__lt=finished_before)
+
+        names = []
+        for task in tasks:
+            if task.result and 'file' in task.result:
+                names.append(task.result.pop('file'))
+            if 'upload' in task.kwargs:
+                names.append(task.kwargs.pop('upload'))
+            task.save(update_fields=['result', 'kwargs'])
+        transaction.on_commit(lambda: _delete_files(names))
+        return len(names)
+
+
+def _delete_files(names):
+    for name in names:
+        default_storage.delete(name)
+
+
+def save_upload(data):
+    """
+    Save the JSON serializable ``data`` of an upload for a task, which is
+    passed the returned name as its ``upload`` argument. Uploads are kept
+    out of ``Task.kwargs`` because they hold personal information.
+    """
+    return default_storage.save(
+        'task-uploads/{}.json'.format(uuid.uuid4().hex),
+        ContentFile(json.dumps(data, cls=DjangoJSONEncoder).encode()),
+    )
+
+
+def load_upload(name):
+    with default_storage.open(name) as f:
+        return json.load(f)
+
+
+def delete_upload(kwargs):
+    """
+    Delete the ``upload`` in task ``kwargs``, if any, once the current
+    transaction commits.
+    """
+    name = kwargs.pop('upload', None)
+    if name is not None:
+        transaction.on_commit(lambda: _delete_files([name]))
+
+
+class Task(models.Model):
+    """
+    A job for the ``runworker`` command.
+
+    ``name`` is the name of the registered task function, which is called
+    with ``kwargs``. See ``fyt.tasks.queue``.
+    """
+
+    QUEUED = 'QUEUED'
+    RUNNING = 'RUNNING'
+    SUCCEEDED = 'SUCCEEDED'
+    FAILED = 'FAILED'
+    STATUS_CHOICES = (
+        (QUEUED, 'queued'),
+        (RUNNING, 'running'),
+        (SUCCEEDED, 'succeeded'),
+        (FAILED, 'failed'),
+    )
+
+    PROGRESS_INTERVAL = timedelta(seconds=1)
+
+    objects = TaskManager()
+
+    name = models.CharField(max_length=255)
+    title = models.CharField(max_length=255)
+    kwargs = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL
+    )
+    created = models.DateTimeField(auto_now_add=True)
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    run_at = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=1)
+    started = models.DateTimeField(null=True, blank=True)
+    heartbeat = models.DateTimeField(null=True, blank=True)
+    finished = models.DateTimeField(null=True, blank=True)
+
+    progress = models.PositiveIntegerField(default=0)
+    progress_total = models.PositiveIntegerField(null=True, blank=True)
+    progress_message = models.CharField(max_length=255, blank=True)
+
+    result = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    error = models.TextField(blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'run_at'])]
+
+    def __str__(self):
+        return '{} ({})'.format(self.title, self.get_status_display())
+
+    def get_absolute_url(self):
+        return reverse('tasks:detail', kwargs={'pk': self.pk})
+
+    @property
+    def finished_running(self):
+        return self.status in [self.SUCCEEDED, self.FAILED]
+
+    @property
+    def percent(self):
+        if self.status == self.SUCCEEDED:
+            return 100
+        if not self.progress_total:
+            return None
+        return min(100, int(100 * self.progress / self.progress_total))
+
+    def open_file(self):
+        """
+        Open the file saved by the task. Returns None if there is no file,
+        or it has been deleted.
+        """
+        name = (self.result or {}).get('file')
+        if name is None or not default_storage.exists(name):
+            return None
+        return default_storage.open(name)
+
+    def set_progress(self, done, total=None, message=''):
+        """
+        Report that ``done`` out of ``total`` steps are finished.
+
+        Progress is saved at most once every ``PROGRESS_INTERVAL``, and
+        when the last step is done, so that reporting every row of a large
+        import does not double its writes. Saving progress also tells
+        ``requeue_stale`` that the worker is still alive.
+        """
+        self.progress = done
+        self.progress_total = total
+        self.progress_message = message[:255]
+
+        now = timezone.now()
+        saved = getattr(self, '_progress_saved', None)
+        last_done = total is not None and done >= total
+        if saved is not None and now - saved < self.PROGRESS_INTERVAL and not last_done:
+            return
+        self._progress_saved = self.heartbeat = now
+        Task.objects.filter(pk=self.pk).update(
+            progress=self.progress,
+            progress_total=self.progress_total,
+            progress_message=self.progress_message,
+            heartbeat=self.heartbeat,
+        )
@@ -0,0 +1,211 @@
+"""
+A task queue kept in the database.
+
+Register a function as a task with ``@task``. Calling the function runs it
+immediately; ``enqueue`` saves a ``Task`` for the ``runworker`` command to
+run later::
+
+    @task(max_attempts=3)
+    def rebuild(trips_year, progress=noop):
+        ...
+        return {'messages': [('info', 'Rebuilt everything')]}
+
+    rebuild(trips_year=2020)                   # right now
+    rebuild.enqueue(user, trips_year=2020)     # in the background
+
+Arguments must be JSON serializable. When run by a worker the function is
+passed a ``progress(done, total, message)`` callback. It may return a JSON
+serializable result: a ``messages`` list of ``(level, message)`` pairs is
+shown to the user, and a ``file`` saved with the default file storage
+can be downloaded by the user who queued the task. Files are deleted
+after a day by the ``delete_old_files`` task.
+
+Uploaded data is saved with ``save_upload`` and passed to the task as
+the file name ``upload``, rather than kept in the task's arguments. The
+file is deleted when the task finishes.
+
+Task functions live in the ``tasks`` module of each app, which workers
+import at startup.
+
+A task registered with ``every`` is also run by the workers on a
+schedule; see ``schedule_periodic``. Periodic tasks take no arguments.
+"""
+
+import logging
+import threading
+import traceback
+from datetime import timedelta
+
+from django.db import connection
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+from fyt.tasks.models import Task, delete_upload
+
+
+log = logging.getLogger(__name__)
+
+_registry = {}
+
+# Seconds between the heartbeats of a running task
+HEARTBEAT_INTERVAL = 60
+
+
+def noop(*args, **kwargs):
+    pass
+
+
+class TaskFunction:
+    def __init__(self, func, max_attempts, every=None):
+        self.func = func
+        self.max_attempts = max_attempts
+        self.every = every
+        self.name = '{}.{}'.format(func.__module__, func.__qualname__)
+        self.title = (func.__doc__ or func.__name__).strip().splitlines()[0]
+        self.__doc__ = func.__doc__
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def enqueue(self, user=None, **kwargs):
+        return Task.objects.enqueue(
+            self.name, self.title, kwargs, user=user, max_attempts=self.max_attempts
+        )
+
+
+def task(max_attempts=1, every=None):
+    """
+    Register the decorated function as a task.
+
+    Failed tasks are retried, with exponential backoff, until they have
+    been tried ``max_attempts`` times. With ``every``, a ``timedelta``,
+    workers run the task that long after its last run finished.
+    """
+
+    def decorator(func):
+        task_function = TaskFunction(func, max_attempts, every)
+        _registry[task_function.name] = task_function
+        return task_function
+
+    return decorator
+
+
+def autodiscover():
+    autodiscover_modules('tasks')
+
+
+def schedule_periodic():
+    """
+    Enqueue the next run of each periodic task which is not already queued
+    or running. Successful runs more than a day old are deleted.
+
+    Returns the enqueued tasks.
+    """
+    now = timezone.now()
+    scheduled = []
+    for func in _registry.values():
+        if func.every is None:
+            continue
+
+        Task.objects.filter(
+            name=func.name,
+            status=Task.SUCCEEDED,
+            finished__lt=now - timedelta(days=1),
+        ).delete()
+
+        last = Task.objects.filter(name=func.name).order_by('-created', '-pk').first()
+        if last is not None and not last.finished_running:
+            continue
+
+        run_at = now if last is None else max(now, last.finished + func.every)
+        scheduled.append(
+            Task.objects.enqueue(
+                func.name,
+                func.title,
+                {},
+                max_attempts=func.max_attempts,
+                run_at=run_at,
+            )
+        )
+
+    return scheduled
+
+
+def retry_delay(attempts):
+    return timedelta(seconds=30 * 2 ** (attempts - 1))
+
+
+class Heartbeat(threading.Thread):
+    """
+    Tell ``requeue_stale`` that the worker running ``task`` is alive, every
+    ``interval`` seconds until stopped.
+
+    The heartbeat is saved from the thread's own database connection, so
+    it is seen even while the task runs in a transaction, as
+    ``forward_trips_year`` does, or goes a long time without reporting
+    progress.
+    """
+
+    def __init__(self, task, interval=HEARTBEAT_INTERVAL):
+        super().__init__(daemon=True)
+        self.task_pk = task.pk
+        self.interval = interval
+        self.stopped = threading.Event()
+
+    def run(self):
+        try:
+            while not self.stopped.wait(self.interval):
+                Task.objects.filter(pk=self.task_pk, status=Task.RUNNING).update(
+                    heartbeat=timezone.now()
+                )
+        finally:
+            connection.close()
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+def run(task):
+    """
+    Run a ``task`` claimed from the queue, and record the outcome.
+    """
+    heartbeat = Heartbeat(task)
+    heartbeat.start()
+    try:
+        func = _registry[task.name]
+        result = func(progress=task.set_progress, **task.kwargs)
+    except Exception:
+        log.exception('Task %s failed', task)
+        task.error = traceback.format_exc()
+        if task.attempts < task.max_attempts:
+            task.status = Task.QUEUED
+            task.run_at = timezone.now() + retry_delay(task.attempts)
+        else:
+            task.status = Task.FAILED
+            task.finished = timezone.now()
+    else:
+        task.status = Task.SUCCEEDED
+        task.result = result
+        task.error = ''
+        task.finished = timezone.now()
+    finally:
+        heartbeat.stop()
+
+    fields = ['status', 'result', 'error', 'run_at', 'finished']
+    if task.finished_running and 'upload' in task.kwargs:
+        delete_upload(task.kwargs)
+        fields.append('kwargs')
+    task.save(update_fields=fields)
+    return task
+
+
+def run_next():
+    """
+    Run the next task in the queue. Returns the task, or None if the queue
+    is empty.
+    """
+    task = Task.objects.claim()
+    if task is not None:
+        run(task)
+    return task
@@ -0,0 +1,22 @@
+from datetime import timedelta
+
+from django.utils import timezone
+
+from fyt.tasks.models import Task
+from fyt.tasks.queue import noop, task
+
+
+#: How long the files saved by tasks can be downloaded
+FILE_LIFETIME = timedelta(days=1)
+
+
+@task(every=timedelta(hours=1))
+def delete_old_files(progress=noop):
+    """
+    Delete old files
+
+    Delete the files saved by tasks which finished more than
+    ``FILE_LIFETIME`` ago.
+    """
+    deleted = Task.objects.delete_files(timezone.now() - FILE_LIFETIME)
+    return {'messages': [('info', 'Deleted {} files'.format(deleted))]}
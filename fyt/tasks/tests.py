@@ -0,0 +1,308 @@
+import shutil
+import tempfile
+import time
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+
+from fyt.tasks.models import Task, load_upload, save_upload
+from fyt.tasks.queue import Heartbeat, noop, run_next, schedule_periodic, task
+from fyt.tasks.tasks import FILE_LIFETIME, delete_old_files
+from fyt.test import FytTestCase
+
+
+@task()
+def add(a, b, progress=noop):
+    """
+    Add two numbers
+    """
+    progress(1, 2, 'Adding')
+    return {'sum': a + b, 'messages': [('success', 'Added')]}
+
+
+@task(max_attempts=2)
+def fail(upload=None, progress=noop):
+    """
+    Fail
+    """
+    raise ValueError('no luck')
+
+
+@task(every=timedelta(minutes=5))
+def tick(progress=noop):
+    """
+    Tick
+    """
+
+
+class TaskQueueTestCase(FytTestCase):
+    def test_call_runs_immediately(self):
+        self.assertEqual(add(1, 2)['sum'], 3)
+        self.assertFalse(Task.objects.exists())
+
+    def test_enqueue_and_run(self):
+        queued = add.enqueue(a=1, b=2)
+        self.assertEqual(queued.title, 'Add two numbers')
+        self.assertEqual(queued.status, Task.QUEUED)
+
+        self.assertEqual(run_next().pk, queued.pk)
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, Task.SUCCEEDED)
+        self.assertEqual(queued.result['sum'], 3)
+        self.assertEqual(queued.attempts, 1)
+        self.assertEqual(queued.progress_message, 'Adding')
+        self.assertEqual(queued.percent, 100)
+
+        self.assertIsNone(run_next())
+
+    def test_tasks_run_in_order(self):
+        first = add.enqueue(a=1, b=2)
+        second = add.enqueue(a=1, b=2)
+        self.assertEqual(run_next(), first)
+        self.assertEqual(run_next(), second)
+
+    def test_failed_tasks_are_retried(self):
+        queued = fail.enqueue()
+        run_next()
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, Task.QUEUED)
+        self.assertIn('no luck', queued.error)
+        self.assertGreater(queued.run_at, timezone.now())
+
+        # Not run again until the backoff expires
+        self.assertIsNone(run_next())
+
+        Task.objects.update(run_at=timezone.now())
+        run_next()
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, Task.FAILED)
+        self.assertEqual(queued.attempts, 2)
+        self.assertIsNotNone(queued.finished)
+
+    def test_requeue_stale(self):
+        long_ago = timezone.now() - timedelta(hours=1)
+        retried = Task.objects.create(
+            name='x',
+            status=Task.RUNNING,
+            heartbeat=long_ago,
+            attempts=1,
+            max_attempts=2,
+        )
+        failed = Task.objects.create(
+            name='y', status=Task.RUNNING, heartbeat=long_ago, attempts=1
+        )
+        running = Task.objects.create(
+            name='z', status=Task.RUNNING, heartbeat=timezone.now(), attempts=1
+        )
+        Task.objects.requeue_stale(60)
+
+        statuses = dict(Task.objects.values_list('pk', 'status'))
+        self.assertEqual(statuses[retried.pk], Task.QUEUED)
+        self.assertEqual(statuses[failed.pk], Task.FAILED)
+        self.assertEqual(statuses[running.pk], Task.RUNNING)
+
+    def test_schedule_periodic(self):
+        def ticks():
+            return [t for t in schedule_periodic() if t.name == tick.name]
+
+        first = ticks()[0]
+        self.assertLessEqual(first.run_at, timezone.now())
+        self.assertEqual(ticks(), [])  # Already queued
+
+        while run_next():
+            pass
+        first.refresh_from_db()
+        self.assertEqual(first.status, Task.SUCCEEDED)
+
+        second = ticks()[0]
+        self.assertEqual(second.run_at, first.finished + timedelta(minutes=5))
+        self.assertEqual(ticks(), [])
+
+    def test_old_periodic_runs_are_deleted(self):
+        old = Task.objects.create(
+            name=tick.name,
+            status=Task.SUCCEEDED,
+            finished=timezone.now() - timedelta(days=2),
+        )
+        schedule_periodic()
+        self.assertFalse(Task.objects.filter(pk=old.pk).exists())
+        self.assertTrue(Task.objects.filter(name=tick.name, status=Task.QUEUED))
+
+    def test_runworker(self):
+        queued = add.enqueue(a=1, b=2)
+        out = StringIO()
+        with mock.patch('fyt.tasks.management.commands.runworker.connection'):
+            call_command('runworker', burst=True, stdout=out)
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, Task.SUCCEEDED)
+        self.assertIn('succeeded Add two numbers', out.getvalue())
+
+
+class TaskProgressTestCase(FytTestCase):
+    def test_progress_is_throttled(self):
+        t = add.enqueue(a=1, b=2)
+        with self.assertNumQueries(2):
+            for i in range(100):
+                t.set_progress(i, 100)
+            t.set_progress(100, 100, 'Done')
+
+        t.refresh_from_db()
+        self.assertEqual(t.progress, 100)
+        self.assertEqual(t.progress_message, 'Done')
+
+    def test_progress_is_saved_after_interval(self):
+        t = add.enqueue(a=1, b=2)
+        t.set_progress(1, 100)
+        t._progress_saved -= Task.PROGRESS_INTERVAL
+        t.set_progress(2, 100)
+
+        t.refresh_from_db()
+        self.assertEqual(t.progress, 2)
+
+    def test_heartbeat(self):
+        t = add.enqueue(a=1, b=2)
+        with mock.patch('fyt.tasks.queue.Task.objects') as objects:
+            heartbeat = Heartbeat(t, interval=0.01)
+            heartbeat.start()
+            time.sleep(0.1)
+            heartbeat.stop()
+
+        self.assertFalse(heartbeat.is_alive())
+        objects.filter.assert_called_with(pk=t.pk, status=Task.RUNNING)
+        objects.filter.return_value.update.assert_called_with(heartbeat=mock.ANY)
+
+
+class TaskViewsTestCase(FytTestCase):
+    def setUp(self):
+        self.init_trips_year()
+        self.user = self.make_director()
+        self.task = add.enqueue(user=self.user, a=1, b=2)
+
+    def test_progress_page(self):
+        url = self.task.get_absolute_url()
+        resp = self.app.get(url, user=self.user)
+        self.assertContains(resp, 'Add two numbers')
+        self.assertContains(resp, reverse('tasks:status', kwargs={'pk': self.task.pk}))
+
+        run_next()
+        resp = self.app.get(url, user=self.user)
+        self.assertContains(resp, 'Added')
+
+    def test_status(self):
+        url = reverse('tasks:status', kwargs={'pk': self.task.pk})
+        data = self.app.get(url, user=self.user).json
+        self.assertEqual(data['status'], Task.QUEUED)
+        self.assertFalse(data['finished'])
+
+        run_next()
+        data = self.app.get(url, user=self.user).json
+        self.assertTrue(data['finished'])
+        self.assertEqual(data['percent'], 100)
+
+    def test_only_creator_can_see_task(self):
+        url = self.task.get_absolute_url()
+        self.app.get(url, user=self.make_user(), status=404)
+
+
+class TaskFilesTestCase(FytTestCase):
+    def setUp(self):
+        self.init_trips_year()
+        self.user = self.make_director()
+        self.storage = FileSystemStorage(location=tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.storage.location)
+        for target in [
+            mock.patch('fyt.tasks.models.default_storage', self.storage),
+            mock.patch('fyt.tasks.models.transaction.on_commit', lambda func: func()),
+        ]:
+            target.start()
+            self.addCleanup(target.stop)
+
+    def make_task(self, finished=None):
+        name = self.storage.save('reports/report.csv', ContentFile(b'a,b\n'))
+        return Task.objects.create(
+            name='export',
+            title='Export',
+            created_by=self.user,
+            status=Task.SUCCEEDED,
+            finished=finished or timezone.now(),
+            result={'messages': [], 'file': name},
+        )
+
+    def test_download(self):
+        t = self.make_task()
+        resp = self.app.get(t.get_absolute_url(), user=self.user)
+        url = reverse('tasks:download', kwargs={'pk': t.pk})
+        self.assertContains(resp, url)
+
+        resp = self.app.get(url, user=self.user)
+        self.assertEqual(resp.body, b'a,b\n')
+        self.assertIn('attachment', resp['Content-Disposition'])
+        self.assertIn(t.result['file'].split('/')[-1], resp['Content-Disposition'])
+
+    def test_only_creator_can_download(self):
+        t = self.make_task()
+        url = reverse('tasks:download', kwargs={'pk': t.pk})
+        self.app.get(url, user=self.make_user(), status=404)
+
+    def test_old_files_are_deleted(self):
+        old = self.make_task(finished=timezone.now() - FILE_LIFETIME * 2)
+        new = self.make_task()
+        old_name = old.result['file']
+
+        result = delete_old_files()
+        self.assertEqual(result['messages'], [('info', 'Deleted 1 files')])
+
+        old.refresh_from_db()
+        new.refresh_from_db()
+        self.assertNotIn('file', old.result)
+        self.assertFalse(self.storage.exists(old_name))
+        self.assertTrue(self.storage.exists(new.result['file']))
+
+        resp = self.app.get(old.get_absolute_url(), user=self.user)
+        self.assertNotContains(resp, 'Download')
+        url = reverse('tasks:download', kwargs={'pk': old.pk})
+        self.app.get(url, user=self.user, status=404)
+
+    def test_old_uploads_are_deleted(self):
+        name = save_upload([['netid'], ['d34898x']])
+        t = Task.objects.create(
+            name='import',
+            title='Import',
+            status=Task.FAILED,
+            finished=timezone.now() - FILE_LIFETIME * 2,
+            kwargs={'trips_year': 2020, 'upload': name},
+        )
+        self.assertEqual(load_upload(name), [['netid'], ['d34898x']])
+
+        delete_old_files()
+        t.refresh_from_db()
+        self.assertEqual(t.kwargs, {'trips_year': 2020})
+        self.assertFalse(self.storage.exists(name))
+
+    def test_upload_is_kept_for_retries(self):
+        name = save_upload([])
+        t = fail.enqueue(upload=name)
+
+        run_next()
+        t.refresh_from_db()
+        self.assertEqual(t.status, Task.QUEUED)
+        self.assertTrue(self.storage.exists(name))
+
+        Task.objects.filter(pk=t.pk).update(run_at=timezone.now())
+        run_next()
+        t.refresh_from_db()
+        self.assertEqual(t.status, Task.FAILED)
+        self.assertEqual(t.kwargs, {})
+        self.assertFalse(self.storage.exists(name))
+
+    def test_missing_file(self):
+        t = self.make_task()
+        self.storage.delete(t.result['file'])
+        url = reverse('tasks:download', kwargs={'pk': t.pk})
+        self.app.get(url, user=self.user, status=404)
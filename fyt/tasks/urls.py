@@ -0,0 +1,10 @@
+from django.urls import path
+
+from fyt.tasks.views import TaskDetail, TaskDownload, TaskStatus
+
+
+urlpatterns = [
+    path('<int:pk>/', TaskDetail.as_view(), name='detail'),
+    path('<int:pk>/status/', TaskStatus.as_view(), name='status'),
+    path('<int:pk>/download/', TaskDownload.as_view(), name='download'),
+]
@@ -0,0 +1,125 @@
+import os
+
+from django.contrib import messages
+from django.contrib.auth.mixins import LoginRequiredMixin
+from django.core.exceptions import ImproperlyConfigured
+from django.http import FileResponse, Http404, HttpResponseRedirect, JsonResponse
+from django.urls import reverse
+from vanilla import DetailView
+
+from fyt.tasks.models import Task, delete_upload
+
+
+def add_result_messages(request, result):
+    """
+    Show the messages in the ``result`` of a task to the user.
+    """
+    for level, message in (result or {}).get('messages', []):
+        getattr(messages, level)(request, message)
+
+
+class BackgroundTaskMixin:
+    """
+    Form view mixin which runs ``task`` when the form is valid.
+
+    If the form has a checked ``background`` field the task is queued,
+    and the user is redirected to its progress page. Otherwise it runs
+    right away and its messages are shown on the success page.
+    """
+
+    task = None
+
+    def get_task_kwargs(self, form):
+        raise ImproperlyConfigured('implement get_task_kwargs()')
+
+    def run_in_background(self, form):
+        return form.cleaned_data.get('background', False)
+
+    def run_task(self, form):
+        if self.task is None:
+            raise ImproperlyConfigured("add a 'task' property")
+        kwargs = self.get_task_kwargs(form)
+
+        if self.run_in_background(form):
+            task = self.task.enqueue(user=self.request.user, **kwargs)
+            return HttpResponseRedirect(task.get_absolute_url())
+
+        try:
+            result = self.task(**kwargs)
+        finally:
+            delete_upload(kwargs)
+        add_result_messages(self.request, result)
+        return HttpResponseRedirect(self.get_success_url())
+
+    def form_valid(self, form):
+        return self.run_task(form)
+
+
+class TaskPermissionMixin(LoginRequiredMixin):
+    """
+    Users can only follow their own tasks.
+    """
+
+    def get_queryset(self):
+        qs = Task.objects.all()
+        if not self.request.user.is_superuser:
+            qs = qs.filter(created_by=self.request.user)
+        return qs
+
+
+class TaskDetail(TaskPermissionMixin, DetailView):
+    """
+    Progress and outcome of a task.
+    """
+
+    template_name = 'tasks/task_detail.html'
+    context_object_name = 'task'
+
+    ALERT_CLASSES = {'error': 'danger'}
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        result = self.object.result or {}
+        context['result_messages'] = [
+            (self.ALERT_CLASSES.get(level, level), message)
+            for level, message in result.get('messages', [])
+        ]
+        if result.get('file'):
+            context['result_url'] = reverse(
+                'tasks:download', kwargs={'pk': self.object.pk}
+            )
+        return context
+
+
+class TaskDownload(TaskPermissionMixin, DetailView):
+    """
+    Download the file saved by a task.
+    """
+
+    def get(self, request, *args, **kwargs):
+        task = self.get_object()
+        f = task.open_file()
+        if f is None:
+            raise Http404('The file has been deleted')
+        return FileResponse(
+            f, as_attachment=True, filename=os.path.basename(task.result['file'])
+        )
+
+
+class TaskStatus(TaskPermissionMixin, DetailView):
+    """
+    Progress of a task, as JSON for the progress page.
+    """
+
+    def get(self, request, *args, **kwargs):
+        task = self.get_object()
+        return JsonResponse(
+            {
+                'status': task.status,
+                'finished': task.finished_running,
+                'progress': task.progress,
+                'total': task.progress_total,
+                'percent': task.percent,
+                'message': task.progress_message,
+            }
+        )
@@ -5,6 +5,8 @@ import os
 import string
 
 from django.conf import settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django_webtest import WebTest
 from model_mommy import mommy, random_gen
 from vcr import VCR
@@ -185,3 +187,47 @@ class FytTestCase(WebTest):
             transformed.append(new)
 
         return self.assertEqual(transformed, values)
+
+    def assertQueryBudget(self, request, populate, budget, sizes=(1, 5)):
+        """
+        Check the number of queries ``request`` runs as the dataset grows.
+
+        Before each call to ``request()`` the dataset is grown to the next
+        size in ``sizes`` by calling ``populate(n)``, which must add ``n``
+        rows. ``budget`` is the maximum number of queries, either a constant
+        or a function of the dataset size.
+
+        A constant budget also requires that the query count does not grow
+        with the dataset, which catches N+1 queries long before the count
+        reaches the budget.
+        """
+        constant = not callable(budget)
+
+        size = 0
+        counts = []
+        for target in sizes:
+            populate(target - size)
+            size = target
+
+            with CaptureQueriesContext(connection) as context:
+                request()
+            counts.append(len(context))
+
+            limit = budget if constant else budget(size)
+            grew = constant and counts[-1] > counts[0]
+
+            if counts[-1] > limit or grew:
+                msg = '{} queries with {} rows exceeds the budget of {}'.format(
+                    counts[-1], size, limit
+                )
+                if grew:
+                    msg = '{} queries with {} rows grew from {} with {} rows'.format(
+                        counts[-1], size, counts[0], sizes[0]
+                    )
+                queries = '\n'.join(
+                    '{}. {}'.format(i, query['sql'])
+                    for i, query in enumerate(context.captured_queries, start=1)
+                )
+                self.fail('{}. Queries:\n{}'.format(msg, queries))
+
+        return counts
@@ -2,8 +2,12 @@ from datetime import timedelta
 
 from django.core.exceptions import ValidationError
 from django.db import models
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from django.utils import timezone
 
+from fyt.utils.cache import SingletonCache
+
 
 """
 Our calendar is represented by a singleton Timetable object which
@@ -19,9 +23,13 @@ TIMETABLE_ID = 1
 GRACE_PERIOD = timedelta(minutes=15)
 
 
+# The timetable is read on most public pages
+timetable_cache = SingletonCache('timetable')
+
+
 class TimetableManager(models.Manager):
     def timetable(self):
-        return self.get(id=TIMETABLE_ID)
+        return timetable_cache.get(TIMETABLE_ID, lambda: self.get(id=TIMETABLE_ID))
 
 
 class Timetable(models.Model):
@@ -121,3 +129,9 @@ class Timetable(models.Model):
         self.trippee_assignment_available = False
 
         self.save()
+
+
+@receiver(post_save, sender=Timetable)
+@receiver(post_delete, sender=Timetable)
+def invalidate_timetable_cache(**kwargs):
+    timetable_cache.invalidate()
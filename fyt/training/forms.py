@@ -3,6 +3,7 @@ from crispy_forms.helper import FormHelper
 from crispy_forms.layout import Div, Layout, Row, Submit
 from django import forms
 from django.core.exceptions import ValidationError
+from django.db import transaction
 from django.utils.safestring import mark_safe
 
 from fyt.applications.models import Volunteer
@@ -116,22 +117,53 @@ class SignupForm(TripsYearModelForm):
         widgets = {'registered_sessions': forms.CheckboxSelectMultiple()}
         labels = {'registered_sessions': ''}
 
-    def clean_registered_sessions(self):
-        new_registrations = set(self.cleaned_data['registered_sessions']) - set(
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        field = self.fields['registered_sessions']
+        field.queryset = field.queryset.with_occupancy()
+
+    def new_registrations(self):
+        return set(self.cleaned_data['registered_sessions']) - set(
             self.instance.registered_sessions.all()
         )
 
-        full = [session for session in new_registrations if session.full()]
+    def full_sessions_error(self, full):
+        return ValidationError(
+            "The following sessions are full: {}. Please choose another "
+            "session. If this is the only time you can attend, please "
+            "contact the Trip Leader Trainers directly.".format(join_with_and(full))
+        )
+
+    def clean_registered_sessions(self):
+        full = [session for session in self.new_registrations() if session.full()]
 
         if full:
-            raise ValidationError(
-                "The following sessions are full: {}. Please choose another "
-                "session. If this is the only time you can attend, please "
-                "contact the Trip Leader Trainers directly.".format(join_with_and(full))
-            )
+            raise self.full_sessions_error(full)
 
         return self.cleaned_data['registered_sessions']
 
+    def save(self, **kwargs):
+        """
+        Lock the sessions the attendee is newly registering for and check
+        their capacity again before saving, so that concurrent signups
+        cannot both take the last place in a session.
+
+        Raises a ``ValidationError`` if a session has filled up since the
+        form was cleaned.
+        """
+        with transaction.atomic():
+            new = [session.pk for session in self.new_registrations()]
+            list(Session.objects.select_for_update().filter(pk__in=new).order_by('pk'))
+            full = list(
+                Session.objects.filter(pk__in=new)
+                .with_occupancy()
+                .filter(registered_count__gte=Session.DEFAULT_CAPACITY)
+            )
+            if full:
+                raise self.full_sessions_error(full)
+
+            return super().save(**kwargs)
+
 
 class CompletedSessionsForm(TripsYearModelForm):
     class Meta:
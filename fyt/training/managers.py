@@ -1,7 +1,6 @@
 from django.db import models
-from django.db.models import Q
-
-from fyt.utils.query import pks
+from django.db.models import Count, F, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
 
 
 class AttendeeManager(models.Manager):
@@ -18,23 +17,53 @@ class AttendeeManager(models.Manager):
             volunteer__status__in=self.model.TRAINABLE_STATUSES
         )
 
-    def training_complete(self, trips_year):
+    def with_trainings_completed(self, trips_year):
         """
-        All volunteers who have finished their training.
+        The volunteers of ``trips_year``, annotated with the number of
+        distinct trainings they have completed a session of as
+        ``trainings_completed`` and the number of trainings this year as
+        ``trainings_required``, in a single grouped query.
         """
-        qs = self.filter(trips_year=trips_year)
-
         from .models import Training
 
-        for training in Training.objects.filter(trips_year=trips_year):
-            qs = qs.filter(complete_sessions__training=training)
+        trainings = (
+            Training.objects.filter(trips_year=OuterRef('trips_year'))
+            .order_by()
+            .values('trips_year')
+            .annotate(count=Count('pk'))
+            .values('count')
+        )
+        return self.filter(trips_year=trips_year).annotate(
+            trainings_completed=Count(
+                'complete_sessions__training',
+                distinct=True,
+                filter=Q(complete_sessions__trips_year=trips_year),
+            ),
+            trainings_required=Coalesce(Subquery(trainings), Value(0)),
+        )
 
-        return qs
+    def training_complete(self, trips_year):
+        """
+        All volunteers who have finished their training.
+        """
+        return self.with_trainings_completed(trips_year).filter(
+            trainings_completed__gte=F('trainings_required')
+        )
 
     def training_incomplete(self, trips_year):
         """
         All volunteers who have not completed their training.
         """
-        return self.filter(trips_year=trips_year).exclude(
-            pk__in=pks(self.training_complete(trips_year))
+        return self.with_trainings_completed(trips_year).filter(
+            trainings_completed__lt=F('trainings_required')
         )
+
+
+class SessionQuerySet(models.QuerySet):
+    def with_occupancy(self):
+        """
+        Annotate the number of registered attendees of each session as
+        ``registered_count``, which ``Session.size`` and ``Session.full``
+        use instead of counting each session separately.
+        """
+        return self.annotate(registered_count=Count('registered', distinct=True))
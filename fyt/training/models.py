@@ -8,7 +8,7 @@ from django.urls import reverse
 
 from fyt.applications.models import Volunteer
 from fyt.core.models import DatabaseModel
-from fyt.training.managers import AttendeeManager
+from fyt.training.managers import AttendeeManager, SessionQuerySet
 
 
 class Training(DatabaseModel):
@@ -40,13 +40,17 @@ class Session(DatabaseModel):
     end_time = models.TimeField()
     location = models.CharField(max_length=256)
 
+    objects = SessionQuerySet.as_manager()
+
     # TODO: expose this as editable?
     DEFAULT_CAPACITY = 70
 
     def full(self):
-        return self.registered.count() >= self.DEFAULT_CAPACITY
+        return self.size() >= self.DEFAULT_CAPACITY
 
     def size(self):
+        if hasattr(self, 'registered_count'):
+            return self.registered_count
         return self.registered.count()
 
     def registered_emails(self):
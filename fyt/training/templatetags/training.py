@@ -17,7 +17,7 @@ def capacity_label(session):
         text = 'full'
     else:
         label = 'success'
-        text = '{}/{}'.format(session.registered.count(), session.DEFAULT_CAPACITY)
+        text = '{}/{}'.format(session.size(), session.DEFAULT_CAPACITY)
 
     return mark_safe(
         '<span class="label label-{} label-training-capacity"> {} </span>'.format(
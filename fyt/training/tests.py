@@ -1,6 +1,8 @@
 from datetime import date
 
 from django.core.exceptions import ValidationError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from model_mommy import mommy
 
@@ -49,6 +51,13 @@ class SessionModelTestCase(FytTestCase):
             make_attendee(trips_year=self.trips_year, registered_sessions=self.session)
         self.assertTrue(self.session.full())
 
+    def test_size_uses_occupancy_annotation(self):
+        make_attendee(trips_year=self.trips_year, registered_sessions=self.session)
+        session = Session.objects.with_occupancy().get(pk=self.session.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(session.size(), 2)
+            self.assertFalse(session.full())
+
 
 class AttendeeModelTestCase(ApplicationTestMixin, FytTestCase):
     def setUp(self):
@@ -110,6 +119,38 @@ class AttendeeTrainingTestCase(FytTestCase):
             Attendee.objects.training_incomplete(self.trips_year), [self.attendee1]
         )
 
+    def test_training_complete_is_one_query(self):
+        mommy.make(Training, trips_year=self.trips_year, _quantity=3)
+        with self.assertNumQueries(1):
+            list(Attendee.objects.training_complete(self.trips_year))
+        with self.assertNumQueries(1):
+            list(Attendee.objects.training_incomplete(self.trips_year))
+
+    def test_sessions_of_the_same_training_count_once(self):
+        other_training = mommy.make(Training, trips_year=self.trips_year)
+        session = mommy.make(
+            Session, trips_year=self.trips_year, training=self.training
+        )
+        session.completed.add(self.attendee2)
+        self.assertQsEqual(Attendee.objects.training_complete(self.trips_year), [])
+
+        mommy.make(
+            Session, trips_year=self.trips_year, training=other_training
+        ).completed.add(self.attendee2)
+        self.assertQsEqual(
+            Attendee.objects.training_complete(self.trips_year), [self.attendee2]
+        )
+
+    def test_everyone_is_complete_without_trainings(self):
+        self.init_old_trips_year()
+        attendee = make_attendee(trips_year=self.old_trips_year)
+        self.assertQsEqual(
+            Attendee.objects.training_complete(self.old_trips_year), [attendee]
+        )
+        self.assertQsEqual(
+            Attendee.objects.training_incomplete(self.old_trips_year), []
+        )
+
 
 # TODO: move this to volunteer app?
 class VolunteerFirstAidTestCase(ApplicationTestMixin, FytTestCase):
@@ -333,6 +374,21 @@ class SignupFormTestCase(FytTestCase):
         self.assertTrue(form.is_valid())
         self.assertQsEqual(form.cleaned_data['registered_sessions'], [session])
 
+    def test_capacity_is_checked_again_on_save(self):
+        session = mommy.make(Session, trips_year=self.trips_year)
+        attendee = make_attendee(trips_year=self.trips_year)
+        form = SignupForm({'registered_sessions': [session]}, instance=attendee)
+        self.assertTrue(form.is_valid())
+
+        # Session fills up before the form is saved
+        for i in range(Session.DEFAULT_CAPACITY):
+            make_attendee(trips_year=self.trips_year, registered_sessions=session)
+
+        with self.assertRaises(ValidationError):
+            form.save()
+        self.assertQsEqual(attendee.registered_sessions.all(), [])
+        self.assertEqual(session.size(), Session.DEFAULT_CAPACITY)
+
     def test_registered_sessions_are_filtered_for_trips_year(self):
         self.init_old_trips_year()
         session = mommy.make(Session, trips_year=self.trips_year)
@@ -414,6 +470,21 @@ class TrainingViewsTestCase(ApplicationTestMixin, FytTestCase):
             app = mommy.make(Volunteer, trips_year=self.trips_year, status=status)
             self.app.get(url, user=app.applicant, status=code)
 
+    def test_session_list_counts_registrations_in_one_query(self):
+        url = reverse('core:session:index', kwargs={'trips_year': self.trips_year})
+        session = mommy.make(Session, trips_year=self.trips_year)
+        make_attendee(trips_year=self.trips_year, registered_sessions=session)
+        self.app.get(url, user=self.tlt)  # Warm the cache
+        with CaptureQueriesContext(connection) as one_session:
+            self.app.get(url, user=self.tlt)
+
+        mommy.make(Session, trips_year=self.trips_year, _quantity=3)
+        with CaptureQueriesContext(connection) as four_sessions:
+            resp = self.app.get(url, user=self.tlt)
+
+        self.assertEqual(len(four_sessions), len(one_session))
+        self.assertIn('1/{}'.format(Session.DEFAULT_CAPACITY), resp)
+
 
 class FirstAidViewsTestCase(ApplicationTestMixin, FytTestCase):
     def setUp(self):
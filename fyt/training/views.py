@@ -2,6 +2,7 @@ import logging
 
 from braces.views import FormMessagesMixin, SetHeadlineMixin
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
+from django.core.exceptions import ValidationError
 from django.urls import reverse
 from django.utils.functional import cached_property
 from django.utils.safestring import mark_safe
@@ -48,6 +49,9 @@ class SessionList(DatabaseListView):
     model = Session
     context_object_name = 'sessions'
 
+    def get_queryset(self):
+        return super().get_queryset().select_related('training').with_occupancy()
+
 
 class SessionDetail(DatabaseDetailView):
     model = Session
@@ -63,6 +67,9 @@ class SessionDetail(DatabaseDetailView):
         'completed',
     ]
 
+    def get_queryset(self):
+        return super().get_queryset().with_occupancy()
+
     def extra_context(self):
         return {
             'update_attendance_url': reverse(
@@ -184,5 +191,13 @@ class Signup(LoginRequiredMixin, UserPassesTestMixin, FormMessagesMixin, UpdateV
     def get_form(self, *args, **kwargs):
         return crispify(super().get_form(*args, **kwargs))
 
+    def form_valid(self, form):
+        # A session can fill up between cleaning the form and saving it
+        try:
+            return super().form_valid(form)
+        except ValidationError as e:
+            form.add_error('registered_sessions', e)
+            return self.form_invalid(form)
+
     def get_success_url(self):
         return self.request.path
@@ -1,6 +1,7 @@
 from django.db import models
 from django.db.models import Q
 
+from fyt.core.managers import trips_data_cache
 from fyt.transport.category import EXTERNAL, INTERNAL
 from fyt.utils.matrix import OrderedMatrix
 
@@ -65,6 +66,7 @@ class ExternalBusManager(models.Manager):
 
 
 class ExternalPassengerManager(models.Manager):
+    @trips_data_cache.memoize('incoming', 'transport', 'trips')
     def matrix_to_hanover(self, trips_year):
         """
         Each entry in the matrix contains the number of
@@ -79,6 +81,7 @@ class ExternalPassengerManager(models.Manager):
             lambda p: p.bus_assignment_to_hanover,
         )
 
+    @trips_data_cache.memoize('incoming', 'transport', 'trips')
     def matrix_from_hanover(self, trips_year):
         """
         Each entry in the matrix contains the number of
@@ -4,6 +4,8 @@ import googlemaps
 from django.conf import settings
 from googlemaps.exceptions import ApiError, TransportError
 
+from fyt.utils import http
+
 
 """
 Interface with the Google Maps Directions API
@@ -12,9 +14,12 @@ See https://developers.google.com/maps/documentation/directions/intro
 for more information about the format of the response object.
 """
 
-TIMEOUT = 10
+MAPS_URL = 'https://maps.googleapis.com'
+TIMEOUT = (3.05, 10)
 MAX_WAYPOINTS = 23  # imposed by Google Maps
 
+_client = None
+
 
 class MapError(Exception):
     pass
@@ -30,6 +35,23 @@ def _split_stops(stops):
     return (addrs[0], addrs[1:-1], addrs[-1])
 
 
+def client():
+    """
+    The shared Google Maps client, which sends its requests through the
+    pooled session for the Maps API.
+    """
+    global _client
+    if _client is None:
+        _client = googlemaps.Client(
+            key=settings.GOOGLE_MAPS_KEY,
+            connect_timeout=TIMEOUT[0],
+            read_timeout=TIMEOUT[1],
+            retry_timeout=20,
+        )
+        _client.session = http.session(MAPS_URL)
+    return _client
+
+
 def get_directions(stops):
     """
     Do a Google maps directions lookup.
@@ -56,10 +78,8 @@ def get_directions(stops):
 
         return Directions({'legs': d1.legs + d2.legs}, stops)
 
-    client = googlemaps.Client(key=settings.GOOGLE_MAPS_KEY, timeout=TIMEOUT)
-
     try:
-        resp = client.directions(origin=orig, destination=dest, waypoints=waypoints)
+        resp = client().directions(origin=orig, destination=dest, waypoints=waypoints)
     except (TransportError, ApiError) as exc:
         raise MapError(exc)
 
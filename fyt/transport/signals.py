@@ -2,6 +2,7 @@ from django.db.models import Q
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 
+from fyt.core.managers import trips_data_cache
 from fyt.transport.models import (
     Hanover,
     InternalBus,
@@ -133,7 +134,7 @@ def mark_buses_dirty_for_address_changes(instance, created, **kwargs):
 
         # TODO: iterate and save if we use a signal to generate directions
         # based on the dirty flag, since `update` does not emit a signal.
-        affected_buses.update(dirty=True)
+        trips_data_cache.update(affected_buses, instance.trips_year_id, dirty=True)
 
 
 @receiver(post_save, sender=StopOrder)
@@ -181,4 +182,8 @@ def update_all_buses_for_hanover_and_lodge_changes(instance, created, **kwargs):
         or instance.tracker.has_changed('lodge')
     ):
 
-        InternalBus.objects.filter(trips_year=instance.trips_year).update(dirty=True)
+        trips_data_cache.update(
+            InternalBus.objects.filter(trips_year=instance.trips_year),
+            instance.trips_year_id,
+            dirty=True,
+        )
@@ -0,0 +1,27 @@
+from fyt.tasks.queue import noop, task
+from fyt.transport.maps import MapError
+from fyt.transport.models import InternalBus
+
+
+@task(max_attempts=3)
+def update_bus_times(trips_year, progress=noop):
+    """
+    Recompute internal bus directions and times
+
+    Only buses whose stops changed since they were last computed are
+    updated.
+    """
+    buses = InternalBus.objects.filter(trips_year=trips_year, dirty=True)
+    buses = buses.select_related('route__vehicle')
+    total = len(buses)
+
+    messages = []
+    for i, bus in enumerate(buses):
+        progress(i, total, 'Updating {}'.format(bus))
+        try:
+            bus.update_stop_times()
+        except MapError as exc:
+            messages.append(('error', '{}: {}'.format(bus, exc)))
+
+    messages.append(('success', 'Updated {} buses'.format(total - len(messages))))
+    return {'messages': messages}
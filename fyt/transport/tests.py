@@ -839,6 +839,69 @@ class TransportViewsTestCase(TransportTestCase):
         InternalBus.objects.get(date=date(2015, 1, 2), route=route)
 
 
+class QueryBudgetTestCase(TransportTestCase):
+    def setUp(self):
+        self.init_trips_year()
+        self.init_transport_config()
+        self.director = self.make_director()
+        self.section = mommy.make(
+            Section,
+            trips_year=self.trips_year,
+            leaders_arrive=date(2015, 1, 1),
+            is_local=True,
+        )
+
+    def test_internal_bus_matrix(self):
+        def populate(n):
+            for _ in range(n):
+                route = mommy.make(
+                    Route, trips_year=self.trips_year, category=Route.INTERNAL
+                )
+                mommy.make(
+                    Trip,
+                    trips_year=self.trips_year,
+                    section=self.section,
+                    template__dropoff_stop__route=route,
+                    template__pickup_stop__route=route,
+                    template__return_route=route,
+                )
+                mommy.make(
+                    InternalBus,
+                    trips_year=self.trips_year,
+                    route=route,
+                    date=date(2015, 1, 3),
+                )
+
+        url = reverse('core:internalbus:index', kwargs={'trips_year': self.trips_year})
+        self.assertQueryBudget(
+            lambda: self.app.get(url, user=self.director), populate, 30
+        )
+
+    def test_external_bus_matrix(self):
+        def populate(n):
+            for _ in range(n):
+                route = mommy.make(
+                    Route, trips_year=self.trips_year, category=Route.EXTERNAL
+                )
+                mommy.make(
+                    ExternalBus,
+                    trips_year=self.trips_year,
+                    route=route,
+                    section=self.section,
+                )
+                mommy.make(
+                    IncomingStudent,
+                    trips_year=self.trips_year,
+                    bus_assignment_round_trip__route=route,
+                    trip_assignment__section=self.section,
+                )
+
+        url = reverse('core:externalbus:matrix', kwargs={'trips_year': self.trips_year})
+        self.assertQueryBudget(
+            lambda: self.app.get(url, user=self.director), populate, 30
+        )
+
+
 class InternalTransportModelTestCase(TransportTestCase):
     def setUp(self):
         self.init_trips_year()
@@ -11,6 +11,7 @@ transportconfig_urlpatterns = [
 internalbus_urlpatterns = [
     url(DB_REGEX['LIST'], InternalBusMatrix.as_view(), name='index'),
     url(r'^by-date/$', InternalTransportByDate.as_view(), name='by_date'),
+    url(r'^update-times/$', UpdateBusTimes.as_view(), name='update_times'),
     url(DB_REGEX['CREATE'], InternalBusCreateView.as_view(), name='create'),
     url(DB_REGEX['UPDATE'], InternalBusUpdateView.as_view(), name='update'),
     url(DB_REGEX['DELETE'], InternalBusDeleteView.as_view(), name='delete'),
@@ -14,6 +14,7 @@ from fyt.core.views import (
     DatabaseCreateView,
     DatabaseDeleteView,
     DatabaseDetailView,
+    DatabaseFormView,
     DatabaseListView,
     DatabaseTemplateView,
     DatabaseUpdateView,
@@ -24,6 +25,8 @@ from fyt.permissions.views import (
     DatabaseEditPermissionRequired,
     DatabaseReadPermissionRequired,
 )
+from fyt.tasks.forms import BackgroundForm
+from fyt.tasks.views import BackgroundTaskMixin
 from fyt.transport.forms import StopOrderFormset
 from fyt.transport.models import (
     ExternalBus,
@@ -36,8 +39,10 @@ from fyt.transport.models import (
     TransportConfig,
     Vehicle,
 )
+from fyt.transport.tasks import update_bus_times
 from fyt.trips.models import Section, Trip, TripTemplate
 from fyt.trips.views import _SectionMixin
+from fyt.utils.forms import crispify
 from fyt.utils.matrix import OrderedMatrix
 from fyt.utils.views import PopulateMixin
 
@@ -570,6 +575,27 @@ class InternalTransportByDate(DatabaseTemplateView):
         }
 
 
+class UpdateBusTimes(BackgroundTaskMixin, DatabaseFormView):
+    """
+    Recompute the directions and times of changed internal buses.
+    """
+
+    template_name = 'form.html'
+    task = update_bus_times
+
+    def get_form(self, **kwargs):
+        return crispify(BackgroundForm(**kwargs), 'Update')
+
+    def extra_context(self):
+        return {'headline': 'Update internal bus directions and times'}
+
+    def get_task_kwargs(self, form):
+        return {'trips_year': self.trips_year.pk}
+
+    def get_success_url(self):
+        return reverse('core:internalbus:by_date', kwargs=self.kwargs)
+
+
 class InternalBusPacket(DatabaseListView):
     """
     Directions and notes for all internal buses.
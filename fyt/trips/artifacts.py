@@ -0,0 +1,228 @@
+"""
+Render packets to files ahead of time.
+
+``build_packets`` renders the section leader and medical packets and the
+internal and external bus packets for each date, and stores them with the
+default file storage. Each packet has an input version computed from the
+cache versions of the data it shows, and is only rebuilt when the version
+changes. Workers run it every minute; see ``fyt.trips.tasks``.
+"""
+
+import functools
+import hashlib
+import shlex
+import subprocess
+import uuid
+from collections import namedtuple
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.test import RequestFactory
+from django.utils import timezone
+
+from fyt.core.managers import trips_data_cache
+from fyt.transport.models import ExternalBus, InternalBus
+from fyt.trips.models import PacketArtifact, Section, Trip
+from fyt.trips.packets import packet_cache
+
+
+Packet = namedtuple('Packet', ['kind', 'key', 'view', 'view_kwargs', 'version'])
+
+
+def _digest(*parts):
+    return hashlib.md5(':'.join(map(str, parts)).encode()).hexdigest()
+
+
+def render_view(view_class, trips_year, **kwargs):
+    """
+    Render the page of ``view_class`` without a user request.
+
+    Permissions are not checked, and the page links to the site with a
+    ``<base>`` tag so that it still finds its stylesheets when served from
+    file storage.
+    """
+    kwargs['trips_year'] = str(trips_year.pk)
+    request = RequestFactory().get('/')
+    request.user = AnonymousUser()
+
+    view = view_class()
+    view.setup(request, **kwargs)
+    html = view.get(request, **kwargs).rendered_content
+
+    base = '<base href="https://{}/">'.format(settings.CANONICAL_HOST)
+    return html.replace('<head>', '<head>' + base, 1)
+
+
+def render_pdf(html):
+    """
+    Convert ``html`` to PDF with ``PACKET_PDF_COMMAND``, which reads HTML
+    from stdin and writes a PDF to stdout. Returns None if no command is
+    configured.
+    """
+    command = getattr(settings, 'PACKET_PDF_COMMAND', None)
+    if not command:
+        return None
+    result = subprocess.run(
+        shlex.split(command),
+        input=html.encode(),
+        stdout=subprocess.PIPE,
+        check=True,
+    )
+    return result.stdout
+
+
+class PacketBuilder:
+    def __init__(self, trips_year):
+        self.trips_year = trips_year
+
+    def section_packets(self):
+        from fyt.trips.views import MedicalInfoForSection, PacketsForSection
+
+        trips = list(Trip.objects.filter(trips_year=self.trips_year))
+        packet_cache.load_versions(trips)
+
+        for section in Section.objects.filter(trips_year=self.trips_year):
+            version = _digest(
+                section.pk,
+                *sorted(
+                    (trip.pk, trip.packet_version)
+                    for trip in trips
+                    if trip.section_id == section.pk
+                )
+            )
+            kwargs = {'section_pk': section.pk}
+            yield Packet(
+                PacketArtifact.LEADER, section.pk, PacketsForSection, kwargs, version
+            )
+            yield Packet(
+                PacketArtifact.MEDICAL,
+                section.pk,
+                MedicalInfoForSection,
+                kwargs,
+                version,
+            )
+
+    def bus_packets(self):
+        from fyt.transport.views import (
+            ExternalBusPacketForDate,
+            InternalBusPacketForDate,
+        )
+
+        # Bus packets show the trips, stops, trippees and leaders on each bus
+        version = _digest(
+            *trips_data_cache.versions(
+                self.trips_year.pk, ['applications', 'incoming', 'transport', 'trips']
+            )
+        )
+
+        internal_dates = set(
+            InternalBus.objects.filter(trips_year=self.trips_year).values_list(
+                'date', flat=True
+            )
+        )
+        for date in sorted(internal_dates):
+            yield Packet(
+                PacketArtifact.INTERNAL_BUS,
+                date.isoformat(),
+                InternalBusPacketForDate,
+                {'date': date.isoformat()},
+                _digest(version, date),
+            )
+
+        external_dates = set()
+        for bus in ExternalBus.objects.filter(trips_year=self.trips_year):
+            external_dates.update([bus.date_to_hanover, bus.date_from_hanover])
+        for date in sorted(external_dates):
+            yield Packet(
+                PacketArtifact.EXTERNAL_BUS,
+                date.isoformat(),
+                ExternalBusPacketForDate,
+                {'date': date.isoformat()},
+                _digest(version, date),
+            )
+
+    def packets(self):
+        yield from self.section_packets()
+        yield from self.bus_packets()
+
+    def build(self, force=False):
+        """
+        Render all packets whose inputs changed since they were last built,
+        or all packets if ``force`` is set.
+
+        Returns the rebuilt artifacts.
+        """
+        existing = {
+            (artifact.kind, artifact.key): artifact
+            for artifact in PacketArtifact.objects.filter(trips_year=self.trips_year)
+        }
+        built = []
+
+        for packet in self.packets():
+            key = str(packet.key)
+            artifact = existing.pop((packet.kind, key), None)
+            if artifact and artifact.input_version == packet.version and not force:
+                continue
+
+            if artifact is None:
+                artifact = PacketArtifact(
+                    trips_year=self.trips_year, kind=packet.kind, key=key
+                )
+            self.render(artifact, packet)
+            built.append(artifact)
+
+        # Sections or buses which no longer exist
+        for artifact in existing.values():
+            self.delete_files(artifact)
+            artifact.delete()
+
+        return built
+
+    def render(self, artifact, packet):
+        old = [artifact.html.name, artifact.pdf.name]
+
+        html = render_view(packet.view, self.trips_year, **packet.view_kwargs)
+        # A random suffix keeps the storage keys unguessable; the files
+        # are served by the ``PacketArtifactFile`` view
+        name = '{}-{}-{}-{}'.format(
+            self.trips_year.pk,
+            packet.kind.lower().replace('_', '-'),
+            artifact.key,
+            uuid.uuid4().hex,
+        )
+        artifact.html.save(name + '.html', ContentFile(html.encode()), save=False)
+
+        pdf = render_pdf(html)
+        if pdf is not None:
+            artifact.pdf.save(name + '.pdf', ContentFile(pdf), save=False)
+
+        artifact.input_version = packet.version
+        artifact.built_at = timezone.now()
+        artifact.save()
+
+        for name in old:
+            if name and name not in [artifact.html.name, artifact.pdf.name]:
+                artifact.html.storage.delete(name)
+
+    @staticmethod
+    def delete_files(artifact):
+        for field in [artifact.html, artifact.pdf]:
+            if field:
+                field.delete(save=False)
+
+
+def delete_artifacts(trips_year):
+    """
+    Delete the packets of ``trips_year``. Their files are deleted once the
+    current transaction commits.
+    """
+    artifacts = list(PacketArtifact.objects.filter(trips_year=trips_year))
+    PacketArtifact.objects.filter(pk__in=[a.pk for a in artifacts]).delete()
+    transaction.on_commit(functools.partial(_delete_files, artifacts))
+
+
+def _delete_files(artifacts):
+    for artifact in artifacts:
+        PacketBuilder.delete_files(artifact)
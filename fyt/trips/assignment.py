@@ -0,0 +1,584 @@
+"""
+Automatic assignment of trippees and leaders to trips.
+
+``TrippeeAssignment`` loads the section and trip type preferences,
+swimming ability and bus requests of every registration, and the room
+left on each trip, in a handful of queries. It then finds the assignment
+which puts as many trippees as possible on trips and, among those, best
+satisfies their preferences by solving a minimum cost flow::
+
+    source -> trippee -> (section, trip type, swim test) group -> sink
+
+Trips which share a section, trip type and swim test requirement are
+interchangeable, so each such group is one node whose capacity is the
+room left on all of its trips. The trippees given to a group are then
+spread evenly over its trips.
+
+``LeaderAssignment`` does the same for leader applicants, using their
+preferences, scores and certifications, with two leaders to a trip.
+"""
+
+import heapq
+from collections import Counter, defaultdict, namedtuple
+
+from django.db import transaction
+from django.db.models import F, Max, Min
+
+from fyt.applications.models import (
+    LeaderSectionChoice,
+    LeaderTripTypeChoice,
+    ScoreValue,
+    Volunteer,
+)
+from fyt.core.managers import trips_data_cache
+from fyt.incoming.models import (
+    AVAILABLE,
+    FIRST_CHOICE,
+    PREFER,
+    IncomingStudent,
+    Registration,
+    RegistrationSectionChoice,
+    RegistrationTripTypeChoice,
+)
+from fyt.transport.models import ExternalBus
+from fyt.trips.models import Trip
+from fyt.trips.packets import packet_cache
+from fyt.utils.flow import MinCostFlow
+
+
+# The cost of placing a trippee on a trip, by preference. Lower is better.
+SECTION_COSTS = {PREFER: 0, AVAILABLE: 2}
+TRIPTYPE_COSTS = {FIRST_CHOICE: 0, PREFER: 1, AVAILABLE: 3}
+
+# Added if the trippee requested an external bus which does not run for
+# the trip's section
+NO_BUS_COST = 4
+
+# The cost of keeping a trippee on their current trip when it does not
+# match their registration. Only used when reassigning.
+MISMATCH_COST = 20
+
+LEADERS_PER_TRIP = 2
+
+# The cost of placing a leader on a trip, by section and trip type
+# preference
+LEADER_COSTS = {PREFER: 0, AVAILABLE: 2}
+
+# Added for each point of a leader's average score below the best score,
+# so that the best applicants fill the places there are
+SCORE_COST = 2
+
+# Added for applicants who have not been accepted as leaders yet, so that
+# accepted leaders are placed first
+UNACCEPTED_COST = 20
+
+
+Change = namedtuple(
+    'Change',
+    [
+        'trippee',
+        'old_trip',
+        'new_trip',
+        'section_pref',
+        'triptype_pref',
+        'bus_available',
+    ],
+)
+
+
+LeaderChange = namedtuple(
+    'LeaderChange', ['leader', 'new_trip', 'section_pref', 'triptype_pref', 'score']
+)
+
+
+class StaleAssignment(Exception):
+    """
+    Raised when applying a plan to trippees or trips which have changed
+    since the plan was made.
+    """
+
+
+def group_of(trip):
+    """
+    Trips which share a section, trip type and swim test requirement are
+    interchangeable.
+    """
+    template = trip.template
+    return (trip.section_id, template.triptype_id, template.swimtest_required)
+
+
+def spread(people, trips, room):
+    """
+    Spread ``people`` over ``trips``, filling the emptiest first.
+
+    People stay on their current trip if it is one of ``trips``.
+    """
+    assignments = {}
+    room = {pk: max(room[pk], 0) for pk in trips}
+
+    rest = []
+    for person in people:
+        if room.get(person.trip_assignment_id, 0) > 0:
+            assignments[person.pk] = person.trip_assignment_id
+            room[person.trip_assignment_id] -= 1
+        else:
+            rest.append(person)
+
+    heap = [(-left, pk) for pk, left in room.items() if left > 0]
+    heapq.heapify(heap)
+    for person in rest:
+        left, pk = heapq.heappop(heap)
+        assignments[person.pk] = pk
+        if left + 1 < 0:
+            heapq.heappush(heap, (left + 1, pk))
+
+    return assignments
+
+
+class TrippeeAssignment:
+    """
+    Propose trip assignments for the trippees of ``trips_year``.
+
+    Only registered, non-cancelled trippees without a trip are assigned,
+    unless ``reassign`` is set, in which case the current assignments of
+    registered trippees may be changed as well.
+    """
+
+    def __init__(self, trips_year, reassign=False):
+        self.trips_year = trips_year
+        self.reassign = reassign
+
+        self.trips = {
+            trip.pk: trip
+            for trip in Trip.objects.filter(trips_year=trips_year).select_related(
+                'section', 'template', 'template__triptype'
+            )
+        }
+        self.trippees = list(
+            IncomingStudent.objects.filter(trips_year=trips_year).order_by('name')
+        )
+        self.registrations = {
+            reg['pk']: reg
+            for reg in Registration.objects.filter(trips_year=trips_year).values(
+                'pk',
+                'swimming_ability',
+                round_trip=F('bus_stop_round_trip__route'),
+                to_hanover=F('bus_stop_to_hanover__route'),
+                from_hanover=F('bus_stop_from_hanover__route'),
+            )
+        }
+
+        self.section_prefs = defaultdict(dict)
+        for reg, section, pref in RegistrationSectionChoice.objects.filter(
+            registration__trips_year=trips_year, preference__in=SECTION_COSTS
+        ).values_list('registration', 'section', 'preference'):
+            self.section_prefs[reg][section] = pref
+
+        self.triptype_prefs = defaultdict(dict)
+        for reg, triptype, pref in RegistrationTripTypeChoice.objects.filter(
+            registration__trips_year=trips_year, preference__in=TRIPTYPE_COSTS
+        ).values_list('registration', 'triptype', 'preference'):
+            self.triptype_prefs[reg][triptype] = pref
+
+        self.bus_routes = defaultdict(set)
+        for route, section in ExternalBus.objects.filter(
+            trips_year=trips_year
+        ).values_list('route', 'section'):
+            self.bus_routes[section].add(route)
+
+    def is_movable(self, trippee):
+        return (
+            trippee.registration_id is not None
+            and not trippee.cancelled
+            and (self.reassign or trippee.trip_assignment_id is None)
+        )
+
+    def bus_available(self, registration, section):
+        """
+        Does every bus requested in ``registration`` run for ``section``?
+
+        None if no bus was requested.
+        """
+        routes = [
+            registration[stop]
+            for stop in ['round_trip', 'to_hanover', 'from_hanover']
+            if registration[stop] is not None
+        ]
+        if not routes:
+            return None
+        return all(route in self.bus_routes[section] for route in routes)
+
+    def options(self, trippee, groups):
+        """
+        The groups ``trippee`` can be placed in, with the cost of each.
+        """
+        registration = self.registrations[trippee.registration_id]
+        swimtests = [False]
+        if registration['swimming_ability'] != Registration.NON_SWIMMER:
+            swimtests.append(True)
+
+        options = {}
+        for section, section_pref in self.section_prefs[registration['pk']].items():
+            bus_cost = 0
+            if self.bus_available(registration, section) is False:
+                bus_cost = NO_BUS_COST
+
+            triptype_prefs = self.triptype_prefs[registration['pk']]
+            for triptype, triptype_pref in triptype_prefs.items():
+                for swimtest in swimtests:
+                    group = (section, triptype, swimtest)
+                    if group in groups:
+                        options[group] = (
+                            SECTION_COSTS[section_pref]
+                            + TRIPTYPE_COSTS[triptype_pref]
+                            + bus_cost
+                        )
+
+        current = self.trips.get(trippee.trip_assignment_id)
+        if current is not None:
+            group = group_of(current)
+            if group in groups and group not in options:
+                options[group] = MISMATCH_COST
+
+        return options
+
+    def solve(self):
+        """
+        Return the proposed changes, as a list of ``Change``s, and the
+        trippees who could not be placed on any trip.
+        """
+        movable = [t for t in self.trippees if self.is_movable(t)]
+
+        room = {pk: trip.template.max_trippees for pk, trip in self.trips.items()}
+        for trippee in self.trippees:
+            if trippee.trip_assignment_id is not None and not self.is_movable(trippee):
+                room[trippee.trip_assignment_id] -= 1
+
+        groups = defaultdict(list)
+        for pk, trip in self.trips.items():
+            groups[group_of(trip)].append(pk)
+
+        network = MinCostFlow(2)
+        source, sink = 0, 1
+        group_nodes = {}
+        for group, trips in groups.items():
+            capacity = sum(max(room[pk], 0) for pk in trips)
+            if capacity:
+                group_nodes[group] = network.add_node()
+                network.add_edge(group_nodes[group], sink, capacity)
+
+        edges = {}
+        for trippee in movable:
+            node = network.add_node()
+            network.add_edge(source, node, 1)
+            edges[trippee.pk] = [
+                (group, network.add_edge(node, group_nodes[group], 1, cost))
+                for group, cost in self.options(trippee, group_nodes).items()
+            ]
+
+        network.solve(source, sink)
+
+        placed = defaultdict(list)
+        unplaced = []
+        for trippee in movable:
+            for group, edge in edges[trippee.pk]:
+                if network.flow_on(edge):
+                    placed[group].append(trippee)
+                    break
+            else:
+                unplaced.append(trippee)
+
+        assignments = {}
+        for group, trippees in placed.items():
+            assignments.update(spread(trippees, groups[group], room))
+
+        changes = []
+        for trippee in movable:
+            new_pk = assignments.get(trippee.pk)
+            if new_pk != trippee.trip_assignment_id:
+                changes.append(self.change(trippee, new_pk))
+
+        return changes, unplaced
+
+    def change(self, trippee, new_pk):
+        old_trip = self.trips.get(trippee.trip_assignment_id)
+        new_trip = self.trips.get(new_pk)
+        section_pref = triptype_pref = bus_available = None
+
+        if new_trip is not None:
+            registration = self.registrations[trippee.registration_id]
+            section_pref = self.section_prefs[registration['pk']].get(
+                new_trip.section_id
+            )
+            triptype_pref = self.triptype_prefs[registration['pk']].get(
+                new_trip.template.triptype_id
+            )
+            bus_available = self.bus_available(registration, new_trip.section_id)
+
+        return Change(
+            trippee, old_trip, new_trip, section_pref, triptype_pref, bus_available
+        )
+
+
+def summarize(changes):
+    """
+    Count the section and trip type preferences which ``changes`` satisfy.
+    """
+    return Counter(
+        (change.section_pref, change.triptype_pref)
+        for change in changes
+        if change.new_trip is not None
+    )
+
+
+def apply_plan(trips_year, plan):
+    """
+    Apply a plan of ``(trippee_pk, old_trip_pk, new_trip_pk)`` changes
+    with a single bulk update.
+
+    Raises ``StaleAssignment``, and changes nothing, if any of the trippees
+    has been assigned elsewhere since the plan was made or any trip would
+    be over capacity.
+    """
+    plan = {trippee: (old, new) for trippee, old, new in plan}
+
+    with transaction.atomic():
+        trippees = list(
+            IncomingStudent.objects.select_for_update().filter(
+                trips_year=trips_year, pk__in=plan
+            )
+        )
+        if len(trippees) != len(plan):
+            raise StaleAssignment('Some trippees no longer exist')
+
+        for trippee in trippees:
+            old, new = plan[trippee.pk]
+            if trippee.trip_assignment_id != old:
+                raise StaleAssignment('{} has been reassigned'.format(trippee))
+            trippee.trip_assignment_id = new
+
+        IncomingStudent.objects.bulk_update(trippees, ['trip_assignment'])
+
+        trips = {pk for change in plan.values() for pk in change if pk is not None}
+        Trip.objects.update_counts(trips)
+        full = Trip.objects.filter(
+            pk__in=[new for _, new in plan.values()],
+            num_trippees__gt=F('template__max_trippees'),
+        ).first()
+        if full is not None:
+            raise StaleAssignment('{} would be over capacity'.format(full))
+
+    trips_data_cache.invalidate(trips_year, IncomingStudent)
+    packet_cache.invalidate(*trips)
+    return len(trippees)
+
+
+class LeaderAssignment:
+    """
+    Propose trip assignments for the leader applicants of ``trips_year``.
+
+    Applicants who are willing to lead and are not yet on a trip or a croo
+    are placed on trips whose section and trip type they prefer or are
+    available for, and which they hold the certifications for, until every
+    trip has ``LEADERS_PER_TRIP`` leaders. Accepted leaders and the best
+    scored applicants are placed first. Current assignments are kept.
+    """
+
+    ASSIGNABLE = [Volunteer.LEADER, Volunteer.LEADER_WAITLIST, Volunteer.PENDING]
+
+    def __init__(self, trips_year):
+        self.trips_year = trips_year
+
+        self.trips = {
+            trip.pk: trip
+            for trip in Trip.objects.filter(trips_year=trips_year).select_related(
+                'section', 'template', 'template__triptype'
+            )
+        }
+        self.certifications = {
+            trip.template.triptype_id: trip.template.triptype.leader_certification
+            for trip in self.trips.values()
+        }
+        self.leaders = list(
+            Volunteer.objects.leader_applications(trips_year)
+            .filter(
+                status__in=self.ASSIGNABLE,
+                trip_assignment=None,
+                croo_assignment=None,
+                leader_supplement__isnull=False,
+            )
+            .with_avg_scores()
+            .select_related('applicant', 'leader_supplement')
+        )
+
+        self.section_prefs = defaultdict(dict)
+        for leader, section, pref in LeaderSectionChoice.objects.filter(
+            application__trips_year=trips_year, preference__in=LEADER_COSTS
+        ).values_list('application__application', 'section', 'preference'):
+            self.section_prefs[leader][section] = pref
+
+        self.triptype_prefs = defaultdict(dict)
+        for leader, triptype, pref in LeaderTripTypeChoice.objects.filter(
+            application__trips_year=trips_year, preference__in=LEADER_COSTS
+        ).values_list('application__application', 'triptype', 'preference'):
+            self.triptype_prefs[leader][triptype] = pref
+
+        scores = ScoreValue.objects.filter(trips_year=trips_year).aggregate(
+            best=Max('value'), worst=Min('value')
+        )
+        self.best_score = scores['best']
+        self.worst_score = scores['worst']
+
+    def is_certified(self, leader, triptype, swimtest):
+        supplement = leader.leader_supplement
+        required = self.certifications[triptype]
+        if required and not getattr(supplement, required):
+            return False
+        return not swimtest or bool(supplement.swim_test)
+
+    def cost(self, leader):
+        """
+        The cost of making ``leader`` a leader at all.
+
+        Applicants without scores are treated as having the worst score.
+        """
+        cost = 0 if leader.status == Volunteer.LEADER else UNACCEPTED_COST
+        if self.best_score is not None:
+            score = leader.avg_leader_score
+            if score is None:
+                score = self.worst_score
+            cost += max(round(SCORE_COST * (float(self.best_score) - float(score))), 0)
+        return cost
+
+    def options(self, leader, groups):
+        """
+        The groups ``leader`` can be placed in, with the cost of each.
+        """
+        options = {}
+        for section, section_pref in self.section_prefs[leader.pk].items():
+            for triptype, triptype_pref in self.triptype_prefs[leader.pk].items():
+                for swimtest in [False, True]:
+                    group = (section, triptype, swimtest)
+                    if group in groups and self.is_certified(
+                        leader, triptype, swimtest
+                    ):
+                        options[group] = (
+                            LEADER_COSTS[section_pref] + LEADER_COSTS[triptype_pref]
+                        )
+        return options
+
+    def solve(self):
+        """
+        Return the proposed changes, as a list of ``LeaderChange``s ordered
+        by trip, and the accepted leaders who could not be placed.
+        """
+        room = {
+            pk: LEADERS_PER_TRIP - trip.num_leaders for pk, trip in self.trips.items()
+        }
+
+        groups = defaultdict(list)
+        for pk, trip in self.trips.items():
+            groups[group_of(trip)].append(pk)
+
+        network = MinCostFlow(2)
+        source, sink = 0, 1
+        group_nodes = {}
+        for group, trips in groups.items():
+            capacity = sum(max(room[pk], 0) for pk in trips)
+            if capacity:
+                group_nodes[group] = network.add_node()
+                network.add_edge(group_nodes[group], sink, capacity)
+
+        edges = {}
+        for leader in self.leaders:
+            node = network.add_node()
+            network.add_edge(source, node, 1, self.cost(leader))
+            edges[leader.pk] = [
+                (group, network.add_edge(node, group_nodes[group], 1, cost))
+                for group, cost in self.options(leader, group_nodes).items()
+            ]
+
+        network.solve(source, sink)
+
+        placed = defaultdict(list)
+        unplaced = []
+        for leader in self.leaders:
+            for group, edge in edges[leader.pk]:
+                if network.flow_on(edge):
+                    placed[group].append(leader)
+                    break
+            else:
+                if leader.status == Volunteer.LEADER:
+                    unplaced.append(leader)
+
+        assignments = {}
+        for group, leaders in placed.items():
+            assignments.update(spread(leaders, groups[group], room))
+
+        changes = [
+            self.change(leader, self.trips[assignments[leader.pk]])
+            for leader in self.leaders
+            if leader.pk in assignments
+        ]
+        changes.sort(
+            key=lambda c: (c.new_trip.section.name, c.new_trip.template.name)
+        )
+        return changes, unplaced
+
+    def change(self, leader, trip):
+        return LeaderChange(
+            leader,
+            trip,
+            self.section_prefs[leader.pk][trip.section_id],
+            self.triptype_prefs[leader.pk][trip.template.triptype_id],
+            leader.avg_leader_score,
+        )
+
+
+def apply_leader_plan(trips_year, plan):
+    """
+    Apply a plan of ``(leader_pk, old_trip_pk, new_trip_pk)`` changes, made
+    by ``LeaderAssignment``, with a single bulk update. Every applicant in
+    the plan becomes a leader.
+
+    Raises ``StaleAssignment``, and changes nothing, if any of the
+    applicants has been assigned or had their status changed since the plan
+    was made, or any trip would have too many leaders.
+    """
+    plan = {leader: (old, new) for leader, old, new in plan}
+
+    with transaction.atomic():
+        leaders = list(
+            Volunteer.objects.select_for_update().filter(
+                trips_year=trips_year, pk__in=plan
+            )
+        )
+        if len(leaders) != len(plan):
+            raise StaleAssignment('Some applicants no longer exist')
+
+        for leader in leaders:
+            old, new = plan[leader.pk]
+            if (
+                leader.trip_assignment_id != old
+                or leader.croo_assignment_id is not None
+                or leader.status not in LeaderAssignment.ASSIGNABLE
+            ):
+                raise StaleAssignment('{} has been reassigned'.format(leader))
+            leader.trip_assignment_id = new
+            leader.status = Volunteer.LEADER
+
+        Volunteer.objects.bulk_update(leaders, ['trip_assignment', 'status'])
+
+        trips = {new for _, new in plan.values()}
+        Trip.objects.update_counts(trips)
+        full = Trip.objects.filter(
+            pk__in=trips, num_leaders__gt=LEADERS_PER_TRIP
+        ).first()
+        if full is not None:
+            raise StaleAssignment(
+                '{} would have more than {} leaders'.format(full, LEADERS_PER_TRIP)
+            )
+
+    trips_data_cache.invalidate(trips_year, Volunteer)
+    packet_cache.invalidate(*trips)
+    return len(leaders)
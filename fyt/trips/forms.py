@@ -3,6 +3,7 @@ from crispy_forms.bootstrap import InlineField
 from crispy_forms.helper import FormHelper
 from crispy_forms.layout import Field, Layout, Submit
 from django import forms
+from django.core import signing
 
 from fyt.applications.models import Volunteer
 from fyt.core.forms import TripsYearModelForm
@@ -84,6 +85,53 @@ class TrippeeAssignmentForm(TripsYearModelForm):
         return helper
 
 
+class TrippeeAssignmentPlanForm(forms.Form):
+    """
+    Apply the changes proposed by ``fyt.trips.assignment.TrippeeAssignment``.
+
+    The plan is signed, so it cannot be changed in the browser.
+    """
+
+    SALT = 'fyt.trips.assignment'
+
+    plan = forms.CharField(widget=forms.HiddenInput)
+
+    @classmethod
+    def sign(cls, changes):
+        return signing.dumps(
+            [
+                (
+                    change.trippee.pk,
+                    change.old_trip and change.old_trip.pk,
+                    change.new_trip and change.new_trip.pk,
+                )
+                for change in changes
+            ],
+            salt=cls.SALT,
+        )
+
+    def clean_plan(self):
+        try:
+            return signing.loads(self.cleaned_data['plan'], salt=self.SALT)
+        except signing.BadSignature:
+            raise forms.ValidationError('The plan is invalid; please try again')
+
+
+class LeaderAssignmentPlanForm(TrippeeAssignmentPlanForm):
+    """
+    Apply the changes proposed by ``fyt.trips.assignment.LeaderAssignment``.
+    """
+
+    SALT = 'fyt.trips.assignment.leaders'
+
+    @classmethod
+    def sign(cls, changes):
+        return signing.dumps(
+            [(change.leader.pk, None, change.new_trip.pk) for change in changes],
+            salt=cls.SALT,
+        )
+
+
 class FoodboxFormsetHelper(FormHelper):
 
     layout = Layout(
@@ -0,0 +1,75 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+
+from fyt.core.models import TripsYear
+from fyt.trips.models import Trip
+
+
+def joined_counts(trips_year):
+    """
+    The original ``with_counts`` query: join trippees and leaders and count
+    distinct rows of each.
+    """
+    return (
+        Trip.objects.filter(trips_year=trips_year)
+        .annotate(joined_num_trippees=Count('trippees', distinct=True))
+        .annotate(joined_num_leaders=Count('leaders', distinct=True))
+        .order_by(*Trip._meta.ordering)
+    )
+
+
+STRATEGIES = [
+    ('join', joined_counts),
+    ('subquery', Trip.objects.with_live_counts),
+    ('stored', Trip.objects.with_counts),
+]
+
+
+class Command(BaseCommand):
+
+    help = (
+        'Time the ways of counting trippees and leaders per Trip. '
+        'Run against a copy of the production database for useful numbers.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--trips-year',
+            type=int,
+            help='Trips year to query; defaults to the current year',
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=10, help='Number of timed runs'
+        )
+
+    def handle(self, *args, **options):
+        trips_year = options['trips_year'] or TripsYear.objects.current().pk
+
+        msg = "%s trips, %s trippees and %s leaders assigned in %s"
+        trips = Trip.objects.filter(trips_year=trips_year)
+        self.stdout.write(
+            msg
+            % (
+                trips.count(),
+                trips.filter(trippees__isnull=False).count(),
+                trips.filter(leaders__isnull=False).count(),
+                trips_year,
+            )
+        )
+
+        for name, strategy in STRATEGIES:
+            list(strategy(trips_year))  # Warm up caches
+
+            timings = []
+            for _ in range(options['repeat']):
+                start = time.perf_counter()
+                list(strategy(trips_year))
+                timings.append((time.perf_counter() - start) * 1000)
+
+            msg = "%-10s best %8.2f ms  median %8.2f ms"
+            self.stdout.write(
+                msg % (name, min(timings), statistics.median(timings))
+            )
@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from fyt.core.models import TripsYear
+from fyt.trips.artifacts import PacketBuilder
+
+
+class Command(BaseCommand):
+
+    help = (
+        'Render leader, medical and bus packets to files. Workers do this '
+        'every minute for the current trips year.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--trips-year',
+            type=int,
+            help='Build packets for this trips year; defaults to the current year',
+        )
+        parser.add_argument(
+            '--force', action='store_true', help='Rebuild packets which are up to date'
+        )
+
+    def handle(self, *args, **options):
+        if options['trips_year']:
+            trips_year = TripsYear.objects.get(pk=options['trips_year'])
+        else:
+            trips_year = TripsYear.objects.current()
+
+        start = time.perf_counter()
+        built = PacketBuilder(trips_year).build(force=options['force'])
+        for artifact in built:
+            self.stdout.write('Built %s' % artifact)
+
+        seconds = time.perf_counter() - start
+        msg = "Built %s packets for %s (%.2fs)"
+        self.stdout.write(msg % (len(built), trips_year, seconds))
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+from django.db.models import F, Q
+
+from fyt.core.models import TripsYear
+from fyt.trips.models import Trip
+
+
+class Command(BaseCommand):
+
+    help = 'Recompute the stored trippee and leader counts of Trips'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--trips-year',
+            type=int,
+            help='Only reconcile this trips year; defaults to the current year',
+        )
+
+    def handle(self, *args, **options):
+        trips_year = options['trips_year'] or TripsYear.objects.current().pk
+
+        incorrect = list(
+            Trip.objects.with_live_counts(trips_year).filter(
+                ~Q(num_trippees=F('live_num_trippees'))
+                | ~Q(num_leaders=F('live_num_leaders'))
+            )
+        )
+        for trip in incorrect:
+            msg = "Fixed counts for %s: %s trippees, %s leaders (was %s, %s)"
+            self.stdout.write(
+                msg
+                % (
+                    trip,
+                    trip.live_num_trippees,
+                    trip.live_num_leaders,
+                    trip.num_trippees,
+                    trip.num_leaders,
+                )
+            )
+
+        Trip.objects.update_counts(incorrect)
+
+        msg = "Reconciled trips in %s; %s had incorrect counts"
+        self.stdout.write(msg % (trips_year, len(incorrect)))
@@ -1,12 +1,31 @@
 from datetime import timedelta
 
 from django.db import models
-from django.db.models import F, Q
+from django.db.models import OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
 
+from fyt.core.managers import trips_data_cache
 from fyt.utils.matrix import OrderedMatrix
 from fyt.trips.constants import FIRST_CAMPSITE_DELTA, LODGE_ARRIVAL_DELTA, RETURN_TO_CAMPUS_DELTA
 
 
+def count_assigned(model):
+    """
+    Correlated subquery counting the ``model`` objects (trippees or leaders)
+    assigned to the outer Trip.
+    """
+    return Coalesce(
+        Subquery(
+            model.objects.filter(trip_assignment=OuterRef('pk'))
+            .order_by()
+            .values('trip_assignment')
+            .annotate(count=models.Count('pk'))
+            .values('count')
+        ),
+        0,
+    )
+
+
 class SectionDatesManager(models.Manager):
     def camping_dates(self, trips_year):
         """
@@ -75,6 +94,7 @@ class TripManager(models.Manager):
         qs = super().get_queryset()
         return qs.select_related('section', 'template')
 
+    @trips_data_cache.memoize('trips')
     def matrix(self, trips_year):
         """
         Return a matrix of scheduled trips.
@@ -97,8 +117,6 @@ class TripManager(models.Manager):
 
         matrix = OrderedMatrix(templates, sections)
 
-        # see https://docs.djangoproject.com/en/dev/ref/models/querysets/#id7
-        # http://stackoverflow.com/questions/6795202/django-count-in-multiple-annotations
         trips = self.with_counts(trips_year)
 
         for trip in trips:
@@ -108,17 +126,55 @@ class TripManager(models.Manager):
 
     def with_counts(self, trips_year):
         """
-        Annotate the number of trippees and leaders.
+        Trips with the number of trippees and leaders.
+
+        The counts are stored on each trip as ``num_trippees`` and
+        ``num_leaders``, so this no longer needs to aggregate over the
+        trippee and leader tables.
         """
-        return (
-            self.filter(trips_year=trips_year)
-            .annotate(num_trippees=models.Count('trippees', distinct=True))
-            .annotate(num_leaders=models.Count('leaders', distinct=True))
-            .annotate(size=F('num_trippees') + F('num_leaders'))
-            # Silence deprecation warning caused by
-            # https://docs.djangoproject.com/en/2.2/releases/2.2/#model-meta-ordering-will-no-longer-affect-group-by-queries
-            .order_by(*self.model._meta.ordering)
+        return self.filter(trips_year=trips_year)
+
+    def with_live_counts(self, trips_year):
+        """
+        Annotate ``live_num_trippees`` and ``live_num_leaders``, counted
+        directly from the trippee and leader tables.
+
+        Each count is a correlated subquery, so unlike joining both tables
+        and using ``Count(distinct=True)`` the database never builds the
+        trippees x leaders product for a trip. Used to check the stored
+        counts.
+        """
+        from fyt.applications.models import Volunteer
+        from fyt.incoming.models import IncomingStudent
+
+        return self.filter(trips_year=trips_year).annotate(
+            live_num_trippees=count_assigned(IncomingStudent),
+            live_num_leaders=count_assigned(Volunteer),
+        )
+
+    def update_counts(self, trips):
+        """
+        Recompute the stored trippee and leader counts of ``trips``.
+
+        ``trips`` is a queryset or an iterable of Trips or Trip pks. This must
+        be called after changing trip assignments with ``QuerySet.update``,
+        since bulk updates do not send the signals which maintain the counts.
+        Returns the number of updated trips.
+        """
+        from fyt.applications.models import Volunteer
+        from fyt.incoming.models import IncomingStudent
+
+        if not isinstance(trips, models.QuerySet):
+            trips = self.filter(pk__in=[getattr(t, 'pk', t) for t in trips])
+
+        trips_years = set(trips.order_by().values_list('trips_year', flat=True))
+        count = trips.order_by().update(
+            num_trippees=count_assigned(IncomingStudent),
+            num_leaders=count_assigned(Volunteer),
         )
+        for trips_year in trips_years:
+            trips_data_cache.invalidate(trips_year, self.model)
+        return count
 
     def dropoffs(self, route, date, trips_year):
         """
@@ -165,6 +221,7 @@ class TripManager(models.Manager):
 
 
 class CampsiteManager(models.Manager):
+    @trips_data_cache.memoize('trips')
     def matrix(self, trips_year):
         """
         Return of a matrix of trips residency by date.
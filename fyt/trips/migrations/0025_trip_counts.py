@@ -0,0 +1,50 @@
+# Generated by Django 3.1.2 on 2026-10-18 20:52
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def populate_counts(apps, schema_editor):
+    Trip = apps.get_model('trips', 'Trip')
+    IncomingStudent = apps.get_model('incoming', 'IncomingStudent')
+    Volunteer = apps.get_model('applications', 'Volunteer')
+
+    def count(model):
+        return Coalesce(
+            Subquery(
+                model.objects.filter(trip_assignment=OuterRef('pk'))
+                .order_by()
+                .values('trip_assignment')
+                .annotate(count=Count('pk'))
+                .values('count')
+            ),
+            0,
+        )
+
+    Trip.objects.update(
+        num_trippees=count(IncomingStudent), num_leaders=count(Volunteer)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trips', '0024_auto_20180822_0834'),
+        ('incoming', '0039_auto_20200214_2151'),
+        ('applications', '0131_auto_20200219_0319'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trip',
+            name='num_leaders',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='trip',
+            name='num_trippees',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(populate_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 3.1.2 on 2026-10-18 21:30
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_auto_20180719_1052'),
+        ('trips', '0025_trip_counts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PacketArtifact',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('LEADER', 'leader packets'), ('MEDICAL', 'medical information'), ('INTERNAL_BUS', 'internal bus directions'), ('EXTERNAL_BUS', 'external bus directions')], max_length=20)),
+                ('key', models.CharField(max_length=20)),
+                ('html', models.FileField(upload_to='packets/')),
+                ('pdf', models.FileField(blank=True, upload_to='packets/')),
+                ('input_version', models.CharField(max_length=32)),
+                ('built_at', models.DateTimeField()),
+                ('trips_year', models.ForeignKey(editable=False, on_delete=django.db.models.deletion.PROTECT, to='core.tripsyear')),
+            ],
+            options={
+                'unique_together': {('trips_year', 'kind', 'key')},
+            },
+        ),
+    ]
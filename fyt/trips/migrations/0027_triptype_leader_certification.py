@@ -0,0 +1,18 @@
+# Generated by Django 3.1.2 on 2026-10-18 22:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trips', '0026_packetartifact'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='triptype',
+            name='leader_certification',
+            field=models.CharField(blank=True, choices=[('swim_test', 'Dartmouth swim test'), ('class_2_3_paddler', 'Class II/III paddler'), ('ledyard_level_1', 'Ledyard Level 1 kayaking leader'), ('ledyard_level_2', 'Ledyard Level 2 kayaking leader'), ('climbing_course', 'DOC climbing course'), ('dmc_leader', 'DMC leader'), ('dmbc_leader', 'DMBC leader'), ('cnt_leader', 'CnT leader')], help_text='only leaders with this certification are assigned to these trips automatically', max_length=20, verbose_name='leaders must have'),
+        ),
+    ]
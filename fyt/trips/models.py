@@ -4,7 +4,6 @@ from datetime import timedelta
 from django.core.exceptions import ValidationError
 from django.db import models
 from django.urls import reverse
-from django.utils.functional import cached_property
 from model_utils import FieldTracker
 
 from .managers import (
@@ -83,6 +82,13 @@ class Trip(DatabaseModel):
         help_text=ROUTE_HELP_TEXT,
     )
 
+    # Denormalized counts of assigned trippees and leaders. These are kept
+    # up to date by the signals in ``fyt.trips.signals``; use
+    # ``Trip.objects.update_counts`` after bulk updating assignments, and
+    # the ``reconcile_trip_counts`` command to repair any drift.
+    num_trippees = models.PositiveSmallIntegerField(default=0, editable=False)
+    num_leaders = models.PositiveSmallIntegerField(default=0, editable=False)
+
     class Meta:
         # no two Trips can have the same template-section-trips_year
         # combination; we don't want to schedule two identical trips
@@ -172,12 +178,12 @@ class Trip(DatabaseModel):
         except StopOrder.DoesNotExist:
             return None
 
-    @cached_property
+    @property
     def size(self):
         """
         Return the number trippees + leaders on this trip
         """
-        return self.leaders.count() + self.trippees.count()
+        return self.num_trippees + self.num_leaders
 
     @property
     def dropoff_date(self):
@@ -476,6 +482,18 @@ class Document(DatabaseModel):
 
 class TripType(DatabaseModel):
 
+    # Certifications from the leader application, by LeaderSupplement field
+    LEADER_CERTIFICATION_CHOICES = (
+        ('swim_test', 'Dartmouth swim test'),
+        ('class_2_3_paddler', 'Class II/III paddler'),
+        ('ledyard_level_1', 'Ledyard Level 1 kayaking leader'),
+        ('ledyard_level_2', 'Ledyard Level 2 kayaking leader'),
+        ('climbing_course', 'DOC climbing course'),
+        ('dmc_leader', 'DMC leader'),
+        ('dmbc_leader', 'DMBC leader'),
+        ('cnt_leader', 'CnT leader'),
+    )
+
     name = models.CharField(max_length=255, db_index=True)
     leader_description = models.TextField()
     trippee_description = models.TextField()
@@ -493,6 +511,14 @@ class TripType(DatabaseModel):
         'registrations',
         default=False,
     )
+    leader_certification = models.CharField(
+        'leaders must have',
+        max_length=20,
+        blank=True,
+        choices=LEADER_CERTIFICATION_CHOICES,
+        help_text='only leaders with this certification are assigned to '
+        'these trips automatically',
+    )
 
     # --- foodbox info ----
     half_kickin = models.PositiveSmallIntegerField(
@@ -533,3 +559,38 @@ class Campsite(DatabaseModel):
 
     def __str__(self):
         return self.name
+
+
+class PacketArtifact(DatabaseModel):
+    """
+    A packet rendered ahead of time by the ``build_packets`` task,
+    so that it can be printed without rendering it on the request path.
+
+    ``input_version`` identifies the data the packet was rendered from;
+    the packet is only rebuilt when it changes.
+    """
+
+    LEADER = 'LEADER'
+    MEDICAL = 'MEDICAL'
+    INTERNAL_BUS = 'INTERNAL_BUS'
+    EXTERNAL_BUS = 'EXTERNAL_BUS'
+    KIND_CHOICES = (
+        (LEADER, 'leader packets'),
+        (MEDICAL, 'medical information'),
+        (INTERNAL_BUS, 'internal bus directions'),
+        (EXTERNAL_BUS, 'external bus directions'),
+    )
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    # The section pk or the date of the packet
+    key = models.CharField(max_length=20)
+
+    html = models.FileField(upload_to='packets/')
+    pdf = models.FileField(upload_to='packets/', blank=True)
+    input_version = models.CharField(max_length=32)
+    built_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ['trips_year', 'kind', 'key']
+
+    def __str__(self):
+        return '{} {}'.format(self.get_kind_display(), self.key)
@@ -0,0 +1,154 @@
+"""
+Caching for the rendered leader and medical packets of each trip.
+
+Section packets are reprinted many times a day during trips, but only a
+few trips change between printings. Each trip has a content version which
+the receivers in ``fyt.trips.signals`` replace whenever something shown in
+its packets changes: the trip, its section and template, the template's
+description, campsites and documents, its stop orders and buses, and its
+leaders and trippees. Every trips year also has a version, used for
+changes which can affect all trips in the year, such as changing a stop.
+
+The rendered packet of a trip is cached under both versions, so rendering
+a section only rebuilds the trips which changed.
+
+The packets show medical information, so fragments are only kept for a
+day, and ``delete_fragments`` removes the current fragments of a year
+when its medical information is deleted.
+"""
+
+import functools
+import uuid
+
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import prefetch_related_objects
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+
+LEADER_TEMPLATE = 'trips/_packet.html'
+MEDICAL_TEMPLATE = 'trips/_medical.html'
+
+
+class PacketCache:
+    templates = [LEADER_TEMPLATE, MEDICAL_TEMPLATE]
+
+    def __init__(self, prefix='trip-packet', timeout=60 * 60 * 24):
+        self.prefix = prefix
+        self.timeout = timeout
+
+    def trip_key(self, trip_pk):
+        return '{}:version:trip:{}'.format(self.prefix, trip_pk)
+
+    def year_key(self, trips_year):
+        return '{}:version:year:{}'.format(self.prefix, trips_year)
+
+    def fragment_key(self, template_name, trip):
+        return '{}:{}:{}:{}'.format(
+            self.prefix, template_name, trip.pk, trip.packet_version
+        )
+
+    @staticmethod
+    def enabled():
+        # As with the other caches, nothing is cached inside a transaction
+        # since it could still be rolled back.
+        return not connection.in_atomic_block
+
+    def load_versions(self, trips):
+        """
+        Set ``packet_version`` on each of ``trips``.
+        """
+        keys = {self.year_key(trip.trips_year_id) for trip in trips}
+        keys.update(self.trip_key(trip.pk) for trip in trips)
+        found = cache.get_many(keys)
+
+        for key in keys - set(found):
+            cache.add(key, uuid.uuid4().hex, None)
+            found[key] = cache.get(key)
+
+        for trip in trips:
+            year_version = found[self.year_key(trip.trips_year_id)]
+            trip_version = found[self.trip_key(trip.pk)]
+            trip.packet_version = '{}-{}'.format(year_version, trip_version)
+
+    def prepare(self, trips, template_name, *lookups):
+        """
+        Get ready to render ``template_name`` for each of ``trips``.
+
+        Cached packets are loaded in one go. The related objects in
+        ``lookups`` are then prefetched only for the trips which have to be
+        rendered again.
+        """
+        trips = list(trips)
+        if not self.enabled():
+            prefetch_related_objects(trips, *lookups)
+            return trips
+
+        self.load_versions(trips)
+        keys = {self.fragment_key(template_name, trip): trip for trip in trips}
+        found = cache.get_many(keys)
+
+        missing = []
+        for key, trip in keys.items():
+            if key in found:
+                trip.packet_fragments = {template_name: found[key]}
+            else:
+                missing.append(trip)
+
+        prefetch_related_objects(missing, *lookups)
+        return trips
+
+    def render(self, template_name, trip):
+        """
+        Render ``template_name`` with ``trip``, through the cache.
+        """
+        fragments = getattr(trip, 'packet_fragments', {})
+        if template_name in fragments:
+            return mark_safe(fragments[template_name])
+
+        html = render_to_string(template_name, {'trip': trip})
+        if self.enabled():
+            if not hasattr(trip, 'packet_version'):
+                self.load_versions([trip])
+            cache.set(self.fragment_key(template_name, trip), str(html), self.timeout)
+        return html
+
+    def invalidate(self, *trip_pks):
+        """
+        Invalidate the packets of ``trip_pks`` once the current transaction
+        commits.
+        """
+        self._bump([self.trip_key(pk) for pk in trip_pks if pk is not None])
+
+    def invalidate_year(self, trips_year):
+        """
+        Invalidate the packets of all trips in ``trips_year``.
+        """
+        self._bump([self.year_key(getattr(trips_year, 'pk', trips_year))])
+
+    def delete_fragments(self, trips):
+        """
+        Delete the cached packets of ``trips`` once the current transaction
+        commits. Packets cached under older versions expire on their own.
+        """
+        trips = list(trips)
+        self.load_versions(trips)
+        keys = [
+            self.fragment_key(template_name, trip)
+            for template_name in self.templates
+            for trip in trips
+        ]
+        if keys:
+            transaction.on_commit(functools.partial(cache.delete_many, keys))
+
+    def _bump(self, keys):
+        if keys:
+            transaction.on_commit(functools.partial(self._set_versions, keys))
+
+    @staticmethod
+    def _set_versions(keys):
+        cache.set_many({key: uuid.uuid4().hex for key in keys}, None)
+
+
+packet_cache = PacketCache()
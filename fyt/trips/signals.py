@@ -0,0 +1,149 @@
+from django.db.models import F, Q
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from fyt.applications.models import Volunteer
+from fyt.core.managers import trips_data_cache
+from fyt.incoming.models import IncomingStudent, Registration
+from fyt.transport.models import InternalBus, Stop, StopOrder, TransportConfig
+from fyt.trips.models import (
+    Campsite,
+    Document,
+    Section,
+    Trip,
+    TripTemplate,
+    TripTemplateDescription,
+)
+from fyt.trips.packets import packet_cache
+from fyt.users.models import DartmouthUser
+
+
+# The assignment models and the Trip counter each of them maintains.
+COUNTERS = {IncomingStudent: 'num_trippees', Volunteer: 'num_leaders'}
+
+
+def adjust_count(instance, trip_pk, delta):
+    """
+    Add ``delta`` to the counter of the Trip with ``trip_pk``.
+
+    The Trip cached on ``instance``, if any, is adjusted in memory as well so
+    that callers holding on to it see the new size without a refresh.
+    """
+    if trip_pk is None:
+        return
+
+    counter = COUNTERS[type(instance)]
+    trips_data_cache.update(
+        Trip.objects.filter(pk=trip_pk),
+        instance.trips_year_id,
+        **{counter: F(counter) + delta}
+    )
+
+    field = type(instance)._meta.get_field('trip_assignment')
+    if field.is_cached(instance):
+        trip = field.get_cached_value(instance)
+        if trip is not None and trip.pk == trip_pk:
+            setattr(trip, counter, getattr(trip, counter) + delta)
+
+
+@receiver(post_save, sender=IncomingStudent)
+@receiver(post_save, sender=Volunteer)
+def update_counts_for_assignment_changes(instance, created, **kwargs):
+    """
+    Move the instance from the count of its old trip to its new trip.
+    """
+    if created or instance.tracker.has_changed('trip_assignment'):
+        old_pk = None if created else instance.tracker.previous('trip_assignment')
+        if old_pk != instance.trip_assignment_id:
+            adjust_count(instance, old_pk, -1)
+            adjust_count(instance, instance.trip_assignment_id, 1)
+
+
+@receiver(post_delete, sender=IncomingStudent)
+@receiver(post_delete, sender=Volunteer)
+def update_counts_for_deletions(instance, **kwargs):
+    adjust_count(instance, instance.trip_assignment_id, -1)
+
+
+@receiver(post_save, sender=IncomingStudent)
+@receiver(post_save, sender=Volunteer)
+@receiver(post_delete, sender=IncomingStudent)
+@receiver(post_delete, sender=Volunteer)
+def invalidate_packets_for_people(instance, created=False, **kwargs):
+    """
+    Leaders and trippees appear in the packets of their old and new trips.
+    """
+    old_pk = None if created else instance.tracker.previous('trip_assignment')
+    packet_cache.invalidate(old_pk, instance.trip_assignment_id)
+
+
+@receiver(post_save, sender=DartmouthUser)
+def invalidate_packets_for_user(instance, update_fields=None, **kwargs):
+    """
+    Leaders are shown by the name of their user. Logging in only saves
+    ``last_login``, which is not shown.
+    """
+    if update_fields is not None and 'name' not in update_fields:
+        return
+    packet_cache.invalidate(
+        *Volunteer.objects.filter(
+            applicant=instance, trip_assignment__isnull=False
+        ).values_list('trip_assignment', flat=True)
+    )
+
+
+@receiver(post_save, sender=Registration)
+def invalidate_packets_for_registration(instance, **kwargs):
+    packet_cache.invalidate(
+        *IncomingStudent.objects.filter(registration=instance).values_list(
+            'trip_assignment', flat=True
+        )
+    )
+
+
+@receiver(post_save, sender=Trip)
+@receiver(post_delete, sender=Trip)
+def invalidate_packets_for_trip(instance, **kwargs):
+    packet_cache.invalidate(instance.pk)
+
+
+@receiver(post_save, sender=StopOrder)
+@receiver(post_delete, sender=StopOrder)
+def invalidate_packets_for_stoporder(instance, **kwargs):
+    packet_cache.invalidate(instance.trip_id)
+
+
+# The trips affected by a change to each model shown in the packets
+PACKET_TRIPS = {
+    Section: lambda section: Q(section=section),
+    TripTemplate: lambda template: Q(template=template),
+    TripTemplateDescription: lambda description: Q(template__description=description),
+    Campsite: lambda campsite: (
+        Q(template__campsite1=campsite) | Q(template__campsite2=campsite)
+    ),
+    Document: lambda document: Q(template=document.template_id),
+    InternalBus: lambda bus: Q(stoporder__bus=bus),
+}
+
+
+def invalidate_packets_for_related(sender, instance, **kwargs):
+    packet_cache.invalidate(
+        *Trip.objects.filter(PACKET_TRIPS[sender](instance)).values_list(
+            'pk', flat=True
+        )
+    )
+
+
+for model in PACKET_TRIPS:
+    post_save.connect(invalidate_packets_for_related, sender=model)
+    post_delete.connect(invalidate_packets_for_related, sender=model)
+
+
+@receiver(post_save, sender=Stop)
+@receiver(post_save, sender=TransportConfig)
+def invalidate_packets_for_year(instance, **kwargs):
+    """
+    Stops are shown in many packets and change bus times on their routes;
+    the transport config changes the times of every bus.
+    """
+    packet_cache.invalidate_year(instance.trips_year_id)
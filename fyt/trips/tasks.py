@@ -0,0 +1,22 @@
+from datetime import timedelta
+
+from fyt.core.models import TripsYear
+from fyt.tasks.queue import noop, task
+from fyt.trips.artifacts import PacketBuilder
+
+
+@task(every=timedelta(minutes=1))
+def build_packets(progress=noop):
+    """
+    Build packets
+
+    Render the packets of the current trips year which have changed since
+    they were last built.
+    """
+    try:
+        trips_year = TripsYear.objects.current()
+    except TripsYear.DoesNotExist:
+        return None
+
+    built = PacketBuilder(trips_year).build()
+    return {'messages': [('info', 'Built {} packets'.format(len(built)))]}
@@ -1,17 +1,18 @@
 from django import template
 
+from fyt.trips.packets import LEADER_TEMPLATE, MEDICAL_TEMPLATE, packet_cache
 
 register = template.Library()
 
 
-@register.inclusion_tag('trips/_packet.html')
+@register.simple_tag
 def leader_packet(trip):
-    return {'trip': trip}
+    return packet_cache.render(LEADER_TEMPLATE, trip)
 
 
-@register.inclusion_tag('trips/_medical.html')
+@register.simple_tag
 def medical_packet(trip):
-    return {'trip': trip}
+    return packet_cache.render(MEDICAL_TEMPLATE, trip)
 
 
 @register.inclusion_tag('trips/_campsite.html')
@@ -1,29 +1,43 @@
 import math
+import shutil
+import tempfile
 import unittest
 from datetime import date, time, timedelta
+from io import StringIO
+from unittest import mock
 
 import boto3  # This is required to fix an issue with VCR
 import webtest
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
+from django.core.files.storage import FileSystemStorage
+from django.core.management import call_command
 from django.forms.models import model_to_dict
+from django.template.loader import render_to_string
 from django.urls import reverse
 from model_mommy import mommy
 
+from ..artifacts import PacketBuilder
+from ..assignment import LeaderAssignment, TrippeeAssignment
 from ..models import (
     NUM_BAGELS_REGULAR,
     NUM_BAGELS_SUPPLEMENT,
     Campsite,
+    PacketArtifact,
     Section,
     Trip,
     TripTemplate,
     TripType,
     validate_triptemplate_name,
 )
+from ..packets import packet_cache
+from ..tasks import build_packets
 
-from fyt.applications.models import Volunteer
+from fyt.applications.models import Score, ScoreValue, Volunteer
 from fyt.applications.tests import make_application
 from fyt.core.forward import forward
 from fyt.incoming.models import (
+    FIRST_CHOICE,
     IncomingStudent,
     Registration,
     RegistrationSectionChoice,
@@ -31,7 +45,7 @@ from fyt.incoming.models import (
 )
 from fyt.test import FytTestCase, vcr
 from fyt.timetable.models import Timetable
-from fyt.transport.models import Route
+from fyt.transport.models import ExternalBus, Route, Stop
 from fyt.utils.choices import AVAILABLE, PREFER
 
 
@@ -434,6 +448,615 @@ class AssignTrippeeTestCase(FytTestCase):
         self.assertEqual(trippee.trip_assignment, trip)
 
 
+class AutoAssignTrippeesTestCase(FytTestCase):
+    def setUp(self):
+        self.init_trips_year()
+        self.section = mommy.make(Section, trips_year=self.trips_year)
+
+    def make_trip(self, max_trippees=1, **kwargs):
+        return mommy.make(
+            Trip,
+            trips_year=self.trips_year,
+            section=self.section,
+            template__max_trippees=max_trippees,
+            **kwargs
+        )
+
+    def make_trippee(self, triptypes, section_pref=PREFER, **kwargs):
+        registration = mommy.make(Registration, trips_year=self.trips_year, **kwargs)
+        registration.set_section_preference(self.section, section_pref)
+        for triptype, pref in triptypes.items():
+            registration.set_triptype_preference(triptype, pref)
+        return mommy.make(
+            IncomingStudent, trips_year=self.trips_year, registration=registration
+        )
+
+    def solve(self, **kwargs):
+        changes, unplaced = TrippeeAssignment(self.trips_year, **kwargs).solve()
+        return {c.trippee: c.new_trip for c in changes}, unplaced
+
+    def test_satisfies_preferences_overall(self):
+        trip1 = self.make_trip()
+        trip2 = self.make_trip()
+        triptype1 = trip1.template.triptype
+        triptype2 = trip2.template.triptype
+        flexible = self.make_trippee({triptype1: FIRST_CHOICE, triptype2: PREFER})
+        picky = self.make_trippee({triptype1: FIRST_CHOICE})
+
+        assignments, unplaced = self.solve()
+        self.assertEqual(assignments, {flexible: trip2, picky: trip1})
+        self.assertEqual(unplaced, [])
+
+    def test_trippees_without_room_are_unplaced(self):
+        trip = self.make_trip()
+        first = self.make_trippee({trip.template.triptype: FIRST_CHOICE})
+        second = self.make_trippee({trip.template.triptype: AVAILABLE})
+
+        assignments, unplaced = self.solve()
+        self.assertEqual(assignments, {first: trip})
+        self.assertEqual(unplaced, [second])
+
+    def test_non_swimmers_are_not_placed_on_swimming_trips(self):
+        trip = self.make_trip(template__swimtest_required=True)
+        trippee = self.make_trippee(
+            {trip.template.triptype: FIRST_CHOICE},
+            swimming_ability=Registration.NON_SWIMMER,
+        )
+
+        assignments, unplaced = self.solve()
+        self.assertEqual(assignments, {})
+        self.assertEqual(unplaced, [trippee])
+
+    def test_avoids_sections_without_requested_bus(self):
+        trip1 = self.make_trip()
+        other_section = mommy.make(Section, trips_year=self.trips_year)
+        trip2 = mommy.make(
+            Trip,
+            trips_year=self.trips_year,
+            section=other_section,
+            template=trip1.template,
+        )
+        trip1.template.max_trippees = 2
+        trip1.template.save()
+
+        stop = mommy.make(
+            Stop, trips_year=self.trips_year, route__category=Route.EXTERNAL
+        )
+        mommy.make(
+            ExternalBus,
+            trips_year=self.trips_year,
+            route=stop.route,
+            section=other_section,
+        )
+        trippee = self.make_trippee(
+            {trip1.template.triptype: FIRST_CHOICE}, bus_stop_round_trip=stop
+        )
+        trippee.registration.set_section_preference(other_section, AVAILABLE)
+
+        assignments, unplaced = self.solve()
+        self.assertEqual(assignments, {trippee: trip2})
+
+    def test_spreads_trippees_over_interchangeable_trips(self):
+        trip1 = self.make_trip(max_trippees=5)
+        trip2 = mommy.make(
+            Trip,
+            trips_year=self.trips_year,
+            section=self.section,
+            template__max_trippees=5,
+            template__triptype=trip1.template.triptype,
+        )
+        for _ in range(4):
+            self.make_trippee({trip1.template.triptype: PREFER})
+
+        assignments, unplaced = self.solve()
+        self.assertEqual(list(assignments.values()).count(trip1), 2)
+        self.assertEqual(list(assignments.values()).count(trip2), 2)
+
+    def test_current_assignments_are_kept(self):
+        trip1 = self.make_trip()
+        trip2 = self.make_trip()
+        trippee = self.make_trippee({trip2.template.triptype: FIRST_CHOICE})
+        trippee.trip_assignment = trip1
+        trippee.save()
+
+        self.assertEqual(self.solve(), ({}, []))
+        self.assertEqual(self.solve(reassign=True), ({trippee: trip2}, []))
+
+    def test_preview_and_apply(self):
+        trip = self.make_trip()
+        trippee = self.make_trippee({trip.template.triptype: FIRST_CHOICE})
+
+        url = reverse(
+            'core:auto_assign_trippees', kwargs={'trips_year': self.trips_year}
+        )
+        res = self.app.get(url, user=self.make_director())
+        self.assertContains(res, str(trippee))
+        res = res.form.submit().follow()
+        self.assertContains(res, 'Updated 1 trip assignments')
+
+        trippee.refresh_from_db()
+        self.assertEqual(trippee.trip_assignment, trip)
+        trip.refresh_from_db()
+        self.assertEqual(trip.num_trippees, 1)
+
+    def test_stale_plans_are_not_applied(self):
+        trip1 = self.make_trip()
+        trip2 = self.make_trip()
+        trippee = self.make_trippee({trip1.template.triptype: FIRST_CHOICE})
+
+        url = reverse(
+            'core:auto_assign_trippees', kwargs={'trips_year': self.trips_year}
+        )
+        res = self.app.get(url, user=self.make_director())
+
+        trippee.trip_assignment = trip2
+        trippee.save()
+
+        res = res.form.submit().follow()
+        self.assertContains(res, 'has been reassigned')
+        trippee.refresh_from_db()
+        self.assertEqual(trippee.trip_assignment, trip2)
+
+    def test_plans_cannot_be_tampered_with(self):
+        trip = self.make_trip()
+        self.make_trippee({trip.template.triptype: FIRST_CHOICE})
+
+        url = reverse(
+            'core:auto_assign_trippees', kwargs={'trips_year': self.trips_year}
+        )
+        res = self.app.get(url, user=self.make_director())
+        res.form['plan'] = res.form['plan'].value + 'x'
+        res = res.form.submit().follow()
+        self.assertContains(res, 'The plan is invalid')
+        self.assertFalse(IncomingStudent.objects.filter(trip_assignment=trip).exists())
+
+
+class AutoAssignLeadersTestCase(FytTestCase):
+    def setUp(self):
+        self.init_trips_year()
+        self.section = mommy.make(Section, trips_year=self.trips_year)
+
+    def make_trip(self, **kwargs):
+        return mommy.make(
+            Trip, trips_year=self.trips_year, section=self.section, **kwargs
+        )
+
+    def make_leader(self, triptypes, status=Volunteer.LEADER, score=None, **kwargs):
+        leader = make_application(trips_year=self.trips_year, status=status)
+        supplement = leader.leader_supplement
+        for field, value in kwargs.items():
+            setattr(supplement, field, value)
+        supplement.save()
+        supplement.set_section_preference(self.section, PREFER)
+        for triptype, pref in triptypes.items():
+            supplement.set_triptype_preference(triptype, pref)
+        if score is not None:
+            mommy.make(
+                Score,
+                trips_year=self.trips_year,
+                application=leader,
+                leader_score=ScoreValue.objects.get_or_create(
+                    trips_year=self.trips_year, value=score
+                )[0],
+            )
+        return leader
+
+    def solve(self):
+        changes, unplaced = LeaderAssignment(self.trips_year).solve()
+        return {c.leader: c.new_trip for c in changes}, unplaced
+
+    def test_fills_trips_with_two_leaders(self):
+        trip = self.make_trip()
+        triptype = trip.template.triptype
+        leaders = [self.make_leader({triptype: PREFER}) for _ in range(3)]
+
+        assignments, unplaced = self.solve()
+        self.assertEqual(list(assignments.values()), [trip, trip])
+        self.assertEqual(len(unplaced), 1)
+        self.assertCountEqual(list(assignments) + unplaced, leaders)
+
+    def test_satisfies_preferences_overall(self):
+        trip1 = self.make_trip()
+        trip2 = self.make_trip()
+        mommy.make(Volunteer, 2, trips_year=self.trips_year, trip_assignment=trip1)
+        mommy.make(Volunteer, 1, trips_year=self.trips_year, trip_assignment=trip2)
+        triptype1 = trip1.template.triptype
+        triptype2 = trip2.template.triptype
+        flexible = self.make_leader({triptype1: PREFER, triptype2: AVAILABLE})
+        picky = self.make_leader({triptype1: PREFER})
+
+        assignments, unplaced = self.solve()
+        self.assertEqual(assignments, {flexible: trip2})
+        self.assertEqual(unplaced, [picky])
+
+    def test_best_scored_applicants_are_chosen(self):
+        ScoreValue.objects.create(trips_year=self.trips_year, value=1)
+        trip = self.make_trip()
+        triptype = trip.template.triptype
+        best = self.make_leader({triptype: PREFER}, Volunteer.PENDING, score=5)
+        good = self.make_leader({triptype: AVAILABLE}, Volunteer.PENDING, score=4)
+        self.make_leader({triptype: PREFER}, Volunteer.PENDING, score=2)
+        self.make_leader({triptype: PREFER}, Volunteer.PENDING)
+
+        assignments, unplaced = self.solve()
+        self.assertEqual(assignments, {best: trip, good: trip})
+        self.assertEqual(unplaced, [])
+
+    def test_accepted_leaders_are_placed_first(self):
+        trip = self.make_trip()
+        mommy.make(Volunteer, trips_year=self.trips_year, trip_assignment=trip)
+        triptype = trip.template.triptype
+        self.make_leader({triptype: PREFER}, Volunteer.LEADER_WAITLIST, score=5)
+        leader = self.make_leader({triptype: AVAILABLE}, score=1)
+
+        assignments, unplaced = self.solve()
+        self.assertEqual(assignments, {leader: trip})
+
+    def test_certifications_are_required(self):
+        trip = self.make_trip(template__triptype__leader_certification='dmc_leader')
+        triptype = trip.template.triptype
+        self.make_leader({triptype: PREFER}, dmc_leader=False)
+        certified = self.make_leader({triptype: PREFER}, dmc_leader=True)
+
+        assignments, unplaced = self.solve()
+        self.assertEqual(assignments, {certified: trip})
+
+    def test_swim_test_is_required_for_swimming_trips(self):
+        trip = self.make_trip(template__swimtest_required=True)
+        triptype = trip.template.triptype
+        self.make_leader({triptype: PREFER}, swim_test=False)
+        swimmer = self.make_leader({triptype: PREFER}, swim_test=True)
+
+        assignments, unplaced = self.solve()
+        self.assertEqual(assignments, {swimmer: trip})
+
+    def test_preview_and_apply(self):
+        trip = self.make_trip()
+        leader = self.make_leader(
+            {trip.template.triptype: PREFER},
+            Volunteer.PENDING,
+            co_leader='Someone who sings',
+        )
+
+        url = reverse(
+            'core:auto_assign_leaders', kwargs={'trips_year': self.trips_year}
+        )
+        res = self.app.get(url, user=self.make_director())
+        self.assertContains(res, str(leader))
+        self.assertContains(res, 'Someone who sings')
+        res = res.form.submit().follow()
+        self.assertContains(res, 'Assigned 1 leaders')
+
+        leader.refresh_from_db()
+        self.assertEqual(leader.trip_assignment, trip)
+        self.assertEqual(leader.status, Volunteer.LEADER)
+        trip.refresh_from_db()
+        self.assertEqual(trip.num_leaders, 1)
+
+    def test_stale_plans_are_not_applied(self):
+        trip = self.make_trip()
+        leader = self.make_leader({trip.template.triptype: PREFER}, Volunteer.PENDING)
+
+        url = reverse(
+            'core:auto_assign_leaders', kwargs={'trips_year': self.trips_year}
+        )
+        res = self.app.get(url, user=self.make_director())
+
+        leader.status = Volunteer.REJECTED
+        leader.save()
+
+        res = res.form.submit().follow()
+        self.assertContains(res, 'has been reassigned')
+        leader.refresh_from_db()
+        self.assertEqual(leader.status, Volunteer.REJECTED)
+        self.assertIsNone(leader.trip_assignment)
+
+
+class QueryBudgetTestCase(FytTestCase):
+    def setUp(self):
+        self.init_trips_year()
+        self.director = self.make_director()
+        self.trip = mommy.make(Trip, trips_year=self.trips_year)
+
+    def url(self, name, **kwargs):
+        return reverse(name, kwargs=dict(kwargs, trips_year=self.trips_year.pk))
+
+    def make_trippees(self, n, **kwargs):
+        for _ in range(n):
+            registration = mommy.make(Registration, trips_year=self.trips_year)
+            registration.set_section_preference(self.trip.section, PREFER)
+            registration.set_triptype_preference(self.trip.template.triptype, PREFER)
+            mommy.make(
+                IncomingStudent,
+                trips_year=self.trips_year,
+                registration=registration,
+                **kwargs
+            )
+
+    def make_leaders(self, n, **kwargs):
+        for _ in range(n):
+            volunteer = make_application(trips_year=self.trips_year, **kwargs)
+            volunteer.leader_supplement.set_section_preference(
+                self.trip.section, AVAILABLE
+            )
+            volunteer.leader_supplement.set_triptype_preference(
+                self.trip.template.triptype, PREFER
+            )
+
+    def test_assign_trippee(self):
+        url = self.url('core:assign_trippee', trip_pk=self.trip.pk)
+        self.assertQueryBudget(
+            lambda: self.app.get(url, user=self.director), self.make_trippees, 25
+        )
+
+    def test_assign_leader(self):
+        url = self.url('core:assign_leader', trip_pk=self.trip.pk)
+        self.assertQueryBudget(
+            lambda: self.app.get(url, user=self.director), self.make_leaders, 25
+        )
+
+    def test_leader_packet(self):
+        def populate(n):
+            self.make_trippees(n, trip_assignment=self.trip)
+            self.make_leaders(n, trip_assignment=self.trip)
+
+        url = self.url('core:packets:trip', pk=self.trip.pk)
+        self.assertQueryBudget(
+            lambda: self.app.get(url, user=self.director), populate, 30
+        )
+
+    def test_packets_for_section(self):
+        section = self.trip.section
+
+        def populate(n):
+            for _ in range(n):
+                trip = mommy.make(Trip, trips_year=self.trips_year, section=section)
+                self.make_trippees(2, trip_assignment=trip)
+                self.make_leaders(2, trip_assignment=trip)
+
+        url = self.url('core:packets:section', section_pk=section.pk)
+        self.assertQueryBudget(
+            lambda: self.app.get(url, user=self.director), populate, 25
+        )
+
+
+class PacketCacheTestCase(FytTestCase):
+    def setUp(self):
+        self.init_trips_year()
+        self.director = self.make_director()
+        self.section = mommy.make(Section, trips_year=self.trips_year)
+        self.trip1, self.trip2 = mommy.make(
+            Trip, trips_year=self.trips_year, section=self.section, _quantity=2
+        )
+        self.leader = mommy.make(
+            Volunteer,
+            trips_year=self.trips_year,
+            trip_assignment=self.trip1,
+            medical_conditions='magic',
+        )
+        self.url = reverse(
+            'core:packets:section',
+            kwargs={'trips_year': self.trips_year, 'section_pk': self.section.pk},
+        )
+
+        # Tests run in a transaction, which would bypass the cache
+        cache.clear()
+        for patch in [
+            mock.patch('fyt.trips.packets.connection', in_atomic_block=False),
+            mock.patch(
+                'fyt.trips.packets.transaction', on_commit=lambda func: func()
+            ),
+        ]:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def rendered_trips(self):
+        """
+        GET the section packets, returning the trips which were rendered.
+        """
+        with mock.patch(
+            'fyt.trips.packets.render_to_string', wraps=render_to_string
+        ) as render:
+            resp = self.app.get(self.url, user=self.director)
+        trips = [
+            call[0][1]['trip']
+            for call in render.call_args_list
+            if call[0][0] == 'trips/_packet.html'
+        ]
+        return resp, trips
+
+    def test_packets_are_cached(self):
+        resp, trips = self.rendered_trips()
+        self.assertEqual(set(trips), {self.trip1, self.trip2})
+        resp, trips = self.rendered_trips()
+        self.assertEqual(trips, [])
+        self.assertContains(resp, 'magic')
+
+    def test_changes_only_rebuild_affected_trips(self):
+        self.rendered_trips()
+        self.leader.medical_conditions = 'sparkles'
+        self.leader.save()
+
+        resp, trips = self.rendered_trips()
+        self.assertEqual(trips, [self.trip1])
+        self.assertContains(resp, 'sparkles')
+        self.assertNotContains(resp, 'magic')
+
+    def test_reassigning_leader_rebuilds_old_and_new_trips(self):
+        self.rendered_trips()
+        self.leader.trip_assignment = self.trip2
+        self.leader.save()
+
+        resp, trips = self.rendered_trips()
+        self.assertEqual(set(trips), {self.trip1, self.trip2})
+
+    def test_campsite_change_rebuilds_trips_using_it(self):
+        self.rendered_trips()
+        campsite = self.trip2.template.campsite1
+        campsite.secret = 'under the rock'
+        campsite.save()
+
+        resp, trips = self.rendered_trips()
+        self.assertEqual(trips, [self.trip2])
+        self.assertContains(resp, 'under the rock')
+
+    def test_leader_name_change_rebuilds_their_trip(self):
+        self.rendered_trips()
+        self.leader.applicant.name = 'Ferdinand'
+        self.leader.applicant.save()
+
+        resp, trips = self.rendered_trips()
+        self.assertEqual(trips, [self.trip1])
+        self.assertContains(resp, 'Ferdinand')
+
+    def test_packets_are_deleted_with_medical_info(self):
+        self.rendered_trips()
+        trips = [self.trip1, self.trip2]
+        packet_cache.load_versions(trips)
+        keys = [
+            packet_cache.fragment_key(template_name, trip)
+            for template_name in packet_cache.templates
+            for trip in trips
+        ]
+        self.assertEqual(len(cache.get_many(keys)), 4)
+
+        mommy.make(Timetable)
+        forward()
+        self.assertEqual(cache.get_many(keys), {})
+
+    def test_stop_change_rebuilds_all_trips(self):
+        self.rendered_trips()
+        mommy.make(Stop, trips_year=self.trips_year)
+
+        resp, trips = self.rendered_trips()
+        self.assertEqual(set(trips), {self.trip1, self.trip2})
+
+
+class PacketArtifactTestCase(FytTestCase):
+    def setUp(self):
+        self.init_trips_year()
+        self.section = mommy.make(Section, trips_year=self.trips_year)
+        self.trip = mommy.make(Trip, trips_year=self.trips_year, section=self.section)
+        self.leader = mommy.make(
+            Volunteer,
+            trips_year=self.trips_year,
+            trip_assignment=self.trip,
+            medical_conditions='magic',
+        )
+
+        storage = FileSystemStorage(location=tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, storage.location)
+        for name in ['html', 'pdf']:
+            patch = mock.patch.object(
+                PacketArtifact._meta.get_field(name), 'storage', storage
+            )
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def build(self):
+        return PacketBuilder(self.trips_year).build()
+
+    def test_build_section_packets(self):
+        built = self.build()
+        self.assertEqual(
+            {(a.kind, a.key) for a in built},
+            {
+                (PacketArtifact.LEADER, str(self.section.pk)),
+                (PacketArtifact.MEDICAL, str(self.section.pk)),
+            },
+        )
+        medical = PacketArtifact.objects.get(kind=PacketArtifact.MEDICAL)
+        html = medical.html.read().decode()
+        self.assertIn('magic', html)
+        self.assertIn('<base href=', html)
+
+    def test_unchanged_packets_are_not_rebuilt(self):
+        self.build()
+        self.assertEqual(self.build(), [])
+
+    def test_changed_packets_are_rebuilt(self):
+        self.build()
+        with mock.patch(
+            'fyt.trips.packets.transaction', on_commit=lambda func: func()
+        ):
+            self.leader.medical_conditions = 'sparkles'
+            self.leader.save()
+
+        self.assertEqual(len(self.build()), 2)
+        medical = PacketArtifact.objects.get(kind=PacketArtifact.MEDICAL)
+        self.assertIn('sparkles', medical.html.read().decode())
+
+    def test_packets_for_deleted_sections_are_removed(self):
+        mommy.make(
+            PacketArtifact,
+            trips_year=self.trips_year,
+            kind=PacketArtifact.LEADER,
+            key='1000',
+        )
+        self.build()
+        self.assertQsEqual(
+            PacketArtifact.objects.values_list('key', flat=True),
+            [str(self.section.pk)] * 2,
+        )
+
+    def test_build_packets_task(self):
+        result = build_packets()
+        self.assertEqual(result['messages'], [('info', 'Built 2 packets')])
+        self.assertEqual(PacketArtifact.objects.count(), 2)
+
+    def test_packets_are_deleted_with_medical_info(self):
+        self.build()
+        medical = PacketArtifact.objects.get(kind=PacketArtifact.MEDICAL)
+        storage, name = medical.html.storage, medical.html.name
+        self.assertTrue(storage.exists(name))
+
+        mommy.make(Timetable)
+        with mock.patch(
+            'fyt.trips.artifacts.transaction', on_commit=lambda func: func()
+        ):
+            forward()
+
+        self.assertFalse(PacketArtifact.objects.exists())
+        self.assertFalse(storage.exists(name))
+
+    def test_checklists_link_to_artifacts(self):
+        self.build()
+        url = reverse('core:checklists:all', kwargs={'trips_year': self.trips_year})
+        director = self.make_director()
+        resp = self.app.get(url, user=director)
+        self.assertContains(resp, 'printable copy', count=2)
+
+        medical = PacketArtifact.objects.get(kind=PacketArtifact.MEDICAL)
+        url = reverse(
+            'core:packets:artifact',
+            kwargs={'trips_year': self.trips_year, 'pk': medical.pk, 'format': 'html'},
+        )
+        self.assertContains(resp, url)
+        self.assertNotContains(resp, medical.html.name)
+        resp = self.app.get(url, user=director)
+        self.assertIn(b'magic', resp.body)
+        self.assertEqual(resp.content_type, 'text/html')
+
+    def test_artifacts_require_permission(self):
+        self.build()
+        medical = PacketArtifact.objects.get(kind=PacketArtifact.MEDICAL)
+        url = reverse(
+            'core:packets:artifact',
+            kwargs={'trips_year': self.trips_year, 'pk': medical.pk, 'format': 'html'},
+        )
+        self.app.get(url, user=self.make_user(), status=403)
+        url = reverse(
+            'core:packets:artifact',
+            kwargs={'trips_year': self.trips_year, 'pk': medical.pk, 'format': 'pdf'},
+        )
+        self.app.get(url, user=self.make_director(), status=404)
+
+    def test_build_packets_command(self):
+        out = StringIO()
+        call_command('build_packets', stdout=out)
+        self.assertIn('Built 2 packets for {}'.format(self.trips_year), out.getvalue())
+
+
 class TripManagerTestCase(FytTestCase):
     def test_manager_automatically_selects_section_and_template(self):
         trips_year = self.init_trips_year()
@@ -576,6 +1199,87 @@ class TripManagerTestCase(FytTestCase):
         self.assertEqual(trip.num_trippees, 1)
         self.assertEqual(trip.num_leaders, 0)
 
+    def test_with_live_counts(self):
+        trips_year = self.init_trips_year()
+        trip = mommy.make(Trip, trips_year=trips_year)
+        mommy.make(
+            IncomingStudent, trips_year=trips_year, trip_assignment=trip, _quantity=2
+        )
+        make_application(trips_year=trips_year, trip_assignment=trip)
+        make_application(trips_year=trips_year, trip_assignment=trip)
+        Trip.objects.update(num_trippees=0)
+
+        with self.assertNumQueries(1):
+            trip = Trip.objects.with_live_counts(trips_year).get()
+        self.assertEqual(trip.live_num_trippees, 2)
+        self.assertEqual(trip.live_num_leaders, 2)
+        self.assertEqual(trip.num_trippees, 0)
+
+
+class TripCountsTestCase(FytTestCase):
+    def setUp(self):
+        self.init_trips_year()
+        self.trip = mommy.make(Trip, trips_year=self.trips_year)
+        self.other_trip = mommy.make(Trip, trips_year=self.trips_year)
+
+    def assertCounts(self, trip, num_trippees, num_leaders):
+        trip.refresh_from_db()
+        self.assertEqual(trip.num_trippees, num_trippees)
+        self.assertEqual(trip.num_leaders, num_leaders)
+
+    def test_counts_updated_when_assignments_change(self):
+        trippee = mommy.make(
+            IncomingStudent, trips_year=self.trips_year, trip_assignment=self.trip
+        )
+        leader = make_application(trips_year=self.trips_year, trip_assignment=self.trip)
+        self.assertCounts(self.trip, 1, 1)
+
+        trippee.trip_assignment = self.other_trip
+        trippee.save()
+        leader.trip_assignment = None
+        leader.save()
+        self.assertCounts(self.trip, 0, 0)
+        self.assertCounts(self.other_trip, 1, 0)
+
+    def test_saving_without_changing_assignment_does_not_change_counts(self):
+        trippee = mommy.make(
+            IncomingStudent, trips_year=self.trips_year, trip_assignment=self.trip
+        )
+        trippee.save()
+        self.assertCounts(self.trip, 1, 0)
+
+    def test_counts_updated_on_delete(self):
+        trippee = mommy.make(
+            IncomingStudent, trips_year=self.trips_year, trip_assignment=self.trip
+        )
+        trippee.delete()
+        self.assertCounts(self.trip, 0, 0)
+
+    def test_update_counts_after_bulk_update(self):
+        mommy.make(IncomingStudent, trips_year=self.trips_year, _quantity=3)
+        IncomingStudent.objects.update(trip_assignment=self.trip)
+        self.assertCounts(self.trip, 0, 0)
+
+        self.assertEqual(Trip.objects.update_counts([self.trip]), 1)
+        self.assertCounts(self.trip, 3, 0)
+        self.assertCounts(self.other_trip, 0, 0)
+
+    def test_reconcile_command(self):
+        mommy.make(
+            IncomingStudent, trips_year=self.trips_year, trip_assignment=self.trip
+        )
+        Trip.objects.update(num_trippees=5, num_leaders=2)
+
+        call_command('reconcile_trip_counts', stdout=StringIO())
+        self.assertCounts(self.trip, 1, 0)
+        self.assertCounts(self.other_trip, 0, 0)
+
+    def test_benchmark_command(self):
+        out = StringIO()
+        call_command('benchmark_trip_counts', repeat=1, stdout=out)
+        for strategy in ['join', 'subquery', 'stored']:
+            self.assertIn(strategy, out.getvalue())
+
 
 class CampsiteManagerTestCase(FytTestCase):
     def test_campsite_matrix(self):
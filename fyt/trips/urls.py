@@ -78,6 +78,16 @@ leader_urlpatterns = [
         AssignTrippeeToTrip.as_view(),
         name='assign_trippee_to_trip',
     ),
+    url(
+        r'^assign/trippees/auto/$',
+        AutoAssignTrippees.as_view(),
+        name='auto_assign_trippees',
+    ),
+    url(
+        r'^assign/leaders/auto/$',
+        AutoAssignLeaders.as_view(),
+        name='auto_assign_leaders',
+    ),
     url(
         r'^assign/leader/(?P<trip_pk>[0-9]+)$',
         AssignLeader.as_view(),
@@ -112,6 +122,11 @@ packet_urlpatterns = [
         MedicalInfoForSection.as_view(),
         name='medical',
     ),
+    url(
+        r'^printable/(?P<pk>[0-9]+)\.(?P<format>html|pdf)$',
+        PacketArtifactFile.as_view(),
+        name='artifact',
+    ),
 ]
 
 checklist_urlpatterns = [
@@ -2,32 +2,47 @@ from collections import OrderedDict, defaultdict
 from statistics import mean
 
 from braces.views import FormValidMessageMixin, SetHeadlineMixin
+from django.contrib import messages
 from crispy_forms.layout import Submit
 from django.db.models import Prefetch
 from django.forms.models import modelformset_factory
+from django.http import FileResponse, Http404, HttpResponseRedirect
 from django.urls import reverse
 from django.utils.functional import cached_property
 from django.utils.safestring import mark_safe
-from vanilla import FormView, UpdateView
-
+from vanilla import DetailView, FormView, UpdateView
+
+from .assignment import (
+    LEADERS_PER_TRIP,
+    LeaderAssignment,
+    StaleAssignment,
+    TrippeeAssignment,
+    apply_leader_plan,
+    apply_plan,
+    summarize,
+)
 from .forms import (
     FoodboxFormsetHelper,
     LeaderAssignmentForm,
+    LeaderAssignmentPlanForm,
     SectionForm,
     TripTemplateDescriptionForm,
     TripTemplateForm,
     TrippeeAssignmentForm,
+    TrippeeAssignmentPlanForm,
 )
 from .models import (
     NUM_BAGELS_REGULAR,
     NUM_BAGELS_SUPPLEMENT,
     Campsite,
     Document,
+    PacketArtifact,
     Section,
     Trip,
     TripTemplate,
     TripType,
 )
+from .packets import LEADER_TEMPLATE, MEDICAL_TEMPLATE, packet_cache
 
 from fyt.applications.models import (
     LeaderSectionChoice,
@@ -41,22 +56,18 @@ from fyt.core.views import (
     DatabaseCreateView,
     DatabaseDeleteView,
     DatabaseDetailView,
+    DatabaseFormView,
     DatabaseListView,
     DatabaseTemplateView,
     DatabaseUpdateView,
     TripsYearMixin,
 )
-from fyt.incoming.models import (
-    AVAILABLE,
-    FIRST_CHOICE,
-    PREFER,
-    IncomingStudent,
-    RegistrationSectionChoice,
-    RegistrationTripTypeChoice,
-)
+from fyt.incoming.eligibility import eligibility_index
+from fyt.incoming.models import AVAILABLE, PREFER, IncomingStudent
 from fyt.permissions.views import (
     ApplicationEditPermissionRequired,
     DatabaseEditPermissionRequired,
+    DatabaseReadPermissionRequired,
     TripInfoEditPermissionRequired,
 )
 from fyt.transport.models import ExternalBus, InternalBus
@@ -301,6 +312,7 @@ class TripTypeDetail(DatabaseDetailView):
         'hidden',
         'trippee_description',
         'leader_description',
+        'leader_certification',
         'half_kickin',
         'gets_supplemental',
     ]
@@ -314,6 +326,7 @@ class TripTypeUpdate(TripInfoEditPermissionRequired, BaseUpdateView):
         'leader_description',
         'trippee_description',
         'packing_list',
+        'leader_certification',
         'half_kickin',
         'gets_supplemental',
     ]
@@ -438,6 +451,14 @@ class AssignTrippee(_TripMixin, DatabaseListView):
     template_name = 'trips/assign_trippee.html'
     context_object_name = 'available_trippees'
 
+    @cached_property
+    def candidates(self):
+        """
+        The section and trip type preferences of every registration which
+        is available for this trip, from the eligibility index.
+        """
+        return eligibility_index(self.trips_year).candidates(self.trip)
+
     def get_queryset(self):
         """
         All trippees who prefer, are available, or chose this
@@ -446,7 +467,9 @@ class AssignTrippee(_TripMixin, DatabaseListView):
         Only pull in required fields because a whole application
         queryset is big enough to slow down performance.
         """
-        return self.model.objects.available_for_trip(self.trip).select_related(
+        return self.model.objects.filter(
+            trips_year=self.trips_year, registration__in=list(self.candidates)
+        ).select_related(
             'trip_assignment',
             'trip_assignment__template',
             'trip_assignment__section',
@@ -456,45 +479,15 @@ class AssignTrippee(_TripMixin, DatabaseListView):
             'registration__bus_stop_from_hanover',
         )
 
-    # TODO: refactor this with the new M2M setup
     def get_context_data(self, **kwargs):
         """
-        In order to compute each trippee's triptype or section
-        preference,
-
-        Initially I tried using ``prefetch_related`` to load all
-        ``preferred_triptypes``, ``available_triptypes``, etc.
-        However, this requires the database to load each trip, in the
-        worst case, on *every* tripppee, up to ``O(n)`` times for the
-        entire, queryset. Multiply this by the total number of trips,
-        and there goes performance.
-
-        Perhaps a SQL guru can figure out a clever way to compute this
-        in-database, but I could not.
-
-        The solution: use the ``through`` objects created by ``M2M`` fields.
-        We iterate through these objects for the sections and triptypes in
-        question and save each trippee's preference in a dict.
-        This technique is ``O(1)`` for queries and ``O(n)`` for in-memory
-        processing, which is quite acceptable. See http://goo.gl/QbK99D
+        Preferences come from the eligibility index, which is built from
+        the ``through`` objects of the preference ``M2M`` fields. See
+        ``fyt.incoming.eligibility``.
         """
         context = super().get_context_data(**kwargs)
         context['trip'] = self.trip
         section = self.trip.section
-        triptype = self.trip.template.triptype
-
-        triptype_pref = {
-            pref.registration_id: pref.preference
-            for pref in RegistrationTripTypeChoice.objects.filter(
-                triptype=triptype, preference__in=[AVAILABLE, PREFER, FIRST_CHOICE]
-            )
-        }
-        section_pref = {
-            pref.registration_id: pref.preference
-            for pref in RegistrationSectionChoice.objects.filter(
-                section=section, preference__in=[AVAILABLE, PREFER]
-            )
-        }
 
         # all external buses for this section
         buses = ExternalBus.objects.filter(trips_year=self.trips_year, section=section)
@@ -508,8 +501,7 @@ class AssignTrippee(_TripMixin, DatabaseListView):
                 kwargs={'trips_year': self.trips_year, 'trippee_pk': trippee.pk},
             )
             trippee.assignment_url = '%s?assign_to=%s' % (url, self.trip.pk)
-            trippee.triptype_pref = triptype_pref[reg.id]
-            trippee.section_pref = section_pref[reg.id]
+            trippee.section_pref, trippee.triptype_pref = self.candidates[reg.id]
 
             bus_requests = (
                 reg.bus_stop_round_trip,
@@ -554,6 +546,105 @@ class AssignTrippeeToTrip(FormValidMessageMixin, DatabaseUpdateView):
         return reverse('core:leader_index', kwargs={'trips_year': self.trips_year})
 
 
+class AutoAssignTrippees(DatabaseFormView):
+    """
+    Propose a trip for every unassigned trippee, and apply the proposal
+    with a single bulk update.
+
+    With ``?reassign=1`` the current assignments may be changed as well.
+    See ``fyt.trips.assignment``.
+    """
+
+    template_name = 'trips/auto_assign_trippees.html'
+
+    @cached_property
+    def reassign(self):
+        return bool(self.request.GET.get('reassign'))
+
+    def get_form(self, **kwargs):
+        return crispify(TrippeeAssignmentPlanForm(**kwargs), 'Apply these changes')
+
+    def get(self, request, *args, **kwargs):
+        assignment = TrippeeAssignment(self.trips_year, reassign=self.reassign)
+        changes, unplaced = assignment.solve()
+        form = self.get_form(
+            initial={'plan': TrippeeAssignmentPlanForm.sign(changes)}
+        )
+        context = self.get_context_data(
+            form=form,
+            changes=changes,
+            unplaced=unplaced,
+            summary=sorted(summarize(changes).items(), key=lambda item: -item[1]),
+            reassign=self.reassign,
+        )
+        return self.render_to_response(context)
+
+    def form_invalid(self, form):
+        messages.error(self.request, ' '.join(form.errors['plan']))
+        return HttpResponseRedirect(self.request.get_full_path())
+
+    def form_valid(self, form):
+        try:
+            count = apply_plan(self.trips_year, form.cleaned_data['plan'])
+        except StaleAssignment as e:
+            messages.error(
+                self.request,
+                '{}. Assignments have changed since these changes were '
+                'proposed; please review the new proposal.'.format(e),
+            )
+            return HttpResponseRedirect(self.request.get_full_path())
+
+        messages.success(self.request, 'Updated {} trip assignments'.format(count))
+        return HttpResponseRedirect(
+            reverse('core:leader_index', kwargs={'trips_year': self.trips_year})
+        )
+
+
+class AutoAssignLeaders(DatabaseFormView):
+    """
+    Propose trips for leader applicants, filling every trip with leaders,
+    and apply the proposal with a single bulk update.
+
+    See ``fyt.trips.assignment``.
+    """
+
+    template_name = 'trips/auto_assign_leaders.html'
+
+    def get_form(self, **kwargs):
+        return crispify(LeaderAssignmentPlanForm(**kwargs), 'Apply these changes')
+
+    def get(self, request, *args, **kwargs):
+        changes, unplaced = LeaderAssignment(self.trips_year).solve()
+        form = self.get_form(initial={'plan': LeaderAssignmentPlanForm.sign(changes)})
+        context = self.get_context_data(
+            form=form,
+            changes=changes,
+            unplaced=unplaced,
+            leaders_per_trip=LEADERS_PER_TRIP,
+        )
+        return self.render_to_response(context)
+
+    def form_invalid(self, form):
+        messages.error(self.request, ' '.join(form.errors['plan']))
+        return HttpResponseRedirect(self.request.get_full_path())
+
+    def form_valid(self, form):
+        try:
+            count = apply_leader_plan(self.trips_year, form.cleaned_data['plan'])
+        except StaleAssignment as e:
+            messages.error(
+                self.request,
+                '{}. Assignments have changed since these changes were '
+                'proposed; please review the new proposal.'.format(e),
+            )
+            return HttpResponseRedirect(self.request.get_full_path())
+
+        messages.success(self.request, 'Assigned {} leaders'.format(count))
+        return HttpResponseRedirect(
+            reverse('core:leader_index', kwargs={'trips_year': self.trips_year})
+        )
+
+
 class AssignLeader(_TripMixin, DatabaseListView):
     """
     Assign a leader to a trip.
@@ -774,6 +865,7 @@ class PacketsForSection(_SectionMixin, DatabaseListView):
     model = Trip
     template_name = 'trips/section_packet.html'
     context_object_name = 'trips'
+    packet_template = LEADER_TEMPLATE
 
     def get_queryset(self):
         return (
@@ -787,11 +879,21 @@ class PacketsForSection(_SectionMixin, DatabaseListView):
                 'template__pickup_stop',
                 'template__description',
             )
-            .prefetch_related(
-                'leaders', 'leaders__applicant', 'trippees', 'trippees__registration'
-            )
         )
 
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        # Only trips whose packets are not cached need their people
+        context['trips'] = packet_cache.prepare(
+            self.object_list,
+            self.packet_template,
+            'leaders',
+            'leaders__applicant',
+            'trippees',
+            'trippees__registration',
+        )
+        return context
+
 
 class MedicalInfoForSection(PacketsForSection):
     """
@@ -801,6 +903,28 @@ class MedicalInfoForSection(PacketsForSection):
     """
 
     template_name = 'trips/medical_packet.html'
+    packet_template = MEDICAL_TEMPLATE
+
+
+class PacketArtifactFile(DatabaseReadPermissionRequired, TripsYearMixin, DetailView):
+    """
+    A printable copy of a packet, from the ``build_packets`` task.
+
+    The files are served through this view, rather than linked to in
+    storage, because they show medical information.
+    """
+
+    model = PacketArtifact
+    CONTENT_TYPES = {'html': 'text/html', 'pdf': 'application/pdf'}
+
+    def get(self, request, *args, **kwargs):
+        artifact = self.get_object()
+        field = getattr(artifact, self.kwargs['format'])
+        if not field:
+            raise Http404('The packet has no {} copy'.format(self.kwargs['format']))
+        return FileResponse(
+            field.open('rb'), content_type=self.CONTENT_TYPES[self.kwargs['format']]
+        )
 
 
 class TrippeeChecklist(_SectionMixin, DatabaseListView):
@@ -840,12 +964,20 @@ class Checklists(DatabaseTemplateView):
         dates = Section.dates.leader_dates(self.trips_year)
         d = OrderedDict([date, []] for date in dates)
 
+        # Entries are (name, url, artifact), where artifact is the latest
+        # PacketArtifact rendered by ``build_packets``, if any.
+        artifacts = {
+            (artifact.kind, artifact.key): artifact
+            for artifact in PacketArtifact.objects.filter(trips_year=self.trips_year)
+        }
+
         for sxn in Section.objects.filter(trips_year=self.trips_year):
             kwargs = {'trips_year': self.trips_year, 'section_pk': sxn.pk}
             d[sxn.leaders_arrive].append(
                 (
                     'Section %s Leader Checkin' % sxn.name,
                     reverse('core:checklists:leaders', kwargs=kwargs),
+                    None,
                 )
             )
 
@@ -853,6 +985,7 @@ class Checklists(DatabaseTemplateView):
                 (
                     'Section %s Trippee Checkin' % sxn.name,
                     reverse('core:checklists:trippees', kwargs=kwargs),
+                    None,
                 )
             )
 
@@ -860,6 +993,7 @@ class Checklists(DatabaseTemplateView):
                 (
                     'Section %s Leader Packets' % sxn.name,
                     reverse('core:packets:section', kwargs=kwargs),
+                    artifacts.get((PacketArtifact.LEADER, str(sxn.pk))),
                 )
             )
 
@@ -867,6 +1001,7 @@ class Checklists(DatabaseTemplateView):
                 (
                     'Section %s Medical Information' % sxn.name,
                     reverse('core:packets:medical', kwargs=kwargs),
+                    artifacts.get((PacketArtifact.MEDICAL, str(sxn.pk))),
                 )
             )
 
@@ -879,6 +1014,7 @@ class Checklists(DatabaseTemplateView):
                         'core:internalbus:packet_for_date',
                         kwargs={'trips_year': self.trips_year, 'date': date},
                     ),
+                    artifacts.get((PacketArtifact.INTERNAL_BUS, date.isoformat())),
                 )
             )
 
@@ -889,6 +1025,17 @@ class Checklists(DatabaseTemplateView):
             bus_dict[bus.date_from_hanover].add(bus)
 
         for date, buses in bus_dict.items():
+            d[date].append(
+                (
+                    'External Bus Directions for %s' % date.strftime('%m/%d'),
+                    reverse(
+                        'core:externalbus:packet_for_date',
+                        kwargs={'trips_year': self.trips_year, 'date': date},
+                    ),
+                    artifacts.get((PacketArtifact.EXTERNAL_BUS, date.isoformat())),
+                )
+            )
+
             for bus in buses:
                 d[date].append(
                     (
@@ -901,6 +1048,7 @@ class Checklists(DatabaseTemplateView):
                                 'route_pk': bus.route.pk,
                             },
                         ),
+                        None,
                     )
                 )
 
@@ -911,6 +1059,7 @@ class Checklists(DatabaseTemplateView):
                             'core:reports:bus_riders',
                             kwargs={'trips_year': self.trips_year, 'bus_pk': bus.pk},
                         ),
+                        None,
                     )
                 )
 
@@ -4,7 +4,7 @@ from django.contrib import admin
 from django.views.generic import TemplateView
 
 from fyt.incoming.urls import settings_urlpatterns
-from fyt.views import HomePage, RaiseError
+from fyt.views import HomePage, Metrics, RaiseError
 
 
 admin.autodiscover()
@@ -18,9 +18,11 @@ urlpatterns = [
     url(r'^db/', include(('fyt.core.urls', 'core'))),
     url(r'^gear/', include(('fyt.gear.urls', 'gear'))),
     url(r'^incoming/', include(('fyt.incoming.urls', 'incoming'))),
+    url(r'^metrics/$', Metrics.as_view(), name='metrics'),
     url(r'^permissions/', include(('fyt.permissions.urls', 'permissions'))),
     # TODO: move this to a better namespace / general settings namespace
     url(r'^settings/', include((settings_urlpatterns, 'settings'))),
+    url(r'^tasks/', include(('fyt.tasks.urls', 'tasks'))),
     url(r'^test/error/', RaiseError.as_view(), name='raise_error'),
     url(r'^timetable/', include(('fyt.timetable.urls', 'timetable'))),
     url(r'^training/', include(('fyt.training.urls', 'training'))),
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from fyt.users.models import DartmouthUser
+
+
+class Command(BaseCommand):
+
+    help = (
+        'Lookup the emails of new users in the Dartmouth directory. Workers '
+        'do this every minute.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=50, help='Lookup at most this many users'
+        )
+
+    def handle(self, *args, **options):
+        found = DartmouthUser.objects.backfill_emails(batch_size=options['batch_size'])
+        if found:
+            self.stdout.write('Found %s emails' % found)
@@ -12,8 +12,9 @@ class UserEmailRequiredMiddleware(MiddlewareMixin):
     have them to enter it manually.
 
     A user will have a blank email if
-    :meth:`~fyt.users.models.DartmouthUserManager.create_user`
-    fails to lookup the email.
+    :meth:`~fyt.users.models.DartmouthUserManager.backfill_emails`
+    fails to lookup the email. Users are not asked while the lookup is
+    still pending.
     """
 
     def process_request(self, request):
@@ -27,6 +28,11 @@ class UserEmailRequiredMiddleware(MiddlewareMixin):
             # allow people to logout without updating email
             return None
 
-        if request.user.is_authenticated and not request.user.email:
+        user = request.user
+        if (
+            user.is_authenticated
+            and not user.email
+            and user.email_lookup != user.LOOKUP_PENDING
+        ):
             params = urlencode({auth.REDIRECT_FIELD_NAME: request.get_full_path()})
             return HttpResponseRedirect(update_url + '?' + params)
@@ -0,0 +1,28 @@
+# Generated by Django 3.1.2 on 2026-10-18 21:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0005_auto_20200411_1619'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dartmouthuser',
+            name='email_lookup',
+            field=models.CharField(blank=True, choices=[('', 'done'), ('PENDING', 'pending'), ('FAILED', 'failed')], default='', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='dartmouthuser',
+            name='email_lookup_attempts',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='dartmouthuser',
+            name='email_lookup_retry_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -1,9 +1,11 @@
 import logging
+from datetime import timedelta
 
 from django.contrib.auth.models import BaseUserManager, PermissionsMixin
 from django.db import models
+from django.utils import timezone
 
-from fyt.dartdm.lookup import EmailLookupException, lookup_email
+from fyt.dartdm.lookup import EmailLookupException, EmailNotFound, lookup_email
 
 log = logging.getLogger(__name__)
 
@@ -22,20 +24,56 @@ class DartmouthUserManager(BaseUserManager):
         Create the user if necessary. Does not search via name, since names
         from different sources (CAS, DartDm lookup) can be slightly different.
         """
-        (user, created) = self.get_or_create(netid=netid, defaults={"name": name})
+        # The CAS response does not contain the user's email, so it is
+        # looked up in the background by the ``backfill_emails`` task.
+        (user, created) = self.get_or_create(
+            netid=netid,
+            defaults={"name": name, "email_lookup": DartmouthUser.LOOKUP_PENDING},
+        )
+        return (user, created)
+
+    def backfill_emails(self, batch_size=50, max_attempts=5):
+        """
+        Lookup the emails of up to ``batch_size`` new users.
+
+        If the lookup fails it is retried with exponential backoff, up to
+        ``max_attempts`` times. Users who are not found, or whose lookups
+        keep failing, are asked to enter their email themselves.
 
-        # Try and lookup user's email in the Dartmouth Directory
-        # manager, since the CAS response does not contain the email.
-        # If not found, email is left empty.
-        if created:
+        Returns the number of users whose email was found.
+        """
+        now = timezone.now()
+        users = self.filter(
+            models.Q(email_lookup_retry_at__isnull=True)
+            | models.Q(email_lookup_retry_at__lte=now),
+            email_lookup=DartmouthUser.LOOKUP_PENDING,
+        ).order_by('pk')[:batch_size]
+
+        found = 0
+        for user in users:
             try:
-                user.email = lookup_email(netid)
-                user.save()
+                email = lookup_email(user.netid)
+            except EmailNotFound:
+                changes = {'email_lookup': DartmouthUser.LOOKUP_FAILED}
             except EmailLookupException:
-                log.error("Email not found for %s %s", name, netid)
-                pass
-
-        return (user, created)
+                attempts = user.email_lookup_attempts + 1
+                changes = {'email_lookup_attempts': attempts}
+                if attempts >= max_attempts:
+                    log.error("Email lookup failed for %s", user.netid)
+                    changes['email_lookup'] = DartmouthUser.LOOKUP_FAILED
+                else:
+                    delay = timedelta(minutes=2 ** attempts)
+                    changes['email_lookup_retry_at'] = now + delay
+            else:
+                changes = {'email': email, 'email_lookup': DartmouthUser.LOOKUP_DONE}
+                found += 1
+
+            # The user may have entered their email in the meantime
+            self.filter(pk=user.pk, email_lookup=DartmouthUser.LOOKUP_PENDING).update(
+                **changes
+            )
+
+        return found
 
     def create_superuser(self, **kwargs):
         raise Exception(
@@ -93,6 +131,23 @@ class DartmouthUser(PermissionsMixin):
     email = models.EmailField('email address')
     name = models.CharField(max_length=255, db_index=True)
 
+    LOOKUP_DONE = ''
+    LOOKUP_PENDING = 'PENDING'
+    LOOKUP_FAILED = 'FAILED'
+
+    email_lookup = models.CharField(
+        max_length=10,
+        blank=True,
+        default=LOOKUP_DONE,
+        choices=(
+            (LOOKUP_DONE, 'done'),
+            (LOOKUP_PENDING, 'pending'),
+            (LOOKUP_FAILED, 'failed'),
+        ),
+    )
+    email_lookup_attempts = models.PositiveSmallIntegerField(default=0)
+    email_lookup_retry_at = models.DateTimeField(blank=True, null=True)
+
     last_login = models.DateTimeField('last login', blank=True, null=True)
 
     class Meta:
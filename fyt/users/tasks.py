@@ -0,0 +1,16 @@
+from datetime import timedelta
+
+from fyt.tasks.queue import noop, task
+from fyt.users.models import DartmouthUser
+
+
+@task(every=timedelta(minutes=1))
+def backfill_emails(progress=noop):
+    """
+    Lookup the emails of new users
+
+    Failed lookups are retried with the backoff of
+    ``DartmouthUserManager.backfill_emails``.
+    """
+    found = DartmouthUser.objects.backfill_emails()
+    return {'messages': [('info', 'Found {} emails'.format(found))]}
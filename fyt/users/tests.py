@@ -1,9 +1,17 @@
+from io import StringIO
+
+import requests
+from django.core.management import call_command
 from django.test.utils import override_settings
 from django.urls import reverse
 from model_mommy import mommy
 
+from fyt.dartdm.lookup import DNDPROFILES_URL
+from fyt.tasks.queue import schedule_periodic
 from fyt.test import FytTestCase, vcr
 from fyt.users.models import MAX_NETID_LENGTH, DartmouthUser
+from fyt.users.tasks import backfill_emails
+from fyt.utils import http
 
 
 class UserManagerTestCase(FytTestCase):
@@ -28,6 +36,13 @@ class UserManagerTestCase(FytTestCase):
         user, _ = DartmouthUser.objects.get_or_create_by_netid('junk_netid', 'name')
         self.assertEqual(user.email, '')
 
+    def test_new_user_email_lookup_is_pending(self):
+        with http.fake_transport() as transport:
+            user, _ = DartmouthUser.objects.get_or_create_by_netid('d34898z', 'X')
+        self.assertEqual(transport.requests, [])
+        self.assertEqual(user.email, '')
+        self.assertEqual(user.email_lookup, DartmouthUser.LOOKUP_PENDING)
+
     def test_create_user_without_netid(self):
         name = 'name'
         email = 'email@email.org'
@@ -45,6 +60,80 @@ class UserManagerTestCase(FytTestCase):
         self.assertEqual(user.email, email)
 
 
+class BackfillEmailsTestCase(FytTestCase):
+    def setUp(self):
+        self.user, _ = DartmouthUser.objects.get_or_create_by_netid('d34898z', 'X')
+
+    def test_email_is_found(self):
+        with http.fake_transport() as transport:
+            transport.add(
+                DNDPROFILES_URL, json={'netid': 'd34898z', 'email': 'x@dartmouth.edu'}
+            )
+            call_command('backfill_emails', stdout=StringIO())
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.email, 'x@dartmouth.edu')
+        self.assertEqual(self.user.email_lookup, DartmouthUser.LOOKUP_DONE)
+
+    def test_backfill_task(self):
+        with http.fake_transport() as transport:
+            transport.add(
+                DNDPROFILES_URL, json={'netid': 'd34898z', 'email': 'x@dartmouth.edu'}
+            )
+            result = backfill_emails()
+
+        self.assertEqual(result['messages'], [('info', 'Found 1 emails')])
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.email, 'x@dartmouth.edu')
+
+    def test_backfill_runs_on_the_worker(self):
+        self.assertIsNotNone(backfill_emails.every)
+        self.assertIn(backfill_emails.name, [t.name for t in schedule_periodic()])
+
+    def test_email_is_not_found(self):
+        with http.fake_transport() as transport:
+            transport.add(DNDPROFILES_URL, json={})
+            self.assertEqual(DartmouthUser.objects.backfill_emails(), 0)
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.email, '')
+        self.assertEqual(self.user.email_lookup, DartmouthUser.LOOKUP_FAILED)
+
+    def test_failed_lookups_are_retried(self):
+        with http.fake_transport() as transport:
+            transport.add(DNDPROFILES_URL, exception=requests.ConnectionError())
+            DartmouthUser.objects.backfill_emails(max_attempts=2)
+
+            self.user.refresh_from_db()
+            self.assertEqual(self.user.email_lookup, DartmouthUser.LOOKUP_PENDING)
+            self.assertEqual(self.user.email_lookup_attempts, 1)
+            self.assertIsNotNone(self.user.email_lookup_retry_at)
+
+            # Not retried until the backoff expires
+            DartmouthUser.objects.backfill_emails(max_attempts=2)
+            self.assertEqual(len(transport.requests), 1)
+
+            DartmouthUser.objects.update(email_lookup_retry_at=None)
+            DartmouthUser.objects.backfill_emails(max_attempts=2)
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.email_lookup, DartmouthUser.LOOKUP_FAILED)
+
+    def test_entered_email_is_not_overwritten(self):
+        resp = self.app.get(reverse('users:update_email'), user=self.user)
+        resp.form['email'] = 'mine@test.com'
+        resp.form.submit()
+
+        with http.fake_transport() as transport:
+            transport.add(
+                DNDPROFILES_URL, json={'netid': 'd34898z', 'email': 'x@dartmouth.edu'}
+            )
+            DartmouthUser.objects.backfill_emails()
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.email, 'mine@test.com')
+
+
 class NetIdFieldTestCase(FytTestCase):
     def test_lowercase_conversion(self):
         netid = 'D34898Z'
@@ -81,6 +170,11 @@ class UserEmailMiddlewareTestCase(FytTestCase):
         self.user.refresh_from_db()
         self.assertEqual(self.user.email, 'd34898z@test.com')
 
+    def test_user_is_not_asked_while_lookup_is_pending(self):
+        self.user.email_lookup = DartmouthUser.LOOKUP_PENDING
+        self.user.save()
+        self.app.get('/', user=self.user, status=200)
+
     @override_settings(CAS_LOGOUT_COMPLETELY=False)
     def test_do_not_ask_for_email_when_logging_out(self):
         resp = self.app.get(reverse('users:logout'), user=self.user).follow()
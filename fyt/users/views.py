@@ -17,5 +17,10 @@ class UpdateEmail(LoginRequiredMixin, UpdateView):
     def get_form(self, **kwargs):
         return crispify(super().get_form(**kwargs), 'Update')
 
+    def form_valid(self, form):
+        # Stop any pending lookup from overwriting the new email
+        form.instance.email_lookup = DartmouthUser.LOOKUP_DONE
+        return super().form_valid(form)
+
     def get_success_url(self):
         return self.request.GET.get(auth.REDIRECT_FIELD_NAME, '/')
@@ -0,0 +1,254 @@
+"""
+In-process caching for small, rarely changing rows such as the current
+TripsYear and the Timetable, and shared caching of computations over a
+trips year.
+"""
+
+import copy
+import functools
+import hashlib
+import inspect
+import threading
+import time
+import uuid
+
+from django.core.cache import cache
+from django.db import connection, transaction
+
+
+_commit_hooks = threading.local()
+
+
+def on_commit_once(key, func):
+    """
+    Call ``func`` once the current transaction commits, unless a function
+    with the same ``key`` already runs at that commit.
+
+    Commit hooks run in order when the outermost transaction of a thread's
+    connection commits, and are dropped if it rolls back. So a hook which
+    was scheduled before another with the same key ran was part of that
+    same commit, and can be skipped.
+    """
+    if not hasattr(_commit_hooks, 'scheduled'):
+        _commit_hooks.scheduled = 0
+        _commit_hooks.ran = {}  # key -> hooks scheduled when it last ran
+
+    state = _commit_hooks
+    state.scheduled += 1
+    seq = state.scheduled
+
+    def hook():
+        if state.ran.get(key, 0) >= seq:
+            return
+        state.ran[key] = state.scheduled
+        func()
+
+    transaction.on_commit(hook)
+
+
+class SingletonCache:
+    """
+    Cache objects in process memory, invalidated through a version stamp.
+
+    The version stamp is stored in Django's cache. ``invalidate`` replaces
+    it once the current transaction commits. Every process compares the
+    stamp with the one its values were loaded under before using them, so
+    with a shared cache backend all gunicorn workers see changes right away.
+    With the default per-process cache, other workers pick up changes once
+    ``timeout`` seconds have passed.
+
+    Values are never read from or stored in the cache inside a transaction,
+    since the transaction could still be rolled back.
+    """
+
+    def __init__(self, name, timeout=60):
+        self.version_key = 'singleton-cache-version:{}'.format(name)
+        self.timeout = timeout
+        self.version = None
+        self.values = {}
+
+    def get(self, key, load):
+        """
+        Return a copy of the value cached under ``key``, calling ``load()``
+        to compute the value if it is not cached.
+        """
+        if connection.in_atomic_block:
+            return load()
+
+        now = time.monotonic()
+        version = cache.get(self.version_key)
+        if version != self.version:
+            self.values = {}
+            self.version = version
+
+        try:
+            value, loaded_at = self.values[key]
+        except KeyError:
+            pass
+        else:
+            if now - loaded_at < self.timeout:
+                # Copy so that callers cannot change the cached instance
+                return copy.deepcopy(value)
+
+        value = load()
+        self.values[key] = (value, now)
+        return copy.deepcopy(value)
+
+    def invalidate(self, **kwargs):
+        """
+        Invalidate the cache in all processes once the current transaction
+        commits.
+
+        Accepts arbitrary keyword arguments so it can be used as a signal
+        receiver.
+        """
+        transaction.on_commit(self._bump_version)
+
+    def _bump_version(self):
+        self.values = {}
+        cache.set(self.version_key, uuid.uuid4().hex, None)
+
+
+class TripsYearCache:
+    """
+    Cache computations over the data of a single trips year.
+
+    Models are grouped by app, and each (trips year, group) pair has a
+    version stamp which is replaced whenever a model in the group changes
+    in that trips year. Cached values are keyed by the versions of the
+    groups they were computed from, so writes invalidate them without
+    having to track individual keys.
+
+    Past trips years are cached indefinitely; the current trips year is
+    cached for ``timeout`` seconds. As with ``SingletonCache``, nothing is
+    read from or stored in the cache inside a transaction.
+    """
+
+    def __init__(self, prefix='trips-year-data', timeout=60 * 60):
+        self.prefix = prefix
+        self.timeout = timeout
+
+    @staticmethod
+    def group(model):
+        """
+        The version group of ``model``, which may be a model class,
+        an instance, or an app label.
+        """
+        if isinstance(model, str):
+            return model
+        return model._meta.app_label
+
+    def version_key(self, year, group):
+        return '{}:version:{}:{}'.format(self.prefix, year, group)
+
+    def versions(self, year, groups):
+        """
+        Return the current version stamps of ``groups`` in ``year``.
+        """
+        keys = [self.version_key(year, group) for group in groups]
+        found = cache.get_many(keys)
+        for key in keys:
+            if key not in found:
+                cache.add(key, uuid.uuid4().hex, None)
+                found[key] = cache.get(key)
+        return [found[key] for key in keys]
+
+    def invalidate(self, trips_year, *models):
+        """
+        Invalidate values computed from ``models`` in ``trips_year`` once
+        the current transaction commits.
+
+        Saving many objects in one transaction only bumps each version once.
+        """
+        year = _year(trips_year)
+        for group in {self.group(model) for model in models}:
+            key = self.version_key(year, group)
+            on_commit_once(key, functools.partial(self._bump, key))
+
+    @staticmethod
+    def _bump(key):
+        cache.set(key, uuid.uuid4().hex, None)
+
+    def update(self, queryset, trips_year, **kwargs):
+        """
+        ``queryset.update(**kwargs)``, which does not send signals, followed
+        by invalidating the model of ``queryset`` in ``trips_year``.
+        """
+        count = queryset.update(**kwargs)
+        self.invalidate(trips_year, queryset.model)
+        return count
+
+    def timeout_for(self, year):
+        from fyt.core.models import TripsYear
+
+        try:
+            current = TripsYear.objects.current()
+        except TripsYear.DoesNotExist:
+            return self.timeout
+        return None if year < current.year else self.timeout
+
+    def get_or_set(self, trips_year, name, models, compute):
+        """
+        Return the value cached under ``name`` for ``trips_year``, calling
+        ``compute()`` if it is missing or any of ``models`` has changed.
+        """
+        if connection.in_atomic_block:
+            return compute()
+
+        year = _year(trips_year)
+        groups = sorted({self.group(model) for model in models})
+        versions = self.versions(year, groups)
+        digest = hashlib.md5(
+            '{}:{}'.format(name, ':'.join(versions)).encode()
+        ).hexdigest()
+        key = '{}:{}:{}'.format(self.prefix, year, digest)
+
+        value = cache.get(key, _MISSING)
+        if value is _MISSING:
+            value = compute()
+            cache.set(key, value, self.timeout_for(year))
+        return value
+
+    def memoize(self, *models):
+        """
+        Decorate a function or method which takes a ``trips_year`` argument
+        to cache its results until any of ``models`` changes.
+
+        Arguments other than ``self`` and ``trips_year`` are part of the key
+        through their ``repr``.
+        """
+
+        def decorator(func):
+            signature = inspect.signature(func)
+            name = '{}.{}'.format(func.__module__, func.__qualname__)
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                arguments = signature.bind(*args, **kwargs).arguments
+                trips_year = arguments['trips_year']
+                extra = [
+                    (arg, value)
+                    for arg, value in arguments.items()
+                    if arg not in ('self', 'trips_year')
+                ]
+                return self.get_or_set(
+                    trips_year,
+                    '{}{!r}'.format(name, extra),
+                    models,
+                    lambda: func(*args, **kwargs),
+                )
+
+            return wrapper
+
+        return decorator
+
+
+_MISSING = object()
+
+
+def _year(trips_year):
+    """
+    The year of ``trips_year``, which may be a TripsYear, a year or a
+    string from a url.
+    """
+    return int(getattr(trips_year, 'pk', trips_year))
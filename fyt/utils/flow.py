@@ -0,0 +1,180 @@
+"""
+Minimum cost flow, for assigning people to trips.
+
+``MinCostFlow`` uses the primal-dual method: Dijkstra's algorithm, with
+node potentials, finds the cost of the cheapest augmenting path, then a
+blocking flow pushes as much flow as possible along every path of that
+cost at once. Costs are small integers in practice, so only a handful of
+phases are needed even for a full class of trippees.
+"""
+
+import heapq
+import math
+
+
+# Edge fields
+TO = 0
+CAPACITY = 1
+COST = 2
+REVERSE = 3
+
+
+class MinCostFlow:
+    """
+    A flow network on nodes ``0..size - 1``.
+
+    Costs must not be negative.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.graph = [[] for _ in range(size)]
+
+    def add_node(self):
+        self.graph.append([])
+        self.size += 1
+        return self.size - 1
+
+    def add_edge(self, frm, to, capacity, cost=0):
+        """
+        Add an edge and return it, as a ``(frm, index)`` handle for ``flow_on``.
+        """
+        if cost < 0:
+            raise ValueError('Costs must not be negative')
+        self.graph[frm].append([to, capacity, cost, len(self.graph[to])])
+        self.graph[to].append([frm, 0, -cost, len(self.graph[frm]) - 1])
+        return (frm, len(self.graph[frm]) - 1)
+
+    def flow_on(self, edge):
+        """
+        The flow pushed along the ``edge`` returned by ``add_edge``.
+        """
+        frm, index = edge
+        forward = self.graph[frm][index]
+        return self.graph[forward[TO]][forward[REVERSE]][CAPACITY]
+
+    def solve(self, source, sink, limit=math.inf):
+        """
+        Push as much flow as possible, up to ``limit``, from ``source`` to
+        ``sink`` at the least total cost.
+
+        Returns a ``(flow, cost)`` pair.
+        """
+        potential = [0] * self.size
+        flow = cost = 0
+
+        while flow < limit:
+            dist = self._distances(source, potential)
+            if dist[sink] == math.inf:
+                break
+            for node, d in enumerate(dist):
+                if d < math.inf:
+                    potential[node] += d
+
+            pushed = self._blocking_flow(source, sink, potential, limit - flow)
+            flow += pushed
+            cost += pushed * (potential[sink] - potential[source])
+
+        return flow, cost
+
+    def _distances(self, source, potential):
+        """
+        Dijkstra's algorithm over the residual network, with reduced costs.
+        """
+        dist = [math.inf] * self.size
+        dist[source] = 0
+        heap = [(0, source)]
+        while heap:
+            d, node = heapq.heappop(heap)
+            if d > dist[node]:
+                continue
+            base = d + potential[node]
+            for to, capacity, cost, _ in self.graph[node]:
+                if capacity > 0:
+                    nd = base + cost - potential[to]
+                    if nd < dist[to]:
+                        dist[to] = nd
+                        heapq.heappush(heap, (nd, to))
+        return dist
+
+    def _admissible(self, node, edge, potential):
+        return (
+            edge[CAPACITY] > 0
+            and edge[COST] + potential[node] - potential[edge[TO]] == 0
+        )
+
+    def _blocking_flow(self, source, sink, potential, limit):
+        """
+        Push flow along shortest paths, which are made of the edges with a
+        reduced cost of zero, until there are none left.
+        """
+        total = 0
+        while total < limit:
+            level = self._levels(source, potential)
+            if level[sink] is None:
+                break
+            pointers = [0] * self.size
+            while total < limit:
+                pushed = self._augment(
+                    source, sink, potential, level, pointers, limit - total
+                )
+                if not pushed:
+                    break
+                total += pushed
+        return total
+
+    def _levels(self, source, potential):
+        """
+        Breadth first distances from ``source`` along admissible edges.
+        """
+        level = [None] * self.size
+        level[source] = 0
+        frontier = [source]
+        while frontier:
+            next_frontier = []
+            for node in frontier:
+                for edge in self.graph[node]:
+                    if level[edge[TO]] is None and self._admissible(
+                        node, edge, potential
+                    ):
+                        level[edge[TO]] = level[node] + 1
+                        next_frontier.append(edge[TO])
+            frontier = next_frontier
+        return level
+
+    def _augment(self, source, sink, potential, level, pointers, limit):
+        """
+        Find one path in the level graph and push flow along it.
+
+        Iterative, since paths can be longer than the recursion limit.
+        """
+        path = []
+        node = source
+        while True:
+            if node == sink:
+                pushed = min([limit] + [self.graph[n][i][CAPACITY] for n, i in path])
+                for n, i in path:
+                    edge = self.graph[n][i]
+                    edge[CAPACITY] -= pushed
+                    self.graph[edge[TO]][edge[REVERSE]][CAPACITY] += pushed
+                return pushed
+
+            edges = self.graph[node]
+            while pointers[node] < len(edges):
+                edge = edges[pointers[node]]
+                if level[edge[TO]] == level[node] + 1 and self._admissible(
+                    node, edge, potential
+                ):
+                    break
+                pointers[node] += 1
+            else:
+                # Dead end: back up and skip the edge which led here
+                if not path:
+                    return 0
+                level[node] = None
+                node, _ = path.pop()
+                pointers[node] += 1
+                continue
+
+            path.append((node, pointers[node]))
+            node = edge[TO]
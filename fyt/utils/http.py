@@ -0,0 +1,317 @@
+"""
+Outbound HTTP to the services we depend on: CAS, the Dartmouth Directory,
+DND profiles and Google Maps.
+
+Each host gets one ``HostSession`` which pools its connections, applies
+connect and read timeouts to every request, retries failed idempotent
+requests with backoff, and records latency and errors per host. A circuit
+breaker fails requests to a host immediately after repeated failures, so
+that a slow or unavailable service cannot tie up every worker.
+
+Tests replace the network with a ``FakeTransport``::
+
+    with fake_transport() as transport:
+        transport.add('https://example.com/path', json={'ok': True})
+        ...
+"""
+
+import contextlib
+import json as jsonlib
+import threading
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from urllib3.util.retry import Retry
+
+from fyt.utils.metrics import (
+    DURATION_BUCKETS,
+    Histogram,
+    format_histogram,
+    format_labels,
+)
+
+
+# (connect, read) seconds
+DEFAULT_TIMEOUT = (3.05, 10)
+
+# Responses which mean that the host is overloaded or down
+UNAVAILABLE_STATUSES = (502, 503, 504)
+
+
+class CircuitOpenError(requests.ConnectionError):
+    """
+    Raised instead of making a request to a host which is failing.
+    """
+
+
+class CircuitBreaker:
+    """
+    Stop calling a host after ``failure_threshold`` consecutive failures.
+
+    Once ``reset_timeout`` seconds have passed a single trial request is
+    let through: if it succeeds the breaker closes again, otherwise it
+    stays open for another ``reset_timeout``.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.lock = threading.Lock()
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+
+    def allow(self):
+        with self.lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at >= self.reset_timeout:
+                    self.state = self.HALF_OPEN
+                    return True
+            return False
+
+    def record_success(self):
+        with self.lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+
+class HostMetrics:
+    def __init__(self):
+        self.latency = Histogram(DURATION_BUCKETS)
+        self.errors = Counter()
+
+
+class HttpMetricsRegistry:
+    """
+    Latency and errors of outbound requests, for each host.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.hosts = {}
+
+    def observe(self, host, seconds):
+        with self.lock:
+            self.hosts.setdefault(host, HostMetrics()).latency.observe(seconds)
+
+    def error(self, host, kind):
+        with self.lock:
+            self.hosts.setdefault(host, HostMetrics()).errors[kind] += 1
+
+    def clear(self):
+        with self.lock:
+            self.hosts = {}
+
+    def render(self):
+        """
+        Return the metrics in the Prometheus text exposition format.
+        """
+        with self.lock:
+            hosts = sorted(self.hosts.items())
+
+            name = 'fyt_http_client_duration_seconds'
+            lines = [
+                '# HELP {} Outbound HTTP request time'.format(name),
+                '# TYPE {} histogram'.format(name),
+            ]
+            for host, metrics in hosts:
+                lines.extend(format_histogram(name, {'host': host}, metrics.latency))
+
+            name = 'fyt_http_client_errors_total'
+            lines.append('# HELP {} Failed outbound HTTP requests'.format(name))
+            lines.append('# TYPE {} counter'.format(name))
+            for host, metrics in hosts:
+                for kind, count in sorted(metrics.errors.items()):
+                    lines.append(
+                        '{}{{{}}} {}'.format(
+                            name, format_labels(host=host, kind=kind), count
+                        )
+                    )
+
+        return '\n'.join(lines) + '\n'
+
+
+metrics = HttpMetricsRegistry()
+
+# Replaces the network while ``fake_transport`` is active
+_fake = None
+
+
+class HostSession(requests.Session):
+    """
+    A pooled session for the requests to a single host.
+
+    Responses with one of ``unavailable_statuses`` are retried and count
+    as failures for the circuit breaker.
+    """
+
+    def __init__(
+        self,
+        host,
+        timeout=DEFAULT_TIMEOUT,
+        retries=2,
+        backoff=0.3,
+        pool_maxsize=10,
+        unavailable_statuses=UNAVAILABLE_STATUSES,
+        breaker=None,
+    ):
+        super().__init__()
+        self.host = host
+        self.timeout = timeout
+        self.unavailable_statuses = unavailable_statuses
+        self.breaker = breaker or CircuitBreaker()
+
+        adapter = HTTPAdapter(
+            pool_maxsize=pool_maxsize,
+            max_retries=Retry(
+                total=retries,
+                backoff_factor=backoff,
+                status_forcelist=unavailable_statuses,
+                raise_on_status=False,
+            ),
+        )
+        self.mount('http://', adapter)
+        self.mount('https://', adapter)
+
+    def get_adapter(self, url):
+        if _fake is not None:
+            return _fake
+        return super().get_adapter(url)
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+
+        if not self.breaker.allow():
+            metrics.error(self.host, 'circuit_open')
+            raise CircuitOpenError('{} is unavailable'.format(self.host))
+
+        start = time.perf_counter()
+        try:
+            response = super().request(method, url, **kwargs)
+        except requests.Timeout:
+            self._failed('timeout')
+            raise
+        except requests.RequestException:
+            self._failed('connection')
+            raise
+        finally:
+            metrics.observe(self.host, time.perf_counter() - start)
+
+        if response.status_code >= 500:
+            metrics.error(self.host, 'status_{}'.format(response.status_code))
+        if response.status_code in self.unavailable_statuses:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        return response
+
+    def _failed(self, kind):
+        metrics.error(self.host, kind)
+        self.breaker.record_failure()
+
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def session(url, **options):
+    """
+    Return the shared session for the host of ``url``, created with the
+    ``HostSession`` ``options``.
+
+    Callers which pass different options get different sessions, each
+    with its own circuit breaker, so that one caller's retries or
+    timeouts never apply to another's. Option values must be hashable.
+    """
+    host = urlsplit(url).netloc or url
+    key = (host, tuple(sorted(options.items())))
+    with _sessions_lock:
+        if key not in _sessions:
+            _sessions[key] = HostSession(host, **options)
+        return _sessions[key]
+
+
+class FakeTransport(BaseAdapter):
+    """
+    A transport which answers requests with canned responses instead of
+    going to the network.
+
+    Responses are matched on the method and the URL without its query
+    string. Requests which were sent are kept in ``requests``.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.responses = {}
+        self.requests = []
+
+    def add(self, url, json=None, text='', status=200, method='GET', exception=None):
+        if json is not None:
+            text = jsonlib.dumps(json)
+        self.responses[(method, url)] = (status, text, exception)
+
+    def send(self, request, **kwargs):
+        self.requests.append(request)
+        url = request.url.split('?')[0]
+        try:
+            status, text, exception = self.responses[(request.method, url)]
+        except KeyError:
+            raise requests.ConnectionError(
+                'No fake response for {} {}'.format(request.method, url),
+                request=request,
+            )
+        if exception is not None:
+            raise exception
+
+        response = requests.Response()
+        response.status_code = status
+        response._content = text.encode()
+        response.encoding = 'utf-8'
+        response.headers = CaseInsensitiveDict()
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+
+@contextlib.contextmanager
+def fake_transport():
+    """
+    Send all requests through a ``FakeTransport`` within the block.
+
+    Circuit breakers are reset on the way in and out.
+    """
+    global _fake
+
+    def reset():
+        with _sessions_lock:
+            for host_session in _sessions.values():
+                host_session.breaker.record_success()
+
+    transport = FakeTransport()
+    _fake = transport
+    reset()
+    try:
+        yield transport
+    finally:
+        _fake = None
+        reset()
@@ -1,25 +1,71 @@
-from collections import OrderedDict
+from collections.abc import Mapping
 
 
-class OrderedMatrix(OrderedDict):
+class OrderedMatrix(Mapping):
     """
     Holds a matrix of objects.
 
     Unlike a numerical matrix, the entries can be keyed
     with any hashable object.
+
+    The entries are stored in a single flat list, indexed by a row map and
+    a column map. ``matrix[row]`` returns a lightweight view of that row
+    which supports ``row[col]`` lookups and assignment, iteration over the
+    columns and ``items()``, so the matrix can be used like a dict of dicts
+    (e.g. ``{% for row, cols in matrix.items %}`` in templates).
     """
 
     def __init__(self, rows, cols, default=None):
-        super().__init__()
         self.rows = rows
         self.cols = cols
+
+        self._col_index = {}
+        for c in cols:
+            self._col_index.setdefault(c, len(self._col_index))
+
+        width = len(self._col_index)
+        self._row_index = {}
         for r in rows:
-            self[r] = OrderedDict()
-            for c in cols:
-                if callable(default):
-                    self[r][c] = default()
-                else:
-                    self[r][c] = default
+            self._row_index.setdefault(r, len(self._row_index) * width)
+
+        size = len(self._row_index) * width
+        if callable(default):
+            self._data = [default() for _ in range(size)]
+        else:
+            self._data = [default] * size
+
+        # Entries assigned to columns outside of ``cols``, keyed by row offset
+        self._extra = {}
+
+    @classmethod
+    def _from_parts(cls, template, data, extra):
+        """
+        Build a matrix with the same shape as ``template`` around ``data``.
+
+        The row and column maps are shared, not copied.
+        """
+        new = cls.__new__(cls)
+        new.rows = template.rows
+        new.cols = template.cols
+        new._col_index = template._col_index
+        new._row_index = template._row_index
+        new._data = data
+        new._extra = extra
+        return new
+
+    def __getitem__(self, row):
+        return MatrixRow(self, self._row_index[row])
+
+    def __iter__(self):
+        return iter(self._row_index)
+
+    def __len__(self):
+        return len(self._row_index)
+
+    def __repr__(self):
+        return '{}({!r})'.format(
+            type(self).__name__, {row: dict(cols) for row, cols in self.items()}
+        )
 
     def truncate(self):
         """
@@ -27,10 +73,15 @@ class OrderedMatrix(OrderedDict):
 
         Note: this mutates the original matrix.
         """
-        empty = [row for row, cols in self.items() if not any(cols.values())]
+        data = self._data
+        width = len(self._col_index)
 
-        for row in empty:
-            self.pop(row)
+        self._row_index = {
+            row: offset
+            for row, offset in self._row_index.items()
+            if any(data[offset : offset + width])
+            or any(self._extra.get(offset, {}).values())
+        }
 
         return self
 
@@ -41,8 +92,75 @@ class OrderedMatrix(OrderedDict):
         Returns a new OrderedMatrix with each entry set as
         new[row][col] = func(orig[row][col])
         """
-        new = OrderedMatrix(self.rows, self.cols)
-        for row in self.rows:
-            for col in self.cols:
-                new[row][col] = func(self[row][col])
-        return new
+        data = self._data
+        width = len(self._col_index)
+
+        if len(self._row_index) * width == len(data):
+            new_data = [func(x) for x in data]
+        else:  # Truncated: only map the remaining rows
+            new_data = [None] * len(data)
+            for offset in self._row_index.values():
+                new_data[offset : offset + width] = map(
+                    func, data[offset : offset + width]
+                )
+
+        extra = {
+            offset: {col: func(x) for col, x in cols.items()}
+            for offset, cols in self._extra.items()
+        }
+        return self._from_parts(self, new_data, extra)
+
+
+class MatrixRow(Mapping):
+    """
+    A view of one row of an OrderedMatrix.
+    """
+
+    __slots__ = ('_matrix', '_offset')
+
+    def __init__(self, matrix, offset):
+        self._matrix = matrix
+        self._offset = offset
+
+    def __getitem__(self, col):
+        matrix = self._matrix
+        try:
+            index = matrix._col_index[col]
+        except KeyError:
+            return matrix._extra[self._offset][col]
+        return matrix._data[self._offset + index]
+
+    def __setitem__(self, col, value):
+        matrix = self._matrix
+        try:
+            index = matrix._col_index[col]
+        except KeyError:
+            matrix._extra.setdefault(self._offset, {})[col] = value
+        else:
+            matrix._data[self._offset + index] = value
+
+    def _cells(self):
+        width = len(self._matrix._col_index)
+        return self._matrix._data[self._offset : self._offset + width]
+
+    def __iter__(self):
+        yield from self._matrix._col_index
+        yield from self._matrix._extra.get(self._offset, ())
+
+    def __len__(self):
+        return len(self._matrix._col_index) + len(
+            self._matrix._extra.get(self._offset, ())
+        )
+
+    def items(self):
+        extra = self._matrix._extra.get(self._offset, {})
+        return list(zip(self._matrix._col_index, self._cells())) + list(
+            extra.items()
+        )
+
+    def values(self):
+        extra = self._matrix._extra.get(self._offset, {})
+        return self._cells() + list(extra.values())
+
+    def __repr__(self):
+        return repr(dict(self.items()))
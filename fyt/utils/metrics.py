@@ -0,0 +1,235 @@
+"""
+In-process request metrics, exported in the Prometheus text format.
+
+Each process keeps its own metrics, and a scrape only sees the worker
+which handled it, so every series is labelled with the ``pid`` of its
+process. Each worker's counters are then separate series which only go
+up until that worker restarts, and can be combined in queries with, for
+example, ``sum without (pid) (rate(fyt_request_duration_seconds_count[5m]))``.
+"""
+
+import bisect
+import os
+import re
+import threading
+import time
+from collections import Counter
+
+
+INF = float('inf')
+
+DURATION_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, INF)
+QUERY_COUNT_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, INF)
+
+
+class Histogram:
+    """
+    A cumulative histogram, as in Prometheus.
+    """
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative_counts(self):
+        total = 0
+        for le, count in zip(self.buckets, self.counts):
+            total += count
+            yield le, total
+
+
+# Collapse literal values and IN lists so that queries with the same
+# structure have the same shape.
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_IN_LISTS = re.compile(r'\((?:\s*%s\s*,)+\s*%s\s*\)')
+
+
+def query_shape(sql):
+    """
+    Return ``sql`` with parameters and literals replaced by placeholders.
+    """
+    return _IN_LISTS.sub('(%s, ...)', _LITERALS.sub('%s', sql))
+
+
+class QueryRecorder:
+    """
+    Database execute wrapper which records the queries run by a request.
+
+    Use with ``connection.execute_wrapper``.
+    """
+
+    def __init__(self):
+        self.queries = []  # (sql, seconds)
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((sql, time.perf_counter() - start))
+
+    @property
+    def count(self):
+        return len(self.queries)
+
+    @property
+    def seconds(self):
+        return sum(seconds for _, seconds in self.queries)
+
+    def duplicates(self, n=None):
+        """
+        The ``n`` most frequently repeated query shapes, with their counts.
+        """
+        shapes = Counter(query_shape(sql) for sql, _ in self.queries)
+        return [(shape, count) for shape, count in shapes.most_common(n) if count > 1]
+
+    def slowest(self, n=None):
+        return sorted(self.queries, key=lambda q: q[1], reverse=True)[:n]
+
+
+class ViewMetrics:
+    def __init__(self):
+        self.duration = Histogram(DURATION_BUCKETS)
+        self.query_count = Histogram(QUERY_COUNT_BUCKETS)
+        self.query_duration = Histogram(DURATION_BUCKETS)
+        self.duplicate_queries = 0
+        self.duplicate_shapes = Counter()
+
+
+def _escape(value):
+    return value.replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def _format_le(le):
+    return '+Inf' if le == INF else '{:g}'.format(le)
+
+
+def format_labels(**labels):
+    """
+    Format ``labels``, after the pid of this process, as a Prometheus
+    label set.
+    """
+    pairs = [('pid', str(os.getpid()))] + list(labels.items())
+    return ','.join('{}="{}"'.format(k, _escape(str(v))) for k, v in pairs)
+
+
+def format_histogram(name, labels, histogram):
+    """
+    The sample lines of ``histogram``, a ``Histogram``, with ``labels``.
+    """
+    lines = [
+        '{}_bucket{{{}}} {}'.format(
+            name, format_labels(**labels, le=_format_le(le)), count
+        )
+        for le, count in histogram.cumulative_counts()
+    ]
+    lines.append('{}_sum{{{}}} {}'.format(name, format_labels(**labels), histogram.sum))
+    lines.append(
+        '{}_count{{{}}} {}'.format(name, format_labels(**labels), histogram.count)
+    )
+    return lines
+
+
+class MetricsRegistry:
+    """
+    Request metrics for each view.
+    """
+
+    HISTOGRAMS = [
+        ('duration', 'fyt_request_duration_seconds', 'Request wall time'),
+        ('query_count', 'fyt_request_queries', 'SQL queries per request'),
+        (
+            'query_duration',
+            'fyt_request_query_duration_seconds',
+            'Time spent in SQL per request',
+        ),
+    ]
+
+    # The most duplicated query shapes of each request are exported, up
+    # to a limit per view to bound the number of series
+    TOP_DUPLICATES = 3
+    MAX_SHAPES_PER_VIEW = 10
+    MAX_SHAPE_LENGTH = 500
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.views = {}
+
+    def observe(self, view, seconds, recorder):
+        """
+        Record a request to ``view`` which took ``seconds`` and ran the
+        queries in ``recorder``.
+        """
+        duplicates = recorder.duplicates()
+
+        with self.lock:
+            metrics = self.views.setdefault(view, ViewMetrics())
+            metrics.duration.observe(seconds)
+            metrics.query_count.observe(recorder.count)
+            metrics.query_duration.observe(recorder.seconds)
+            metrics.duplicate_queries += sum(count - 1 for _, count in duplicates)
+
+            shapes = metrics.duplicate_shapes
+            for shape, count in duplicates[: self.TOP_DUPLICATES]:
+                shape = shape[: self.MAX_SHAPE_LENGTH]
+                if shape in shapes or len(shapes) < self.MAX_SHAPES_PER_VIEW:
+                    shapes[shape] += count - 1
+
+    def clear(self):
+        with self.lock:
+            self.views = {}
+
+    def render(self):
+        """
+        Return all metrics in the Prometheus text exposition format.
+        """
+        with self.lock:
+            views = sorted(self.views.items())
+            lines = []
+
+            for attr, name, help_text in self.HISTOGRAMS:
+                lines.append('# HELP {} {}'.format(name, help_text))
+                lines.append('# TYPE {} histogram'.format(name))
+                for view, metrics in views:
+                    lines.extend(
+                        format_histogram(name, {'view': view}, getattr(metrics, attr))
+                    )
+
+            name = 'fyt_request_duplicate_queries_total'
+            lines.append(
+                '# HELP {} Queries repeating the shape of an earlier query '
+                'in the same request'.format(name)
+            )
+            lines.append('# TYPE {} counter'.format(name))
+            for view, metrics in views:
+                lines.append(
+                    '{}{{{}}} {}'.format(
+                        name, format_labels(view=view), metrics.duplicate_queries
+                    )
+                )
+
+            name = 'fyt_request_duplicated_query_shapes_total'
+            lines.append(
+                '# HELP {} Repeats of the most duplicated query shapes of '
+                'each view'.format(name)
+            )
+            lines.append('# TYPE {} counter'.format(name))
+            for view, metrics in views:
+                for shape, count in sorted(metrics.duplicate_shapes.items()):
+                    lines.append(
+                        '{}{{{}}} {}'.format(
+                            name, format_labels(view=view, shape=shape), count
+                        )
+                    )
+
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
@@ -0,0 +1,175 @@
+"""
+Keyset pagination for querysets.
+
+Instead of skipping rows with an OFFSET, each page after the first is
+fetched by seeking past the sort keys of the last row of the previous
+page, so every page is a range scan which costs the same no matter how
+deep into the results it is, and no total count is needed.
+"""
+
+import json
+
+from django.core import signing
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+
+
+class _JSONSerializer:
+    """
+    Serialize cursors with support for decimals and dates.
+    """
+
+    def dumps(self, obj):
+        return json.dumps(obj, separators=(',', ':'), cls=DjangoJSONEncoder).encode(
+            'latin-1'
+        )
+
+    def loads(self, data):
+        return json.loads(data.decode('latin-1'))
+
+
+def _expand(model, name, annotations, prefix=''):
+    """
+    Return the ``(lookup, descending)`` keys which ordering by ``name``
+    orders by, following the default ordering of related models.
+    """
+    if not isinstance(name, str):
+        raise TypeError('Cannot paginate by the expression {!r}'.format(name))
+
+    descending = name.startswith('-')
+    name = name.lstrip('-')
+
+    if name == 'pk' or '__' in name or (not prefix and name in annotations):
+        return [(prefix + name, descending)]
+
+    field = model._meta.get_field(name)
+    if not field.is_relation:
+        return [(prefix + name, descending)]
+
+    related = field.related_model
+    return [
+        (lookup, related_descending != descending)
+        for ordering in related._meta.ordering or ['pk']
+        for lookup, related_descending in _expand(
+            related, ordering, {}, prefix + name + '__'
+        )
+    ]
+
+
+def order_keys(queryset):
+    """
+    The ``(lookup, descending)`` keys that ``queryset`` is ordered by, with
+    the primary key added to break ties.
+    """
+    query = queryset.query
+    if query.order_by:
+        ordering = query.order_by
+    elif query.default_ordering:
+        ordering = queryset.model._meta.ordering
+    else:
+        ordering = []
+
+    keys = []
+    for name in ordering:
+        keys.extend(_expand(queryset.model, name, query.annotations))
+
+    if not any(lookup == 'pk' for lookup, _ in keys):
+        keys.append(('pk', False))
+    return keys
+
+
+def _value(obj, lookup):
+    for attr in lookup.split('__'):
+        obj = getattr(obj, attr)
+    return obj
+
+
+class KeysetPage:
+    """
+    A page of results, with the cursor of the next page.
+    """
+
+    def __init__(self, object_list, next_cursor, is_first):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.is_first = is_first
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+class KeysetPaginator:
+    """
+    Paginate ``queryset`` by its current ordering.
+
+    Cursors are signed, and include the sort keys they were made for. An
+    invalid cursor, or one from a different ordering, gives the first
+    page. The sort keys must not be null.
+    """
+
+    salt = 'fyt.utils.pagination'
+
+    def __init__(self, queryset, per_page):
+        self.keys = order_keys(queryset)
+        self.queryset = queryset.order_by(
+            *[('-' if descending else '') + lookup for lookup, descending in self.keys]
+        )
+        self.per_page = per_page
+
+    def page(self, cursor=None):
+        values = self.decode(cursor)
+        queryset = self.queryset
+        if values is not None:
+            queryset = queryset.filter(self.seek(values))
+
+        # Fetch one extra row to find out if there is a next page
+        rows = list(queryset[: self.per_page + 1])
+        next_cursor = None
+        if len(rows) > self.per_page:
+            rows = rows[: self.per_page]
+            next_cursor = self.encode(rows[-1])
+
+        return KeysetPage(rows, next_cursor, is_first=values is None)
+
+    def seek(self, values):
+        """
+        Filter for the rows which come after the row with sort key
+        ``values``::
+
+            a > x OR (a = x AND b > y) OR (a = x AND b = y AND pk > z) ...
+        """
+        condition = Q()
+        equal = {}
+        for (lookup, descending), value in zip(self.keys, values):
+            after = '{}__{}'.format(lookup, 'lt' if descending else 'gt')
+            condition |= Q(**equal, **{after: value})
+            equal[lookup] = value
+        return condition
+
+    def encode(self, obj):
+        values = [_value(obj, lookup) for lookup, _ in self.keys]
+        return signing.dumps(
+            {'keys': self.keys, 'values': values},
+            salt=self.salt,
+            serializer=_JSONSerializer,
+            compress=True,
+        )
+
+    def decode(self, cursor):
+        if not cursor:
+            return None
+        try:
+            data = signing.loads(cursor, salt=self.salt, serializer=_JSONSerializer)
+        except signing.BadSignature:
+            return None
+
+        if data['keys'] != [list(key) for key in self.keys]:
+            return None
+        return data['values']
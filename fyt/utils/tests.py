@@ -1,14 +1,27 @@
+import os
 import unittest
+from unittest import mock
+
+import requests
 
 from django.core.exceptions import ValidationError
+from django.db.models import Count
 from django.template import Context, Template
+from django.urls import reverse
 from model_mommy import mommy
 
+from fyt.core.managers import trips_data_cache
 from fyt.test import FytTestCase
-from fyt.trips.models import Section
+from fyt.utils import http
+from fyt.trips.models import Section, Trip
+from fyt.users.models import DartmouthUser
+from fyt.utils.cache import SingletonCache, TripsYearCache, on_commit_once
+from fyt.utils.flow import MinCostFlow
 from fyt.utils.fmt import join_with_and, join_with_or, section_range
 from fyt.utils.lat_lng import parse_lat_lng, validate_lat_lng
 from fyt.utils.matrix import OrderedMatrix
+from fyt.utils.metrics import QueryRecorder, query_shape, registry
+from fyt.utils.pagination import KeysetPaginator, order_keys
 
 
 class OrderedMatrixTestCase(unittest.TestCase):
@@ -33,6 +46,310 @@ class OrderedMatrixTestCase(unittest.TestCase):
         n = m.map(lambda x: x + 1)
         self.assertEqual(m[0][0], 0)
 
+    def test_default_factory(self):
+        m = OrderedMatrix([0, 1], [0, 1], default=list)
+        m[0][1].append('a')
+        self.assertEqual(m, {0: {0: [], 1: ['a']}, 1: {0: [], 1: []}})
+
+    def test_rows_behave_like_ordered_dicts(self):
+        m = OrderedMatrix(['b', 'a'], [2, 1], default=0)
+        m['a'][1] += 3
+        self.assertEqual(list(m), ['b', 'a'])
+        self.assertEqual(list(m['a']), [2, 1])
+        self.assertEqual(m['a'].items(), [(2, 0), (1, 3)])
+        self.assertEqual(list(m['a'].values()), [0, 3])
+        self.assertEqual(len(m['a']), 2)
+        with self.assertRaises(KeyError):
+            m['c']
+
+    def test_assign_to_unknown_column(self):
+        m = OrderedMatrix([0, 1], [0])
+        m[1]['x'] = True
+        self.assertEqual(m, {0: {0: None}, 1: {0: None, 'x': True}})
+        self.assertEqual(m.truncate(), {1: {0: None, 'x': True}})
+
+    def test_truncate_does_not_change_mapped_matrices(self):
+        m = OrderedMatrix([0, 1], [0, 1], default=0)
+        m[1][0] = 1
+        n = m.map(lambda x: x + 1)
+        m.truncate()
+        self.assertEqual(list(m), [1])
+        self.assertEqual(list(n), [0, 1])
+
+    def test_map_truncated_matrix(self):
+        m = OrderedMatrix([0, 1, 2], [0], default=0)
+        m[1][0] = 1
+        n = m.truncate().map(lambda x: x * 10)
+        self.assertEqual(n, {1: {0: 10}})
+
+
+@mock.patch('fyt.utils.cache.transaction.on_commit', lambda func: func())
+@mock.patch('fyt.utils.cache.connection', mock.Mock(in_atomic_block=False))
+class SingletonCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.cache = SingletonCache(self.id())
+        self.load = mock.Mock(return_value=['value'])
+
+    def test_value_is_cached(self):
+        self.assertEqual(self.cache.get('key', self.load), ['value'])
+        self.assertEqual(self.cache.get('key', self.load), ['value'])
+        self.load.assert_called_once_with()
+
+    def test_returns_copies(self):
+        self.cache.get('key', self.load).append('changed')
+        self.assertEqual(self.cache.get('key', self.load), ['value'])
+
+    def test_invalidate(self):
+        self.cache.get('key', self.load)
+        self.cache.invalidate()
+        self.cache.get('key', self.load)
+        self.assertEqual(self.load.call_count, 2)
+
+    def test_invalidate_from_another_process(self):
+        self.cache.get('key', self.load)
+        SingletonCache(self.id()).invalidate()
+        self.cache.get('key', self.load)
+        self.assertEqual(self.load.call_count, 2)
+
+    def test_timeout(self):
+        self.cache.timeout = 0
+        self.cache.get('key', self.load)
+        self.cache.get('key', self.load)
+        self.assertEqual(self.load.call_count, 2)
+
+    def test_bypassed_in_transactions(self):
+        with mock.patch('fyt.utils.cache.connection', mock.Mock(in_atomic_block=True)):
+            self.cache.get('key', self.load)
+            self.cache.get('key', self.load)
+        self.assertEqual(self.load.call_count, 2)
+
+
+class MinCostFlowTestCase(unittest.TestCase):
+    def assignment(self, costs, capacities):
+        """
+        Assign each row of ``costs`` to a column, which are nodes with
+        ``capacities``. Returns the column of each row and the total cost.
+        """
+        rows, cols = len(costs), len(capacities)
+        network = MinCostFlow(2 + rows + cols)
+        for col, capacity in enumerate(capacities):
+            network.add_edge(2 + rows + col, 1, capacity)
+
+        edges = []
+        for row, row_costs in enumerate(costs):
+            network.add_edge(0, 2 + row, 1)
+            edges.append(
+                {
+                    col: network.add_edge(2 + row, 2 + rows + col, 1, cost)
+                    for col, cost in row_costs.items()
+                }
+            )
+
+        flow, cost = network.solve(0, 1)
+        assigned = [
+            next((col for col, edge in row.items() if network.flow_on(edge)), None)
+            for row in edges
+        ]
+        return assigned, cost
+
+    def test_beats_greedy(self):
+        # Greedily giving row 0 its cheapest column leaves row 1 with cost 9
+        costs = [{0: 0, 1: 1}, {0: 0, 1: 9}]
+        self.assertEqual(self.assignment(costs, [1, 1]), ([1, 0], 1))
+
+    def test_maximizes_flow_before_cost(self):
+        costs = [{0: 5}, {0: 0, 1: 9}]
+        self.assertEqual(self.assignment(costs, [1, 1]), ([0, 1], 14))
+
+    def test_capacity(self):
+        costs = [{0: 0}, {0: 0}, {0: 0}]
+        assigned, cost = self.assignment(costs, [2])
+        self.assertEqual(sorted(assigned, key=str), [0, 0, None])
+
+    def test_long_augmenting_paths(self):
+        # Each row prefers the only column of the row before it, so the
+        # whole chain has to shift over
+        n = 2000
+        costs = [{0: 0}] + [{i - 1: 0, i: 1} for i in range(1, n)]
+        assigned, cost = self.assignment(costs, [1] * n)
+        self.assertEqual(assigned, list(range(n)))
+        self.assertEqual(cost, n - 1)
+
+    def test_limit(self):
+        network = MinCostFlow(2)
+        network.add_edge(0, 1, 10, 1)
+        self.assertEqual(network.solve(0, 1, limit=3), (3, 3))
+
+    def test_negative_costs_are_rejected(self):
+        with self.assertRaises(ValueError):
+            MinCostFlow(2).add_edge(0, 1, 1, -1)
+
+
+class TripsYearCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.cache = TripsYearCache(prefix=self.id())
+        self.compute = mock.Mock(return_value=['value'])
+
+        @self.cache.memoize('trips')
+        def matrix(trips_year, option=None):
+            return self.compute(trips_year, option)
+
+        self.matrix = matrix
+
+    def test_value_is_cached(self):
+        self.assertEqual(self.matrix(2014), ['value'])
+        self.assertEqual(self.matrix(2014), ['value'])
+        self.compute.assert_called_once_with(2014, None)
+
+    def test_years_and_arguments_are_cached_separately(self):
+        self.matrix(2014)
+        self.matrix('2015')
+        self.matrix(2014, option=True)
+        self.assertEqual(self.compute.call_count, 3)
+
+    def test_invalidate_group(self):
+        self.matrix(2014)
+        self.cache.invalidate(2014, Section)
+        self.matrix(2014)
+        self.assertEqual(self.compute.call_count, 2)
+
+    def test_invalidate_other_group_or_year(self):
+        self.matrix(2014)
+        self.cache.invalidate(2014, 'transport')
+        self.cache.invalidate(2015, 'trips')
+        self.matrix(2014)
+        self.compute.assert_called_once_with(2014, None)
+
+    def test_bypassed_in_transactions(self):
+        with mock.patch('fyt.utils.cache.connection', mock.Mock(in_atomic_block=True)):
+            self.matrix(2014)
+            self.matrix(2014)
+        self.assertEqual(self.compute.call_count, 2)
+
+
+class TripsYearCacheSignalsTestCase(FytTestCase):
+    def setUp(self):
+        self.init_trips_year()
+        self.init_old_trips_year()
+
+    def test_past_trips_years_do_not_expire(self):
+        self.assertIsNone(trips_data_cache.timeout_for(self.old_trips_year.year))
+        self.assertEqual(
+            trips_data_cache.timeout_for(self.trips_year.year),
+            trips_data_cache.timeout,
+        )
+
+    def test_saving_database_model_invalidates_group(self):
+        with mock.patch.object(trips_data_cache, 'invalidate') as invalidate:
+            mommy.make(Section, trips_year=self.trips_year)
+        invalidate.assert_called_with(self.trips_year.pk, Section)
+
+    def test_one_version_bump_per_group_in_a_transaction(self):
+        hooks = []
+        with mock.patch('fyt.utils.cache.transaction.on_commit', hooks.append):
+            with mock.patch.object(trips_data_cache, '_bump') as bump:
+                mommy.make(Trip, trips_year=self.trips_year, _quantity=2)
+                for hook in hooks:
+                    hook()
+
+        key = trips_data_cache.version_key(self.trips_year.pk, 'trips')
+        self.assertEqual(bump.call_args_list.count(mock.call(key)), 1)
+
+
+class OnCommitOnceTestCase(unittest.TestCase):
+    def setUp(self):
+        self.hooks = []
+        patcher = mock.patch('fyt.utils.cache.transaction.on_commit', self.hooks.append)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def commit(self):
+        hooks, self.hooks[:] = list(self.hooks), []
+        for hook in hooks:
+            hook()
+
+    def test_runs_once_per_commit(self):
+        a, b = mock.Mock(), mock.Mock()
+        on_commit_once('a', a)
+        on_commit_once('a', a)
+        on_commit_once('b', b)
+        self.commit()
+        a.assert_called_once_with()
+        b.assert_called_once_with()
+
+        on_commit_once('a', a)
+        self.commit()
+        self.assertEqual(a.call_count, 2)
+
+    def test_rolled_back_hooks_do_not_suppress_later_ones(self):
+        func = mock.Mock()
+        on_commit_once('key', func)
+        self.hooks.clear()  # Rolled back
+
+        on_commit_once('key', func)
+        self.commit()
+        func.assert_called_once_with()
+
+
+class KeysetPaginatorTestCase(FytTestCase):
+    def setUp(self):
+        for name in ['b', 'a', 'c', 'a', 'b', 'a']:
+            mommy.make(DartmouthUser, name=name)
+
+    def pages(self, queryset, per_page):
+        paginator = KeysetPaginator(queryset, per_page)
+        page = paginator.page()
+        pages = [page.object_list]
+        while page.has_next:
+            page = paginator.page(page.next_cursor)
+            pages.append(page.object_list)
+        return pages
+
+    def test_order_keys(self):
+        self.assertEqual(
+            order_keys(DartmouthUser.objects.all()), [('name', False), ('pk', False)]
+        )
+        self.assertEqual(
+            order_keys(DartmouthUser.objects.order_by('-name', '-pk')),
+            [('name', True), ('pk', True)],
+        )
+
+    def test_order_keys_follow_relations(self):
+        self.assertEqual(
+            order_keys(Trip.objects.order_by('-section', 'pk')),
+            [('section__name', True), ('pk', False)],
+        )
+
+    def test_pages(self):
+        users = list(DartmouthUser.objects.order_by('name', 'pk'))
+        pages = self.pages(DartmouthUser.objects.all(), 4)
+        self.assertEqual(pages, [users[:4], users[4:]])
+
+    def test_descending_pages_with_ties(self):
+        users = list(DartmouthUser.objects.order_by('-name', 'pk'))
+        pages = self.pages(DartmouthUser.objects.order_by('-name'), 2)
+        self.assertEqual(pages, [users[:2], users[2:4], users[4:]])
+
+    def test_pages_filtered_on_annotations(self):
+        queryset = DartmouthUser.objects.annotate(n=Count('pk')).order_by('-name')
+        users = list(queryset.order_by('-name', 'pk'))
+        self.assertEqual(sum(self.pages(queryset, 5), []), users)
+
+    def test_first_page(self):
+        page = KeysetPaginator(DartmouthUser.objects.all(), 10).page()
+        self.assertTrue(page.is_first)
+        self.assertFalse(page.has_next)
+        self.assertEqual(len(page), 6)
+
+    def test_invalid_cursors_give_first_page(self):
+        paginator = KeysetPaginator(DartmouthUser.objects.all(), 2)
+        cursor = paginator.page().next_cursor
+        self.assertFalse(paginator.page(cursor).is_first)
+
+        self.assertTrue(paginator.page(cursor + 'x').is_first)
+        other = KeysetPaginator(DartmouthUser.objects.order_by('-name'), 2)
+        self.assertTrue(other.page(cursor).is_first)
+
 
 class FmtUtilsTest(FytTestCase):
     def test_section_range(self):
@@ -92,3 +409,153 @@ class UrlencodeTagTestCase(FytTestCase):
             out.strip(),
             ['param1=1&amp;param2=test+this', 'param2=test+this&amp;param1=1'],
         )
+
+
+class MetricsTestCase(FytTestCase):
+    def setUp(self):
+        registry.clear()
+
+    def test_query_shape(self):
+        self.assertEqual(
+            query_shape("SELECT * FROM t WHERE a = 'x' AND b IN (%s, %s, %s)"),
+            "SELECT * FROM t WHERE a = %s AND b IN (%s, ...)",
+        )
+
+    def test_query_recorder_duplicates(self):
+        recorder = QueryRecorder()
+        recorder.queries = [
+            ('SELECT * FROM t WHERE id = %s', 0.1),
+            ('SELECT * FROM t WHERE id = %s', 0.3),
+            ('SELECT * FROM u', 0.2),
+        ]
+        self.assertEqual(
+            recorder.duplicates(), [('SELECT * FROM t WHERE id = %s', 2)]
+        )
+        self.assertEqual(
+            recorder.slowest(1), [('SELECT * FROM t WHERE id = %s', 0.3)]
+        )
+
+    def test_requests_are_recorded(self):
+        trips_year = self.init_trips_year()
+        user = self.make_director()
+        user.is_superuser = True
+        user.save()
+        url = reverse('core:landing_page', kwargs={'trips_year': trips_year})
+        self.app.get(url, user=user)
+
+        body = self.app.get(reverse('metrics'), user=user).text
+        labels = 'pid="{}",view="core:landing_page"'.format(os.getpid())
+        self.assertIn(
+            'fyt_request_duration_seconds_count{{{}}} 1'.format(labels), body
+        )
+        self.assertIn(
+            'fyt_request_queries_bucket{{{},le="+Inf"}} 1'.format(labels), body
+        )
+
+    def test_duplicated_query_shapes_are_exported(self):
+        recorder = QueryRecorder()
+        recorder.queries = [
+            ('SELECT * FROM t WHERE id = 1', 0.1),
+            ('SELECT * FROM t WHERE id = 2', 0.1),
+            ('SELECT * FROM t WHERE id = 3', 0.1),
+            ('SELECT * FROM u', 0.1),
+        ]
+        registry.observe('view', 0.5, recorder)
+        registry.observe('view', 0.5, recorder)
+
+        body = registry.render()
+        self.assertIn(
+            'fyt_request_duplicated_query_shapes_total{{pid="{}",view="view",'
+            'shape="SELECT * FROM t WHERE id = %s"}} 4'.format(os.getpid()),
+            body,
+        )
+        self.assertIn(
+            'fyt_request_duplicate_queries_total{{pid="{}",view="view"}} 4'.format(
+                os.getpid()
+            ),
+            body,
+        )
+
+    def test_metrics_are_staff_only(self):
+        self.app.get(reverse('metrics'), user=self.make_user(), status=403)
+
+
+class HttpClientTestCase(unittest.TestCase):
+    url = 'https://example.com/api'
+
+    def setUp(self):
+        http.metrics.clear()
+        self.session = http.HostSession(
+            'example.com', breaker=http.CircuitBreaker(failure_threshold=2)
+        )
+
+    def test_fake_transport(self):
+        with http.fake_transport() as transport:
+            transport.add(self.url, json={'a': 1})
+            r = self.session.get(self.url, params={'q': 'x'})
+
+        self.assertEqual(r.json(), {'a': 1})
+        self.assertEqual(transport.requests[0].url, self.url + '?q=x')
+
+    def test_unknown_url_is_a_connection_error(self):
+        with http.fake_transport():
+            with self.assertRaises(requests.ConnectionError):
+                self.session.get(self.url)
+
+    def test_circuit_opens_after_failures(self):
+        with http.fake_transport() as transport:
+            transport.add(self.url, exception=requests.Timeout())
+            for i in range(2):
+                with self.assertRaises(requests.Timeout):
+                    self.session.get(self.url)
+
+            transport.add(self.url, json={})
+            with self.assertRaises(http.CircuitOpenError):
+                self.session.get(self.url)
+            self.assertEqual(len(transport.requests), 2)
+
+            # A trial request is let through after the reset timeout
+            self.session.breaker.reset_timeout = 0
+            self.assertEqual(self.session.get(self.url).json(), {})
+            self.assertEqual(self.session.breaker.state, http.CircuitBreaker.CLOSED)
+
+    def test_server_errors_count_as_failures(self):
+        with http.fake_transport() as transport:
+            transport.add(self.url, status=503)
+            self.session.get(self.url)
+            self.session.get(self.url)
+            with self.assertRaises(http.CircuitOpenError):
+                self.session.get(self.url)
+
+    def test_metrics(self):
+        with http.fake_transport() as transport:
+            transport.add(self.url, exception=requests.Timeout())
+            with self.assertRaises(requests.Timeout):
+                self.session.get(self.url)
+
+        body = http.metrics.render()
+        pid = os.getpid()
+        self.assertIn(
+            'fyt_http_client_duration_seconds_count'
+            '{{pid="{}",host="example.com"}} 1'.format(pid),
+            body,
+        )
+        self.assertIn(
+            'fyt_http_client_errors_total'
+            '{{pid="{}",host="example.com",kind="timeout"}} 1'.format(pid),
+            body,
+        )
+
+    def test_sessions_are_shared_per_host(self):
+        self.assertIs(
+            http.session('https://example.org/a'), http.session('https://example.org/b')
+        )
+
+    def test_sessions_are_shared_per_options(self):
+        default = http.session('https://example.org/a')
+        no_retries = http.session('https://example.org/b', retries=0)
+        self.assertIsNot(no_retries, default)
+        self.assertIs(http.session('https://example.org/c', retries=0), no_retries)
+        url = 'https://example.org/'
+        self.assertEqual(no_retries.get_adapter(url).max_retries.total, 0)
+        self.assertEqual(default.get_adapter(url).max_retries.total, 2)
@@ -1,9 +1,14 @@
-from braces.views import SuperuserRequiredMixin
+from braces.views import StaffuserRequiredMixin, SuperuserRequiredMixin
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.http import HttpResponse
 from django.shortcuts import render
 from django.utils.encoding import force_text
+from django.views.generic import View
 from vanilla import TemplateView
 
+from fyt.utils import http
+from fyt.utils.metrics import registry
+
 
 class HomePage(TemplateView):
     """ Site landing page """
@@ -20,6 +25,21 @@ class RaiseError(LoginRequiredMixin, SuperuserRequiredMixin, TemplateView):
         )
 
 
+class Metrics(StaffuserRequiredMixin, View):
+    """
+    Request and outbound HTTP metrics for this process, in the Prometheus
+    text format.
+    """
+
+    raise_exception = True
+
+    def get(self, request, *args, **kwargs):
+        return HttpResponse(
+            registry.render() + http.metrics.render(),
+            content_type='text/plain; version=0.0.4; charset=utf-8',
+        )
+
+
 def permission_denied(request, exception):
     """
     Custom 403 page.
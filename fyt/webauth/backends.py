@@ -1,11 +1,11 @@
 from urllib.parse import urljoin
 from xml.etree import ElementTree
 
-import requests
 from django.conf import settings
 from django.contrib.auth.backends import ModelBackend
 
 from fyt.users.models import DartmouthUser
+from fyt.utils import http
 
 
 def parse_cas_success(tree):
@@ -42,7 +42,9 @@ def verify(ticket, service):
 
     # TODO: ensure that url uses https
     url = urljoin(settings.CAS_SERVER_URL, 'serviceValidate')
-    r = requests.get(url, params=params)
+    # Tickets can only be validated once, so a retry after the server has
+    # seen the ticket would always fail
+    r = http.session(url, retries=0).get(url, params=params)
 
     if r.status_code == 200:
         tree = ElementTree.fromstring(r.text)